@@ -15,6 +15,22 @@ import json
 import base64
 from datetime import datetime
 
+from price_matrix_service import invalidate_price_matrix_cache, get_price_matrix_cache_stats
+from pvgis_cache import get_pvgis_cache_stats, clear_pvgis_cache
+from solar_model import load_typical_year_csv
+try:
+    from chart_cache import get_chart_cache_stats, clear_chart_cache, configure_from_constants as configure_chart_cache_from_constants
+except ImportError:
+    get_chart_cache_stats = clear_chart_cache = configure_chart_cache_from_constants = None
+try:
+    from product_image_store import get_product_thumbnail
+except ImportError:
+    def get_product_thumbnail(product_id, size=128): return None
+try:
+    from product_db import bulk_import_products
+except ImportError:
+    bulk_import_products = None
+
 # NEU: Definition von WIDGET_KEY_SUFFIX, um NameError zu beheben
 # Dieser Suffix wird verwendet, um die Eindeutigkeit von Streamlit-Widget-Keys
 # innerhalb dieses Admin-Panels sicherzustellen.
@@ -37,6 +53,8 @@ _DEFAULT_GLOBAL_CONSTANTS_FALLBACK: Dict[str, Any] = {
     'maintenance_increase_percent_pa': 2.0, 'one_time_bonus_eur': 0.0,
     'global_yield_adjustment_percent': 0.0, 'reference_specific_yield_pr': 1100.0,
     'pvgis_enabled': True,  # Neue Option für PVGIS aktivieren/deaktivieren
+    'pvgis_cache_enabled': True, 'pvgis_offline_mode': False, 'pvgis_cache_ttl_days': 180, 'pvgis_cache_max_entries': 5000,
+    'local_solar_model_enabled': True,
     'specific_yields_by_orientation_tilt': {
         "Süd_0":1050.0, "Süd_15":1080.0, "Süd_30":1100.0, "Süd_45":1080.0, "Süd_60":1050.0,
         "Südost_0":980.0, "Südost_15":1030.0, "Südost_30":1070.0, "Südost_45":1030.0, "Südost_60":980.0,
@@ -53,6 +71,8 @@ _DEFAULT_GLOBAL_CONSTANTS_FALLBACK: Dict[str, Any] = {
     'monthly_production_distribution': [0.03,0.05,0.08,0.11,0.13,0.14,0.13,0.12,0.09,0.06,0.04,0.02],
     'monthly_consumption_distribution': [1/12]*12, 
     'direct_self_consumption_factor_of_production': 0.25,
+    'energy_balance_mode': 'monthly', 'storage_max_c_rate': 0.5, 'storage_min_soc_percent': 0.0,
+    'chart_cache_max_mb': 64, 'chart_cache_disk_enabled': False, 'chart_cache_disk_max_mb': 256,
     'co2_per_tree_kg_pa': 12.5, 'co2_per_car_km_kg': 0.12, 'co2_per_flight_muc_pmi_kg': 180.0,
     'economic_settings': {'reference_specific_yield_for_pr_kwh_per_kwp': 1100.0}, 
     'default_performance_ratio_percent': 78.0, 'peak_shaving_effect_kw_estimate': 0.0,
@@ -529,6 +549,7 @@ def render_product_management(
     )
 
     if uploaded_product_file_bulk is not None:
+        bulk_import_dry_run = st.checkbox(get_text_local("admin_product_import_dry_run_label", "Probelauf (nur prüfen, nichts speichern)"), value=False, key=f"product_bulk_dry_run{WIDGET_KEY_SUFFIX}")
         if st.button(get_text_local("admin_process_product_file_button", "Hochgeladene Produkt-Datei verarbeiten"), key=f"process_bulk_product_btn{WIDGET_KEY_SUFFIX}"):
             try:
                 df_products_import = None
@@ -555,70 +576,21 @@ def render_product_management(
                     if not detected_encoding and df_products_import is None: 
                         st.error("Konnte CSV-Datei mit gängigen Kodierungen/Trennzeichen nicht verarbeiten.")
                 
-                if df_products_import is not None:
+                if df_products_import is not None and bulk_import_products is None:
+                    st.error("Produkt-Importfunktion (product_db) nicht verfügbar.")
+                elif df_products_import is not None:
                     df_products_import.columns = [str(col).strip().lower().replace(' ', '_') for col in df_products_import.columns]
                     st.write("Vorschau der importierten Daten (erste 5 Zeilen):", df_products_import.head()) 
-                    imported_count, updated_count, skipped_count = 0, 0, 0; error_rows = []
-                    db_columns_from_product_db = [
-                        'id', 'category', 'model_name', 'brand', 'price_euro', 
-                        'capacity_w', 'storage_power_kw', 'power_kw', 'max_cycles', 
-                        'warranty_years', 'length_m', 'width_m', 'weight_kg', 
-                        'efficiency_percent', 'origin_country', 'description', 'pros', 'cons', 
-                        'rating', 'image_base64', 'datasheet_link_db_path', 
-                        'additional_cost_netto', 'created_at', 'updated_at'
-                    ]
-                    df_products_import.rename(columns={'last_updated': 'updated_at'}, inplace=True, errors='ignore') 
-                    required_cols_import = ['model_name', 'category'] 
-                    missing_required = [col for col in required_cols_import if col not in df_products_import.columns]
-                    if missing_required: 
-                        st.error(f"Fehlende Pflichtspalten in der hochgeladenen Datei: {', '.join(missing_required)}. Import abgebrochen.")
+                    import_report = bulk_import_products(df_products_import, dry_run=bulk_import_dry_run)
+                    if import_report['dry_run']:
+                        st.info(f"Probelauf (keine Änderungen gespeichert): {import_report['inserted']} Produkte würden neu hinzugefügt, {import_report['updated']} aktualisiert, {import_report['skipped']} übersprungen.")
                     else:
-                        for index, row in df_products_import.iterrows():
-                            product_data_import = {}
-                            try:
-                                product_data_import = {k: (v if pd.notna(v) else None) for k, v in row.to_dict().items()}
-                                product_data_import_filtered = {db_col: product_data_import.get(db_col) for db_col in db_columns_from_product_db if db_col in product_data_import}
-                                if not product_data_import_filtered.get('model_name') or not product_data_import_filtered.get('category'):
-                                    skipped_count += 1
-                                    error_rows.append({'row': index + 2, 'reason': "Modellname oder Kategorie fehlt in Zeile."})
-                                    continue
-                                for num_col in ['price_euro', 'capacity_w', 'storage_power_kw', 'power_kw', 'warranty_years', 'length_m', 'width_m', 'weight_kg', 'efficiency_percent', 'additional_cost_netto', 'max_cycles', 'rating']:
-                                    if num_col in product_data_import_filtered and product_data_import_filtered[num_col] is not None:
-                                        try:
-                                            val_str = str(product_data_import_filtered[num_col])
-                                            if '.' in val_str and ',' in val_str: 
-                                                if val_str.rfind('.') < val_str.rfind(','): 
-                                                    val_str = val_str.replace('.', '') 
-                                            val_str = val_str.replace(',', '.') 
-                                            product_data_import_filtered[num_col] = float(val_str)
-                                            if num_col in ['warranty_years', 'max_cycles', 'rating'] and product_data_import_filtered[num_col] is not None:
-                                                 product_data_import_filtered[num_col] = int(product_data_import_filtered[num_col])
-                                        except (ValueError, TypeError): 
-                                            error_rows.append({'row': index + 2, 'model': product_data_import_filtered.get('model_name'), 'column': num_col, 'value': product_data_import_filtered[num_col], 'reason': 'Zahlenkonvertierung fehlgeschlagen'})
-                                            product_data_import_filtered[num_col] = None 
-                                existing_product = get_product_by_model_name_func(str(product_data_import_filtered['model_name']))
-                                if existing_product and 'id' in existing_product: 
-                                    if update_product_func(existing_product['id'], product_data_import_filtered): 
-                                        updated_count += 1
-                                    else: 
-                                        skipped_count += 1
-                                        error_rows.append({'row': index + 2, 'model': product_data_import_filtered.get('model_name'), 'reason': 'Datenbank-Update fehlgeschlagen'})
-                                else:
-                                    if add_product_func(product_data_import_filtered): 
-                                        imported_count += 1
-                                    else: 
-                                        skipped_count += 1
-                                        error_rows.append({'row': index + 2, 'model': product_data_import_filtered.get('model_name'), 'reason': 'Datenbank-Hinzufügen fehlgeschlagen (evtl. Duplikat oder anderer Fehler)'})
-                            except Exception as e_row: 
-                                skipped_count += 1
-                                current_model_name_for_error = product_data_import.get('model_name', f"Zeile {index+2}")
-                                error_rows.append({'row': index + 2, 'model': current_model_name_for_error, 'reason': f"Allgemeiner Fehler: {str(e_row)}"})
-                        st.success(f"Produktimport abgeschlossen: {imported_count} Produkte neu hinzugefügt, {updated_count} Produkte aktualisiert, {skipped_count} Produkte übersprungen/fehlerhaft.")
-                        if error_rows: 
-                            st.warning("Details zu fehlerhaften/übersprungenen Zeilen (max. erste 10 Fehler):")
-                            st.json(error_rows[:10]) 
-                        st.session_state.selected_page_key_sui = "admin" 
-                        st.rerun() 
+                        st.success(f"Produktimport abgeschlossen: {import_report['inserted']} Produkte neu hinzugefügt, {import_report['updated']} Produkte aktualisiert, {import_report['skipped']} Produkte übersprungen/fehlerhaft.")
+                    if import_report['errors']:
+                        df_import_errors = pd.DataFrame(import_report['errors'])
+                        st.warning(f"Fehlerbericht: {len(df_import_errors)} Einträge")
+                        st.dataframe(df_import_errors, use_container_width=True)
+                        st.download_button("Fehlerbericht herunterladen (CSV)", df_import_errors.to_csv(index=False).encode('utf-8'), file_name="produktimport_fehler.csv", mime="text/csv", key=f"download_bulk_import_errors{WIDGET_KEY_SUFFIX}")
             except Exception as e_bulk_import:
                 st.error(f"Fehler beim Verarbeiten der Produkt-Datei: {e_bulk_import}")
                 traceback.print_exc() 
@@ -662,12 +634,10 @@ def render_product_management(
             
             st.markdown("**"+get_text_local("product_image_header","Produktbild")+"**")
             uploaded_product_image_manual_file_form = st.file_uploader(get_text_local("product_image_upload_label","Produktbild (PNG, JPG, max. 2MB)"), type=["png", "jpg", "jpeg"], key=f"{form_key_manual_prod_ui}_image_upload_man")
-            current_product_image_b64_form = product_data_for_manual_form.get("image_base64")
-            if current_product_image_b64_form and not uploaded_product_image_manual_file_form and st.session_state.product_to_edit_id_manual:
-                try:
-                    st.image(base64.b64decode(current_product_image_b64_form), caption=get_text_local("product_current_image_caption","Aktuelles Produktbild"), width=100)
-                except Exception:
-                    pass 
+            if product_data_for_manual_form.get("has_image") and not uploaded_product_image_manual_file_form and st.session_state.product_to_edit_id_manual:
+                current_product_thumbnail_form = get_product_thumbnail(st.session_state.product_to_edit_id_manual, 160)
+                if current_product_thumbnail_form:
+                    st.image(current_product_thumbnail_form, caption=get_text_local("product_current_image_caption","Aktuelles Produktbild"), width=100)
             
             st.markdown("**"+get_text_local("product_datasheet_header","Produktdatenblatt (PDF)")+"**")
             uploaded_datasheet_pdf_file_form = st.file_uploader(get_text_local("product_datasheet_upload_label","Datenblatt-PDF hochladen (max. 5MB)"), type="pdf", key=f"{form_key_manual_prod_ui}_datasheet_upload_man")
@@ -705,7 +675,6 @@ def render_product_management(
                     "brand": p_brand_form.strip(), "price_euro": p_price_form, 
                     "additional_cost_netto": p_add_cost_form, "warranty_years": p_warranty_form, 
                     "description": p_description_form_val.strip(), 
-                    "image_base64": current_product_image_b64_form, # Start with current, update if new one uploaded
                     "datasheet_link_db_path": current_datasheet_link # Start with current
                 }
                 if p_category_form == 'Modul': 
@@ -844,10 +813,10 @@ def render_product_management(
             list_cols_r = st.columns([0.4, 2, 0.8, 0.8, 1, 0.8, 0.4, 0.4])
             list_cols_r[0].text(str(prod_id_in_list) if prod_id_in_list is not None else "N/A")
             list_cols_r[1].text(f"{prod_item_in_list.get('brand','') or ''} {prod_item_in_list.get('model_name','') or ''}".strip())
-            prod_img_b64_list_view = prod_item_in_list.get('image_base64')
-            if prod_img_b64_list_view:
+            prod_thumbnail_list_view = get_product_thumbnail(prod_id_in_list, 64) if prod_item_in_list.get('has_image') else None
+            if prod_thumbnail_list_view:
                 try:
-                    list_cols_r[2].image(base64.b64decode(prod_img_b64_list_view), width=40)
+                    list_cols_r[2].image(prod_thumbnail_list_view, width=40)
                 except Exception:
                     list_cols_r[2].caption("err")
             else:
@@ -950,6 +919,11 @@ def render_general_settings_extended(load_admin_setting_func: Callable, save_adm
             else: st.error(get_text_local("admin_economic_yield_settings_save_error", "Fehler beim Speichern der Einstellungen."))
 
 def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_func: Callable, parse_csv_func_from_calculations: Callable, parse_excel_func_local_admin: Callable):
+    def save_price_matrix_setting(key: str, value: Any) -> bool:
+        # Geparste Matrix im Cache verwerfen, sobald neue Daten gespeichert oder gelöscht werden
+        saved = save_admin_setting_func(key, value)
+        if saved: invalidate_price_matrix_cache()
+        return saved
     if 'uploaded_excel_bytes_for_save_admin' not in st.session_state: st.session_state.uploaded_excel_bytes_for_save_admin = None
     if 'parsed_excel_df_for_preview_admin' not in st.session_state: st.session_state.parsed_excel_df_for_preview_admin = None
     if 'uploaded_csv_content_for_save_admin' not in st.session_state: st.session_state.uploaded_csv_content_for_save_admin = None
@@ -974,7 +948,7 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
         st.markdown("---"); st.markdown("**Vorschau Excel Preis-Matrix (nicht gespeichert):**"); st.dataframe(st.session_state.parsed_excel_df_for_preview_admin, use_container_width=True)
         if st.button(get_text_local("admin_save_price_matrix_button_xlsx", "...Excel...speichern"), key=f"save_uploaded_price_matrix_xlsx_btn{WIDGET_KEY_SUFFIX}"):
             if st.session_state.uploaded_excel_bytes_for_save_admin:
-                if save_admin_setting_func('price_matrix_excel_bytes', st.session_state.uploaded_excel_bytes_for_save_admin):
+                if save_price_matrix_setting('price_matrix_excel_bytes', st.session_state.uploaded_excel_bytes_for_save_admin):
                     st.success("Preis-Matrix (Excel) gespeichert!"); st.session_state.uploaded_excel_bytes_for_save_admin = None; st.session_state.parsed_excel_df_for_preview_admin = None
                     st.session_state.selected_page_key_sui = "admin"; st.rerun()
                 else: st.error("Fehler beim Speichern der Excel Preis-Matrix.")
@@ -989,7 +963,7 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
         if parsed_stored_df_pm_excel is not None and not parsed_stored_df_pm_excel.empty:
             st.dataframe(parsed_stored_df_pm_excel, use_container_width=True)
             if st.button(get_text_local("admin_delete_saved_price_matrix_button_xlsx", "Excel Preis-Matrix löschen"), key=f"delete_price_matrix_excel_final{WIDGET_KEY_SUFFIX}"):
-                if save_admin_setting_func('price_matrix_excel_bytes', None): st.success("Excel Preis-Matrix gelöscht."); st.session_state.selected_page_key_sui = "admin"; st.rerun()
+                if save_price_matrix_setting('price_matrix_excel_bytes', None): st.success("Excel Preis-Matrix gelöscht."); st.session_state.selected_page_key_sui = "admin"; st.rerun()
                 else: st.error("Fehler Löschen Excel Preis-Matrix.")
         else: st.warning("Gespeicherte Excel Preis-Matrix ungültig.")
     else: st.info("Keine Excel Preis-Matrix gespeichert.")
@@ -1017,7 +991,7 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
         st.markdown("---"); st.markdown("**Vorschau CSV Preis-Matrix (nicht gespeichert):**"); st.dataframe(st.session_state.parsed_csv_df_for_preview_admin, use_container_width=True)
         if st.button(get_text_local("admin_save_price_matrix_button_csv", "...CSV...speichern"), key=f"save_uploaded_price_matrix_csv_btn{WIDGET_KEY_SUFFIX}"):
             if st.session_state.uploaded_csv_content_for_save_admin:
-                if save_admin_setting_func('price_matrix_csv_data', st.session_state.uploaded_csv_content_for_save_admin):
+                if save_price_matrix_setting('price_matrix_csv_data', st.session_state.uploaded_csv_content_for_save_admin):
                     st.success("Preis-Matrix (CSV) gespeichert!"); st.session_state.uploaded_csv_content_for_save_admin = None; st.session_state.parsed_csv_df_for_preview_admin = None
                     st.session_state.selected_page_key_sui = "admin"; st.rerun()
                 else: st.error("Fehler beim Speichern der CSV Preis-Matrix.")
@@ -1032,11 +1006,13 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
         if parsed_stored_df_pm_csv is not None and not parsed_stored_df_pm_csv.empty:
             st.dataframe(parsed_stored_df_pm_csv, use_container_width=True)
             if st.button(get_text_local("admin_delete_saved_price_matrix_button_csv", "...CSV...löschen"), key=f"delete_price_matrix_csv_final{WIDGET_KEY_SUFFIX}"):
-                if save_admin_setting_func('price_matrix_csv_data', None): st.success("CSV Preis-Matrix gelöscht."); st.session_state.selected_page_key_sui = "admin"; st.rerun()
+                if save_price_matrix_setting('price_matrix_csv_data', None): st.success("CSV Preis-Matrix gelöscht."); st.session_state.selected_page_key_sui = "admin"; st.rerun()
                 else: st.error("Fehler Löschen CSV Preis-Matrix.")
         else:
             st.warning("Gespeicherte CSV Preis-Matrix ungültig."); st.text_area("Rohdaten CSV (max. 500 Z.)", value=current_price_matrix_csv_from_db[:500]+"..." if len(current_price_matrix_csv_from_db) > 500 else current_price_matrix_csv_from_db, height=100, disabled=True, key=f"raw_db_csv_preview{WIDGET_KEY_SUFFIX}")
     else: st.info("Keine CSV Preis-Matrix gespeichert.")
+    matrix_cache_stats = get_price_matrix_cache_stats()
+    st.caption(f"Preis-Matrix-Cache: {matrix_cache_stats['hits']} Treffer, {matrix_cache_stats['misses']} Parser-Läufe, {matrix_cache_stats['invalidations']} Invalidierungen")
 
 def render_tariff_management(load_admin_setting_func: Callable, save_admin_setting_func: Callable):
     st.subheader(get_text_local("admin_tariff_management_header", "Einspeisevergütungen"))
@@ -1136,10 +1112,24 @@ def render_advanced_settings(load_admin_setting_func: Callable, save_admin_setti
             key=f"pvgis_system_loss{WIDGET_KEY_SUFFIX}",
             help=get_text_local("admin_pvgis_system_loss_help", "Systemverluste für PVGIS-Berechnung (Standard: 14%)")
         )
+
+        col_pvc1, col_pvc2 = st.columns(2)
+        with col_pvc1:
+            pvgis_cache_enabled = st.checkbox(get_text_local("admin_pvgis_cache_enabled_label", "PVGIS-Antworten zwischenspeichern"), value=bool(current_global_constants.get('pvgis_cache_enabled', True)), key=f"pvgis_cache_enabled{WIDGET_KEY_SUFFIX}")
+            pvgis_offline_mode = st.checkbox(get_text_local("admin_pvgis_offline_mode_label", "Offline-Modus (nur Cache, keine Netzwerkanfragen)"), value=bool(current_global_constants.get('pvgis_offline_mode', False)), key=f"pvgis_offline_mode{WIDGET_KEY_SUFFIX}")
+            local_solar_model_enabled = st.checkbox(get_text_local("admin_local_solar_model_enabled_label", "Lokales Solarmodell als Ersatz für PVGIS"), value=bool(current_global_constants.get('local_solar_model_enabled', True)), key=f"local_solar_model_enabled{WIDGET_KEY_SUFFIX}", help=get_text_local("admin_local_solar_model_enabled_help", "Berechnet Erträge offline aus Sonnenstand und Klimadaten, wenn PVGIS deaktiviert oder nicht erreichbar ist."))
+        with col_pvc2:
+            pvgis_cache_ttl_days = st.number_input(get_text_local("admin_pvgis_cache_ttl_label", "Cache-Gültigkeit (Tage)"), value=float(current_global_constants.get('pvgis_cache_ttl_days', 180)), min_value=1.0, max_value=3650.0, step=1.0, format="%.0f", key=f"pvgis_cache_ttl{WIDGET_KEY_SUFFIX}")
+            pvgis_cache_max_entries = st.number_input(get_text_local("admin_pvgis_cache_max_entries_label", "Max. Cache-Einträge"), value=int(current_global_constants.get('pvgis_cache_max_entries', 5000)), min_value=10, max_value=1000000, step=100, key=f"pvgis_cache_max_entries{WIDGET_KEY_SUFFIX}")
         
         if st.form_submit_button(get_text_local("admin_save_pvgis_settings_button", "PVGIS-Einstellungen speichern")):
             current_global_constants['pvgis_enabled'] = pvgis_enabled
             current_global_constants['pvgis_system_loss_default_percent'] = pvgis_system_loss
+            current_global_constants['pvgis_cache_enabled'] = pvgis_cache_enabled
+            current_global_constants['pvgis_offline_mode'] = pvgis_offline_mode
+            current_global_constants['pvgis_cache_ttl_days'] = pvgis_cache_ttl_days
+            current_global_constants['pvgis_cache_max_entries'] = int(pvgis_cache_max_entries)
+            current_global_constants['local_solar_model_enabled'] = local_solar_model_enabled
             
             if save_admin_setting_func('global_constants', current_global_constants):
                 st.success(get_text_local("admin_pvgis_settings_save_success", "PVGIS-Einstellungen erfolgreich gespeichert."))
@@ -1147,6 +1137,58 @@ def render_advanced_settings(load_admin_setting_func: Callable, save_admin_setti
                 st.rerun()
             else:
                 st.error(get_text_local("admin_pvgis_settings_save_error", "Fehler beim Speichern der PVGIS-Einstellungen."))
+
+    pvgis_cache_stats = get_pvgis_cache_stats()
+    col_pvs1, col_pvs2 = st.columns([3, 1])
+    col_pvs1.caption(f"PVGIS-Cache: {pvgis_cache_stats.get('entries') or 0} Einträge, {pvgis_cache_stats['hits']} Treffer / {pvgis_cache_stats['misses']} Fehlgriffe seit Start")
+    if col_pvs2.button(get_text_local("admin_pvgis_cache_clear_button", "PVGIS-Cache leeren"), key=f"pvgis_cache_clear_btn{WIDGET_KEY_SUFFIX}"):
+        st.success(f"{clear_pvgis_cache()} Einträge gelöscht.")
+
+    # Typjahr für das lokale Solarmodell (z.B. PVGIS-TMY-Export); ohne Datei werden die Klimatabellen genutzt
+    uploaded_typical_year = st.file_uploader(get_text_local("admin_typical_year_upload_label", "Typjahr-Klimadaten für lokales Solarmodell (CSV, 8760 Stunden)"), type=["csv"], key=f"typical_year_upload{WIDGET_KEY_SUFFIX}")
+    if uploaded_typical_year is not None:
+        typical_year_text = uploaded_typical_year.getvalue().decode("utf-8", errors="replace")
+        typical_year_errors: List[str] = []
+        if load_typical_year_csv(typical_year_text, typical_year_errors) is None:
+            for err_typical_year in typical_year_errors: st.error(err_typical_year)
+        elif st.button(get_text_local("admin_typical_year_save_button", "Typjahr speichern"), key=f"typical_year_save_btn{WIDGET_KEY_SUFFIX}"):
+            if save_admin_setting_func('solar_model_typical_year_csv', typical_year_text): st.success(get_text_local("admin_typical_year_saved", "Typjahr gespeichert."))
+            else: st.error(get_text_local("admin_typical_year_save_error", "Fehler beim Speichern des Typjahrs."))
+    if load_admin_setting_func('solar_model_typical_year_csv', ""):
+        st.caption(get_text_local("admin_typical_year_active", "Importiertes Typjahr aktiv."))
+        if st.button(get_text_local("admin_typical_year_delete_button", "Typjahr entfernen (Klimatabellen nutzen)"), key=f"typical_year_delete_btn{WIDGET_KEY_SUFFIX}"):
+            if save_admin_setting_func('solar_model_typical_year_csv', ""): st.rerun()
+
+    # Energiebilanz-Einstellungen (monatliche Faktoren vs. stündliche Simulation)
+    st.markdown("---")
+    st.subheader(get_text_local("admin_energy_balance_settings_header", "Energiebilanz"))
+    with st.form(f"energy_balance_settings_form{WIDGET_KEY_SUFFIX}"):
+        energy_balance_options = ['monthly', 'hourly']
+        current_energy_balance_mode = current_global_constants.get('energy_balance_mode', 'monthly')
+        energy_balance_mode = st.selectbox(
+            get_text_local("admin_energy_balance_mode_label", "Berechnungsmodus Eigenverbrauch"),
+            options=energy_balance_options,
+            index=energy_balance_options.index(current_energy_balance_mode) if current_energy_balance_mode in energy_balance_options else 0,
+            format_func=lambda x: get_text_local(f"admin_energy_balance_mode_{x}", "Monatlich (Faktoren)" if x == 'monthly' else "Stündlich (8760 h Simulation)"),
+            key=f"energy_balance_mode_select{WIDGET_KEY_SUFFIX}"
+        )
+        col_eb1, col_eb2 = st.columns(2)
+        with col_eb1: storage_max_c_rate = st.number_input(label=get_text_local("admin_storage_max_c_rate_label", "Max. Lade-/Entladeleistung (C-Rate)"), value=float(current_global_constants.get('storage_max_c_rate', 0.5)), min_value=0.05, max_value=5.0, step=0.05, format="%.2f", key=f"storage_max_c_rate{WIDGET_KEY_SUFFIX}", help=get_text_local("admin_storage_max_c_rate_help", "Wird genutzt, wenn beim Speicherprodukt keine Leistung (power_kw) hinterlegt ist."))
+        with col_eb2: storage_min_soc_percent = st.number_input(label=get_text_local("admin_storage_min_soc_label", "Minimaler Ladezustand (%)"), value=float(current_global_constants.get('storage_min_soc_percent', 0.0)), min_value=0.0, max_value=50.0, step=1.0, format="%.0f", key=f"storage_min_soc{WIDGET_KEY_SUFFIX}")
+        if st.form_submit_button(get_text_local("admin_save_energy_balance_settings_button", "Energiebilanz-Einstellungen speichern")):
+            current_global_constants['energy_balance_mode'] = energy_balance_mode
+            current_global_constants['storage_max_c_rate'] = storage_max_c_rate
+            current_global_constants['storage_min_soc_percent'] = storage_min_soc_percent
+            if save_admin_setting_func('global_constants', current_global_constants):
+                st.success(get_text_local("admin_energy_balance_settings_save_success", "Energiebilanz-Einstellungen gespeichert."))
+                st.session_state.selected_page_key_sui = "admin"
+                st.rerun()
+            else:
+                st.error(get_text_local("admin_energy_balance_settings_save_error", "Fehler beim Speichern der Energiebilanz-Einstellungen."))
+
+    # Diagramm-Cache (Plotly → PNG): Speicherbudget und optionale Ablage auf der Festplatte
+    if get_chart_cache_stats is not None:
+        render_chart_cache_settings(current_global_constants, save_admin_setting_func)
     
     render_api_key_settings(load_admin_setting_func, save_admin_setting_func) 
     st.markdown("---"); st.subheader(get_text_local("admin_localization_settings_header", "Lokalisierung"))
@@ -1329,6 +1371,33 @@ def manage_templates_local(template_type_key: str, template_list_setting_key: st
                     st.session_state[confirm_delete_session_key] = True; st.session_state.selected_page_key_sui = "admin"; st.rerun() 
     st.markdown("---")
 
+def render_chart_cache_settings(current_global_constants: Dict[str, Any], save_admin_setting_func: Callable):
+    st.markdown("---")
+    st.subheader(get_text_local("admin_chart_cache_settings_header", "Diagramm-Cache"))
+    with st.form(f"chart_cache_settings_form{WIDGET_KEY_SUFFIX}"):
+        col_cc1, col_cc2, col_cc3 = st.columns(3)
+        with col_cc1: chart_cache_max_mb = st.number_input(get_text_local("admin_chart_cache_max_mb_label", "Speicherbudget (MB)"), value=float(current_global_constants.get('chart_cache_max_mb', 64)), min_value=0.0, max_value=4096.0, step=16.0, format="%.0f", key=f"chart_cache_max_mb{WIDGET_KEY_SUFFIX}")
+        with col_cc2: chart_cache_disk_enabled = st.checkbox(get_text_local("admin_chart_cache_disk_enabled_label", "Zusätzlich auf Festplatte ablegen"), value=bool(current_global_constants.get('chart_cache_disk_enabled', False)), key=f"chart_cache_disk_enabled{WIDGET_KEY_SUFFIX}")
+        with col_cc3: chart_cache_disk_max_mb = st.number_input(get_text_local("admin_chart_cache_disk_max_mb_label", "Festplatten-Budget (MB)"), value=float(current_global_constants.get('chart_cache_disk_max_mb', 256)), min_value=0.0, max_value=65536.0, step=64.0, format="%.0f", key=f"chart_cache_disk_max_mb{WIDGET_KEY_SUFFIX}")
+        if st.form_submit_button(get_text_local("admin_save_chart_cache_settings_button", "Diagramm-Cache-Einstellungen speichern")):
+            current_global_constants['chart_cache_max_mb'] = chart_cache_max_mb
+            current_global_constants['chart_cache_disk_enabled'] = chart_cache_disk_enabled
+            current_global_constants['chart_cache_disk_max_mb'] = chart_cache_disk_max_mb
+            if save_admin_setting_func('global_constants', current_global_constants):
+                configure_chart_cache_from_constants(current_global_constants)
+                st.success(get_text_local("admin_chart_cache_settings_save_success", "Diagramm-Cache-Einstellungen gespeichert."))
+            else:
+                st.error(get_text_local("admin_chart_cache_settings_save_error", "Fehler beim Speichern der Diagramm-Cache-Einstellungen."))
+    chart_cache_stats = get_chart_cache_stats()
+    col_ccs1, col_ccs2 = st.columns([3, 1])
+    col_ccs1.caption(
+        f"Diagramm-Cache: {chart_cache_stats['entries']} Diagramme, {chart_cache_stats['memory_bytes'] / 1024 / 1024:.1f} MB, "
+        f"Trefferquote {chart_cache_stats['hit_rate']:.0%} ({chart_cache_stats['memory_hits']} Speicher / {chart_cache_stats['disk_hits']} Festplatte / {chart_cache_stats['misses']} neu gerendert), "
+        f"ca. {chart_cache_stats['render_seconds_saved']:.1f} s Renderzeit gespart"
+    )
+    if col_ccs2.button(get_text_local("admin_chart_cache_clear_button", "Diagramm-Cache leeren"), key=f"chart_cache_clear_btn{WIDGET_KEY_SUFFIX}"):
+        st.success(f"{clear_chart_cache()} Einträge gelöscht.")
+
 def render_api_key_settings(load_admin_setting_func: Callable, save_admin_setting_func: Callable):
     st.subheader(get_text_local("admin_api_keys_header", "API-Key Verwaltung"))
     st.info(get_text_local("admin_api_keys_info", "Verwalten Sie hier Ihre API-Schlüssel für externe Dienste..."))
@@ -23,6 +23,8 @@ from reportlab.lib import colors # Für HexColor Zugriff
 import colorsys # Für HLS/RGB Konvertierungen
 from datetime import datetime, timedelta
 from calculations import AdvancedCalculationsIntegrator
+from chart_cache import render_figure_cached, configure_from_constants as configure_chart_cache_from_constants
+from chart_export_queue import register_chart_export
 # HINZUGEFÜGT: Import der kompletten Finanz-Tools
 from financial_tools import (
     calculate_annuity, 
@@ -527,12 +529,16 @@ def _apply_custom_style_to_fig(fig: go.Figure, viz_settings: Dict[str, Any], cha
 def _export_plotly_fig_to_bytes(fig: Optional[go.Figure], texts: Dict[str,str]) -> Optional[bytes]:
     if fig is None: return None
     try:
-        return fig.to_image(format="png", scale=2, width=900, height=550)
+        return render_figure_cached(fig, format="png", scale=2, width=900, height=550)
     except Exception as e:
         if "kaleido" in str(e).lower() and 'st' in globals() and hasattr(st, 'warning'):
              st.warning(get_text(texts, "analysis_chart_export_error_kaleido_v4", "Hinweis: Diagramm-Export für PDF fehlgeschlagen (Kaleido?). Details: {error_details}").format(error_details=str(e)))
         return None
 
+def _defer_chart_export(target: Dict[str, Any], result_key: str, fig: Optional[go.Figure]) -> None:
+    """Merkt die Figur für den PDF-Export vor; gerastert wird erst, wenn ein PDF angefordert wird."""
+    register_chart_export(target, result_key, fig, format="png", scale=2, width=900, height=550)
+
 AVAILABLE_CHART_TYPES = {
     "bar": "Balkendiagramm", "line": "Liniendiagramm",
     "area": "Flächendiagramm", "pie": "Kreisdiagramm",
@@ -622,7 +628,7 @@ def render_daily_production_switcher(analysis_results: Dict[str, Any], texts: Di
     
     if fig:
         st.plotly_chart(fig, use_container_width=True, key="analysis_daily_prod_switcher_key_v7_2d")
-        analysis_results['daily_production_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'daily_production_switcher_chart_bytes', fig)
     else:
         st.error("Fehler beim Erstellen des Tagesproduktions-Diagramms")
 
@@ -664,7 +670,7 @@ def render_weekly_production_switcher(analysis_results: Dict[str, Any], texts: D
     
     if fig:
         st.plotly_chart(fig, use_container_width=True, key="analysis_weekly_prod_switcher_key_v7_2d")
-        analysis_results['weekly_production_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'weekly_production_switcher_chart_bytes', fig)
     else:
         st.error("Fehler beim Erstellen des Wochenproduktions-Diagramms")
 
@@ -709,7 +715,7 @@ def render_yearly_production_switcher(analysis_results: Dict[str, Any], texts: D
     
     if fig:
         st.plotly_chart(fig, use_container_width=True, key="analysis_yearly_prod_switcher_key_v7_2d")
-        analysis_results['yearly_production_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'yearly_production_switcher_chart_bytes', fig)
     else:
         st.error("Fehler beim Erstellen des Jahresproduktions-Diagramms")
 
@@ -754,7 +760,7 @@ def render_project_roi_matrix_switcher(analysis_results: Dict[str, Any], texts:
     
     if fig:
         st.plotly_chart(fig, use_container_width=True, key="analysis_project_roi_matrix_switcher_key_v7_2d")
-        analysis_results['project_roi_matrix_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'project_roi_matrix_switcher_chart_bytes', fig)
     else:
         st.error("Fehler beim Erstellen des ROI-Diagramms")
 
@@ -803,7 +809,7 @@ def render_feed_in_revenue_switcher(analysis_results: Dict[str, Any], texts: Dic
     
     if fig:
         st.plotly_chart(fig, use_container_width=True, key="analysis_feed_in_revenue_switcher_key_v7_2d")
-        analysis_results['feed_in_revenue_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'feed_in_revenue_switcher_chart_bytes', fig)
     else:
         st.error("Fehler beim Erstellen des Einspeisevergütungs-Diagramms")
 
@@ -901,7 +907,7 @@ def render_production_vs_consumption_switcher(analysis_results: Dict[str, Any],
     )
     
     st.plotly_chart(fig, use_container_width=True, key="analysis_prod_vs_cons_switcher_key_v7_2d")
-    analysis_results['prod_vs_cons_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+    _defer_chart_export(analysis_results, 'prod_vs_cons_switcher_chart_bytes', fig)
 
 def render_tariff_cube_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_tariff_cube_switcher", "Tarifvergleich - Anbieter (2D Diagramm)"))
@@ -938,7 +944,7 @@ def render_tariff_cube_switcher(analysis_results: Dict[str, Any], texts: Dict[st
     )
     
     if fig:
-        analysis_results['tariff_cube_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'tariff_cube_switcher_chart_bytes', fig)
     else:
         analysis_results['tariff_cube_switcher_chart_bytes'] = None
 
@@ -1020,7 +1026,7 @@ def render_co2_savings_value_switcher(analysis_results: Dict[str, Any],
 
     
     if fig:
-        analysis_results['co2_savings_value_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'co2_savings_value_switcher_chart_bytes', fig)
     else:
         analysis_results['co2_savings_value_switcher_chart_bytes'] = None
 
@@ -1596,7 +1602,7 @@ def render_co2_savings_value_switcher(analysis_results: Dict[str, Any],
     
     if fig:
         st.plotly_chart(fig, use_container_width=True, key="analysis_co2_savings_value_switcher_key_v6_final")
-        analysis_results['co2_savings_value_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+        _defer_chart_export(analysis_results, 'co2_savings_value_switcher_chart_bytes', fig)
     else:
         st.warning("CO₂-Diagramm konnte nicht erstellt werden.")
         analysis_results['co2_savings_value_switcher_chart_bytes'] = None
@@ -1653,7 +1659,7 @@ def render_investment_value_switcher(analysis_results: Dict[str, Any], texts: Di
         y_label="Gesamtrendite (%)",
         chart_key="investment_value_modern_2d_chart"
     )
-    analysis_results['investment_value_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'investment_value_switcher_chart_bytes', fig)
 
 def render_storage_effect_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_storage_effect_subheader_switcher", "Speicherwirkung – Kapazität vs. Nutzen (Illustrativ)"))
@@ -1697,7 +1703,7 @@ def render_storage_effect_switcher(analysis_results: Dict[str, Any], texts: Dict
         y_label="Jährl. Einsparpotenzial (€)",
         chart_key="storage_effect_modern_2d_chart"
     )
-    analysis_results['storage_effect_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'storage_effect_switcher_chart_bytes', fig)
 
 def render_selfuse_stack_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_selfuse_stack_subheader_switcher", "Eigenverbrauch vs. Einspeisung - Jährlicher Vergleich"))
@@ -1751,7 +1757,7 @@ def render_selfuse_stack_switcher(analysis_results: Dict[str, Any], texts: Dict[
     
     _apply_custom_style_to_fig(fig,viz_settings,"selfuse_stack_switcher")
     st.plotly_chart(fig,use_container_width=True,key="analysis_selfuse_stack_switcher_key_v6_final")
-    analysis_results['selfuse_stack_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+    _defer_chart_export(analysis_results, 'selfuse_stack_switcher_chart_bytes', fig)
 
 def render_cost_growth_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_cost_growth_subheader_switcher", "Stromkostensteigerung - 2D Szenarien"))
@@ -1796,7 +1802,7 @@ def render_cost_growth_switcher(analysis_results: Dict[str, Any], texts: Dict[st
     
     _apply_custom_style_to_fig(fig,viz_settings,"cost_growth_switcher")
     st.plotly_chart(fig,use_container_width=True,key="analysis_cost_growth_switcher_key_v6_final")
-    analysis_results['cost_growth_switcher_chart_bytes'] = _export_plotly_fig_to_bytes(fig, texts)
+    _defer_chart_export(analysis_results, 'cost_growth_switcher_chart_bytes', fig)
 
 def render_selfuse_ratio_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_selfuse_ratio_subheader_switcher", "Eigenverbrauchsgrad – Monatliche Bubble View (Jahr 1)"))
@@ -1829,7 +1835,7 @@ def render_selfuse_ratio_switcher(analysis_results: Dict[str, Any], texts: Dict[
     )
     _apply_custom_style_to_fig(fig,viz_settings,"selfuse_ratio_switcher")
     st.plotly_chart(fig,use_container_width=True,key="analysis_selfuse_ratio_switcher_key_v6_final")
-    analysis_results['selfuse_ratio_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'selfuse_ratio_switcher_chart_bytes', fig)
 
 def render_roi_comparison_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_roi_comparison_subheader_switcher", "ROI-Vergleich – Investitionen in 3D (Illustrativ)"))
@@ -1864,7 +1870,7 @@ def render_roi_comparison_switcher(analysis_results: Dict[str, Any], texts: Dict
     )
     
     st.plotly_chart(fig,use_container_width=True,key="analysis_roi_comparison_switcher_key_v6_final")
-    analysis_results['roi_comparison_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'roi_comparison_switcher_chart_bytes', fig)
 
 def render_scenario_comparison_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_scenario_comp_subheader_switcher", "Szenarienvergleich – Invest/Ertrag/Bonus (Illustrativ)"))
@@ -1909,7 +1915,7 @@ def render_scenario_comparison_switcher(analysis_results: Dict[str, Any], texts:
     
     _apply_custom_style_to_fig(fig,viz_settings,"scenario_comparison_switcher")
     st.plotly_chart(fig,use_container_width=True,key="analysis_scenario_comp_switcher_key_v6_final")
-    analysis_results['scenario_comparison_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'scenario_comparison_switcher_chart_bytes', fig)
 
 def render_tariff_comparison_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_tariff_comp_subheader_switcher", "Vorher/Nachher – Monatliche Stromkosten (Jahr 1)"))
@@ -1954,7 +1960,7 @@ def render_tariff_comparison_switcher(analysis_results: Dict[str, Any], texts: D
     
     _apply_custom_style_to_fig(fig,viz_settings,"tariff_comparison_switcher")
     st.plotly_chart(fig,use_container_width=True,key="analysis_tariff_comp_switcher_key_v6_final")
-    analysis_results['tariff_comparison_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'tariff_comparison_switcher_chart_bytes', fig)
 
 def render_income_projection_switcher(analysis_results: Dict[str, Any], texts: Dict[str, str], viz_settings: Dict[str, Any]):
     st.subheader(get_text(texts, "viz_income_proj_subheader_switcher", "💸 Einnahmen/Ersparnisprognose – Dynamischer Verlauf"))
@@ -1989,7 +1995,7 @@ def render_income_projection_switcher(analysis_results: Dict[str, Any], texts: D
     )
     _apply_custom_style_to_fig(fig,viz_settings,"income_projection_switcher")
     st.plotly_chart(fig,use_container_width=True,key="analysis_income_proj_switcher_key_v6_final")
-    analysis_results['income_projection_switcher_chart_bytes']=_export_plotly_fig_to_bytes(fig,texts)
+    _defer_chart_export(analysis_results, 'income_projection_switcher_chart_bytes', fig)
 
 def _create_monthly_production_consumption_chart(analysis_results_local: Dict, texts_local: Dict, viz_settings: Dict[str, Any], chart_key_prefix: str) -> Optional[go.Figure]:
     # Sichere Behandlung von viz_settings
@@ -2174,7 +2180,7 @@ def _render_consumption_coverage_pie(analysis_results_local: Dict, texts_local:
                        hole=0.3,color_discrete_sequence=dynamic_color_list)
             _apply_custom_style_to_fig(fig,viz_settings,"consumption_coverage_chart")
             st.plotly_chart(fig,use_container_width=True,key=f"{chart_key_prefix}_final_pie_chart_key_v7_corrected")
-            analysis_results_local[f'{chart_key_prefix}_chart_bytes'] = _export_plotly_fig_to_bytes(fig,texts_local)
+            _defer_chart_export(analysis_results_local, f'{chart_key_prefix}_chart_bytes', fig)
         else:
             st.info(get_text(texts_local,"no_data_for_consumption_pie_chart_filtered","Keine signifikanten Anteile für Verbrauchsdeckungsdiagramm."))
             analysis_results_local[f'{chart_key_prefix}_chart_bytes'] = None
@@ -2238,7 +2244,7 @@ def _render_pv_usage_pie(analysis_results_local: Dict, texts_local: Dict, viz_se
                        hole=0.3,color_discrete_sequence=dynamic_color_list)
             _apply_custom_style_to_fig(fig,viz_settings,"pv_usage_chart")
             st.plotly_chart(fig,use_container_width=True,key=f"{chart_key_prefix}_final_pie_chart_key_v7_corrected")
-            analysis_results_local[f'{chart_key_prefix}_chart_bytes'] = _export_plotly_fig_to_bytes(fig,texts_local)
+            _defer_chart_export(analysis_results_local, f'{chart_key_prefix}_chart_bytes', fig)
         else:
             st.info(get_text(texts_local,"no_data_for_pv_usage_pie_chart_filtered","Keine signifikanten Anteile für PV-Nutzungsdiagramm."))
             analysis_results_local[f'{chart_key_prefix}_chart_bytes'] = None
@@ -3593,6 +3599,7 @@ def render_analysis(texts: Dict[str, str], results: Optional[Dict[str, Any]] = N
 
     st.sidebar.subheader(get_text(texts, "analysis_interactive_settings_header", "Analyse-Parameter"))
     admin_defaults_gc = load_admin_setting('global_constants', {'simulation_period_years': 20, 'electricity_price_increase_annual_percent': 3.0})
+    configure_chart_cache_from_constants(admin_defaults_gc)
     admin_default_sim_years = int(admin_defaults_gc.get('simulation_period_years', 20) or 20)
     admin_default_price_increase = float(admin_defaults_gc.get('electricity_price_increase_annual_percent', 3.0) or 3.0)
     current_sim_years_for_ui = admin_default_sim_years; current_price_increase_for_ui = admin_default_price_increase
@@ -3673,21 +3680,21 @@ def render_analysis(texts: Dict[str, str], results: Optional[Dict[str, Any]] = N
     fig_monthly_comp = _create_monthly_production_consumption_chart(results_for_display, texts, viz_settings, "monthly_compare")
     if fig_monthly_comp:
         st.plotly_chart(fig_monthly_comp, use_container_width=True, key="analysis_monthly_comp_chart_final_v8_corrected")
-        results_for_display['monthly_prod_cons_chart_bytes'] = _export_plotly_fig_to_bytes(fig_monthly_comp, texts)
+        _defer_chart_export(results_for_display, 'monthly_prod_cons_chart_bytes', fig_monthly_comp)
     else: st.info(get_text(texts, "no_data_for_monthly_comparison_chart_v3", "Daten für Monatsvergleich (Prod/Verbr) unvollständig."))
 
     _add_chart_controls("cost_projection", texts, default_type="line", supported_types=["line", "bar"], viz_settings=viz_settings)
     fig_cost_projection = _create_electricity_cost_projection_chart(results_for_display, texts, viz_settings, "cost_projection")
     if fig_cost_projection:
         st.plotly_chart(fig_cost_projection, use_container_width=True, key="analysis_cost_proj_chart_final_v8_corrected")
-        results_for_display['cost_projection_chart_bytes'] = _export_plotly_fig_to_bytes(fig_cost_projection, texts)
+        _defer_chart_export(results_for_display, 'cost_projection_chart_bytes', fig_cost_projection)
     else: st.info(get_text(texts, "no_data_for_cost_projection_chart_v3", "Daten für Kostenhochrechnung unvollständig."))
 
     _add_chart_controls("cum_cashflow", texts, default_type="area", supported_types=["area", "line", "bar"], viz_settings=viz_settings)
     fig_cum_cf = _create_cumulative_cashflow_chart(results_for_display, texts, viz_settings, "cum_cashflow")
     if fig_cum_cf:
         st.plotly_chart(fig_cum_cf, use_container_width=True, key="analysis_cum_cashflow_chart_final_v8_corrected")
-        results_for_display['cumulative_cashflow_chart_bytes'] = _export_plotly_fig_to_bytes(fig_cum_cf, texts)
+        _defer_chart_export(results_for_display, 'cumulative_cashflow_chart_bytes', fig_cum_cf)
     else: st.info(get_text(texts, "no_data_for_cumulative_cashflow_chart_v3", "Daten für kum. Cashflow unvollständig."))
     st.markdown("---")
 
@@ -10,11 +10,20 @@ import pandas as pd
 import numpy as np
 import json
 import math
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 import traceback
+import os
 import requests # Für HTTP-Anfragen an PVGIS
 
+from calculations_hourly import run_hourly_energy_balance
+from price_matrix_service import PriceMatrix, get_price_matrix
+import pvgis_cache
+from solar_model import get_local_yield_data, load_typical_year_csv
+
+# PVGIS-Endpunkt; per Umgebungsvariable überschreibbar (z.B. lokaler Stub-Server in Tests)
+PVGIS_API_URL = os.environ.get("PVGIS_API_URL", "https://re.jrc.ec.europa.eu/api/seriescalc")
+
 _global_import_errors_calc: List[str] = []
 
 # --- DUMMY FUNKTIONEN UND FALLBACKS ---
@@ -53,6 +62,9 @@ def Dummy_load_admin_setting_calc(key, default=None):
             'default_specific_yield_kwh_kwp': 950.0,
             'reference_specific_yield_pr': 1100.0,
             'pvgis_enabled': True,  # Neue Option für PVGIS aktivieren/deaktivieren
+            'pvgis_cache_enabled': True, 'pvgis_offline_mode': False, # Persistenter PVGIS-Cache / nur Cache nutzen
+            'pvgis_cache_ttl_days': 180, 'pvgis_cache_max_entries': 5000,
+            'local_solar_model_enabled': True, # Lokales Solarmodell (solar_model.py) statt Pauschalwerten, wenn PVGIS nicht verfügbar
             'specific_yields_by_orientation_tilt': {
                 "Süd_0":950.0, "Süd_15":980.0, "Süd_30":1000.0, "Süd_45":980.0, "Süd_60":950.0,
                 "Südost_0":900.0, "Südost_15":930.0, "Südost_30":950.0, "Südost_45":930.0, "Südost_60":900.0,
@@ -68,6 +80,8 @@ def Dummy_load_admin_setting_calc(key, default=None):
             'monthly_production_distribution': [0.03,0.05,0.08,0.11,0.13,0.14,0.13,0.12,0.09,0.06,0.04,0.02],
             'monthly_consumption_distribution': [0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0837], # Summe ca. 1
             'direct_self_consumption_factor_of_production': 0.25,
+            'energy_balance_mode': 'monthly', # 'monthly' oder 'hourly' (8760-Stunden-Simulation)
+            'storage_max_c_rate': 0.5, 'storage_min_soc_percent': 0.0,
             'co2_per_tree_kg_pa': 12.5, 'co2_per_car_km_kg': 0.12,
             'co2_per_flight_muc_pmi_kg': 180.0,
             'economic_settings': {'reference_specific_yield_for_pr_kwh_per_kwp': 1100.0},
@@ -1502,9 +1516,16 @@ def get_pvgis_data(
     latitude: float, longitude: float, peak_power_kwp: float,
     tilt: int, azimuth: int, system_loss_percent: float = 14.0,
     texts: Optional[Dict[str,str]] = None, errors_list: Optional[List[str]] = None,
-    debug_mode_enabled: bool = False
+    debug_mode_enabled: bool = False, use_cache: bool = True, offline_mode: bool = False,
+    cache_ttl_days: Optional[float] = pvgis_cache.DEFAULT_TTL_DAYS, cache_max_entries: int = pvgis_cache.DEFAULT_MAX_ENTRIES
 ) -> Optional[Dict[str, Any]]:
-    """Holt PV-Produktionsdaten von der PVGIS API."""
+    """
+    Holt PV-Produktionsdaten von der PVGIS API.
+
+    Antworten werden normiert auf 1 kWp im persistenten Cache (pvgis_cache.py) abgelegt und bei
+    gleicher Lage/Ausrichtung für jede Anlagengröße wiederverwendet. Im Offline-Modus wird
+    ausschließlich der Cache genutzt (kein Netzwerkzugriff).
+    """
     local_errors: List[str] = [] # Für interne Fehler dieser Funktion
     texts = texts if texts is not None else {} # Sicherstellen, dass texts ein Dict ist
     effective_errors_list = errors_list if errors_list is not None else local_errors
@@ -1521,7 +1542,18 @@ def get_pvgis_data(
         # if debug_mode_enabled: print(f"PVGIS Error: {actual_error_msg}") # Bereinigt
         return None
 
-    base_url = "https://re.jrc.ec.europa.eu/api/seriescalc"
+    cache_key = pvgis_cache.make_cache_key(latitude, longitude, tilt, azimuth, system_loss_percent, "crystSi", "building")
+    if use_cache or offline_mode:
+        cached_per_kwp = pvgis_cache.get_cached_pvgis_per_kwp(cache_key, ttl_days=cache_ttl_days)
+        if cached_per_kwp is not None:
+            cached_result = pvgis_cache.scale_pvgis_result(cached_per_kwp, peak_power_kwp)
+            cached_result["pvgis_cache_hit"] = True
+            return cached_result
+    if offline_mode:
+        effective_errors_list.append(texts.get("pvgis_offline_cache_miss", "PVGIS-Offline-Modus: Keine zwischengespeicherten Daten für diesen Standort. Nutze manuelle Ertragsberechnung.") or "")
+        return None
+
+    base_url = PVGIS_API_URL
     params = {
         "lat": latitude, "lon": longitude, "peakpower": peak_power_kwp, "loss": system_loss_percent,
         "pvtechchoice": "crystSi", "mountingplace": "building", "angle": tilt, "aspect": azimuth,
@@ -1561,12 +1593,16 @@ def get_pvgis_data(
             effective_errors_list.append(error_msg_pvgis)
             return None
 
-        return {
+        pvgis_result = {
             "monthly_production_kwh": monthly_production_kwh,
             "annual_production_kwh": annual_production_kwh,
             "specific_yield_kwh_kwp_pa": specific_yield_kwh_kwp_pa,
             "pvgis_source": data.get("meta", {}).get("source", "PVGIS-TMY") # Quelle der Daten (z.B. TMY, ERA5)
         }
+        if use_cache:
+            pvgis_cache.store_pvgis_per_kwp(cache_key, pvgis_cache.normalize_pvgis_result(pvgis_result, peak_power_kwp), max_entries=cache_max_entries)
+        pvgis_result["pvgis_cache_hit"] = False
+        return pvgis_result
 
     except requests.exceptions.HTTPError as e_http:
         status_code_val = e_http.response.status_code if e_http.response is not None else "N/A"
@@ -1594,10 +1630,61 @@ def get_pvgis_data(
         # if debug_mode_enabled: print(f"PVGIS Fehler: {error_msg_pvgis}") # Bereinigt
     return None
 
-def perform_calculations(
+def load_calculation_context(texts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Lädt alles, was perform_calculations aus der Datenbank braucht, genau einmal:
+    globale Konstanten, Einspeisetarife, Preis-Matrix (geparst) und einen Produkt-Cache.
+    Der Kontext kann an perform_calculations bzw. perform_calculations_batch übergeben werden.
+    """
+    texts = texts if texts is not None else {}
+    load_errors: List[str] = []
+
+    global_constants = real_load_admin_setting('global_constants')
+    if not isinstance(global_constants, dict) or not global_constants:
+        global_constants = Dummy_load_admin_setting_calc('global_constants')
+        load_errors.append(texts.get("warn_global_constants_fallback", "Warnung: Fallback für globale Konstanten verwendet."))
+
+    # --- Preis-Matrix laden (geparst und indiziert aus dem Cache, siehe price_matrix_service) ---
+    price_matrix = get_price_matrix(
+        real_load_admin_setting('price_matrix_excel_bytes', None), # Aus DB laden (Bytes)
+        real_load_admin_setting('price_matrix_csv_data', ""), # Aus DB laden (String)
+        load_errors
+    )
+
+    # Optional importiertes Typjahr für das lokale Solarmodell (geparst und gecacht pro Inhalt)
+    typical_year_csv = real_load_admin_setting('solar_model_typical_year_csv', "")
+    typical_year = load_typical_year_csv(typical_year_csv, load_errors) if typical_year_csv else None
+
+    # Einspeisevergütungen laden
+    feed_in_tariffs_block = real_load_admin_setting('feed_in_tariffs', Dummy_load_admin_setting_calc('feed_in_tariffs'))
+
+    # Produkt-Lookups werden je Kontext nur einmal gegen die DB aufgelöst
+    product_cache: Dict[Any, Optional[Dict[str, Any]]] = {}
+    def get_product_by_id_cached(product_id: Any) -> Optional[Dict[str, Any]]:
+        if product_id not in product_cache:
+            product_cache[product_id] = real_get_product_by_id(product_id)
+        return product_cache[product_id]
+
+    return {
+        'global_constants': global_constants,
+        'load_errors': load_errors,
+        'price_matrix': price_matrix,
+        'price_matrix_source_type': price_matrix.source_type if price_matrix is not None else "Keine",
+        'feed_in_tariffs_parts': feed_in_tariffs_block.get('parts', []) if isinstance(feed_in_tariffs_block, dict) else [],
+        'feed_in_tariffs_full': feed_in_tariffs_block.get('full', []) if isinstance(feed_in_tariffs_block, dict) else [],
+        'get_product_by_id': get_product_by_id_cached,
+        'typical_year': typical_year,
+    }
+
+def _calculate_project_base(
     project_data: Dict[str, Any], texts: Dict[str, str], errors_list: List[str],
-    simulation_duration_user: Optional[int] = None, electricity_price_increase_user: Optional[float] = None
-) -> Dict[str, Any]:
+    simulation_duration_user: Optional[int], electricity_price_increase_user: Optional[float],
+    calculation_context: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Stufe 1 von perform_calculations: Ertrag, Energiebilanz, Kosten und Jahr-1-Kennzahlen.
+    Liefert die (Teil-)Ergebnisse und den Zustand für Cashflow-Simulation und Abschluss.
+    """
     results: Dict[str, Any] = {"calculation_errors": errors_list}
     customer_data = project_data.get('customer_data', {})
     project_details = project_data.get('project_details', {})
@@ -1608,50 +1695,21 @@ def perform_calculations(
     module_quantity = int(project_details.get('module_quantity', 0) or 0)
     # selected_module_id wird später für die Kapazität benötigt, aber die Anzahl ist jetzt schon da.
 
-    global_constants = real_load_admin_setting('global_constants')
-    if not isinstance(global_constants, dict) or not global_constants:
-        global_constants = Dummy_load_admin_setting_calc('global_constants')
-        errors_list.append(texts.get("warn_global_constants_fallback", "Warnung: Fallback für globale Konstanten verwendet."))
+    global_constants = calculation_context['global_constants']
+    errors_list.extend(calculation_context['load_errors'])
+    get_product_by_id = calculation_context['get_product_by_id']
 
     app_debug_mode_is_enabled = global_constants.get('app_debug_mode_enabled', False)
     if not isinstance(app_debug_mode_is_enabled, bool): 
         app_debug_mode_is_enabled = False
-    # --- Preis-Matrix laden ---
-    price_matrix_df_for_lookup: Optional[pd.DataFrame] = None
-    price_matrix_excel_bytes = real_load_admin_setting('price_matrix_excel_bytes', None) # Aus DB laden (Bytes)
-    price_matrix_csv_content = real_load_admin_setting('price_matrix_csv_data', "") # Aus DB laden (String)
-    results['price_matrix_source_type'] = "Keine"
-
-    if price_matrix_excel_bytes and isinstance(price_matrix_excel_bytes, bytes):
-        # if app_debug_mode_is_enabled: print("CALC: Versuche, Preis-Matrix aus Excel-Bytes zu parsen.") # Bereinigt
-        price_matrix_df_for_lookup = parse_module_price_matrix_excel(price_matrix_excel_bytes, errors_list)
-        if price_matrix_df_for_lookup is not None and not price_matrix_df_for_lookup.empty:
-            # if app_debug_mode_is_enabled: print("CALC: Preis-Matrix erfolgreich aus Excel-Bytes geladen.") # Bereinigt
-            results['price_matrix_source_type'] = "Excel"
-        else:
-            # if app_debug_mode_is_enabled: errors_list.append("CALC: Parsen der Excel-Preis-Matrix fehlgeschlagen oder Ergebnis leer. Versuche CSV...") # Bereinigt
-            price_matrix_df_for_lookup = None # Explizit zurücksetzen, falls Excel-Versuch fehlschlägt
-    
-    if price_matrix_df_for_lookup is None: # Nur wenn Excel nicht erfolgreich war oder nicht vorhanden
-        if price_matrix_csv_content and isinstance(price_matrix_csv_content, str) and price_matrix_csv_content.strip():
-            # if app_debug_mode_is_enabled: print("CALC: Kein Excel-Matrix oder Fehler, versuche Preis-Matrix aus CSV-Daten zu parsen.") # Bereinigt
-            price_matrix_df_for_lookup = parse_module_price_matrix_csv(price_matrix_csv_content, errors_list)
-            if price_matrix_df_for_lookup is not None and not price_matrix_df_for_lookup.empty:
-                # if app_debug_mode_is_enabled: print("CALC: Preis-Matrix erfolgreich aus CSV-Daten geladen.") # Bereinigt
-                results['price_matrix_source_type'] = "CSV"
-            else:
-                # if app_debug_mode_is_enabled: errors_list.append("CALC: Parsen der CSV-Preis-Matrix fehlgeschlagen oder Ergebnis leer.") # Bereinigt
-                price_matrix_df_for_lookup = None # Sicherstellen, dass es None ist bei Fehlschlag
-        # elif app_debug_mode_is_enabled and price_matrix_excel_bytes is None : # Bereinigt
-             # print("CALC: Weder Excel- noch CSV-Preis-Matrix-Daten in Admin-Settings gefunden.")
+    # --- Preis-Matrix (einmalig im Kontext geladen) ---
+    price_matrix: Optional[PriceMatrix] = calculation_context['price_matrix']
+    results['price_matrix_source_type'] = calculation_context['price_matrix_source_type']
+    results['price_matrix_loaded_successfully'] = price_matrix is not None and not price_matrix.empty
 
-    results['price_matrix_loaded_successfully'] = price_matrix_df_for_lookup is not None and not price_matrix_df_for_lookup.empty
-    # if app_debug_mode_is_enabled: print(f"CALC: Preis-Matrix für Lookup geladen: {results['price_matrix_loaded_successfully']} (Quelle: {results.get('price_matrix_source_type', 'Keine')})") # Bereinigt
-
-    # Einspeisevergütungen laden
-    feed_in_tariffs_block = real_load_admin_setting('feed_in_tariffs', Dummy_load_admin_setting_calc('feed_in_tariffs'))
-    einspeiseverguetung_parts_data = feed_in_tariffs_block.get('parts', []) if isinstance(feed_in_tariffs_block, dict) else []
-    einspeiseverguetung_full_data = feed_in_tariffs_block.get('full', []) if isinstance(feed_in_tariffs_block, dict) else []
+    # Einspeisevergütungen
+    einspeiseverguetung_parts_data = calculation_context['feed_in_tariffs_parts']
+    einspeiseverguetung_full_data = calculation_context['feed_in_tariffs_full']
 
     # Globale Konstanten extrahieren mit robusten Fallbacks
     DEFAULT_YIELD_KWH_PER_KWP_ANNUAL = float(global_constants.get('default_specific_yield_kwh_kwp', 950.0) or 950.0)
@@ -1679,7 +1737,7 @@ def perform_calculations(
 
     # Anlagengröße
     selected_module_id = project_details.get('selected_module_id')
-    module_details = real_get_product_by_id(selected_module_id) if selected_module_id else None
+    module_details = get_product_by_id(selected_module_id) if selected_module_id else None
     module_capacity_w = float(module_details.get('capacity_w', 0.0) or 0.0) if module_details else 0.0
     results['anlage_kwp'] = (module_quantity * module_capacity_w) / 1000.0
     
@@ -1711,7 +1769,14 @@ def perform_calculations(
                 orientation_text_val = project_details.get('roof_orientation', 'Süd')
                 azimuth_val = convert_orientation_to_pvgis_azimuth(orientation_text_val)
                 SYSTEM_LOSS_PVGIS = float(global_constants.get('pvgis_system_loss_default_percent', 14.0) or 14.0)
-                pvgis_results_data = get_pvgis_data(lat, lon, results['anlage_kwp'], tilt_val, azimuth_val, SYSTEM_LOSS_PVGIS, texts, errors_list, debug_mode_enabled=app_debug_mode_is_enabled)
+                pvgis_results_data = get_pvgis_data(
+                    lat, lon, results['anlage_kwp'], tilt_val, azimuth_val, SYSTEM_LOSS_PVGIS, texts, errors_list,
+                    debug_mode_enabled=app_debug_mode_is_enabled,
+                    use_cache=bool(global_constants.get('pvgis_cache_enabled', True)),
+                    offline_mode=bool(global_constants.get('pvgis_offline_mode', False)),
+                    cache_ttl_days=float(global_constants.get('pvgis_cache_ttl_days', pvgis_cache.DEFAULT_TTL_DAYS) or pvgis_cache.DEFAULT_TTL_DAYS),
+                    cache_max_entries=int(global_constants.get('pvgis_cache_max_entries', pvgis_cache.DEFAULT_MAX_ENTRIES) or pvgis_cache.DEFAULT_MAX_ENTRIES)
+                )
         except (ValueError, TypeError) as e_coords:
             errors_list.append((texts.get("error_geocoding_conversion_calc", "Fehler Konvertierung Geodaten für PVGIS.") or "") + f" Details: {e_coords}")
             pvgis_results_data = None # Sicherstellen, dass es None ist bei Fehler
@@ -1719,8 +1784,32 @@ def perform_calculations(
         # PVGIS ist deaktiviert - verwende manuelle Berechnung ohne Meldung
         pvgis_results_data = None
 
+    # Lokales Solarmodell als Ersatz, wenn PVGIS deaktiviert, offline oder nicht erreichbar ist
+    if (pvgis_results_data is None and
+        bool(global_constants.get('local_solar_model_enabled', True)) and
+        project_details.get('latitude') not in (None, '') and
+        project_details.get('longitude') not in (None, '') and
+        results['anlage_kwp'] > 0):
+        try:
+            lat_local = float(project_details['latitude'])
+            lon_local = float(project_details['longitude'])
+            if not (abs(lat_local) < 1e-5 and abs(lon_local) < 1e-5):
+                pvgis_results_data = get_local_yield_data(
+                    lat_local, lon_local, results['anlage_kwp'],
+                    int(project_details.get('roof_inclination_deg', 30) or 30),
+                    convert_orientation_to_pvgis_azimuth(project_details.get('roof_orientation', 'Süd')),
+                    float(global_constants.get('pvgis_system_loss_default_percent', 14.0) or 14.0),
+                    typical_year=calculation_context.get('typical_year')
+                )
+        except (ValueError, TypeError) as e_local_model:
+            errors_list.append((texts.get("warn_local_solar_model_failed", "Lokales Solarmodell fehlgeschlagen. Nutze manuelle Ertragsberechnung.") or "") + f" Details: {e_local_model}")
+            pvgis_results_data = None
+
     annual_pv_production_kwh_base, monthly_pv_production_kwh_base = 0.0, [0.0]*12
     results['pvgis_data_used'] = False # Standardmäßig auf False setzen
+    results['local_solar_model_used'] = False
+    production_data_used = False
+    hourly_pv_production_kwh_base = None
 
     if pvgis_results_data and isinstance(pvgis_results_data, dict):
         annual_prod_pvgis = pvgis_results_data.get("annual_production_kwh")
@@ -1735,12 +1824,15 @@ def perform_calculations(
                 monthly_pv_production_kwh_base = monthly_prod_pvgis
                 results['specific_annual_yield_kwh_per_kwp'] = pvgis_results_data.get("specific_yield_kwh_kwp_pa", 0.0)
                 results['pvgis_source'] = pvgis_results_data.get("pvgis_source", "PVGIS")
-                results['pvgis_data_used'] = True
+                results['local_solar_model_used'] = bool(pvgis_results_data.get("local_solar_model", False))
+                results['pvgis_data_used'] = not results['local_solar_model_used']
+                hourly_pv_production_kwh_base = pvgis_results_data.get("hourly_production_kwh")
+                production_data_used = True
         # else: # Bereinigt
             # if app_debug_mode_is_enabled:
                 # errors_list.append(texts.get("warn_pvgis_incomplete_data_fallback", "PVGIS-Antwort unvollständig/fehlerhaft. Nutze manuelle Ertragsberechnung."))
 
-    if not results['pvgis_data_used'] and results['anlage_kwp'] > 0: # Fallback zur manuellen Berechnung
+    if not production_data_used and results['anlage_kwp'] > 0: # Fallback zur manuellen Berechnung
         # if project_details.get('latitude') is not None and app_debug_mode_is_enabled and not any("PVGIS" in err for err in errors_list): # Bereinigt
             # errors_list.append(texts.get("info_pvgis_unavailable_manual_fallback", "PVGIS nicht verfügbar/genutzt. Nutze manuelle Ertragsberechnung."))
         orientation_key = project_details.get('roof_orientation', 'Sonstige') # Default auf 'Sonstige'
@@ -1806,39 +1898,74 @@ def perform_calculations(
     monthly_feed_in_kwh = [0.0] * 12
     monthly_grid_bezug_kwh = [0.0] * 12
 
-    for i in range(12):
-        prod_month = monthly_pv_production_kwh[i]
-        cons_month = monthly_total_consumption_kwh[i]
-
-        # Direkter Eigenverbrauch
-        direct_sc = min(prod_month * direct_sc_from_production_factor, cons_month)
-        monthly_direct_self_consumption_kwh[i] = direct_sc
-
-        rem_prod_after_direct_sc = prod_month - direct_sc
-        rem_cons_after_direct_sc = cons_month - direct_sc
-
-        # Speicherlogik (vereinfacht: Speicher wird geladen, wenn Überschuss, und entladen, wenn Bedarf)
-        if include_storage and selected_storage_capacity_kwh > 0:
-            storage_cycles_per_year_val = float(global_constants.get('storage_cycles_per_year', 250) or 250)
-            # Max. mögliche Ladung/Entladung pro Monat basierend auf Kapazität und Zyklen (vereinfacht)
-            monthly_storage_charge_potential_effective = selected_storage_capacity_kwh * (storage_cycles_per_year_val / 12.0) # Max kWh die pro Monat theoretisch geladen/entladen werden könnten
-
-            # Laden des Speichers
-            # Wie viel kann *vor* Ladeverlusten in den Speicher?
-            potential_charge_to_storage_brutto = min(rem_prod_after_direct_sc, monthly_storage_charge_potential_effective / storage_efficiency if storage_efficiency > 0 else float('inf'))
-            # Tatsächliche Nettoladung unter Berücksichtigung des Wirkungsgrads
-            actual_charge_into_storage_netto = potential_charge_to_storage_brutto * storage_efficiency
-            monthly_storage_charge_kwh[i] = actual_charge_into_storage_netto # Gespeichert: wie viel *im* Speicher ankommt
-            rem_prod_after_direct_sc -= potential_charge_to_storage_brutto # Vom Überschuss abziehen, was zum Laden verwendet wurde (brutto)
-
-            # Entladen des Speichers für Eigenverbrauch
-            discharge_from_storage_for_sc = min(actual_charge_into_storage_netto, rem_cons_after_direct_sc) # Kann max. das entladen, was geladen wurde und was gebraucht wird
-            monthly_storage_discharge_for_sc_kwh[i] = discharge_from_storage_for_sc
-            rem_cons_after_direct_sc -= discharge_from_storage_for_sc
-
-        # Verbleibender Überschuss geht ins Netz, verbleibender Bedarf aus dem Netz
-        monthly_feed_in_kwh[i] = max(0, rem_prod_after_direct_sc)
-        monthly_grid_bezug_kwh[i] = max(0, rem_cons_after_direct_sc)
+    # Energiebilanz-Modus: 'hourly' = 8760-Stunden-Simulation, 'monthly' = bisherige Faktor-Logik
+    energy_balance_mode = str(project_details.get('energy_balance_mode') or global_constants.get('energy_balance_mode', 'monthly') or 'monthly').lower()
+    results['energy_balance_mode'] = 'monthly'
+    if energy_balance_mode == 'hourly':
+        try:
+            storage_power_limit_kw = 0.0
+            if include_storage and selected_storage_id:
+                storage_product_for_sim = get_product_by_id(selected_storage_id)
+                storage_power_limit_kw = float((storage_product_for_sim or {}).get('power_kw', 0.0) or 0.0)
+            if storage_power_limit_kw <= 0 and selected_storage_capacity_kwh > 0:
+                storage_power_limit_kw = selected_storage_capacity_kwh * float(global_constants.get('storage_max_c_rate', 0.5) or 0.5)
+            latitude_for_sim = project_details.get('latitude')
+            hourly_balance = run_hourly_energy_balance(
+                monthly_pv_production_kwh, monthly_total_consumption_kwh,
+                latitude_deg=float(latitude_for_sim) if latitude_for_sim not in (None, '') else None,
+                storage_capacity_kwh=selected_storage_capacity_kwh if include_storage else 0.0,
+                max_charge_kw=storage_power_limit_kw, max_discharge_kw=storage_power_limit_kw,
+                round_trip_efficiency=storage_efficiency,
+                min_soc_percent=float(global_constants.get('storage_min_soc_percent', 0.0) or 0.0),
+                daily_load_profile=global_constants.get('hourly_load_profile_daily'),
+                hourly_production_shape=hourly_pv_production_kwh_base
+            )
+            monthly_direct_self_consumption_kwh = hourly_balance['monthly_direct_self_consumption_kwh']
+            monthly_storage_charge_kwh = hourly_balance['monthly_storage_charge_kwh']
+            monthly_storage_discharge_for_sc_kwh = hourly_balance['monthly_storage_discharge_for_sc_kwh']
+            monthly_feed_in_kwh = hourly_balance['monthly_feed_in_kwh']
+            monthly_grid_bezug_kwh = hourly_balance['monthly_grid_bezug_kwh']
+            results['storage_full_cycles_per_year_sim'] = hourly_balance['storage_full_cycles_per_year_sim']
+            results['peak_grid_import_kw_sim'] = hourly_balance['peak_grid_import_kw_sim']
+            results['peak_feed_in_kw_sim'] = hourly_balance['peak_feed_in_kw_sim']
+            results['energy_balance_mode'] = 'hourly'
+        except Exception as e_hourly:
+            errors_list.append((texts.get("warn_hourly_balance_failed_fallback", "Stündliche Energiebilanz fehlgeschlagen, nutze monatliche Berechnung.") or "") + f" Details: {e_hourly}")
+
+    if results['energy_balance_mode'] == 'monthly':
+        for i in range(12):
+            prod_month = monthly_pv_production_kwh[i]
+            cons_month = monthly_total_consumption_kwh[i]
+
+            # Direkter Eigenverbrauch
+            direct_sc = min(prod_month * direct_sc_from_production_factor, cons_month)
+            monthly_direct_self_consumption_kwh[i] = direct_sc
+
+            rem_prod_after_direct_sc = prod_month - direct_sc
+            rem_cons_after_direct_sc = cons_month - direct_sc
+
+            # Speicherlogik (vereinfacht: Speicher wird geladen, wenn Überschuss, und entladen, wenn Bedarf)
+            if include_storage and selected_storage_capacity_kwh > 0:
+                storage_cycles_per_year_val = float(global_constants.get('storage_cycles_per_year', 250) or 250)
+                # Max. mögliche Ladung/Entladung pro Monat basierend auf Kapazität und Zyklen (vereinfacht)
+                monthly_storage_charge_potential_effective = selected_storage_capacity_kwh * (storage_cycles_per_year_val / 12.0) # Max kWh die pro Monat theoretisch geladen/entladen werden könnten
+
+                # Laden des Speichers
+                # Wie viel kann *vor* Ladeverlusten in den Speicher?
+                potential_charge_to_storage_brutto = min(rem_prod_after_direct_sc, monthly_storage_charge_potential_effective / storage_efficiency if storage_efficiency > 0 else float('inf'))
+                # Tatsächliche Nettoladung unter Berücksichtigung des Wirkungsgrads
+                actual_charge_into_storage_netto = potential_charge_to_storage_brutto * storage_efficiency
+                monthly_storage_charge_kwh[i] = actual_charge_into_storage_netto # Gespeichert: wie viel *im* Speicher ankommt
+                rem_prod_after_direct_sc -= potential_charge_to_storage_brutto # Vom Überschuss abziehen, was zum Laden verwendet wurde (brutto)
+
+                # Entladen des Speichers für Eigenverbrauch
+                discharge_from_storage_for_sc = min(actual_charge_into_storage_netto, rem_cons_after_direct_sc) # Kann max. das entladen, was geladen wurde und was gebraucht wird
+                monthly_storage_discharge_for_sc_kwh[i] = discharge_from_storage_for_sc
+                rem_cons_after_direct_sc -= discharge_from_storage_for_sc
+
+            # Verbleibender Überschuss geht ins Netz, verbleibender Bedarf aus dem Netz
+            monthly_feed_in_kwh[i] = max(0, rem_prod_after_direct_sc)
+            monthly_grid_bezug_kwh[i] = max(0, rem_cons_after_direct_sc)
 
     eigenverbrauch_pro_jahr_kwh = sum(monthly_direct_self_consumption_kwh) + sum(monthly_storage_discharge_for_sc_kwh)
     netzeinspeisung_kwh = sum(monthly_feed_in_kwh)
@@ -1855,11 +1982,11 @@ def perform_calculations(
     })
 
     selected_inverter_id = project_details.get('selected_inverter_id')
-    inverter_details = real_get_product_by_id(selected_inverter_id) if selected_inverter_id else None
+    inverter_details = get_product_by_id(selected_inverter_id) if selected_inverter_id else None
     free_roof_area_sqm = float(project_details.get('free_roof_area_sqm', 0.0) or 0.0)
 
     # --- Kostenberechnung ---
-    storage_details_from_db = real_get_product_by_id(selected_storage_id) if selected_storage_id and include_storage else None
+    storage_details_from_db = get_product_by_id(selected_storage_id) if selected_storage_id and include_storage else None
     storage_name_for_matrix_lookup = texts.get("no_storage_option_for_matrix", "Ohne Speicher")
     if include_storage and storage_details_from_db and storage_details_from_db.get('model_name'):
         storage_name_for_matrix_lookup = storage_details_from_db.get('model_name')
@@ -1867,46 +1994,21 @@ def perform_calculations(
         # errors_list.append(f"CALC: Speicher (ID: {selected_storage_id}) ausgewählt, aber Details nicht in product_db gefunden. Matrix-Preis nutzt '{storage_name_for_matrix_lookup}'.")
 
     base_matrix_price_netto, matrix_column_used_for_price = 0.0, None
-    if price_matrix_df_for_lookup is not None and not price_matrix_df_for_lookup.empty and module_quantity > 0:
+    if price_matrix is not None and not price_matrix.empty and module_quantity > 0:
         # Finde die passende Zeile in der Matrix (genau oder nächstkleinere Modulanzahl)
-        relevant_rows_matrix = price_matrix_df_for_lookup[price_matrix_df_for_lookup.index <= module_quantity]
-        if not relevant_rows_matrix.empty:
-            selected_row_from_matrix = relevant_rows_matrix.iloc[-1] # Letzte Zeile, die Bedingung erfüllt
-            actual_module_count_in_matrix = selected_row_from_matrix.name # Indexwert der Zeile (Modulanzahl)
-            # if module_quantity != actual_module_count_in_matrix and app_debug_mode_is_enabled: # Bereinigt
-                # errors_list.append(f"CALC: Für {module_quantity} Module wurde Matrix-Stufe '{actual_module_count_in_matrix}' Module verwendet.")
-
-            # Spaltennamen normalisieren für robusten Zugriff
-            normalized_matrix_columns_map = {str(col).strip().lower(): str(col) for col in selected_row_from_matrix.index}
-            normalized_storage_name_lookup = str(storage_name_for_matrix_lookup).strip().lower()
-            no_storage_text_normalized_lookup = texts.get("no_storage_option_for_matrix", "Ohne Speicher").strip().lower()
-
-            # Original Spaltennamen aus der Map holen
-            original_no_storage_column_name = normalized_matrix_columns_map.get(no_storage_text_normalized_lookup)
-            original_price_col_key_for_df_access = normalized_matrix_columns_map.get(normalized_storage_name_lookup)
-            price_value_from_matrix = None
-
+        if price_matrix.row_for_module_quantity(module_quantity) is not None:
+            no_storage_option_text = texts.get("no_storage_option_for_matrix", "Ohne Speicher")
             # Versuche Preis für spezifischen Speicher zu finden
-            if original_price_col_key_for_df_access and original_price_col_key_for_df_access in selected_row_from_matrix.index and pd.notna(selected_row_from_matrix[original_price_col_key_for_df_access]):
-                price_value_from_matrix = selected_row_from_matrix[original_price_col_key_for_df_access]
-                matrix_column_used_for_price = original_price_col_key_for_df_access # Speichere den verwendeten Spaltennamen
-            
+            price_value_from_matrix, matrix_column_used_for_price, actual_module_count_in_matrix = price_matrix.lookup(module_quantity, storage_name_for_matrix_lookup)
+
             # Fallback auf "Ohne Speicher", wenn spezifischer Speicher nicht gefunden oder Preis ungültig
-            if price_value_from_matrix is None or not pd.notna(price_value_from_matrix):
-                # if normalized_storage_name_lookup != no_storage_text_normalized_lookup and include_storage : # Bereinigt (Fehlermeldung bereits informativ genug)
-                     # errors_list.append((texts.get("warn_specific_storage_not_in_matrix_fallback_no_storage", "Preis für Speichermodell '{selected_storage_name}' bei {module_count} Modulen nicht in Matrix oder Wert ungültig. Versuche Fallback auf '{no_storage_option_text}'.") or "").format(selected_storage_name=storage_name_for_matrix_lookup, module_count=actual_module_count_in_matrix, no_storage_option_text=texts.get("no_storage_option_for_matrix", "Ohne Speicher")))
-                if original_no_storage_column_name and original_no_storage_column_name in selected_row_from_matrix.index and pd.notna(selected_row_from_matrix[original_no_storage_column_name]):
-                    price_value_from_matrix = selected_row_from_matrix[original_no_storage_column_name]
-                    matrix_column_used_for_price = original_no_storage_column_name # Speichere "Ohne Speicher" als verwendeten Spaltennamen
-                else: # Auch "Ohne Speicher" nicht gefunden oder ungültig
+            if price_value_from_matrix is None:
+                price_value_from_matrix, matrix_column_used_for_price, actual_module_count_in_matrix = price_matrix.lookup(module_quantity, no_storage_option_text)
+                if price_value_from_matrix is None: # Auch "Ohne Speicher" nicht gefunden oder ungültig
                     price_value_from_matrix = 0.0 # Sicherer Fallback
-                    errors_list.append((texts.get("error_no_storage_column_or_price_not_found_in_matrix", "Fehler: Weder Preis für '{selected_storage_name}' noch für '{no_storage_option_text}' bei {module_count} Modulen in Matrix. Grundpreis 0€.") or "").format(selected_storage_name=storage_name_for_matrix_lookup, no_storage_option_text=texts.get("no_storage_option_for_matrix", "Ohne Speicher"), module_count=actual_module_count_in_matrix))
-            
-            try: # Konvertiere den gefundenen Preiswert sicher zu float
-                base_matrix_price_netto = float(price_value_from_matrix if pd.notna(price_value_from_matrix) else 0.0)
-            except (ValueError, TypeError):
-                errors_list.append((texts.get("error_invalid_price_in_matrix_conversion", "Konnte Matrixpreis '{matrix_price_value}' nicht in Zahl umwandeln. Grundpreis 0€.") or "").format(matrix_price_value=price_value_from_matrix))
-                base_matrix_price_netto = 0.0
+                    errors_list.append((texts.get("error_no_storage_column_or_price_not_found_in_matrix", "Fehler: Weder Preis für '{selected_storage_name}' noch für '{no_storage_option_text}' bei {module_count} Modulen in Matrix. Grundpreis 0€.") or "").format(selected_storage_name=storage_name_for_matrix_lookup, no_storage_option_text=no_storage_option_text, module_count=actual_module_count_in_matrix))
+
+            base_matrix_price_netto = price_value_from_matrix
         else: # Keine passende Modulanzahl in Matrix gefunden
             errors_list.append((texts.get("error_module_count_not_in_matrix", "Keine passende Modulanzahl (<= {module_quantity}) in Preis-Matrix gefunden. Grundpreis 0€.") or "").format(module_quantity=module_quantity))
     elif module_quantity > 0: # Matrix nicht geladen oder leer, aber Module vorhanden
@@ -1968,7 +2070,7 @@ def perform_calculations(
             component_id = project_details.get(pd_key)
             cost_val = 0.0
             if component_id:
-                component_details_db = real_get_product_by_id(component_id)
+                component_details_db = get_product_by_id(component_id)
                 cost_val = float(component_details_db.get('additional_cost_netto', 0.0) or 0.0) if component_details_db else 0.0
                 # Spezifische Logik für Optimierer (Menge?) könnte hierhin
                 # if pd_key == 'selected_optimizer_id' and module_quantity > 0: cost_val *= module_quantity # Beispiel
@@ -2050,12 +2152,7 @@ def perform_calculations(
     results['annual_financial_benefit_year1'] = annual_financial_benefit_year1
     results['amortization_time_years'] = total_investment_netto / annual_financial_benefit_year1 if annual_financial_benefit_year1 > 0 else float('inf')
 
-    # --- Simulation über die Jahre ---
-    cash_flows_initial_investment = [-total_investment_netto] # Jahr 0 ist die Investition
-    annual_productions_sim_list, annual_benefits_sim_list, annual_maintenance_costs_sim_list = [],[],[]
-    annual_cash_flows_yearly_list, annual_elec_prices_sim_list, annual_feed_in_tariffs_sim_list = [],[],[]
-    annual_revenue_from_feed_in_sim_list = [] # Für detailliertere Analyse
-
+    # --- Parameter für die Simulation über die Jahre ---
     # Wartungskosten
     maintenance_fixed_pa = float(global_constants.get('maintenance_fixed_eur_pa', 0.0) or 0.0)
     maintenance_variable_pa_kwp = float(global_constants.get('maintenance_variable_eur_per_kwp_pa', 0.0) or 0.0)
@@ -2075,57 +2172,121 @@ def perform_calculations(
     # Wartungskosten für erweiterte Berechnungen definieren
     maintenance_cost_fixed_pa = annual_maintenance_costs_eur_year1_calc
 
-    for year_idx in range(1, results['simulation_period_years_effective'] + 1):
-        current_year_production = annual_pv_production_kwh * (annual_degredation_factor**(year_idx - 1))
-        annual_productions_sim_list.append(current_year_production)
-
-        # Annahme: Anteile von EV und Einspeisung bleiben über die Jahre relativ konstant zur Produktion
-        ev_anteil_an_prod_j1 = eigenverbrauch_pro_jahr_kwh / annual_pv_production_kwh if annual_pv_production_kwh > 0 else 0
-        einspeisung_anteil_an_prod_j1 = netzeinspeisung_kwh / annual_pv_production_kwh if annual_pv_production_kwh > 0 else 0
-
-        current_year_ev = current_year_production * ev_anteil_an_prod_j1
-        current_year_einspeisung = current_year_production * einspeisung_anteil_an_prod_j1
-
-        elec_price_sim = electricity_price_kwh * ((1 + results['electricity_price_increase_rate_effective_percent'] / 100.0)**(year_idx - 1))
-        annual_elec_prices_sim_list.append(elec_price_sim)
-
-        feed_in_tariff_sim = results['einspeiseverguetung_eur_per_kwh'] # Annahme: fester Tarif für EEG-Zeitraum
-        if year_idx > int(global_constants.get('einspeiseverguetung_period_years', 20) or 20): # Nach EEG-Vergütungszeitraum
-            feed_in_tariff_sim = float(global_constants.get('marktwert_strom_eur_per_kwh_after_eeg', 0.03) or 0.03) # Marktwert
-        annual_feed_in_tariffs_sim_list.append(feed_in_tariff_sim)
+    # Eingangsgrößen der Cashflow-Simulation (je Variante ein Skalar, siehe simulate_cash_flows_matrix)
+    cash_flow_params = {
+        'n_years': int(results['simulation_period_years_effective']),
+        'investment_netto': total_investment_netto,
+        'annual_production_kwh': annual_pv_production_kwh,
+        'degradation_factor': annual_degredation_factor,
+        'self_consumption_share': eigenverbrauch_pro_jahr_kwh / annual_pv_production_kwh if annual_pv_production_kwh > 0 else 0,
+        'feed_in_share': netzeinspeisung_kwh / annual_pv_production_kwh if annual_pv_production_kwh > 0 else 0,
+        'electricity_price_kwh': electricity_price_kwh,
+        'electricity_price_increase_rate': results['electricity_price_increase_rate_effective_percent'] / 100.0,
+        'feed_in_tariff_eur_per_kwh': results['einspeiseverguetung_eur_per_kwh'], # Annahme: fester Tarif für EEG-Zeitraum
+        'feed_in_period_years': int(global_constants.get('einspeiseverguetung_period_years', 20) or 20),
+        'market_value_eur_per_kwh_after_eeg': float(global_constants.get('marktwert_strom_eur_per_kwh_after_eeg', 0.03) or 0.03), # Marktwert nach EEG
+        'feed_in_tax_rate': (income_tax_rate_percent / 100.0) if customer_data.get('type', 'Privat').lower() == 'gewerblich' else 0.0,
+        'maintenance_costs_year1': annual_maintenance_costs_eur_year1_calc,
+        'maintenance_increase_rate': maintenance_increase_pa_rate,
+        'discount_rate': loan_interest_rate_percent / 100.0, # Kalkulatorischer Zinssatz (NPV und LCOE)
+    }
+    state = {
+        'customer_data': customer_data, 'project_details': project_details, 'global_constants': global_constants,
+        'app_debug_mode_is_enabled': app_debug_mode_is_enabled, 'cash_flow_params': cash_flow_params,
+        'total_investment_netto': total_investment_netto, 'total_investment_brutto': total_investment_brutto,
+        'annual_financial_benefit_year1': annual_financial_benefit_year1, 'annual_pv_production_kwh': annual_pv_production_kwh,
+        'annual_consumption_kwh_yr': annual_consumption_kwh_yr, 'electricity_price_kwh': electricity_price_kwh,
+        'eigenverbrauch_pro_jahr_kwh': eigenverbrauch_pro_jahr_kwh, 'feed_in_tariff_effective': feed_in_tariff_effective,
+        'inflation_rate_percent': inflation_rate_percent, 'anlage_kwp': anlage_kwp,
+        'annual_module_degradation_percent': annual_module_degradation_percent,
+        'maintenance_cost_fixed_pa': maintenance_cost_fixed_pa, 'include_storage': include_storage,
+        'maintenance_scales_with_price': not (maintenance_fixed_pa > 0 or maintenance_variable_pa_kwp > 0),
+        'one_time_bonus_eur': one_time_bonus_eur, 'vat_rate_percent': vat_rate_percent,
+        'selected_storage_capacity_kwh': selected_storage_capacity_kwh, 'storage_details_from_db': storage_details_from_db,
+        'monthly_direct_self_consumption_kwh': monthly_direct_self_consumption_kwh,
+        'monthly_storage_discharge_for_sc_kwh': monthly_storage_discharge_for_sc_kwh,
+    }
+    return results, state
 
-        cost_savings_sim = current_year_ev * elec_price_sim
-        feed_in_rev_sim = current_year_einspeisung * feed_in_tariff_sim
-        annual_revenue_from_feed_in_sim_list.append(feed_in_rev_sim) # Speichern für Details
 
-        tax_benefit_sim = feed_in_rev_sim * (income_tax_rate_percent / 100.0) if customer_data.get('type', 'Privat').lower() == 'gewerblich' else 0.0
-        maint_costs_sim = annual_maintenance_costs_eur_year1_calc * ((1 + maintenance_increase_pa_rate)**(year_idx - 1))
-        annual_maintenance_costs_sim_list.append(maint_costs_sim)
+def simulate_cash_flows_matrix(cash_flow_params: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Vektorisierte Cashflow-Simulation für beliebig viele Varianten als (Varianten x Jahre)-Matrix.
 
-        annual_benefit_this_year = cost_savings_sim + feed_in_rev_sim + tax_benefit_sim
-        annual_benefits_sim_list.append(annual_benefit_this_year)
+    Jede Zeile entspricht einer Variante (Parameter aus _calculate_project_base); Jahre jenseits
+    der jeweiligen Simulationsdauer werden maskiert. Liefert die jährlichen Reihen sowie NPV und
+    die diskontierten LCOE-Summen je Variante.
+    """
+    def column(key: str) -> np.ndarray:
+        return np.array([float(p[key]) for p in cash_flow_params], dtype=float)[:, None]
+
+    n_years = np.array([int(p['n_years']) for p in cash_flow_params], dtype=int)
+    max_years = int(n_years.max()) if n_years.size else 0
+    year_idx = np.arange(1, max_years + 1, dtype=float)[None, :]  # Jahr 1..N
+    active = year_idx <= n_years[:, None]
+
+    productions = column('annual_production_kwh') * column('degradation_factor') ** (year_idx - 1)
+    self_consumption = productions * column('self_consumption_share')
+    feed_in = productions * column('feed_in_share')
+    elec_prices = column('electricity_price_kwh') * (1 + column('electricity_price_increase_rate')) ** (year_idx - 1)
+    feed_in_tariffs = np.where(year_idx > column('feed_in_period_years'), column('market_value_eur_per_kwh_after_eeg'), column('feed_in_tariff_eur_per_kwh'))
+    feed_in_revenue = feed_in * feed_in_tariffs
+    tax_benefit = feed_in_revenue * column('feed_in_tax_rate')
+    maintenance = column('maintenance_costs_year1') * (1 + column('maintenance_increase_rate')) ** (year_idx - 1)
+    benefits = self_consumption * elec_prices + feed_in_revenue + tax_benefit
+    cash_flows = benefits - maintenance
+
+    investment = column('investment_netto')
+    cumulative = np.cumsum(np.concatenate([-investment, np.where(active, cash_flows, 0.0)], axis=1), axis=1)
+    discount = (1 + column('discount_rate')) ** year_idx
+    # NPV: wie bisher ausgehend von -cash_flows[0] (= +Investition) zzgl. diskontierter Jahres-Cashflows
+    npv = investment[:, 0] + np.cumsum(np.where(active, cash_flows / discount, 0.0), axis=1)[:, -1] if max_years else investment[:, 0]
+    lcoe_costs = investment[:, 0] + (np.cumsum(np.where(active, maintenance / discount, 0.0), axis=1)[:, -1] if max_years else 0.0)
+    lcoe_production = np.cumsum(np.where(active, productions / discount, 0.0), axis=1)[:, -1] if max_years else np.zeros(len(cash_flow_params))
+
+    return {
+        'n_years': n_years, 'productions': productions, 'benefits': benefits, 'maintenance': maintenance,
+        'cash_flows': cash_flows, 'cumulative': cumulative, 'elec_prices': elec_prices,
+        'feed_in_tariffs': feed_in_tariffs, 'feed_in_revenue': feed_in_revenue,
+        'npv': npv, 'lcoe_discounted_costs': lcoe_costs, 'lcoe_discounted_production': lcoe_production,
+    }
 
-        cash_flow_this_year = annual_benefit_this_year - maint_costs_sim
-        cash_flows_initial_investment.append(cash_flow_this_year) # Für IRR und NPV
-        annual_cash_flows_yearly_list.append(cash_flow_this_year) # Nur die jährlichen CFs
 
+def _finalize_project_results(
+    results: Dict[str, Any], state: Dict[str, Any], cash_flow_matrix: Dict[str, np.ndarray], row: int,
+    texts: Dict[str, str], errors_list: List[str]
+) -> Dict[str, Any]:
+    """Stufe 2 von perform_calculations: übernimmt Zeile `row` der Cashflow-Matrix und berechnet die Folgekennzahlen."""
+    project_details, global_constants = state['project_details'], state['global_constants']
+    total_investment_netto, total_investment_brutto = state['total_investment_netto'], state['total_investment_brutto']
+    annual_financial_benefit_year1, annual_pv_production_kwh = state['annual_financial_benefit_year1'], state['annual_pv_production_kwh']
+    annual_consumption_kwh_yr, electricity_price_kwh = state['annual_consumption_kwh_yr'], state['electricity_price_kwh']
+    eigenverbrauch_pro_jahr_kwh, feed_in_tariff_effective = state['eigenverbrauch_pro_jahr_kwh'], state['feed_in_tariff_effective']
+    inflation_rate_percent, anlage_kwp = state['inflation_rate_percent'], state['anlage_kwp']
+    annual_module_degradation_percent, maintenance_cost_fixed_pa = state['annual_module_degradation_percent'], state['maintenance_cost_fixed_pa']
+    include_storage, selected_storage_capacity_kwh = state['include_storage'], state['selected_storage_capacity_kwh']
+    storage_details_from_db = state['storage_details_from_db']
+    monthly_direct_self_consumption_kwh = state['monthly_direct_self_consumption_kwh']
+    monthly_storage_discharge_for_sc_kwh = state['monthly_storage_discharge_for_sc_kwh']
+
+    n_years = int(cash_flow_matrix['n_years'][row])
+    annual_productions_sim_list = cash_flow_matrix['productions'][row, :n_years].tolist()
+    annual_maintenance_costs_sim_list = cash_flow_matrix['maintenance'][row, :n_years].tolist()
+    cash_flows_initial_investment = [-total_investment_netto] + cash_flow_matrix['cash_flows'][row, :n_years].tolist()
     results.update({
         'annual_productions_sim': annual_productions_sim_list,
-        'annual_benefits_sim': annual_benefits_sim_list,
+        'annual_benefits_sim': cash_flow_matrix['benefits'][row, :n_years].tolist(),
         'annual_maintenance_costs_sim': annual_maintenance_costs_sim_list,
-        'annual_cash_flows_sim': annual_cash_flows_yearly_list, # Jährliche CFs (ohne Jahr 0)
-        'cumulative_cash_flows_sim': np.cumsum(cash_flows_initial_investment).tolist(), # Kumulierte CFs (inkl. Jahr 0)
-        'annual_elec_prices_sim': annual_elec_prices_sim_list, # Strompreise pro Jahr
-        'annual_feed_in_tariffs_sim': annual_feed_in_tariffs_sim_list, # Einspeisevergütung pro Jahr
-        'annual_revenue_from_feed_in_sim': annual_revenue_from_feed_in_sim_list # Jährliche Einnahmen aus Einspeisung
+        'annual_cash_flows_sim': cash_flows_initial_investment[1:], # Jährliche CFs (ohne Jahr 0)
+        'cumulative_cash_flows_sim': cash_flow_matrix['cumulative'][row, :n_years + 1].tolist(), # Kumulierte CFs (inkl. Jahr 0)
+        'annual_elec_prices_sim': cash_flow_matrix['elec_prices'][row, :n_years].tolist(), # Strompreise pro Jahr
+        'annual_feed_in_tariffs_sim': cash_flow_matrix['feed_in_tariffs'][row, :n_years].tolist(), # Einspeisevergütung pro Jahr
+        'annual_revenue_from_feed_in_sim': cash_flow_matrix['feed_in_revenue'][row, :n_years].tolist() # Jährliche Einnahmen aus Einspeisung
     })
 
     # --- Weitere Kennzahlen ---
     # Nettobarwert (NPV)
-    npv_value = -cash_flows_initial_investment[0] # Investition in Jahr 0
-    discount_rate_npv = loan_interest_rate_percent / 100.0 # Kalkulatorischer Zinssatz
-    for i_npv, cf_val in enumerate(cash_flows_initial_investment[1:], 1): # Ab Jahr 1
-        npv_value += cf_val / ((1 + discount_rate_npv)**i_npv)
+    npv_value = float(cash_flow_matrix['npv'][row])
     results['npv_value'] = npv_value
     results['npv_per_kwp'] = npv_value / results['anlage_kwp'] if results['anlage_kwp'] > 0 else float('nan')
 
@@ -2142,13 +2303,8 @@ def perform_calculations(
         errors_list.append((texts.get("error_irr_calculation", "Fehler bei IRR-Berechnung: {error_details}") or "").format(error_details=str(e_irr_calc)))
 
     # Stromgestehungskosten (LCOE)
-    total_discounted_costs_lcoe = total_investment_netto # Kosten in Jahr 0
-    total_discounted_production_lcoe = 0.0
-    discount_rate_lcoe = loan_interest_rate_percent / 100.0 # Gleicher Diskontsatz wie NPV
-    if annual_productions_sim_list and annual_maintenance_costs_sim_list:
-        for y_idx in range(min(len(annual_productions_sim_list), len(annual_maintenance_costs_sim_list), results['simulation_period_years_effective'])):
-            total_discounted_production_lcoe += annual_productions_sim_list[y_idx]/((1+discount_rate_lcoe)**(y_idx+1))
-            total_discounted_costs_lcoe += annual_maintenance_costs_sim_list[y_idx]/((1+discount_rate_lcoe)**(y_idx+1)) # Diskontierte Wartungskosten addieren
+    total_discounted_costs_lcoe = float(cash_flow_matrix['lcoe_discounted_costs'][row])
+    total_discounted_production_lcoe = float(cash_flow_matrix['lcoe_discounted_production'][row])
     results['lcoe_euro_per_kwh'] = total_discounted_costs_lcoe/total_discounted_production_lcoe if total_discounted_production_lcoe > 0 else float('inf')
     results['effektiver_pv_strompreis_ct_kwh'] = results['lcoe_euro_per_kwh']*100 if results['lcoe_euro_per_kwh'] != float('inf') else float('inf')
 
@@ -2370,6 +2526,20 @@ def perform_calculations(
     # if app_debug_mode_is_enabled: print(f"--- CALCULATIONS.PY: Berechnungen abgeschlossen. Ergebnisse (Auszug): {json.dumps({k: v for k,v in results.items() if not isinstance(v, list) or len(v) < 5}, indent=2, ensure_ascii=False)}") # Bereinigt
     # if app_debug_mode_is_enabled and errors_list: print(f"CALC: Gesammelte Fehler/Hinweise: {errors_list}") # Bereinigt
 
+    return results
+
+
+def perform_calculations(
+    project_data: Dict[str, Any], texts: Dict[str, str], errors_list: List[str],
+    simulation_duration_user: Optional[int] = None, electricity_price_increase_user: Optional[float] = None,
+    calculation_context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    calculation_context = calculation_context if calculation_context is not None else load_calculation_context(texts)
+    results, state = _calculate_project_base(project_data, texts, errors_list, simulation_duration_user, electricity_price_increase_user, calculation_context)
+    cash_flow_matrix = simulate_cash_flows_matrix([state['cash_flow_params']])
+    results = _finalize_project_results(results, state, cash_flow_matrix, 0, texts, errors_list)
+    app_debug_mode_is_enabled = state['app_debug_mode_is_enabled']
+
     # *** BACKUP-SYSTEM: Speichere Ergebnisse in Session State mit Zeitstempel ***
     try:
         import streamlit as st
@@ -2406,6 +2576,113 @@ def perform_calculations(
 
     return results
 
+def _merge_project_variant(base_project: Dict[str, Any], variant: Dict[str, Any]) -> Dict[str, Any]:
+    """Überlagert eine Variante (gleiche Struktur wie project_data, nur geänderte Felder) auf das Basisprojekt."""
+    merged = {key: (dict(value) if isinstance(value, dict) else value) for key, value in base_project.items()}
+    for key, value in (variant or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key].update(value)
+        else:
+            merged[key] = value
+    return merged
+
+def perform_calculations_batch(
+    base_project: Dict[str, Any], variants: List[Dict[str, Any]], texts: Optional[Dict[str, str]] = None,
+    simulation_duration_user: Optional[int] = None, electricity_price_increase_user: Optional[float] = None,
+    calculation_context: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Berechnet viele Projektvarianten in einem Aufruf.
+
+    Einstellungen, Tarife, Preis-Matrix und Produkte werden einmal geladen, die Cashflow-Simulation
+    läuft für alle Varianten gemeinsam als (Varianten x Jahre)-Matrix. Jede Variante ist ein Dict
+    mit geänderten Feldern, z.B. {'project_details': {'module_quantity': 24}}. Die Ergebnis-Dicts
+    entsprechen denen von perform_calculations (jeweils mit eigener 'calculation_errors'-Liste).
+    """
+    texts = texts if texts is not None else {}
+    calculation_context = calculation_context if calculation_context is not None else load_calculation_context(texts)
+    staged: List[Tuple[Dict[str, Any], Dict[str, Any], List[str]]] = []
+    for variant in variants:
+        variant_errors: List[str] = []
+        results, state = _calculate_project_base(
+            _merge_project_variant(base_project, variant), texts, variant_errors,
+            simulation_duration_user, electricity_price_increase_user, calculation_context
+        )
+        staged.append((results, state, variant_errors))
+    if not staged:
+        return []
+    cash_flow_matrix = simulate_cash_flows_matrix([state['cash_flow_params'] for _, state, _ in staged])
+    return [
+        _finalize_project_results(results, state, cash_flow_matrix, row, texts, variant_errors)
+        for row, (results, state, variant_errors) in enumerate(staged)
+    ]
+
+# Nettokosten-Positionen, die ein Preisfaktor (z.B. Preisstaffelung je Firma) skaliert
+PRICE_SCALED_COST_KEYS = (
+    'base_matrix_price_netto', 'cost_modules_aufpreis_netto', 'cost_inverter_aufpreis_netto',
+    'cost_storage_aufpreis_product_db_netto', 'cost_accessories_aufpreis_netto', 'cost_misc_netto',
+    'cost_scaffolding_netto', 'cost_custom_netto', 'total_optional_components_cost_netto',
+    'total_additional_costs_netto', 'subtotal_netto',
+    'cost_wallbox_aufpreis_netto', 'cost_ems_aufpreis_netto', 'cost_optimizer_aufpreis_netto',
+    'cost_carport_aufpreis_netto', 'cost_notstrom_aufpreis_netto', 'cost_tierabwehr_aufpreis_netto',
+)
+
+def _apply_price_factor(
+    results: Dict[str, Any], state: Dict[str, Any], price_factor: float
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Skaliert die kostenabhängigen Größen von Stufe 1; Ertrag und Energiebilanz bleiben unverändert."""
+    scaled_results = dict(results)
+    scaled_results['calculation_errors'] = list(results.get('calculation_errors', []))
+    for key in PRICE_SCALED_COST_KEYS:
+        if isinstance(scaled_results.get(key), (int, float)):
+            scaled_results[key] = scaled_results[key] * price_factor
+    total_investment_netto = scaled_results['subtotal_netto'] - state['one_time_bonus_eur']
+    total_investment_brutto = total_investment_netto * (1 + state['vat_rate_percent'] / 100.0)
+    annual_financial_benefit_year1 = state['annual_financial_benefit_year1']
+    scaled_results.update({
+        'price_factor': price_factor,
+        'total_investment_netto': total_investment_netto,
+        'total_investment_brutto': total_investment_brutto,
+        'amortization_time_years': total_investment_netto / annual_financial_benefit_year1 if annual_financial_benefit_year1 > 0 else float('inf'),
+    })
+    cash_flow_params = dict(state['cash_flow_params'], investment_netto=total_investment_netto)
+    maintenance_cost_fixed_pa = state['maintenance_cost_fixed_pa']
+    if state['maintenance_scales_with_price']:  # Wartung als % der Investition
+        maintenance_cost_fixed_pa *= price_factor
+        cash_flow_params['maintenance_costs_year1'] = maintenance_cost_fixed_pa
+        scaled_results['annual_maintenance_costs_eur_year1'] = maintenance_cost_fixed_pa
+    scaled_state = dict(state, cash_flow_params=cash_flow_params, total_investment_netto=total_investment_netto,
+                        total_investment_brutto=total_investment_brutto, maintenance_cost_fixed_pa=maintenance_cost_fixed_pa)
+    return scaled_results, scaled_state
+
+def perform_calculations_price_scaled(
+    project_data: Dict[str, Any], price_factors: List[float], texts: Optional[Dict[str, str]] = None,
+    simulation_duration_user: Optional[int] = None, electricity_price_increase_user: Optional[float] = None,
+    calculation_context: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ein Projekt mit mehreren Preisniveaus (z.B. ein Angebot je Firma mit Preisstaffelung).
+
+    Ertrag, Energiebilanz und Grundkosten (Stufe 1) laufen einmal; je Preisfaktor werden nur
+    Investition, Cashflows, NPV/IRR, Amortisation und Folgekennzahlen neu berechnet – die
+    Cashflows aller Faktoren gemeinsam in simulate_cash_flows_matrix. Faktor 1.0 entspricht
+    perform_calculations.
+    """
+    texts = texts if texts is not None else {}
+    if not price_factors:
+        return []
+    calculation_context = calculation_context if calculation_context is not None else load_calculation_context(texts)
+    base_errors: List[str] = []
+    base_results, base_state = _calculate_project_base(
+        project_data, texts, base_errors, simulation_duration_user, electricity_price_increase_user, calculation_context
+    )
+    staged = [_apply_price_factor(base_results, base_state, float(price_factor)) for price_factor in price_factors]
+    cash_flow_matrix = simulate_cash_flows_matrix([state['cash_flow_params'] for _, state in staged])
+    return [
+        _finalize_project_results(results, state, cash_flow_matrix, row, texts, results['calculation_errors'])
+        for row, (results, state) in enumerate(staged)
+    ]
+
 # --- Testlauf für calculations.py (optional, nur für direkte Ausführung) ---
 if __name__ == "__main__":
     print("--- Testlauf für calculations.py (minimal) ---")
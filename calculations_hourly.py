@@ -0,0 +1,186 @@
+# calculations_hourly.py
+# -*- coding: utf-8 -*-
+"""
+Stündliche Energiebilanz (8760 Zeitschritte) für PV-Anlagen mit optionalem Speicher.
+
+Die monatlichen Produktions- und Verbrauchswerte aus perform_calculations werden
+auf Stundenprofile verteilt (PV über den Sonnenstand, Verbrauch über ein
+Haushalts-Lastprofil). Anschließend wird Direktverbrauch, Batterieladung und
+-entladung (mit Leistungsgrenzen und Wirkungsgrad), Einspeisung und Netzbezug
+stündlich simuliert und wieder zu den bekannten monthly_*-Schlüsseln aggregiert.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+DEFAULT_LATITUDE_DEG = 51.0  # Mitte Deutschlands
+
+# Typisches Tagesprofil eines Haushalts (Anteile je Stunde 0..23, angelehnt an BDEW H0)
+DEFAULT_DAILY_LOAD_PROFILE = (
+    0.027, 0.022, 0.020, 0.019, 0.019, 0.022, 0.032, 0.043,
+    0.046, 0.044, 0.043, 0.046, 0.052, 0.048, 0.042, 0.040,
+    0.042, 0.050, 0.060, 0.066, 0.064, 0.057, 0.047, 0.035,
+)
+
+# Monatsindex (0..11) und Tag des Jahres (1..365) für jede Stunde, einmalig berechnet
+_MONTH_INDEX_OF_HOUR = np.repeat(np.arange(12), np.array(DAYS_PER_MONTH) * 24)
+_DAY_OF_YEAR_OF_HOUR = np.repeat(np.arange(1, 366), 24)
+_HOUR_OF_DAY = np.tile(np.arange(24), 365)
+
+
+def _distribute_to_hours(monthly_kwh: Sequence[float], hourly_weights: np.ndarray) -> np.ndarray:
+    """Skaliert stündliche Gewichte so, dass jede Monatssumme dem Vorgabewert entspricht."""
+    monthly = np.asarray(monthly_kwh, dtype=float)
+    weight_sums = np.bincount(_MONTH_INDEX_OF_HOUR, weights=hourly_weights, minlength=12)
+    scale = np.divide(monthly, weight_sums, out=np.zeros(12), where=weight_sums > 0)
+    return hourly_weights * scale[_MONTH_INDEX_OF_HOUR]
+
+
+def build_hourly_pv_profile(monthly_production_kwh: Sequence[float], latitude_deg: Optional[float] = None) -> np.ndarray:
+    """
+    Verteilt monatliche PV-Erträge auf 8760 Stunden anhand des Sonnenstands.
+
+    Args:
+        monthly_production_kwh: 12 Monatswerte in kWh.
+        latitude_deg: Breitengrad des Standorts (Default: 51°).
+
+    Returns:
+        np.ndarray: Stündliche Produktion in kWh (Länge 8760).
+    """
+    lat_rad = np.radians(DEFAULT_LATITUDE_DEG if latitude_deg is None else float(latitude_deg))
+    declination = np.radians(23.45) * np.sin(2.0 * np.pi * (284 + _DAY_OF_YEAR_OF_HOUR) / 365.0)
+    hour_angle = np.radians(15.0 * (_HOUR_OF_DAY + 0.5 - 12.0))  # Stundenmitte, Sonnenzeit
+    sin_elevation = (np.sin(lat_rad) * np.sin(declination)
+                     + np.cos(lat_rad) * np.cos(declination) * np.cos(hour_angle))
+    return _distribute_to_hours(monthly_production_kwh, np.clip(sin_elevation, 0.0, None))
+
+
+def build_hourly_load_profile(monthly_consumption_kwh: Sequence[float], daily_profile: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    Verteilt monatliche Verbrauchswerte auf 8760 Stunden anhand eines Tagesprofils.
+
+    Args:
+        monthly_consumption_kwh: 12 Monatswerte in kWh.
+        daily_profile: 24 relative Stundenanteile (Default: Haushaltsprofil).
+
+    Returns:
+        np.ndarray: Stündlicher Verbrauch in kWh (Länge 8760).
+    """
+    profile = np.asarray(daily_profile if daily_profile is not None else DEFAULT_DAILY_LOAD_PROFILE, dtype=float)
+    if profile.shape != (24,) or profile.sum() <= 0:
+        profile = np.asarray(DEFAULT_DAILY_LOAD_PROFILE, dtype=float)
+    return _distribute_to_hours(monthly_consumption_kwh, profile[_HOUR_OF_DAY])
+
+
+def simulate_hourly_energy_balance(
+    pv_kwh: np.ndarray, load_kwh: np.ndarray,
+    storage_capacity_kwh: float = 0.0, max_charge_kw: Optional[float] = None,
+    max_discharge_kw: Optional[float] = None, round_trip_efficiency: float = 0.9,
+    min_soc_percent: float = 0.0, initial_soc_percent: float = 0.0
+) -> Dict[str, np.ndarray]:
+    """
+    Simuliert die stündliche Energiebilanz mit Batteriespeicher.
+
+    Direktverbrauch, Überschuss und Defizit werden vektorisiert berechnet; nur der
+    Ladezustand (SoC) wird sequentiell fortgeschrieben, da jede Stunde vom Vorzustand
+    abhängt. Der Wirkungsgrad wird je zur Hälfte (Wurzel) auf Laden und Entladen verteilt.
+
+    Returns:
+        Dict mit stündlichen Arrays: direct_self_consumption, storage_charge (im Speicher
+        angekommen), storage_discharge (an Verbraucher geliefert), feed_in, grid_import, soc.
+    """
+    pv = np.asarray(pv_kwh, dtype=float)
+    load = np.asarray(load_kwh, dtype=float)
+    direct = np.minimum(pv, load)
+    surplus = pv - direct
+    deficit = load - direct
+    n_hours = pv.shape[0]
+
+    charge_in = np.zeros(n_hours)
+    discharge_out = np.zeros(n_hours)
+    soc = np.zeros(n_hours)
+
+    capacity = max(0.0, float(storage_capacity_kwh or 0.0))
+    if capacity > 0:
+        eff = min(max(float(round_trip_efficiency or 0.0), 0.01), 1.0)
+        eta_c = eta_d = eff ** 0.5
+        max_c = float(max_charge_kw) if max_charge_kw and max_charge_kw > 0 else capacity
+        max_d = float(max_discharge_kw) if max_discharge_kw and max_discharge_kw > 0 else capacity
+        soc_min = capacity * min(max(min_soc_percent, 0.0), 100.0) / 100.0
+        level = max(soc_min, capacity * min(max(initial_soc_percent, 0.0), 100.0) / 100.0)
+
+        # Schleife über Python-Floats ist hier deutlich schneller als über NumPy-Skalare
+        surplus_l, deficit_l = surplus.tolist(), deficit.tolist()
+        charge_l, discharge_l, soc_l = [0.0] * n_hours, [0.0] * n_hours, [0.0] * n_hours
+        for h in range(n_hours):
+            s = surplus_l[h]
+            if s > 0.0:
+                stored = min(s * eta_c, max_c * eta_c, capacity - level)
+                if stored > 0.0:
+                    level += stored
+                    charge_l[h] = stored
+            else:
+                d = deficit_l[h]
+                if d > 0.0 and level > soc_min:
+                    delivered = min(d, max_d, (level - soc_min) * eta_d)
+                    level -= delivered / eta_d
+                    discharge_l[h] = delivered
+            soc_l[h] = level
+        charge_in, discharge_out, soc = np.array(charge_l), np.array(discharge_l), np.array(soc_l)
+        charge_from_pv = charge_in / eta_c
+    else:
+        charge_from_pv = charge_in
+
+    return {
+        'direct_self_consumption': direct,
+        'storage_charge': charge_in,
+        'storage_discharge': discharge_out,
+        'feed_in': np.clip(surplus - charge_from_pv, 0.0, None),
+        'grid_import': np.clip(deficit - discharge_out, 0.0, None),
+        'soc': soc,
+    }
+
+
+def aggregate_hourly_to_monthly(hourly_values: np.ndarray) -> List[float]:
+    """Summiert eine 8760-Stunden-Reihe zu 12 Monatswerten."""
+    return np.bincount(_MONTH_INDEX_OF_HOUR, weights=hourly_values, minlength=12).tolist()
+
+
+def run_hourly_energy_balance(
+    monthly_production_kwh: Sequence[float], monthly_consumption_kwh: Sequence[float],
+    latitude_deg: Optional[float] = None, storage_capacity_kwh: float = 0.0,
+    max_charge_kw: Optional[float] = None, max_discharge_kw: Optional[float] = None,
+    round_trip_efficiency: float = 0.9, min_soc_percent: float = 0.0,
+    daily_load_profile: Optional[Sequence[float]] = None,
+    hourly_production_shape: Optional[Sequence[float]] = None
+) -> Dict[str, Any]:
+    """
+    Führt die komplette stündliche Simulation aus und liefert Monatswerte im Format
+    von perform_calculations (monthly_direct_self_consumption_kwh, monthly_feed_in_kwh, ...).
+
+    hourly_production_shape: Optionale stündliche Produktion (z.B. aus solar_model), die statt
+    des Sonnenstandsprofils als Verlauf dient; die Monatssummen bleiben maßgeblich.
+    """
+    if hourly_production_shape is not None and len(hourly_production_shape) == HOURS_PER_YEAR:
+        pv = _distribute_to_hours(monthly_production_kwh, np.clip(np.asarray(hourly_production_shape, dtype=float), 0.0, None))
+    else:
+        pv = build_hourly_pv_profile(monthly_production_kwh, latitude_deg)
+    load = build_hourly_load_profile(monthly_consumption_kwh, daily_load_profile)
+    sim = simulate_hourly_energy_balance(
+        pv, load, storage_capacity_kwh, max_charge_kw, max_discharge_kw,
+        round_trip_efficiency, min_soc_percent
+    )
+    total_discharge = float(sim['storage_discharge'].sum())
+    return {
+        'monthly_direct_self_consumption_kwh': aggregate_hourly_to_monthly(sim['direct_self_consumption']),
+        'monthly_storage_charge_kwh': aggregate_hourly_to_monthly(sim['storage_charge']),
+        'monthly_storage_discharge_for_sc_kwh': aggregate_hourly_to_monthly(sim['storage_discharge']),
+        'monthly_feed_in_kwh': aggregate_hourly_to_monthly(sim['feed_in']),
+        'monthly_grid_bezug_kwh': aggregate_hourly_to_monthly(sim['grid_import']),
+        'storage_full_cycles_per_year_sim': total_discharge / storage_capacity_kwh if storage_capacity_kwh and storage_capacity_kwh > 0 else 0.0,
+        'peak_grid_import_kw_sim': float(sim['grid_import'].max()) if sim['grid_import'].size else 0.0,
+        'peak_feed_in_kw_sim': float(sim['feed_in'].max()) if sim['feed_in'].size else 0.0,
+    }
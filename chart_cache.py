@@ -0,0 +1,230 @@
+# chart_cache.py
+# -*- coding: utf-8 -*-
+"""
+Cache für Plotly-Diagramme als Bild-Bytes (PNG/SVG/... über fig.to_image / Kaleido).
+
+Schlüssel ist ein Hash über das Figuren-JSON plus Format, Breite, Höhe und Skalierung:
+identische Diagramme werden bei Streamlit-Reruns nicht erneut gerastert. Die Bytes liegen
+in einem LRU-Speicher mit Byte-Budget; optional zusätzlich auf der Festplatte
+(data/chart_cache), damit sie Neustarts überleben. Trefferstatistiken liefert
+get_chart_cache_stats().
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHART_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'chart_cache')
+
+DEFAULT_MAX_MEMORY_MB = 64
+DEFAULT_MAX_DISK_MB = 256
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, bytes]" = OrderedDict()
+_memory_bytes = 0
+_config: Dict[str, Any] = {
+    'max_memory_bytes': DEFAULT_MAX_MEMORY_MB * 1024 * 1024,
+    'disk_enabled': False,
+    'disk_dir': CHART_CACHE_DIR,
+    'max_disk_bytes': DEFAULT_MAX_DISK_MB * 1024 * 1024,
+}
+_stats: Dict[str, float] = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'uncacheable': 0, 'render_seconds': 0.0}
+
+
+def configure_chart_cache(max_memory_bytes: Optional[int] = None, disk_enabled: Optional[bool] = None,
+                          disk_dir: Optional[str] = None, max_disk_bytes: Optional[int] = None) -> None:
+    """Setzt Budget und Festplatten-Stufe; None lässt den jeweiligen Wert unverändert."""
+    with _lock:
+        if max_memory_bytes is not None:
+            _config['max_memory_bytes'] = max(0, int(max_memory_bytes))
+            _evict_locked()
+        if disk_enabled is not None:
+            _config['disk_enabled'] = bool(disk_enabled)
+        if disk_dir is not None:
+            _config['disk_dir'] = disk_dir
+        if max_disk_bytes is not None:
+            _config['max_disk_bytes'] = max(0, int(max_disk_bytes))
+
+
+def configure_from_constants(global_constants: Optional[Dict[str, Any]]) -> None:
+    """Übernimmt chart_cache_max_mb, chart_cache_disk_enabled und chart_cache_disk_max_mb aus den Admin-Einstellungen."""
+    gc = global_constants if isinstance(global_constants, dict) else {}
+    try:
+        configure_chart_cache(
+            max_memory_bytes=int(float(gc.get('chart_cache_max_mb', DEFAULT_MAX_MEMORY_MB)) * 1024 * 1024),
+            disk_enabled=bool(gc.get('chart_cache_disk_enabled', False)),
+            max_disk_bytes=int(float(gc.get('chart_cache_disk_max_mb', DEFAULT_MAX_DISK_MB)) * 1024 * 1024),
+        )
+    except (TypeError, ValueError) as e:
+        print(f"chart_cache: Ungültige Einstellungen, Standardwerte bleiben aktiv: {e}")
+
+
+def make_chart_key_from_json(figure_json: str, format: str = 'png', width: Optional[int] = None,
+                             height: Optional[int] = None, scale: Optional[float] = None) -> str:
+    """Hash über Figuren-JSON und Exportparameter."""
+    digest = hashlib.sha256(figure_json.encode('utf-8'))
+    digest.update(f"|{format}|{width}|{height}|{scale}".encode('ascii'))
+    return digest.hexdigest()
+
+
+def make_chart_key(fig: Any, format: str = 'png', width: Optional[int] = None,
+                   height: Optional[int] = None, scale: Optional[float] = None) -> str:
+    return make_chart_key_from_json(fig.to_json(), format, width, height, scale)
+
+
+def _evict_locked() -> None:
+    global _memory_bytes
+    while _memory and _memory_bytes > _config['max_memory_bytes']:
+        _, evicted = _memory.popitem(last=False)
+        _memory_bytes -= len(evicted)
+        _stats['evictions'] += 1
+
+
+def _remember_locked(key: str, data: bytes) -> None:
+    global _memory_bytes
+    if len(data) > _config['max_memory_bytes']:
+        return
+    previous = _memory.pop(key, None)
+    if previous is not None:
+        _memory_bytes -= len(previous)
+    _memory[key] = data
+    _memory_bytes += len(data)
+    _evict_locked()
+
+
+def _disk_path(key: str, format: str) -> str:
+    return os.path.join(_config['disk_dir'], f"{key}.{format}")
+
+
+def _read_disk(key: str, format: str) -> Optional[bytes]:
+    path = _disk_path(key, format)
+    try:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        os.utime(path)  # Zugriffszeit für die LRU-Bereinigung der Festplatten-Stufe
+        return data
+    except OSError:
+        return None
+
+
+def _write_disk(key: str, format: str, data: bytes) -> None:
+    disk_dir = _config['disk_dir']
+    try:
+        os.makedirs(disk_dir, exist_ok=True)
+        path = _disk_path(key, format)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        _trim_disk(disk_dir, _config['max_disk_bytes'])
+    except OSError as e:
+        print(f"chart_cache: Schreiben auf Festplatte fehlgeschlagen: {e}")
+
+
+def _trim_disk(disk_dir: str, max_disk_bytes: int) -> None:
+    entries = [e for e in os.scandir(disk_dir) if e.is_file() and not e.name.endswith('.tmp')]
+    total = sum(e.stat().st_size for e in entries)
+    if total <= max_disk_bytes:
+        return
+    for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+        if total <= max_disk_bytes:
+            break
+        total -= entry.stat().st_size
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def render_figure_cached(fig: Any, format: str = 'png', width: Optional[int] = None,
+                         height: Optional[int] = None, scale: Optional[float] = None) -> bytes:
+    """
+    Wie fig.to_image(format=..., width=..., height=..., scale=...), aber mit Cache.
+    Fehler von fig.to_image (z.B. Kaleido fehlt) werden unverändert weitergereicht.
+    """
+    export_kwargs = {k: v for k, v in (('width', width), ('height', height), ('scale', scale)) if v is not None}
+    try:
+        key = make_chart_key(fig, format, width, height, scale)
+    except Exception as e:
+        # Figur lässt sich nicht serialisieren: ohne Cache exportieren
+        print(f"chart_cache: Kein Cache-Schlüssel möglich ({e}), exportiere direkt.")
+        with _lock:
+            _stats['uncacheable'] += 1
+        return fig.to_image(format=format, **export_kwargs)
+
+    data = get_cached_chart(key, format)
+    if data is not None:
+        return data
+    start = time.perf_counter()
+    data = fig.to_image(format=format, **export_kwargs)
+    store_chart(key, format, data, time.perf_counter() - start)
+    return data
+
+
+def get_cached_chart(key: str, format: str = 'png') -> Optional[bytes]:
+    """Bild-Bytes zu einem Schlüssel aus Speicher oder Festplatten-Stufe (None bei Fehlgriff)."""
+    with _lock:
+        data = _memory.get(key)
+        if data is not None:
+            _memory.move_to_end(key)
+            _stats['memory_hits'] += 1
+            return data
+        disk_enabled = _config['disk_enabled']
+    if disk_enabled:
+        data = _read_disk(key, format)
+        if data is not None:
+            with _lock:
+                _stats['disk_hits'] += 1
+                _remember_locked(key, data)
+            return data
+    return None
+
+
+def store_chart(key: str, format: str, data: bytes, render_seconds: float = 0.0) -> None:
+    """Legt frisch gerenderte Bytes ab (zählt als Fehlgriff mit der angegebenen Renderzeit)."""
+    with _lock:
+        _stats['misses'] += 1
+        _stats['render_seconds'] += render_seconds
+        _remember_locked(key, data)
+        disk_enabled = _config['disk_enabled']
+    if disk_enabled:
+        _write_disk(key, format, data)
+
+
+def clear_chart_cache(include_disk: bool = True) -> int:
+    """Leert den Speicher (und optional die Festplatten-Stufe); gibt die Anzahl entfernter Einträge zurück."""
+    global _memory_bytes
+    with _lock:
+        removed = len(_memory)
+        _memory.clear()
+        _memory_bytes = 0
+        disk_dir = _config['disk_dir']
+    if include_disk and os.path.isdir(disk_dir):
+        for entry in os.scandir(disk_dir):
+            if entry.is_file():
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
+
+def get_chart_cache_stats() -> Dict[str, Any]:
+    """Treffer (Speicher/Festplatte), Fehlgriffe, Verdrängungen, Belegung und geschätzte eingesparte Renderzeit."""
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats['entries'] = len(_memory)
+        stats['memory_bytes'] = _memory_bytes
+        stats['max_memory_bytes'] = _config['max_memory_bytes']
+        stats['disk_enabled'] = _config['disk_enabled']
+    stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    average_render = stats['render_seconds'] / stats['misses'] if stats['misses'] else 0.0
+    stats['render_seconds_saved'] = average_render * stats['hits']
+    return stats
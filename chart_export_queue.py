@@ -0,0 +1,211 @@
+# chart_export_queue.py
+# -*- coding: utf-8 -*-
+"""
+Verzögerter Diagramm-Export für die PDF-Erstellung.
+
+Die Analyse-Seite registriert ihre Plotly-Figuren nur noch als Spezifikation (Figuren-JSON
+plus Exportgröße) unter analysis_results['_pending_chart_exports'], statt bei jedem Rerun
+PNGs zu erzeugen. Erst wenn ein PDF angefordert wird, rastert rasterize_pending_charts die
+offenen Figuren in einem Pool von Worker-Prozessen (jeder Worker hält seinen Kaleido-Prozess
+warm) und füllt die bekannten *_chart_bytes-Schlüssel. Bereits bekannte Figuren kommen aus
+dem Diagramm-Cache (chart_cache.py).
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import chart_cache
+
+PENDING_CHART_EXPORTS_KEY = '_pending_chart_exports'
+DEFAULT_EXPORT_SIZE = {'format': 'png', 'width': 900, 'height': 550, 'scale': 2}
+DEFAULT_MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+_executor_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+
+
+def register_chart_export(results: Dict[str, Any], result_key: str, fig: Any, **export_size) -> None:
+    """
+    Merkt fig für den späteren Export nach results[result_key] vor.
+    Liegt das Bild bereits im Diagramm-Cache, wird es sofort eingetragen; sonst wird ein
+    veraltetes Bild unter result_key entfernt, damit kein altes Diagramm im PDF landet.
+    """
+    if fig is None:
+        return
+    spec = dict(DEFAULT_EXPORT_SIZE, **export_size)
+    try:
+        spec['figure_json'] = fig.to_json()
+    except Exception as e:
+        print(f"chart_export_queue: Figur für {result_key} nicht serialisierbar, exportiere sofort: {e}")
+        try:
+            results[result_key] = chart_cache.render_figure_cached(fig, spec['format'], spec['width'], spec['height'], spec['scale'])
+        except Exception as e_export:
+            print(f"chart_export_queue: Export für {result_key} fehlgeschlagen: {e_export}")
+            results[result_key] = None
+        return
+    spec['cache_key'] = chart_cache.make_chart_key_from_json(spec['figure_json'], spec['format'], spec['width'], spec['height'], spec['scale'])
+    pending = results.setdefault(PENDING_CHART_EXPORTS_KEY, {})
+    cached = chart_cache.get_cached_chart(spec['cache_key'], spec['format'])
+    if cached is not None:
+        results[result_key] = cached
+        pending.pop(result_key, None)
+        return
+    results.pop(result_key, None)
+    pending[result_key] = spec
+
+
+def pending_chart_keys(results: Optional[Dict[str, Any]]) -> List[str]:
+    """Ergebnis-Schlüssel, deren Bild noch nicht gerastert ist."""
+    if not isinstance(results, dict):
+        return []
+    return list(results.get(PENDING_CHART_EXPORTS_KEY) or {})
+
+
+def is_chart_available(results: Optional[Dict[str, Any]], result_key: str) -> bool:
+    """True, wenn das Diagramm als Bytes vorliegt oder für den Export vorgemerkt ist."""
+    if not isinstance(results, dict):
+        return False
+    return results.get(result_key) is not None or result_key in (results.get(PENDING_CHART_EXPORTS_KEY) or {})
+
+
+def _warm_kaleido() -> None:
+    """Initializer der Worker: startet Kaleido einmal, damit jeder Auftrag den laufenden Prozess nutzt."""
+    try:
+        import plotly.graph_objects as go
+        go.Figure().to_image(format='png', width=10, height=10)
+    except Exception as e:
+        print(f"chart_export_queue: Kaleido konnte im Worker nicht gestartet werden: {e}")
+
+
+def _rasterize_spec(spec: Dict[str, Any]) -> bytes:
+    """Rastert eine Spezifikation aus register_chart_export (Modulebene für Worker-Prozesse)."""
+    import plotly.io as pio
+    fig = pio.from_json(spec['figure_json'], skip_invalid=True)
+    export_kwargs = {k: spec[k] for k in ('width', 'height', 'scale') if spec.get(k) is not None}
+    return fig.to_image(format=spec['format'], **export_kwargs)
+
+
+def _get_executor(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """Gemeinsamer Pool über mehrere PDF-Anforderungen hinweg, damit die Worker warm bleiben."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None and _executor_workers == max_workers:
+            return _executor
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_warm_kaleido)
+            _executor_workers = max_workers
+        except (OSError, ValueError, NotImplementedError) as e:
+            logging.warning(f"chart_export_queue: Prozess-Pool nicht verfügbar, rastere im Hauptprozess: {e}")
+            _executor, _executor_workers = None, 0
+        return _executor
+
+
+def shutdown_chart_export_pool() -> None:
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor, _executor_workers = None, 0
+
+
+atexit.register(shutdown_chart_export_pool)
+
+
+def rasterize_chart(results: Optional[Dict[str, Any]], result_key: str,
+                    rasterize: Callable[[Dict[str, Any]], bytes] = None) -> Optional[bytes]:
+    """Rastert ein einzelnes vorgemerktes Diagramm sofort, z.B. wenn seine Vektorgrafik doch nicht entsteht."""
+    others = [key for key in pending_chart_keys(results) if key != result_key]
+    rasterize_pending_charts(results, max_workers=1, rasterize=rasterize, skip_keys=others)
+    return results.get(result_key) if isinstance(results, dict) else None
+
+
+def rasterize_pending_charts(results: Optional[Dict[str, Any]], max_workers: int = DEFAULT_MAX_WORKERS,
+                             progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                             rasterize: Callable[[Dict[str, Any]], bytes] = None,
+                             skip_keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Füllt alle vorgemerkten *_chart_bytes in results (Cache-Treffer sofort, Rest im Worker-Pool).
+    Schlüssel in skip_keys (z.B. als Vektorgrafik gezeichnete Diagramme) bleiben vorgemerkt.
+    progress_callback(fertig, gesamt, result_key) wird nach jedem Diagramm aufgerufen.
+    Fehlgeschlagene Exporte werden als None eingetragen, wie beim bisherigen Sofort-Export.
+    Gibt eine Statistik zurück: total, cached, rendered, failed, seconds.
+    """
+    stats = {'total': 0, 'cached': 0, 'rendered': 0, 'failed': 0, 'seconds': 0.0}
+    if not isinstance(results, dict):
+        return stats
+    pending: Dict[str, Dict[str, Any]] = results.pop(PENDING_CHART_EXPORTS_KEY, None) or {}
+    skipped = {key: pending.pop(key) for key in set(skip_keys or ()) if key in pending}
+    if skipped:
+        results[PENDING_CHART_EXPORTS_KEY] = skipped
+    stats['total'] = len(pending)
+    if not pending:
+        return stats
+    rasterize = rasterize or _rasterize_spec
+    start = time.perf_counter()
+    done = 0
+
+    def _finish(result_key: str, data: Optional[bytes]) -> None:
+        nonlocal done
+        results[result_key] = data
+        done += 1
+        if progress_callback:
+            progress_callback(done, stats['total'], result_key)
+
+    to_render = {}
+    for result_key, spec in pending.items():
+        cached = chart_cache.get_cached_chart(spec['cache_key'], spec['format'])
+        if cached is not None:
+            stats['cached'] += 1
+            _finish(result_key, cached)
+        else:
+            to_render[result_key] = spec
+
+    def _store(result_key: str, spec: Dict[str, Any], data: Optional[bytes], render_seconds: float) -> None:
+        if data:
+            chart_cache.store_chart(spec['cache_key'], spec['format'], data, render_seconds)
+            stats['rendered'] += 1
+        else:
+            stats['failed'] += 1
+        _finish(result_key, data)
+
+    def _render_in_process(result_key: str, spec: Dict[str, Any]) -> None:
+        render_start = time.perf_counter()
+        try:
+            data = rasterize(spec)
+        except Exception as e:
+            print(f"chart_export_queue: Export für {result_key} fehlgeschlagen: {e}")
+            data = None
+        _store(result_key, spec, data, time.perf_counter() - render_start)
+
+    executor = _get_executor(min(max_workers, len(to_render))) if max_workers > 1 and len(to_render) > 1 else None
+    if executor is None:
+        for result_key, spec in to_render.items():
+            _render_in_process(result_key, spec)
+    else:
+        pool_start = time.perf_counter()
+        futures = {executor.submit(rasterize, spec): result_key for result_key, spec in to_render.items()}
+        for future in as_completed(futures):
+            result_key = futures[future]
+            spec = to_render[result_key]
+            try:
+                _store(result_key, spec, future.result(), (time.perf_counter() - pool_start) / max(len(futures), 1))
+            except BrokenProcessPool as e:
+                logging.warning(f"chart_export_queue: Worker abgebrochen ({e}), rastere {result_key} im Hauptprozess.")
+                shutdown_chart_export_pool()
+                _render_in_process(result_key, spec)
+            except Exception as e:
+                print(f"chart_export_queue: Export für {result_key} fehlgeschlagen: {e}")
+                _store(result_key, spec, None, 0.0)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
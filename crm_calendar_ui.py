@@ -11,7 +11,7 @@ import calendar
 import json
 
 try:
-    from database import execute_query, get_db_connection
+    from database import get_db_connection
     DATABASE_AVAILABLE = True
 except ImportError:
     DATABASE_AVAILABLE = False
@@ -3,6 +3,10 @@ import sqlite3
 import os
 import traceback
 import json
+import copy
+import threading
+import time
+import db_pool
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 import io
@@ -95,13 +99,17 @@ INITIAL_ADMIN_SETTINGS: Dict[str, Any] = {
 }
 
 def get_db_connection() -> Optional[sqlite3.Connection]:
+    # Gepoolte Verbindung (WAL, busy_timeout, row_factory); conn.close() gibt sie an den Pool zurück
     try:
         if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return db_pool.get_connection(DB_PATH)
     except sqlite3.Error as e: print(f"FATAL DB Error: {e}"); traceback.print_exc(); return None
 
+def _remove_wal_files(db_path: str) -> None:
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
 
 def get_pdf_template_by_name(template_type: str, name: str) -> Optional[Dict[str, Any]]:
     conn = get_db_connection()
@@ -123,6 +131,7 @@ def backup_database(backup_path: str) -> bool:
     try:
         import shutil
         if os.path.exists(DB_PATH):
+            db_pool.checkpoint(DB_PATH)  # WAL-Inhalt in die Hauptdatei übernehmen
             shutil.copy2(DB_PATH, backup_path)
             print(f"DB: Backup erfolgreich erstellt: {backup_path}")
             return True
@@ -137,7 +146,10 @@ def restore_database(backup_path: str) -> bool:
     try:
         import shutil
         if os.path.exists(backup_path):
+            db_pool.close_all_connections()
+            _remove_wal_files(DB_PATH)  # WAL der alten Datei darf nicht auf das Backup angewendet werden
             shutil.copy2(backup_path, DB_PATH)
+            invalidate_admin_settings_cache()
             print(f"DB: Wiederherstellung erfolgreich von: {backup_path}")
             return True
         else:
@@ -224,6 +236,9 @@ def get_database_statistics() -> Dict[str, Any]:
         # Schema Version
         cursor.execute("PRAGMA user_version")
         stats['schema_version'] = cursor.fetchone()[0]
+
+        # Verbindungs-Pool (Wiederverwendung, Sperr-Wartezeiten)
+        stats['connection_pool'] = db_pool.get_pool_stats()
         
         return stats
         
@@ -441,6 +456,8 @@ def cleanup_orphaned_files() -> Dict[str, Any]:
 def reset_database() -> bool:
     try:
         # Datenbankdatei löschen
+        db_pool.close_all_connections()
+        _remove_wal_files(DB_PATH)
         if os.path.exists(DB_PATH):
             os.remove(DB_PATH)
             print(f"DB: Datenbankdatei {DB_PATH} gelöscht")
@@ -453,6 +470,7 @@ def reset_database() -> bool:
         
         # Datenbank neu initialisieren
         init_db()
+        invalidate_admin_settings_cache()
         print("DB: Datenbank erfolgreich zurückgesetzt und neu initialisiert")
         return True
         
@@ -785,35 +803,94 @@ def init_db():
                 elif value_insert is not None:
                      cursor.execute("INSERT INTO admin_settings (key, value, last_modified) VALUES (?, ?, CURRENT_TIMESTAMP)", (key, value_insert))
                 print(f"DB: Initiale Admin-Einstellung '{key}' hinzugefügt.")
-        conn.commit(); print("DB: Initialisierung abgeschlossen.")
+        conn.commit(); invalidate_admin_settings_cache(); print("DB: Initialisierung abgeschlossen.")
     except Exception as e: print(f"DB KRITISCHER FEHLER init_db: {e}"); traceback.print_exc(); conn.rollback()
     finally:
         if conn: conn.close()
 
+# --- Admin-Einstellungen: Snapshot-Cache ---
+# Alle Einstellungen werden mit einer Abfrage geladen und einmal dekodiert. Der Snapshot gilt,
+# bis save_admin_setting (oder Restore/Reset) den Änderungszähler erhöht; Änderungen anderer
+# Prozesse werden spätestens nach ADMIN_SETTINGS_REVALIDATE_SECONDS über COUNT/MAX(last_modified) erkannt.
+ADMIN_SETTINGS_REVALIDATE_SECONDS = 5.0
+_SETTING_NULL = object()     # Wert in der DB ist NULL
+_SETTING_INVALID = object()  # Wert nicht konvertierbar -> Default des Aufrufers
+_admin_settings_lock = threading.RLock()
+_admin_settings_snapshot: Optional[Dict[str, Any]] = None
+_admin_settings_snapshot_version: Optional[tuple] = None
+_admin_settings_snapshot_checked_at = 0.0
+_admin_settings_change_counter = 0
+_admin_settings_stats: Dict[str, int] = {'hits': 0, 'reloads': 0, 'invalidations': 0}
+
+def _decode_admin_setting_value(key: str, value_str: Any) -> Any:
+    if value_str is None:
+        return _SETTING_NULL
+    if isinstance(value_str, str) and value_str.strip().startswith(('[', '{')) and value_str.strip().endswith((']', '}')):
+        try: return json.loads(value_str)
+        except json.JSONDecodeError: pass
+    if key in INITIAL_ADMIN_SETTINGS and isinstance(INITIAL_ADMIN_SETTINGS.get(key), bool):
+        try: return bool(int(value_str))
+        except: pass
+    if key == 'active_company_id':
+        try: return int(value_str)
+        except: return _SETTING_INVALID
+    return value_str
+
+def _read_admin_settings_version(cursor: sqlite3.Cursor) -> tuple:
+    cursor.execute("SELECT COUNT(*), MAX(last_modified) FROM admin_settings")
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (0, None)
+
+def invalidate_admin_settings_cache() -> None:
+    """Verwirft den Snapshot; der nächste Zugriff lädt alle Einstellungen neu."""
+    global _admin_settings_change_counter, _admin_settings_snapshot
+    with _admin_settings_lock:
+        _admin_settings_change_counter += 1
+        _admin_settings_snapshot = None
+        _admin_settings_stats['invalidations'] += 1
+
+def _get_admin_settings_snapshot() -> Optional[Dict[str, Any]]:
+    global _admin_settings_snapshot, _admin_settings_snapshot_version, _admin_settings_snapshot_checked_at
+    with _admin_settings_lock:
+        now = time.monotonic()
+        if _admin_settings_snapshot is not None and now - _admin_settings_snapshot_checked_at < ADMIN_SETTINGS_REVALIDATE_SECONDS:
+            _admin_settings_stats['hits'] += 1
+            return _admin_settings_snapshot
+        conn = get_db_connection()
+        if conn is None: return None
+        try:
+            cursor = conn.cursor()
+            db_version = _read_admin_settings_version(cursor)
+            version = (_admin_settings_change_counter,) + db_version
+            if _admin_settings_snapshot is not None and version == _admin_settings_snapshot_version:
+                _admin_settings_snapshot_checked_at = now
+                _admin_settings_stats['hits'] += 1
+                return _admin_settings_snapshot
+            cursor.execute("SELECT key, value FROM admin_settings")
+            _admin_settings_snapshot = {row['key']: _decode_admin_setting_value(row['key'], row['value']) for row in cursor.fetchall()}
+            _admin_settings_snapshot_version = version
+            _admin_settings_snapshot_checked_at = now
+            _admin_settings_stats['reloads'] += 1
+            return _admin_settings_snapshot
+        except Exception as e: print(f"DB Fehler Admin-Einstellungen-Snapshot: {e}"); return None
+        finally:
+            if conn: conn.close()
+
+def get_admin_settings_cache_stats() -> Dict[str, Any]:
+    """Zähler des Snapshot-Caches (hits, reloads, invalidations, entries)."""
+    with _admin_settings_lock:
+        stats: Dict[str, Any] = dict(_admin_settings_stats)
+        stats['entries'] = len(_admin_settings_snapshot) if _admin_settings_snapshot is not None else 0
+    return stats
+
 def load_admin_setting(key: str, default: Any = None) -> Any:
-    conn = get_db_connection()
-    if conn is None: return default
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM admin_settings WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        if row and row['value'] is not None:
-            value_str = row['value']
-            if isinstance(value_str, str) and value_str.strip().startswith(('[', '{')) and value_str.strip().endswith((']', '}')):
-                try: return json.loads(value_str)
-                except json.JSONDecodeError: pass
-            if key in INITIAL_ADMIN_SETTINGS and isinstance(INITIAL_ADMIN_SETTINGS.get(key), bool):
-                try: return bool(int(value_str))
-                except: pass
-            if key == 'active_company_id':
-                try: return int(value_str) if value_str is not None else None
-                except: return default
-            return value_str
-        if key == 'active_company_id' and row and row['value'] is None: return None
-        return default
-    except Exception as e: print(f"DB Fehler load_admin_setting '{key}': {e}"); return default
-    finally:
-        if conn: conn.close()
+    snapshot = _get_admin_settings_snapshot()
+    if snapshot is None or key not in snapshot: return default
+    value = snapshot[key]
+    if value is _SETTING_NULL: return None if key == 'active_company_id' else default
+    if value is _SETTING_INVALID: return default
+    # Aufrufer verändern geladene Dicts/Listen häufig vor dem Speichern -> Kopie statt Snapshot-Objekt
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
 
 def save_admin_setting(key: str, value: Any) -> bool:
     conn = get_db_connection()
@@ -842,6 +919,7 @@ def save_admin_setting(key: str, value: Any) -> bool:
         print(f"DB DEBUG: save_admin_setting - Versuche SQL auszuführen für Key '{key}'. Wert None? {params_for_sql[1] is None}")
         cursor.execute(sql_query, params_for_sql)
         conn.commit()
+        invalidate_admin_settings_cache()
         print(f"DB ERFOLG: save_admin_setting - Einstellung '{key}' erfolgreich gespeichert.")
         return True
     except Exception as e: 
@@ -1503,7 +1581,7 @@ def get_company_documents(company_id: int, doc_type: Optional[str] = None) -> Li
 def get_all_active_customers() -> List[Dict[str, Any]]:
     """Gibt alle aktiven Kunden aus der CRM-Datenbank zurück"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Versuche zuerst die Tabelle zu erstellen falls sie nicht existiert
@@ -1560,7 +1638,7 @@ def get_all_active_customers() -> List[Dict[str, Any]]:
 def create_customer(customer_data: Dict[str, Any]) -> bool:
     """Erstellt einen neuen Kunden in der CRM-Datenbank"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Tabelle erstellen falls sie nicht existiert
@@ -1656,7 +1734,7 @@ def update_customer(customer_id: int, customer_data: Dict[str, Any]) -> bool:
 def get_customer_by_id(customer_id: int) -> Optional[Dict[str, Any]]:
     """Gibt einen spezifischen Kunden basierend auf der ID zurück"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Versuche zuerst die Tabelle zu erstellen falls sie nicht existiert
@@ -0,0 +1,200 @@
+# db_pool.py
+# -*- coding: utf-8 -*-
+"""
+Verbindungsverwaltung für die SQLite-Datenbank der App.
+
+Jeder Thread hält eine kleine Menge offener Verbindungen (WAL-Modus, busy_timeout,
+abgestimmte Pragmas, row_factory = sqlite3.Row). conn.close() gibt eine Verbindung an den
+Pool des Threads zurück, statt sie zu schließen; offene Transaktionen werden dabei wie
+beim echten Schließen verworfen. Verschachtelte Aufrufer erhalten eigene Verbindungen.
+Zähler für Wiederverwendung und Sperr-Wartezeiten liefert get_pool_stats().
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, Any, List
+
+BUSY_TIMEOUT_MS = 10000
+CACHE_SIZE_KIB = 16384
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+MAX_IDLE_PER_THREAD = 2
+LOCK_WAIT_THRESHOLD_SECONDS = 0.05  # Schreibanweisungen, die länger dauern, zählen als Sperr-Wartezeit
+
+_WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER', 'BEGIN')
+
+_thread_state = threading.local()
+_registry_lock = threading.Lock()
+_all_connections: "weakref.WeakSet[PooledConnection]" = weakref.WeakSet()
+_generation = 0
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {'opened': 0, 'reused': 0, 'released': 0, 'lock_waits': 0, 'lock_timeouts': 0}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+class PooledCursor(sqlite3.Cursor):
+    """Cursor, der Warten auf Schreibsperren und Sperr-Timeouts zählt."""
+
+    def execute(self, sql, parameters=()):
+        return _timed_write(sql, super().execute, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return _timed_write(sql, super().executemany, seq_of_parameters)
+
+
+def _timed_write(sql, run, parameters):
+    if not sql.lstrip()[:7].upper().startswith(_WRITE_PREFIXES):
+        return run(sql, parameters)
+    start = time.perf_counter()
+    try:
+        return run(sql, parameters)
+    except sqlite3.OperationalError as e:
+        if 'locked' in str(e).lower() or 'busy' in str(e).lower():
+            _count('lock_timeouts')
+        raise
+    finally:
+        if time.perf_counter() - start > LOCK_WAIT_THRESHOLD_SECONDS:
+            _count('lock_waits')
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3-Verbindung, deren close() sie an den Thread-Pool zurückgibt."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_path = ''
+        self.pool_generation = 0
+
+    def cursor(self, factory=PooledCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute umgeht Cursor.execute; über den PooledCursor werden auch diese Anweisungen gezählt
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        _release(self)
+
+    def close_for_real(self):
+        super().close()
+
+
+def _configure(conn: PooledConnection) -> None:
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    except sqlite3.DatabaseError as e:
+        print(f"db_pool: WAL-Modus nicht verfügbar: {e}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
+def _idle_connections(path: str) -> List[PooledConnection]:
+    pools = getattr(_thread_state, 'pools', None)
+    if pools is None:
+        pools = _thread_state.pools = {}
+    return pools.setdefault(path, [])
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Liefert eine konfigurierte Verbindung (aus dem Pool des Threads oder neu geöffnet)."""
+    path = os.path.abspath(db_path)
+    idle = _idle_connections(path)
+    while idle:
+        conn = idle.pop()
+        if conn.pool_generation == _generation:
+            conn.row_factory = sqlite3.Row
+            _count('reused')
+            return conn
+        conn.close_for_real()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000.0, factory=PooledConnection,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.pool_path = path
+    conn.pool_generation = _generation
+    _configure(conn)
+    with _registry_lock:
+        _all_connections.add(conn)
+    _count('opened')
+    return conn
+
+
+def _release(conn: PooledConnection) -> None:
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.ProgrammingError:
+        return  # bereits endgültig geschlossen
+    idle = _idle_connections(conn.pool_path)
+    if conn.pool_generation != _generation or conn in idle or len(idle) >= MAX_IDLE_PER_THREAD:
+        if conn not in idle:
+            conn.close_for_real()
+        return
+    idle.append(conn)
+    _count('released')
+
+
+def close_all_connections() -> int:
+    """
+    Schließt alle Verbindungen aller Threads (z.B. vor Restore/Reset der Datenbankdatei).
+    Verbindungen aus anderen Threads werden beim nächsten Zugriff neu geöffnet.
+    """
+    global _generation
+    with _registry_lock:
+        _generation += 1
+        connections = list(_all_connections)
+        _all_connections.clear()
+    closed = 0
+    for conn in connections:
+        try:
+            conn.close_for_real()
+            closed += 1
+        except sqlite3.Error:
+            pass
+    pools = getattr(_thread_state, 'pools', None)
+    if pools is not None:
+        pools.clear()
+    return closed
+
+
+def get_generation() -> int:
+    """Zähler, der bei close_all_connections steigt (Datenbankdatei ersetzt/neu angelegt)."""
+    return _generation
+
+
+def checkpoint(db_path: str) -> bool:
+    """Schreibt das WAL in die Hauptdatei zurück (vor dem Kopieren der Datenbankdatei)."""
+    try:
+        conn = get_connection(db_path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error as e:
+        print(f"db_pool: Checkpoint fehlgeschlagen: {e}")
+        return False
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Zähler: opened, reused, released, lock_waits, lock_timeouts, open_connections, reuse_rate."""
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    with _registry_lock:
+        stats['open_connections'] = len(_all_connections)
+    acquisitions = stats['opened'] + stats['reused']
+    stats['reuse_rate'] = stats['reused'] / acquisitions if acquisitions else 0.0
+    return stats
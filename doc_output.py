@@ -16,6 +16,7 @@ import traceback
 import os
 # doc_output.py (Ausschnitt)
 from txt_to_pdf_integration import generate_pdf_from_txt_files
+from chart_export_queue import is_chart_available, pending_chart_keys
 
 
 
@@ -1015,8 +1016,8 @@ def render_pdf_ui(
                 }
                 available_chart_keys = [
                     k
-                    for k in analysis_results.keys()
-                    if k.endswith("_chart_bytes") and analysis_results[k] is not None
+                    for k in list(analysis_results.keys()) + pending_chart_keys(analysis_results)
+                    if k.endswith("_chart_bytes") and is_chart_available(analysis_results, k)
                 ]
                 ordered_display_keys = [
                     k_map
@@ -1376,7 +1377,7 @@ def render_pdf_ui(
                 # === NEUE EINFACHE TXT-BASIERTE PDF-GENERIERUNG ===
                 st.success(" VERWENDE GARANTIERT DAS TXT-SYSTEM!")
                 st.info(" Generiere 20-Seiten-PDF aus input-Ordner TXT-Dateien")
-                st.info(" Rufe direkt pdf_erstellen_komplett.py auf...")
+                st.info(" Rendere die TXT-Seiten im Speicher...")
 
                 # Debug-Info
                 st.code("TXT-System wird jetzt ausgeführt - NICHT das alte System!")
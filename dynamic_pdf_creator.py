@@ -16,6 +16,13 @@ from reportlab.lib.colors import Color
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import io
+import threading
+
+from txt_layout_compiler import fill_layout_placeholders, load_layout, parse_text_runs
+
+# Schriften nur einmal pro Prozess registrieren (die ReportLab-Registry ist global)
+_font_setup_lock = threading.Lock()
+_font_setup_done = False
 
 class DynamicPDFCreator:
     """Erstellt PDF direkt aus dynamischen Text-Daten."""
@@ -25,6 +32,14 @@ class DynamicPDFCreator:
         
     def setup_fonts(self):
         """Richtet verfügbare Schriftarten ein."""
+        global _font_setup_done
+        with _font_setup_lock:
+            if _font_setup_done:
+                return
+            _font_setup_done = True
+            self._register_fonts()
+    
+    def _register_fonts(self):
         try:
             # Versuche System-Schriftarten zu laden
             if os.name == 'nt':  # Windows
@@ -95,80 +110,90 @@ class DynamicPDFCreator:
     
     def _render_page_content(self, canvas_obj, content: str, width: float, height: float):
         """Rendert den Inhalt einer Seite auf das PDF-Canvas."""
-        lines = content.split('\n')
-        
-        current_text = None
-        current_position = None
-        current_font = None
-        current_size = None
-        current_color = None
+        for run in parse_text_runs(content):
+            self._draw_text(
+                canvas_obj, run['text'], run['bbox'],
+                run.get('font'), run.get('size'), self._parse_color(str(run.get('color', ''))),
+                page_height=height
+            )
+    
+    def create_pdf_from_layout(self, layout: Dict[str, Any]) -> bytes:
+        """
+        Erstellt das PDF aus dem kompilierten Layout (txt_layout_compiler.load_layout):
+        Formen, Bilder, Texte und Annotationen, ohne die TXT-Dateien erneut zu parsen.
+        """
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        input_dir = layout.get('input_dir', '')
+        pages_drawn = 0
         
-        for line in lines:
-            line = line.strip()
+        for page_layout in layout.get('pages', []):
+            if page_layout['size'] is None:
+                continue
+            x0, y0, x1, y1 = page_layout['size']
+            width, height = x1 - x0, y1 - y0
+            if pages_drawn:
+                c.showPage()
+            c.setPageSize((width, height))
+            pages_drawn += 1
+            
+            # Formen wie in pdf_erstellen_komplett.py: schwarz, 0.5 pt
+            c.setStrokeColor(Color(0, 0, 0))
+            c.setLineWidth(0.5)
+            lines = page_layout['lines']
+            for i in range(0, len(lines), 4):
+                c.line(lines[i], height - lines[i + 1], lines[i + 2], height - lines[i + 3])
+            rects = page_layout['rects']
+            for i in range(0, len(rects), 4):
+                c.rect(rects[i], height - rects[i + 3], rects[i + 2] - rects[i], rects[i + 3] - rects[i + 1], stroke=1, fill=0)
+            beziers = page_layout['beziers']
+            for i in range(0, len(beziers), 8):
+                c.bezier(*[beziers[i + k] if k % 2 == 0 else height - beziers[i + k] for k in range(8)])
             
-            if line.startswith('Text: '):
-                current_text = line[6:]  # Entferne "Text: "
-                
-            elif line.startswith('Position: '):
-                current_position = self._parse_position(line)
-                
-            elif line.startswith('Schriftart: '):
-                current_font = line[12:]
-                
-            elif line.startswith('Schriftgröße: '):
+            for i, filename in enumerate(page_layout['image_files']):
+                bx0, by0, bx1, by1 = page_layout['image_bboxes'][4 * i:4 * i + 4]
                 try:
-                    current_size = float(line[14:])
-                except ValueError:
-                    current_size = 10.0
-                    
-            elif line.startswith('Farbe: '):
-                current_color = self._parse_color(line[7:])
-                
-            elif line.startswith('---'):
-                # Ende eines Text-Blocks - rendern
-                if current_text and current_position and current_text.strip():
-                    self._draw_text(
-                        canvas_obj, current_text, current_position,
-                        current_font, current_size, current_color
-                    )
-                
-                # Reset für nächsten Block
-                current_text = None
-                current_position = None
-                current_font = None  
-                current_size = None
-                current_color = None
+                    c.drawImage(os.path.join(input_dir, filename), bx0, height - by1, width=bx1 - bx0, height=by1 - by0, mask='auto')
+                except Exception as e:
+                    print(f"⚠️ Bild {filename} konnte nicht eingefügt werden: {e}")
+            
+            texts = page_layout['texts']
+            for i, text in enumerate(texts['text']):
+                self._draw_text(
+                    c, text, tuple(texts['bbox'][4 * i:4 * i + 4]), texts['font'][i], texts['size'][i],
+                    self._color_from_int(texts['color'][i]), page_height=height
+                )
+            
+            for content, (ax0, ay0, ax1, ay1) in page_layout['annotations']:
+                c.textAnnotation(content, Rect=(ax0, height - ay1, ax1, height - ay0), relative=0)
+        
+        c.save()
+        return buffer.getvalue()
     
-    def _parse_position(self, position_line: str) -> tuple:
-        """Parst Position aus Text-Zeile."""
-        import re
-        match = re.search(r'\\(([\\d.]+),\\s*([\\d.]+),\\s*([\\d.]+),\\s*([\\d.]+)\\)', position_line)
-        if match:
-            return tuple(float(x) for x in match.groups())
-        return (50, 700, 550, 720)  # Fallback-Position
+    def _color_from_int(self, color_int: int) -> Color:
+        r = (color_int >> 16) & 255
+        g = (color_int >> 8) & 255
+        b = color_int & 255
+        return Color(r/255.0, g/255.0, b/255.0)
     
     def _parse_color(self, color_str: str) -> Color:
         """Konvertiert Farb-Integer zu ReportLab Color."""
         try:
-            color_int = int(color_str)
-            # RGB aus Integer extrahieren
-            r = (color_int >> 16) & 255
-            g = (color_int >> 8) & 255
-            b = color_int & 255
-            return Color(r/255.0, g/255.0, b/255.0)
+            return self._color_from_int(int(color_str))
         except:
             return Color(0.2, 0.2, 0.2)  # Fallback: Dunkelgrau
     
-    def _draw_text(self, canvas_obj, text: str, position: tuple, font: str, size: float, color: Color):
+    def _draw_text(self, canvas_obj, text: str, position: tuple, font: str, size: float, color: Color,
+                   page_height: float = A4[1]):
         """Zeichnet Text auf das Canvas."""
         if not text.strip():
             return
         
         x1, y1, x2, y2 = position
         
-        # Y-Koordinate für ReportLab umrechnen (unten statt oben)
-        page_height = A4[1]
-        y = page_height - y1 - (size or 10)
+        # Y-Koordinate für ReportLab umrechnen (unten statt oben): Grundlinie über der
+        # Unterkante des Textrahmens (Unterlänge ca. 0,21 em)
+        y = page_height - y2 + (size or 10) * 0.21
         
         # Schriftart setzen
         font_name = self._map_font_name(font)
@@ -214,6 +239,22 @@ def create_dynamic_pdf(dynamic_texts: Dict[str, str]) -> bytes:
     return creator.create_pdf_from_dynamic_texts(dynamic_texts)
 
 
+def render_txt_pdf(values: Dict[str, Any], input_dir: Optional[str] = None) -> bytes:
+    """
+    PDF aus den TXT-Seitenbeschreibungen komplett im Speicher: Platzhalter werden im geladenen
+    Layout ersetzt, die Bytes direkt zurückgegeben. Keine Schreibzugriffe auf input/ und keine
+    gemeinsame Ausgabedatei, daher parallel aus Threads und Prozessen aufrufbar.
+    """
+    layout = fill_layout_placeholders(load_layout(input_dir), values or {})
+    return DynamicPDFCreator().create_pdf_from_layout(layout)
+
+
+def create_pdf_from_compiled_layout(input_dir: Optional[str] = None) -> bytes:
+    """PDF direkt aus dem kompilierten Layout des input/-Ordners (ohne TXT-Parsing)."""
+    creator = DynamicPDFCreator()
+    return creator.create_pdf_from_layout(load_layout(input_dir))
+
+
 if __name__ == "__main__":
     # Test mit Beispiel-Daten
     test_texts = {
@@ -110,6 +110,8 @@ def initialize_database_once():
     if database_module and callable(getattr(database_module, 'init_db', None)):
         try:
             database_module.init_db() # type: ignore
+            if product_db_module and callable(getattr(product_db_module, 'ensure_product_schema', None)):
+                product_db_module.ensure_product_schema() # Produkttabelle einmalig anlegen/migrieren
         except Exception as e_init_db:
             error_msg_db = get_text_gui("db_init_error", "Fehler bei DB-Initialisierung:") + f" {e_init_db}"
             import_errors.append(error_msg_db)
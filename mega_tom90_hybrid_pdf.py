@@ -19,6 +19,10 @@ from datetime import datetime
 import base64
 import copy
 
+from pdf_asset_cache import get_optimized_image_bytes
+from pdf_image_optimizer import image_optimization
+from pdf_output_optimizer import optimize_pdf_output
+
 # TOM-90 Exact Renderer Import
 try:
     from tom90_exact_renderer import TOM90ExactRenderer
@@ -232,6 +236,18 @@ class MegaTOM90HybridPDFGenerator:
             PDF als Bytes
         """
         
+        image_profile = (self.tom90_inclusion_options or {}).get('image_profile')
+        with image_optimization(image_profile) as image_report:
+            final_pdf_bytes = self._generate_hybrid_pdf_bytes()
+        if image_report.images:
+            print(f"🖼️ PDF-Bilder optimiert: {image_report.summary()}")
+        if final_pdf_bytes:
+            output_profile = (self.tom90_inclusion_options or {}).get('output_profile')
+            final_pdf_bytes, output_result = optimize_pdf_output(final_pdf_bytes, output_profile)
+            print(f"📦 PDF-Ausgabe optimiert: {output_result.summary()}")
+        return final_pdf_bytes
+
+    def _generate_hybrid_pdf_bytes(self) -> bytes:
         try:
             # 1. TOM-90 Seiten 1-5 generieren
             print("🎨 Generiere TOM-90 Basis-Seiten (1-5)...")
@@ -1125,9 +1141,9 @@ class MegaTOM90HybridPDFGenerator:
             if image_bytes:
                 try:
                     # Bild einfügen - mit sicherer Bildverarbeitung
-                    processed_image = self._process_image_data(image_bytes)
+                    img_rect = fitz.Rect(50, 100, 545, 400)
+                    processed_image = self._process_image_data(image_bytes, img_rect.width, img_rect.height)
                     if processed_image:
-                        img_rect = fitz.Rect(50, 100, 545, 400)
                         page.insert_image(img_rect, stream=processed_image)
                         print(f"✅ Bild {title} erfolgreich hinzugefügt")
                     else:
@@ -1618,10 +1634,9 @@ class MegaTOM90HybridPDFGenerator:
         if image_data:
             try:
                 # Bild einfügen - mit sicherer Bildverarbeitung
-                processed_image = self._process_image_data(image_data)
+                image_rect = fitz.Rect(50, y_pos, 545, y_pos + 400)  # Maximale Bildgröße
+                processed_image = self._process_image_data(image_data, image_rect.width, image_rect.height)
                 if processed_image:
-                    import io
-                    image_rect = fitz.Rect(50, y_pos, 545, y_pos + 400)  # Maximale Bildgröße
                     page.insert_image(image_rect, stream=processed_image)
                     y_pos += 420
                     print(f"✅ Individuelles Bild {title} erfolgreich hinzugefügt")
@@ -1660,16 +1675,25 @@ class MegaTOM90HybridPDFGenerator:
             page.insert_text((70, y_pos), f"• {legal_doc}", fontsize=11)
             y_pos += 20
     
-    def _process_image_data(self, image_data) -> bytes:
+    def _process_image_data(self, image_data, max_width: Optional[float] = None,
+                            max_height: Optional[float] = None) -> bytes:
         """
         Verarbeitet Bilddaten und stellt sicher, dass sie als Bytes-Stream vorliegen
         
         Args:
             image_data: Bilddaten in verschiedenen Formaten (bytes, base64, file path, etc.)
+            max_width, max_height: Platzierungsgröße in pt; mit Angabe wird das Bild für das
+                aktive Bildprofil verkleinert und neu kodiert (pdf_image_optimizer)
             
         Returns:
             bytes: Bilddaten als Bytes-Stream oder None bei Fehlern
         """
+        image_bytes = self._read_image_bytes(image_data)
+        if image_bytes and (max_width or max_height):
+            return get_optimized_image_bytes(image_bytes, max_width, max_height) or image_bytes
+        return image_bytes
+
+    def _read_image_bytes(self, image_data) -> Optional[bytes]:
         try:
             # Fall 1: Bereits Bytes
             if isinstance(image_data, bytes):
@@ -1705,7 +1729,7 @@ class MegaTOM90HybridPDFGenerator:
             
             # Fall 5: Dictionary mit image_bytes
             if isinstance(image_data, dict) and 'image_bytes' in image_data:
-                return self._process_image_data(image_data['image_bytes'])
+                return self._read_image_bytes(image_data['image_bytes'])
             
             print(f"⚠️ Unbekanntes Bilddatenformat: {type(image_data)}")
             return None
@@ -1720,9 +1744,9 @@ class MegaTOM90HybridPDFGenerator:
         if self.tom90_company_logo_base64:
             try:
                 # Verwende sichere Bildverarbeitung
-                processed_logo = self._process_image_data(self.tom90_company_logo_base64)
+                logo_rect = fitz.Rect(450, 20, 540, 60)
+                processed_logo = self._process_image_data(self.tom90_company_logo_base64, logo_rect.width, logo_rect.height)
                 if processed_logo:
-                    logo_rect = fitz.Rect(450, 20, 540, 60)
                     page.insert_image(logo_rect, stream=processed_logo)
                     print("✅ Firmenlogo erfolgreich hinzugefügt")
                 else:
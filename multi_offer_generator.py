@@ -9,14 +9,19 @@ import os
 import tempfile
 from datetime import datetime
 import streamlit as st
-import zipfile
-import io
 import re
+import shutil
 import pandas as pd
 import json
 import random
 from typing import Dict, List, Any, Callable, Optional
 import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from offer_spool import OfferSpool, peak_memory_mb
+from chart_export_queue import pending_chart_keys, rasterize_pending_charts
 
 try:
     from reportlab.platypus import Table, TableStyle, Paragraph
@@ -66,11 +71,47 @@ except ImportError as e:
     PDF_OUTPUT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pdf_output")
 
 
+# Standard-Workerzahl für die parallele PDF-Erstellung (ein Kern bleibt für Streamlit frei)
+MULTI_OFFER_DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
 def get_text_mog(key: str, fallback: str) -> str:
     """Hilfsfunktion für Texte"""
     return st.session_state.get("TEXTS", {}).get(key, fallback)
 
 
+def _render_offer_pdf_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Erstellt das PDF einer Firma aus einem Auftrag von MultiCompanyOfferGenerator._build_pdf_job.
+    Modulebene und ohne Session-State, damit der Auftrag auch in einem Worker-Prozess laufen kann.
+    Fehler werden im Ergebnis gemeldet statt geworfen, damit andere Firmen weiterlaufen.
+    Mit job["output_path"] wird das PDF direkt in diese Datei geschrieben und nur der Pfad
+    zurückgegeben (pdf_path), statt die Bytes an den Hauptprozess zu übertragen.
+    """
+    result = {"company_index": job["company_index"], "company_name": job["company_name"], "pdf_content": None, "error": None}
+    try:
+        pdf_content = generate_offer_pdf(
+            **job["generate_kwargs"],
+            load_admin_setting_func=load_admin_setting if callable(load_admin_setting) else lambda k, d: d,
+            save_admin_setting_func=save_admin_setting if callable(save_admin_setting) else lambda k, v: True,
+            list_products_func=list_products if callable(list_products) else lambda: [],
+            get_product_by_id_func=get_product_by_id if callable(get_product_by_id) else lambda x: {},
+            db_list_company_documents_func=list_company_documents if callable(list_company_documents) else lambda cid, dtype=None: [],
+        )
+        if pdf_content and job.get("output_path"):
+            with open(job["output_path"], "wb") as fh:
+                fh.write(pdf_content)
+            result["pdf_path"] = job["output_path"]
+        else:
+            result["pdf_content"] = pdf_content
+    except Exception as e:
+        traceback.print_exc()
+        result["error"] = str(e)
+    # Spitzen-RSS des Prozesses, der das PDF erstellt hat (Worker oder Hauptprozess)
+    result["peak_rss_mb"] = peak_memory_mb()
+    return result
+
+
 class MultiCompanyOfferGenerator:
     """Generator für Multi-Firmen-Angebote - übernimmt Kundendaten aus Projekt"""
 
@@ -685,6 +726,24 @@ class MultiCompanyOfferGenerator:
             else:
                 st.success(f"✅ {len(selected_sections)} Sektionen ausgewählt")
         
+        # Parallele Erstellung: jede Firma als eigener Auftrag in einem Worker-Prozess
+        st.markdown("### ⚡ Erstellung")
+        parallel_cols = st.columns(2)
+        settings["parallel_generation"] = parallel_cols[0].checkbox(
+            "PDFs parallel erstellen",
+            value=settings.get("parallel_generation", True),
+            help="Erstellt die Firmen-PDFs gleichzeitig in mehreren Prozessen"
+        )
+        max_parallel_workers = max(os.cpu_count() or 1, 1)
+        settings["parallel_workers"] = parallel_cols[1].number_input(
+            "Anzahl paralleler Prozesse",
+            min_value=1,
+            max_value=max_parallel_workers,
+            value=min(int(settings.get("parallel_workers", MULTI_OFFER_DEFAULT_WORKERS)), max_parallel_workers),
+            step=1,
+            disabled=not settings["parallel_generation"],
+        )
+        
         return True
 
     def generate_multi_offers(self):
@@ -707,60 +766,97 @@ class MultiCompanyOfferGenerator:
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
+                # Fertige PDFs landen in einem eigenen Lauf-Verzeichnis, nicht im Speicher;
+                # das Verzeichnis des vorherigen Laufs dieser Sitzung wird nicht mehr gebraucht
+                previous_spool_dir = st.session_state.get("multi_offer_spool_dir")
+                if previous_spool_dir:
+                    shutil.rmtree(previous_spool_dir, ignore_errors=True)
+                spool = OfferSpool()
+                st.session_state["multi_offer_spool_dir"] = spool.directory
                 generated_pdfs = []
                 total_companies = len(selected_companies)
                 
+                # Aufträge vorbereiten (Firmendaten, Produktrotation, Preisstaffelung) – schnell, im UI-Thread
+                prepared_offers = []
                 for i, company_id in enumerate(selected_companies):
                     company_name = f"Firma_{company_id}"  # Fallback-Name sofort setzen
                     try:
-                        # Company-Daten laden
                         company = get_company(company_id) if callable(get_company) else {}
                         company_name = company.get("name", f"Firma_{company_id}")  # Überschreibe mit echtem Namen
-                        
-                        status_text.text(f"Erstelle Angebot für {company_name} (Firma {i+1}/{total_companies})...")
+                        status_text.text(f"Bereite Angebot für {company_name} vor (Firma {i+1}/{total_companies})...")
                         
                         # NEUE FEATURE: Produktrotation für diese Firma
                         company_settings = self.get_rotated_products_for_company(i, settings)
-                          # PDF-Generierung vorbereiten mit firmenspezifischen Produkten
+                        # PDF-Generierung vorbereiten mit firmenspezifischen Produkten
                         offer_data = self._prepare_offer_data(customer_data, company, company_settings, project_data, i)
-                        
-                        # PDF generieren mit company_index für Preisstaffelung
-                        pdf_content = self._generate_company_pdf(offer_data, company, i)
-                        
-                        if pdf_content:
-                            generated_pdfs.append({
-                                "company_name": company_name,
-                                "pdf_content": pdf_content,
-                                "filename": f"Angebot_{company_name}_{customer_data.get('last_name', 'Kunde')}.pdf"
-                            })
-                            st.success(f"✅ PDF für {company_name} erstellt")
-                        else:
-                            st.error(f"❌ PDF für {company_name} konnte nicht erstellt werden")                        # Fortschritt aktualisieren
-                        progress_bar.progress((i + 1) / total_companies)
-                        
+                        prepared_offers.append({"company_index": i, "company": company, "company_name": company_name, "offer_data": offer_data})
+                    except Exception as e:
+                        st.error(f"Fehler bei {company_name}: {str(e)}")
+                        logging.error(f"Fehler bei Vorbereitung für {company_name} (company_id={company_id}): {type(e).__name__}: {e}")
+                
+                # Wirtschaftlichkeit: Ertragssimulation einmal je Produktkombination, je Firma nur die Kostenstufe
+                status_text.text("Berechne Wirtschaftlichkeit für alle Firmen...")
+                company_calc_results = self._calculate_company_results(prepared_offers, project_data, settings)
+                # Diagramme der Analyse-Seite einmal rastern; alle Firmen-PDFs übernehmen die Bytes
+                session_calc_results = st.session_state.get("calculation_results")
+                if pending_chart_keys(session_calc_results):
+                    rasterize_pending_charts(
+                        session_calc_results,
+                        progress_callback=lambda done, total, key: status_text.text(f"Erstelle Diagramme für die PDFs ({done}/{total})..."),
+                    )
+                pdf_jobs = []
+                for prepared in prepared_offers:
+                    try:
+                        pdf_job = self._build_pdf_job(prepared["offer_data"], prepared["company"], prepared["company_index"],
+                                                      company_calc_results.get(prepared["company_index"]))
+                        pdf_job["company_name"] = prepared["company_name"]
+                        pdf_job["filename"] = f"Angebot_{prepared['company_name']}_{customer_data.get('last_name', 'Kunde')}.pdf"
+                        pdf_job["output_path"] = spool.path_for(prepared["company_index"], pdf_job["filename"])
+                        pdf_jobs.append(pdf_job)
                     except Exception as e:
-                        # Sichere Verwendung von company_name - falls nicht definiert, Fallback verwenden
-                        safe_company_name = locals().get('company_name', f"Firma_{company_id}")
-                        st.error(f"Fehler bei {safe_company_name}: {str(e)}")
-                        logging.error(f"Fehler bei PDF-Generierung für {safe_company_name}: {e}")
-                        logging.error(f"Exception Typ: {type(e).__name__}")
-                        logging.error(f"Verfügbare lokale Variablen: {list(locals().keys())}")
-                        # Ausführlichere Fehlerbehandlung für company_name Probleme
-                        if "company_name" in str(e):
-                            logging.error(f"COMPANY_NAME DEBUG: company_id={company_id}, locals company_name: {locals().get('company_name', 'NOT_FOUND')}")
-                        continue  # Weiter mit der nächsten Firma
+                        st.error(f"Fehler bei {prepared['company_name']}: {str(e)}")
+                        logging.error(f"Fehler bei Vorbereitung für {prepared['company_name']}: {type(e).__name__}: {e}")
+                
+                # PDFs erstellen – parallel in Worker-Prozessen oder nacheinander; Fortschritt je fertigem PDF
+                max_workers = int(settings.get("parallel_workers", MULTI_OFFER_DEFAULT_WORKERS)) if settings.get("parallel_generation", True) else 1
+                status_text.text(f"Erstelle {len(pdf_jobs)} Angebote ({min(max_workers, max(len(pdf_jobs), 1))} parallel)...")
+                filenames = {job["company_index"]: job["filename"] for job in pdf_jobs}
+                for finished, result in enumerate(self._iter_pdf_results(pdf_jobs, max_workers), start=1):
+                    company_name = result["company_name"]
+                    if result.get("pdf_path") or result["pdf_content"]:
+                        generated_pdfs.append(self._spool_pdf_result(spool, result, filenames[result["company_index"]]))
+                        st.success(f"✅ PDF für {company_name} erstellt")
+                    else:
+                        st.error(f"❌ PDF für {company_name} konnte nicht erstellt werden" + (f": {result['error']}" if result["error"] else ""))
+                        logging.error(f"Fehler bei PDF-Generierung für {company_name}: {result['error']}")
+                    # Fortschritt aktualisieren
+                    progress_bar.progress(finished / max(len(pdf_jobs), 1))
+                    status_text.text(f"{finished}/{len(pdf_jobs)} Angebote fertig (zuletzt: {company_name})")
+                generated_pdfs.sort(key=lambda pdf_info: pdf_info["company_index"])
                 
-                # ZIP-Download erstellen
+                # ZIP-Download erstellen (blockweise aus den ausgelagerten Dateien)
                 if generated_pdfs:
-                    zip_content = self._create_zip_download(generated_pdfs)
+                    zip_name = f"Multi_Angebote_{customer_data.get('last_name', 'Kunde')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+                    zip_path = spool.build_zip(zip_name)
                     
                     st.success(f"🎉 {len(generated_pdfs)} Angebote erfolgreich erstellt!")
-                    st.download_button(
-                        label="📦 Alle Angebote als ZIP herunterladen",
-                        data=zip_content,
-                        file_name=f"Multi_Angebote_{customer_data.get('last_name', 'Kunde')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                        mime="application/zip"
+                    with open(zip_path, "rb") as zip_file:
+                        st.download_button(
+                            label="📦 Alle Angebote als ZIP herunterladen",
+                            data=zip_file,
+                            file_name=zip_name,
+                            mime="application/zip"
+                        )
+                    spool_stats = spool.stats()
+                    main_rss = spool_stats["main_peak_rss_mb"]
+                    worker_rss = spool_stats["worker_peak_rss_mb"]
+                    st.caption(
+                        f"ZIP: {spool_stats['zip_bytes'] / 1024 / 1024:.1f} MB aus {spool_stats['files']} PDFs · "
+                        f"größtes PDF im Speicher: {spool_stats['largest_buffered_bytes'] / 1024 / 1024:.1f} MB"
+                        + (f" · Spitzen-RSS Hauptprozess: {main_rss:.0f} MB" if main_rss is not None else "")
+                        + (f" · Spitzen-RSS je PDF-Prozess: {worker_rss:.0f} MB" if worker_rss is not None else "")
                     )
+                    logging.info(f"Multi-Angebote ausgelagert: {spool_stats}")
                 else:
                     st.error("Keine PDFs konnten erstellt werden!")
                 
@@ -770,6 +866,38 @@ class MultiCompanyOfferGenerator:
                 st.error(f"Fehler bei der PDF-Generierung: {str(e)}")
                 logging.error(f"Fehler in generate_multi_offers: {e}")
 
+    def _iter_pdf_results(self, pdf_jobs: List[Dict[str, Any]], max_workers: int, render_job: Callable = None):
+        """
+        Führt render_job (Standard: _render_offer_pdf_job) für alle Aufträge aus und liefert die Ergebnisse
+        in Fertigstellungsreihenfolge.
+        Ab 2 Workern in einem ProcessPoolExecutor (spawn, da der Streamlit-Prozess mehrere Threads hat);
+        Aufträge, deren Worker-Prozess abstürzt, werden im eigenen Prozess nachgeholt.
+        """
+        render_job = render_job or _render_offer_pdf_job
+        if max_workers <= 1 or len(pdf_jobs) <= 1:
+            for job in pdf_jobs:
+                yield render_job(job)
+            return
+        try:
+            executor = ProcessPoolExecutor(max_workers=min(max_workers, len(pdf_jobs)),
+                                           mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, ValueError, NotImplementedError) as e:
+            logging.warning(f"Prozess-Pool nicht verfügbar, erstelle PDFs nacheinander: {e}")
+            for job in pdf_jobs:
+                yield render_job(job)
+            return
+        with executor:
+            futures = {executor.submit(render_job, job): job for job in pdf_jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    logging.warning(f"Worker-Prozess für {job['company_name']} abgebrochen ({e}), erstelle PDF im Hauptprozess.")
+                    yield render_job(job)
+                except Exception as e:
+                    yield {"company_index": job["company_index"], "company_name": job["company_name"], "pdf_content": None, "error": str(e)}
+
     def get_rotated_products_for_company(self, company_index: int, base_settings: Dict) -> Dict:
         """
         Vollständig flexible Produktrotation für verschiedene Firmen
@@ -832,6 +960,62 @@ class MultiCompanyOfferGenerator:
         
         return rotated_settings
 
+    def get_price_factor(self, company_index: int, base_settings: Dict) -> float:
+        """Preisfaktor der Firma laut Preisstaffelung (Linear, Exponentiell, Custom); erste Firma = 1.0"""
+        price_increment = base_settings.get("price_increment_percent", 0)
+        if company_index == 0 or price_increment == 0:
+            return 1.0
+        # Bestimme Preisfaktor basierend auf Berechnungsmodus
+        calc_mode = base_settings.get("price_calculation_mode", "linear")
+        if calc_mode == "linear":
+            return 1.0 + (company_index * price_increment / 100.0)
+        elif calc_mode == "exponentiell":
+            exponent = base_settings.get("price_exponent", 1.03)
+            return exponent ** company_index
+        elif calc_mode == "custom":
+            try:
+                custom_factors = json.loads(base_settings.get("custom_price_factors", "[1.0]"))
+                return float(custom_factors[company_index] if company_index < len(custom_factors) else custom_factors[-1])
+            except (ValueError, TypeError, IndexError):
+                # Fallback auf linear
+                return 1.0 + (company_index * price_increment / 100.0)
+        return 1.0
+
+    def _calculate_company_results(self, prepared_offers: List[Dict[str, Any]], project_data: Dict, settings: Dict) -> Dict[int, Dict[str, Any]]:
+        """
+        Berechnet die Wirtschaftlichkeit aller Firmen: Ertrag und Energiebilanz einmal je Produktkombination,
+        je Firma nur die kostenabhängige Stufe mit ihrem Preisfaktor (calculations.perform_calculations_price_scaled).
+        Liefert {company_index: Ergebnisse}; leer, wenn die Berechnung nicht verfügbar ist.
+        """
+        if not project_data or not project_data.get("project_details"):
+            return {}
+        try:
+            from calculations import perform_calculations_price_scaled, load_calculation_context, _merge_project_variant
+        except ImportError as e:
+            logging.warning(f"Gemeinsame Berechnung nicht verfügbar, verwende Preisstaffelung der Projektergebnisse: {e}")
+            return {}
+        texts = st.session_state.get("TEXTS", {})
+        calculation_context = load_calculation_context(texts)
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for prepared in prepared_offers:
+            details = prepared["offer_data"].get("project_details", {})
+            product_key = tuple(details.get(key) for key in (
+                "module_quantity", "include_storage", "selected_module_id", "selected_inverter_id", "selected_storage_id"))
+            groups.setdefault(product_key, []).append(prepared)
+        company_results: Dict[int, Dict[str, Any]] = {}
+        for group in groups.values():
+            calc_project = _merge_project_variant(project_data, {"project_details": group[0]["offer_data"].get("project_details", {})})
+            price_factors = [self.get_price_factor(p["company_index"], settings) for p in group]
+            try:
+                group_results = perform_calculations_price_scaled(calc_project, price_factors, texts, calculation_context=calculation_context)
+            except Exception as e:
+                logging.warning(f"Berechnung für Produktkombination fehlgeschlagen, verwende Preisstaffelung: {e}")
+                continue
+            for prepared, results in zip(group, group_results):
+                company_results[prepared["company_index"]] = results
+        logging.info(f"Multi-Angebot: {len(groups)} Ertragsberechnung(en) für {len(prepared_offers)} Firmen")
+        return company_results
+
     def apply_price_scaling(self, company_index: int, base_settings: Dict, calc_results: Dict) -> Dict:
         """
         Vollständig flexible Preisstaffelung für verschiedene Firmen
@@ -848,24 +1032,8 @@ class MultiCompanyOfferGenerator:
         scaled_results = calc_results.copy()
         
         try:
-            # Bestimme Preisfaktor basierend auf Berechnungsmodus
             calc_mode = base_settings.get("price_calculation_mode", "linear")
-            
-            if calc_mode == "linear":
-                price_factor = 1.0 + (company_index * price_increment / 100.0)
-            elif calc_mode == "exponentiell":
-                exponent = base_settings.get("price_exponent", 1.03)
-                price_factor = exponent ** company_index
-            elif calc_mode == "custom":
-                try:
-                    import json
-                    custom_factors = json.loads(base_settings.get("custom_price_factors", "[1.0]"))
-                    price_factor = custom_factors[company_index] if company_index < len(custom_factors) else custom_factors[-1]
-                except:
-                    # Fallback auf linear
-                    price_factor = 1.0 + (company_index * price_increment / 100.0)
-            else:
-                price_factor = 1.0
+            price_factor = self.get_price_factor(company_index, base_settings)
             
             logging.info(f"Preisstaffelung: Firma {company_index+1}, Modus: {calc_mode}, Faktor: {price_factor:.3f}")
             
@@ -1010,161 +1178,145 @@ class MultiCompanyOfferGenerator:
         
         return offer_data
 
+    def _build_pdf_job(self, offer_data: Dict, company: Dict, company_index: int = 0,
+                       company_calc_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Sammelt alle Eingaben für das PDF einer Firma (Session-State, Preisstaffelung, Optionen)
+        in einem picklebaren Auftrag für _render_offer_pdf_job.
+        company_calc_results: Ergebnisse aus _calculate_company_results (bereits mit Preisfaktor);
+        ohne sie werden die Projektergebnisse per apply_price_scaling angenähert.
+        """
+        # Vorbereitung der Berechnungsergebnisse - ECHTE DATEN verwenden!
+        calc_results = st.session_state.get('calculation_results', {})
+        
+        # Fallback: Multi-Offer spezifische Berechnungen
+        if not calc_results:
+            calc_results = st.session_state.get('multi_offer_calc_results', {})
+        
+        # Als letzter Fallback Mock-Daten, aber mit Warnung
+        if not calc_results:
+            logging.warning("Keine echten Berechnungsergebnisse verfügbar - verwende Mock-Daten")
+            calc_results = {
+                'anlage_kwp': offer_data.get('module_quantity', 20) * 0.4,  # Geschätzt
+                'annual_pv_production_kwh': offer_data.get('module_quantity', 20) * 400,
+                'total_investment_netto': offer_data.get('module_quantity', 20) * 750,
+                'amortization_time_years': 12.5,
+                'self_supply_rate_percent': 65.0,
+                'annual_financial_benefit_year1': 1200
+            }
+        else:
+            logging.info(f"Verwende echte Berechnungsergebnisse mit {len(calc_results)} Feldern")
+
+        base_settings = st.session_state.get("multi_offer_settings", {})
+        if company_calc_results:
+            # Firmenspezifische Berechnung; Diagramme aus der Projektanalyse bleiben erhalten
+            calc_results = dict(calc_results)
+            calc_results.update({k: v for k, v in company_calc_results.items() if not (k.endswith('_chart_bytes') and v is None)})
+        else:
+            # NEUE FEATURE: Preisstaffelung anwenden
+            calc_results = self.apply_price_scaling(company_index, base_settings, calc_results)
+        
+        logging.info(f"PDF-Generierung für Firma {company_index+1}: Preise angepasst")# KRITISCH: PDF-kompatible Datenstruktur erstellen
+        # Die PDF-Funktion erwartet project_data mit customer_data und project_details
+        pdf_project_data = {
+            "customer_data": offer_data.get("customer_data", {}),
+            "project_details": offer_data.get("project_details", {}),
+            # Weitere Felder aus offer_data übernehmen
+            "consumption_data": offer_data.get("consumption_data", {}),
+            "calculation_results": offer_data.get("calculation_results", {})
+        }
+          # Falls ursprüngliche project_data vorhanden, deren Struktur beibehalten
+        if "project_data" in offer_data and offer_data["project_data"]:
+            original_project_data = offer_data["project_data"]
+            # Wichtige Felder aus original_project_data übernehmen
+            for key in ["address", "roof_data", "location_data", "technical_specs"]:
+                if key in original_project_data:
+                    pdf_project_data[key] = original_project_data[key]
+          # DEBUG: Ausgabe der PDF-Datenstruktur
+        logging.info(f"Multi-Offer PDF Datenstruktur:")
+        logging.info(f"  project_details keys: {list(pdf_project_data.get('project_details', {}).keys())}")
+        logging.info(f"  selected_module_id: {pdf_project_data.get('project_details', {}).get('selected_module_id', 'NICHT GESETZT')}")
+        logging.info(f"  selected_inverter_id: {pdf_project_data.get('project_details', {}).get('selected_inverter_id', 'NICHT GESETZT')}")
+        logging.info(f"  selected_storage_id: {pdf_project_data.get('project_details', {}).get('selected_storage_id', 'NICHT GESETZT')}")
+          # KRITISCH: Verfügbare Charts aus analysis_results extrahieren
+        available_charts = []
+        if calc_results and isinstance(calc_results, dict):
+            # Chart-Keys aus analysis_results finden
+            chart_keys = [k for k in calc_results.keys() if k.endswith('_chart_bytes') and calc_results[k] is not None]
+            available_charts = chart_keys
+            logging.info(f"Multi-Offer PDF: {len(available_charts)} Charts gefunden: {chart_keys}")
+        
+        # NEUE FEATURE: Benutzerdefinierten PDF-Optionen aus Einstellungen verwenden
+        pdf_options = base_settings.get("pdf_options", {})
+        
+        # Sektionen aus Benutzereinstellungen
+        selected_sections = pdf_options.get("selected_sections", [
+            "ProjectOverview", "TechnicalComponents", "CostDetails",
+            "Economics", "SimulationDetails", "CO2Savings", 
+            "Visualizations", "FutureAspects"
+        ])
+        
+        # Charts basierend auf Benutzereinstellungen filtern
+        charts_to_include = available_charts if pdf_options.get("include_charts", True) else []
+        if not pdf_options.get("include_visualizations", True):
+            # Technische Visualisierungen entfernen
+            charts_to_include = [c for c in charts_to_include if not any(
+                vis_key in c for vis_key in ['daily_production', 'weekly_production', 'yearly_production']
+            )]
+        
+        # NEUE FEATURE: Template-Parameter aus Benutzereinstellungen verwenden
+        template_options = base_settings.get("template_options", {})
+        
+        return {
+            "company_index": company_index,
+            "company_name": company.get("name", f"Firma_{company.get('id', company_index + 1)}"),
+            "generate_kwargs": {
+                "project_data": pdf_project_data,  # Korrekt strukturierte Daten
+                "analysis_results": calc_results,
+                "company_info": company,
+                "company_logo_base64": company.get('logo_base64'),  # Firmen-spezifisches Logo
+                "selected_title_image_b64": template_options.get("selected_title_image_b64"),  # Template-Titelbild
+                "selected_offer_title_text": template_options.get("selected_offer_title_text", f"Ihr individuelles Solaranlagen-Angebot von {company.get('name', 'Unser Unternehmen')}"),  # Template-Titel
+                "selected_cover_letter_text": template_options.get("selected_cover_letter_text", "Sehr geehrte Damen und Herren,\n\nvielen Dank für Ihr Interesse an nachhaltiger Solarenergie."),  # Template-Anschreiben
+                "sections_to_include": selected_sections,  # Benutzer-definierte Sektionen
+                "inclusion_options": {
+                    "include_company_logo": pdf_options.get("include_company_logo", True),
+                    "include_product_images": pdf_options.get("include_product_images", True),
+                    "include_all_documents": pdf_options.get("include_all_documents", True),
+                    "company_document_ids_to_include": [],  # Firmendokumente werden im Multi-Angebot nicht angehängt
+                    "selected_charts_for_pdf": charts_to_include,
+                    "include_optional_component_details": pdf_options.get("include_optional_component_details", True),
+                    "include_custom_footer": True,  # Standard Footer
+                    "include_header_logo": True,  # Header Logo
+                },
+                "active_company_id": company.get("id", 1),
+                "texts": st.session_state.get("TEXTS", {}),
+            },
+        }
+
     def _generate_company_pdf(self, offer_data: Dict, company: Dict, company_index: int = 0) -> bytes:
         """Generiert PDF für eine spezifische Firma mit firmenspezifischen Produkten und Preisen"""
         try:
-            # PDF-Generierung über generate_offer_pdf mit allen 16 erforderlichen Parametern
-            if callable(generate_offer_pdf):
-                  # Vorbereitung der Berechnungsergebnisse - ECHTE DATEN verwenden!
-                calc_results = st.session_state.get('calculation_results', {})
-                
-                # Fallback: Multi-Offer spezifische Berechnungen
-                if not calc_results:
-                    calc_results = st.session_state.get('multi_offer_calc_results', {})
-                
-                # Als letzter Fallback Mock-Daten, aber mit Warnung
-                if not calc_results:
-                    logging.warning("Keine echten Berechnungsergebnisse verfügbar - verwende Mock-Daten")
-                    calc_results = {
-                        'anlage_kwp': offer_data.get('module_quantity', 20) * 0.4,  # Geschätzt
-                        'annual_pv_production_kwh': offer_data.get('module_quantity', 20) * 400,
-                        'total_investment_netto': offer_data.get('module_quantity', 20) * 750,
-                        'amortization_time_years': 12.5,
-                        'self_supply_rate_percent': 65.0,
-                        'annual_financial_benefit_year1': 1200
-                    }
-                else:
-                    logging.info(f"Verwende echte Berechnungsergebnisse mit {len(calc_results)} Feldern")
-
-                # NEUE FEATURE: Preisstaffelung anwenden
-                base_settings = st.session_state.get("multi_offer_settings", {})
-                calc_results = self.apply_price_scaling(company_index, base_settings, calc_results)
-                
-                logging.info(f"PDF-Generierung für Firma {company_index+1}: Preise angepasst")# KRITISCH: PDF-kompatible Datenstruktur erstellen
-                # Die PDF-Funktion erwartet project_data mit customer_data und project_details
-                pdf_project_data = {
-                    "customer_data": offer_data.get("customer_data", {}),
-                    "project_details": offer_data.get("project_details", {}),
-                    # Weitere Felder aus offer_data übernehmen
-                    "consumption_data": offer_data.get("consumption_data", {}),
-                    "calculation_results": offer_data.get("calculation_results", {})
-                }
-                  # Falls ursprüngliche project_data vorhanden, deren Struktur beibehalten
-                if "project_data" in offer_data and offer_data["project_data"]:
-                    original_project_data = offer_data["project_data"]
-                    # Wichtige Felder aus original_project_data übernehmen
-                    for key in ["address", "roof_data", "location_data", "technical_specs"]:
-                        if key in original_project_data:
-                            pdf_project_data[key] = original_project_data[key]
-                  # DEBUG: Ausgabe der PDF-Datenstruktur
-                logging.info(f"Multi-Offer PDF Datenstruktur:")
-                logging.info(f"  project_details keys: {list(pdf_project_data.get('project_details', {}).keys())}")
-                logging.info(f"  selected_module_id: {pdf_project_data.get('project_details', {}).get('selected_module_id', 'NICHT GESETZT')}")
-                logging.info(f"  selected_inverter_id: {pdf_project_data.get('project_details', {}).get('selected_inverter_id', 'NICHT GESETZT')}")
-                logging.info(f"  selected_storage_id: {pdf_project_data.get('project_details', {}).get('selected_storage_id', 'NICHT GESETZT')}")
-                  # KRITISCH: Verfügbare Charts aus analysis_results extrahieren
-                available_charts = []
-                if calc_results and isinstance(calc_results, dict):
-                    # Chart-Keys aus analysis_results finden
-                    chart_keys = [k for k in calc_results.keys() if k.endswith('_chart_bytes') and calc_results[k] is not None]
-                    available_charts = chart_keys
-                    logging.info(f"Multi-Offer PDF: {len(available_charts)} Charts gefunden: {chart_keys}")
-                
-                # PDF-Templates aus Admin-Einstellungen laden
-                try:
-                    # Templates laden (falls verfügbar)
-                    title_image_templates = load_admin_setting("pdf_title_image_templates", []) if callable(load_admin_setting) else []
-                    offer_title_templates = load_admin_setting("pdf_offer_title_templates", []) if callable(load_admin_setting) else []
-                    cover_letter_templates = load_admin_setting("pdf_cover_letter_templates", []) if callable(load_admin_setting) else []
-                    
-                    # Erstes verfügbares Template verwenden
-                    selected_title_image = title_image_templates[0] if title_image_templates else None
-                    selected_offer_title = offer_title_templates[0] if offer_title_templates else None
-                    selected_cover_letter = cover_letter_templates[0] if cover_letter_templates else None
-                    
-                    logging.info(f"Templates geladen: Titelbild={bool(selected_title_image)}, Titel={bool(selected_offer_title)}, Anschreiben={bool(selected_cover_letter)}")
-                except Exception as e:
-                    logging.warning(f"Fehler beim Laden der Templates: {e}")
-                    selected_title_image = selected_offer_title = selected_cover_letter = None
-                  # NEUE FEATURE: Benutzerdefinierten PDF-Optionen aus Einstellungen verwenden
-                base_settings = st.session_state.get("multi_offer_settings", {})
-                pdf_options = base_settings.get("pdf_options", {})
-                
-                # Sektionen aus Benutzereinstellungen
-                selected_sections = pdf_options.get("selected_sections", [
-                    "ProjectOverview", "TechnicalComponents", "CostDetails",
-                    "Economics", "SimulationDetails", "CO2Savings", 
-                    "Visualizations", "FutureAspects"
-                ])
-                
-                # Charts basierend auf Benutzereinstellungen filtern
-                charts_to_include = available_charts if pdf_options.get("include_charts", True) else []
-                if not pdf_options.get("include_visualizations", True):
-                    # Technische Visualisierungen entfernen
-                    charts_to_include = [c for c in charts_to_include if not any(
-                        vis_key in c for vis_key in ['daily_production', 'weekly_production', 'yearly_production']
-                    )]
-                
-                # Erstelle section_order_df aus selected_sections
-                import pandas as pd
-                section_order_df = pd.DataFrame({
-                    "Aktiv": [True] * len(selected_sections),
-                    "Sektion": selected_sections
-                })
-                
-                # NEUE FEATURE: Template-Parameter aus Benutzereinstellungen verwenden
-                template_options = base_settings.get("template_options", {})
-                
-                pdf_content = generate_offer_pdf(
-                    project_data=pdf_project_data,  # Korrekt strukturierte Daten
-                    analysis_results=calc_results,
-                    company_info=company,
-                    company_logo_base64=company.get('logo_base64'),  # Firmen-spezifisches Logo
-                    selected_title_image_b64=template_options.get("selected_title_image_b64"),  # Template-Titelbild
-                    selected_offer_title_text=template_options.get("selected_offer_title_text", f"Ihr individuelles Solaranlagen-Angebot von {company.get('name', 'Unser Unternehmen')}"),  # Template-Titel
-                    selected_cover_letter_text=template_options.get("selected_cover_letter_text", "Sehr geehrte Damen und Herren,\n\nvielen Dank für Ihr Interesse an nachhaltiger Solarenergie."),  # Template-Anschreiben
-                    sections_to_include=selected_sections,  # Benutzer-definierte Sektionen
-                    inclusion_options={
-                        "include_company_logo": pdf_options.get("include_company_logo", True),
-                        "include_product_images": pdf_options.get("include_product_images", True),
-                        "include_all_documents": pdf_options.get("include_all_documents", True),
-                        "company_document_ids_to_include": [],  # TODO: Firmen-spezifische Dokumente
-                        "selected_charts_for_pdf": charts_to_include,
-                        "include_optional_component_details": pdf_options.get("include_optional_component_details", True),
-                        "include_custom_footer": True,  # Standard Footer
-                        "include_header_logo": True,  # Header Logo
-                    },
-                    load_admin_setting_func=load_admin_setting if callable(load_admin_setting) else lambda k, d: d,
-                    save_admin_setting_func=save_admin_setting if callable(save_admin_setting) else lambda k, v: True,
-                    list_products_func=list_products if callable(list_products) else lambda: [],
-                    get_product_by_id_func=get_product_by_id if callable(get_product_by_id) else lambda x: {},
-                    db_list_company_documents_func=list_company_documents if callable(list_company_documents) else lambda cid, dtype=None: [],
-                    active_company_id=company.get("id", 1),
-                    texts=st.session_state.get("TEXTS", {})
-                )
-                return pdf_content
-            else:
+            if not callable(generate_offer_pdf):
                 st.error("PDF-Generator nicht verfügbar")
                 return None
-                
+            result = _render_offer_pdf_job(self._build_pdf_job(offer_data, company, company_index))
+            if result["error"]:
+                logging.error(f"Fehler bei PDF-Generierung: {result['error']}")
+                st.error(f"PDF-Generierung fehlgeschlagen: {result['error']}")
+            return result["pdf_content"]
         except Exception as e:
             logging.error(f"Fehler bei PDF-Generierung: {e}")
             st.error(f"PDF-Generierung fehlgeschlagen: {str(e)}")
             return None
 
-    def _create_zip_download(self, generated_pdfs: List[Dict]) -> bytes:
-        """Erstellt ZIP-Datei mit allen PDFs"""
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for pdf_info in generated_pdfs:
-                zip_file.writestr(
-                    pdf_info["filename"],
-                    pdf_info["pdf_content"]
-                )
-        
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
+    def _spool_pdf_result(self, spool: OfferSpool, result: Dict[str, Any], filename: str) -> Dict[str, Any]:
+        """Registriert ein fertiges PDF im Lauf-Verzeichnis (vom Worker geschrieben oder als Bytes geliefert)."""
+        info = {"company_index": result["company_index"], "company_name": result["company_name"],
+                "worker_peak_rss_mb": result.get("peak_rss_mb")}
+        if result.get("pdf_path"):
+            return spool.add_file(result["pdf_path"], filename, result["company_index"], **info)
+        return spool.add_bytes(result["pdf_content"], filename, result["company_index"], **info)
 
     def render_ui(self):
         """Hauptfunktion für die UI-Darstellung"""
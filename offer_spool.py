@@ -0,0 +1,134 @@
+# offer_spool.py
+# -*- coding: utf-8 -*-
+"""
+Auslagerung von Angebots-PDFs auf die Festplatte für Sammel-Downloads.
+
+Jeder Erstellungslauf erhält ein eigenes temporäres Verzeichnis unter data/offer_spool.
+Fertige PDFs werden dort abgelegt (von Worker-Prozessen direkt oder aus dem Hauptprozess),
+das ZIP wird dateiweise und blockweise aus diesen Dateien geschrieben (ZIP_STORED, da PDFs
+bereits komprimiert sind). Im Speicher liegen so nur Pfade und Größen, nicht alle PDFs.
+Verzeichnisse älter als SPOOL_MAX_AGE_SECONDS werden beim Anlegen eines neuen Laufs entfernt.
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+SPOOL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "offer_spool")
+SPOOL_MAX_AGE_SECONDS = 6 * 3600
+SPOOL_DIR_PREFIX = "run_"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def safe_filename(name: str) -> str:
+    """Dateiname ohne Pfadtrenner und Sonderzeichen (Firmennamen können beliebige Zeichen enthalten)."""
+    cleaned = re.sub(r'[^\w.\-]+', '_', name, flags=re.UNICODE).strip('._')
+    return cleaned or "datei"
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Maximaler Arbeitsspeicher (RSS) des Prozesses in MB; None, wenn das Betriebssystem ihn nicht liefert."""
+    if resource is None:
+        return None
+    try:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (OSError, ValueError):
+        return None
+    # Linux liefert KiB, macOS Bytes
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def cleanup_expired_spools(root: str = None, max_age_seconds: float = SPOOL_MAX_AGE_SECONDS) -> int:
+    """Entfernt Lauf-Verzeichnisse, die älter als max_age_seconds sind. Gibt die Anzahl zurück."""
+    root = root or SPOOL_ROOT
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for entry in os.scandir(root):
+        if not entry.is_dir() or not entry.name.startswith(SPOOL_DIR_PREFIX):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except OSError as e:
+            print(f"offer_spool: {entry.path} konnte nicht geprüft werden: {e}")
+    return removed
+
+
+class OfferSpool:
+    """Temporäres Verzeichnis eines Erstellungslaufs mit den fertigen PDFs und dem daraus erzeugten ZIP."""
+
+    def __init__(self, root: str = None, max_age_seconds: float = SPOOL_MAX_AGE_SECONDS):
+        self.root = root or SPOOL_ROOT
+        os.makedirs(self.root, exist_ok=True)
+        self.expired_removed = cleanup_expired_spools(self.root, max_age_seconds)
+        self.directory = tempfile.mkdtemp(prefix=SPOOL_DIR_PREFIX, dir=self.root)
+        self.files: List[Dict[str, Any]] = []
+        self.zip_path: Optional[str] = None
+        self.largest_buffered_bytes = 0  # größtes PDF, das als Bytes durch den Hauptprozess lief
+
+    def path_for(self, index: int, filename: str) -> str:
+        """Zielpfad für ein PDF (eindeutig über den Index, z.B. für Worker-Prozesse)."""
+        return os.path.join(self.directory, f"{index:03d}_{safe_filename(filename)}")
+
+    def add_file(self, path: str, filename: str, index: int = None, **info) -> Dict[str, Any]:
+        """Registriert eine bereits geschriebene Datei; filename ist der Name im ZIP."""
+        entry = {"index": len(self.files) if index is None else index, "filename": filename,
+                 "path": path, "size_bytes": os.path.getsize(path), **info}
+        self.files.append(entry)
+        return entry
+
+    def add_bytes(self, content: bytes, filename: str, index: int = None, **info) -> Dict[str, Any]:
+        """Schreibt content in das Lauf-Verzeichnis und registriert die Datei."""
+        index = len(self.files) if index is None else index
+        path = self.path_for(index, filename)
+        with open(path, "wb") as fh:
+            fh.write(content)
+        self.largest_buffered_bytes = max(self.largest_buffered_bytes, len(content))
+        return self.add_file(path, filename, index, **info)
+
+    def build_zip(self, zip_name: str = "angebote.zip") -> str:
+        """Schreibt alle Dateien (nach Index sortiert) blockweise in ein ZIP im Lauf-Verzeichnis."""
+        self.zip_path = os.path.join(self.directory, safe_filename(zip_name))
+        used_names = set()
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+            for entry in sorted(self.files, key=lambda e: e["index"]):
+                arcname = entry["filename"]
+                if arcname in used_names:
+                    arcname = f"{entry['index']:03d}_{arcname}"
+                used_names.add(arcname)
+                with open(entry["path"], "rb") as src, zip_file.open(arcname, "w") as dst:
+                    shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return self.zip_path
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Anzahl und Größe der Dateien, ZIP-Größe, größter Puffer im Hauptprozess, Spitzen-RSS des
+        Hauptprozesses und höchster Spitzen-RSS der PDF-erstellenden Prozesse (aus add_*(worker_peak_rss_mb=...)).
+        """
+        zip_bytes = os.path.getsize(self.zip_path) if self.zip_path and os.path.exists(self.zip_path) else 0
+        worker_rss = [e["worker_peak_rss_mb"] for e in self.files if e.get("worker_peak_rss_mb") is not None]
+        return {
+            "files": len(self.files),
+            "total_bytes": sum(e["size_bytes"] for e in self.files),
+            "zip_bytes": zip_bytes,
+            "largest_buffered_bytes": self.largest_buffered_bytes,
+            "main_peak_rss_mb": peak_memory_mb(),
+            "worker_peak_rss_mb": max(worker_rss) if worker_rss else None,
+            "directory": self.directory,
+        }
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,295 @@
+# pdf_asset_cache.py
+# -*- coding: utf-8 -*-
+"""
+Prozessweiter Cache für Bild-Assets der PDF-Erzeugung (Firmenlogo, Titelbilder, Produktbilder).
+
+Base64-Strings und Bild-Bytes werden einmal dekodiert und als ImageReader vorgehalten,
+Schlüssel ist der SHA1-Hash des Inhalts. ReportLab erkennt beim drawImage identische
+Bilder am Inhalt und bettet sie pro Dokument nur einmal als XObject ein; weil der Reader
+seine RGB-Daten schon dekodiert mitbringt, kostet jeder weitere Seitenaufruf (Logo in
+Kopf- und Fußzeile) nur noch den Verweis. Für feste Zielgrößen gibt es optimierte
+Varianten aus pdf_image_optimizer (Schlüssel: Inhalt + Pixelgröße + Profil), damit z.B. ein
+4000px-Handyfoto nicht in voller Auflösung in jedes Angebot wandert.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Image
+    _REPORTLAB_AVAILABLE = True
+except ImportError:
+    ImageReader = None  # type: ignore
+    Image = object  # type: ignore
+    _REPORTLAB_AVAILABLE = False
+
+from pdf_image_optimizer import (IMAGE_PROFILES, active_image_profile, optimize_image, record_image,
+                                 resolve_image_profile, target_pixels)
+
+DEFAULT_MAX_MEMORY_MB = 96
+
+ImagePayload = Union[str, bytes, None]
+
+
+@dataclass(frozen=True)
+class ImageAsset:
+    key: str
+    data: bytes
+    reader: Any
+    width: int
+    height: int
+    memory_bytes: int
+    original_bytes: int = 0
+
+    def fit_size(self, max_width: float, max_height: Optional[float] = None) -> Tuple[float, float]:
+        """Zeichengröße in pt, seitenverhältnistreu in max_width x max_height eingepasst."""
+        aspect = self.height / float(self.width)
+        width, height = float(max_width), float(max_width) * aspect
+        if max_height and height > max_height:
+            height = float(max_height)
+            width = height / aspect
+        return width, height
+
+
+_lock = threading.Lock()
+_assets: "OrderedDict[Tuple[str, int, int, str], ImageAsset]" = OrderedDict()
+_payload_keys: "OrderedDict[str, str]" = OrderedDict()
+# Varianten-Schlüssel, bei denen die Optimierung nichts bringt (Original wird verwendet)
+_passthrough: "OrderedDict[Tuple[str, int, int, str], bool]" = OrderedDict()
+# Schlüssel, deren Asset gerade ein Thread dekodiert/optimiert (die anderen warten auf das Future)
+_inflight: Dict[Tuple[str, int, int, str], "Future[Optional[ImageAsset]]"] = {}
+_memory_bytes = 0
+_config: Dict[str, int] = {'max_memory_bytes': DEFAULT_MAX_MEMORY_MB * 1024 * 1024}
+_stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'optimized': 0, 'evictions': 0, 'invalid': 0}
+
+
+def configure_asset_cache(max_memory_bytes: Optional[int] = None) -> None:
+    with _lock:
+        if max_memory_bytes is not None:
+            _config['max_memory_bytes'] = max(0, int(max_memory_bytes))
+            _evict_locked()
+
+
+def decode_image_payload(payload: ImagePayload) -> Optional[bytes]:
+    """Bild-Bytes aus Bytes, Base64-String oder Data-URI ('data:image/png;base64,...'); None bei Müll."""
+    if isinstance(payload, (bytes, bytearray)):
+        return bytes(payload) or None
+    if not isinstance(payload, str):
+        return None
+    text = payload.strip()
+    if text.lower() in ("", "none", "null", "nan"):
+        return None
+    if text.startswith("data:") or "," in text:
+        text = text.split(",", 1)[1]
+    try:
+        return base64.b64decode(text) or None
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _payload_digest(payload: ImagePayload) -> Optional[str]:
+    if isinstance(payload, str):
+        return hashlib.sha1(payload.encode("utf-8", "surrogatepass")).hexdigest()
+    if isinstance(payload, (bytes, bytearray)):
+        return hashlib.sha1(payload).hexdigest()
+    return None
+
+
+def _evict_locked() -> None:
+    global _memory_bytes
+    while _assets and _memory_bytes > _config['max_memory_bytes']:
+        _, asset = _assets.popitem(last=False)
+        _memory_bytes -= asset.memory_bytes
+        _stats['evictions'] += 1
+    while len(_payload_keys) > 4 * max(len(_assets), 1):
+        _payload_keys.popitem(last=False)
+    while len(_passthrough) > 4 * max(len(_assets), 1):
+        _passthrough.popitem(last=False)
+
+
+def _remember_locked(cache_key: Tuple[str, int, int, str], asset: ImageAsset) -> None:
+    global _memory_bytes
+    _assets[cache_key] = asset
+    _memory_bytes += asset.memory_bytes
+    _evict_locked()
+
+
+def _make_reader(source: Any) -> Tuple[Any, int, int, int]:
+    """ImageReader mit bereits dekodierten Pixeldaten (drawImage braucht sie für die Signatur)."""
+    reader = ImageReader(source)
+    width, height = reader.getSize()
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Ungültige Bilddimensionen: w={width}, h={height}")
+    rgb = reader.getRGBData()
+    reader.getTransparent()
+    alpha = getattr(reader, '_dataA', None)
+    alpha_bytes = len(alpha.getRGBData()) if alpha is not None else 0
+    return reader, width, height, len(rgb) + alpha_bytes
+
+
+def _build_once(cache_key: Tuple[str, int, int, str],
+                build: Callable[[], Optional[ImageAsset]]) -> Tuple[Optional[ImageAsset], bool]:
+    """
+    (Asset, neu gebaut) für cache_key. Fehlt es im Cache, baut genau ein Thread es außerhalb des
+    globalen Locks; weitere Threads mit demselben Schlüssel warten auf dessen Ergebnis, Threads mit
+    anderen Bildern laufen ungehindert weiter. Gebaute Assets landen im Cache, None nicht.
+    """
+    with _lock:
+        asset = _assets.get(cache_key)
+        if asset is not None:
+            _assets.move_to_end(cache_key)
+            return asset, False
+        future = _inflight.get(cache_key)
+        if future is None:
+            future = _inflight[cache_key] = Future()
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        return future.result(), False
+    asset = None
+    try:
+        asset = build()
+    except Exception as e:
+        print(f"pdf_asset_cache: Bild konnte nicht verarbeitet werden: {e}")
+    finally:
+        with _lock:
+            if asset is not None:
+                _remember_locked(cache_key, asset)
+            del _inflight[cache_key]
+        future.set_result(asset)
+    return asset, asset is not None
+
+
+def _load_original(content_key: str, data: bytes) -> Optional[ImageAsset]:
+    try:
+        reader, width, height, pixel_bytes = _make_reader(io.BytesIO(data))
+    except Exception as e:
+        print(f"pdf_asset_cache: Bild konnte nicht gelesen werden: {e}")
+        return None
+    return ImageAsset(content_key, data, reader, width, height, len(data) + pixel_bytes, len(data))
+
+
+def get_image_asset(payload: ImagePayload, max_width: Optional[float] = None,
+                    max_height: Optional[float] = None, profile: Optional[str] = None) -> Optional[ImageAsset]:
+    """
+    Gecachtes Bild-Asset für payload (Bytes, Base64 oder Data-URI); None, wenn es kein Bild ist.
+    Mit max_width/max_height (pt) wird die für diese Box und das Profil optimierte Variante
+    geliefert (ohne Profil gilt das aktive aus pdf_image_optimizer.image_optimization()).
+    """
+    if not _REPORTLAB_AVAILABLE:
+        return None
+    payload_digest = _payload_digest(payload)
+    if payload_digest is None:
+        return None
+
+    with _lock:
+        content_key = _payload_keys.get(payload_digest)
+        if content_key is not None:
+            _payload_keys.move_to_end(payload_digest)
+    data = None
+    if content_key is None:
+        # Base64-Dekodieren und Hashen ohne Lock; nur die Cache-Verwaltung ist serialisiert
+        data = decode_image_payload(payload)
+        if data is None:
+            with _lock:
+                _stats['invalid'] += 1
+            return None
+        content_key = hashlib.sha1(data).hexdigest()
+
+    original, built = _build_once((content_key, 0, 0, ''),
+                                  lambda: _load_original(content_key, data or decode_image_payload(payload)))
+    with _lock:
+        if original is None:
+            _stats['invalid'] += 1
+            return None
+        _stats['misses' if built else 'hits'] += 1
+        _payload_keys[payload_digest] = content_key
+        _evict_locked()
+
+    if not (max_width or max_height):
+        return original
+    profile = resolve_image_profile(profile or active_image_profile())
+    target_px = target_pixels(original.width, original.height, max_width, max_height,
+                              IMAGE_PROFILES[profile]['dpi'])
+    variant_key = (content_key, target_px[0], target_px[1], profile)
+    with _lock:
+        passthrough = variant_key in _passthrough
+    variant = None
+    if not passthrough:
+        variant, built = _build_once(variant_key,
+                                     lambda: _optimize(original, variant_key, max_width, max_height, profile))
+        if built:
+            with _lock:
+                _stats['optimized'] += 1
+    variant = variant or original
+    record_image(content_key, f"{content_key}:{target_px[0]}x{target_px[1]}:{profile}",
+                 original.original_bytes, len(variant.data))
+    return variant
+
+
+def _optimize(original: ImageAsset, variant_key: Tuple[str, int, int, str], max_width: Optional[float],
+              max_height: Optional[float], profile: str) -> Optional[ImageAsset]:
+    """Optimierte Variante; None (und Vermerk in _passthrough), wenn das Original verwendet werden soll."""
+    try:
+        optimized = optimize_image(original.data, max_width, max_height, profile)
+        if optimized is not None:
+            reader, width, height, pixel_bytes = _make_reader(io.BytesIO(optimized.data))
+    except Exception as e:
+        print(f"pdf_asset_cache: Bildoptimierung fehlgeschlagen, nutze Original: {e}")
+        optimized = None
+    if optimized is None:
+        with _lock:
+            _passthrough[variant_key] = True
+        return None
+    return ImageAsset(original.key, optimized.data, reader, width, height,
+                      len(optimized.data) + pixel_bytes, original.original_bytes)
+
+
+def get_image_reader(payload: ImagePayload, max_width: Optional[float] = None,
+                     max_height: Optional[float] = None, profile: Optional[str] = None) -> Optional[Any]:
+    asset = get_image_asset(payload, max_width, max_height, profile)
+    return asset.reader if asset is not None else None
+
+
+def get_optimized_image_bytes(payload: ImagePayload, max_width: Optional[float] = None,
+                              max_height: Optional[float] = None, profile: Optional[str] = None) -> Optional[bytes]:
+    """Kodierte Bild-Bytes der optimierten Variante, z.B. für PyMuPDF (page.insert_image(stream=...))."""
+    asset = get_image_asset(payload, max_width, max_height, profile)
+    return asset.data if asset is not None else None
+
+
+class CachedImage(Image):
+    """Platypus-Image aus den (bereits optimierten) Bytes eines gecachten Assets."""
+
+    def __init__(self, asset: ImageAsset, width: Optional[float] = None, height: Optional[float] = None,
+                 kind: str = 'direct', mask: str = 'auto', hAlign: str = 'CENTER'):
+        super().__init__(io.BytesIO(asset.data), width=width, height=height, kind=kind, mask=mask, hAlign=hAlign)
+
+
+def clear_asset_cache() -> int:
+    global _memory_bytes
+    with _lock:
+        removed = len(_assets)
+        _assets.clear()
+        _payload_keys.clear()
+        _passthrough.clear()
+        _memory_bytes = 0
+        return removed
+
+
+def get_asset_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats['entries'] = len(_assets)
+        stats['memory_bytes'] = _memory_bytes
+        stats['max_memory_bytes'] = _config['max_memory_bytes']
+        return stats
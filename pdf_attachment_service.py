@@ -0,0 +1,250 @@
+# pdf_attachment_service.py
+# -*- coding: utf-8 -*-
+"""
+Anhang-Service für Angebots-PDFs (Produktdatenblätter, Firmendokumente).
+
+Angehängte PDFs werden pro Prozess nur einmal gelesen und geparst: der PdfReader liegt in
+einem LRU-Cache (Schlüssel: Pfad, neu geladen bei geänderter mtime/Größe), seine bereits
+aufgelösten Objekte werden beim nächsten Angebot nur noch in den Writer kopiert. Innerhalb
+eines Angebots wird jeder Anhang anhand seines Inhalts-Hashes nur einmal übernommen, und das
+Ergebnis wird direkt in den Ziel-Stream bzw. die Zieldatei geschrieben.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple, Union
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    _PYPDF_AVAILABLE = True
+except ImportError:
+    PdfReader = PdfWriter = None  # type: ignore
+    _PYPDF_AVAILABLE = False
+
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_MAX_MEMORY_MB = 128
+
+PdfSource = Union[str, bytes, io.BytesIO]
+
+
+@dataclass
+class CachedAttachment:
+    path: str
+    signature: Tuple[int, int]
+    digest: str
+    size: int
+    reader: Any
+    # Ein PdfReader ist nicht threadsicher; Seiten werden unter diesem Lock in den Writer kopiert
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+_lock = threading.Lock()
+_cache: "OrderedDict[str, CachedAttachment]" = OrderedDict()
+_cache_bytes = 0
+_config: Dict[str, int] = {'max_entries': DEFAULT_MAX_ENTRIES,
+                           'max_memory_bytes': DEFAULT_MAX_MEMORY_MB * 1024 * 1024}
+_stats: Dict[str, float] = {'hits': 0, 'misses': 0, 'reloads': 0, 'evictions': 0,
+                            'duplicates_skipped': 0, 'load_seconds': 0.0}
+
+
+def configure_attachment_cache(max_entries: Optional[int] = None, max_memory_bytes: Optional[int] = None) -> None:
+    with _lock:
+        if max_entries is not None:
+            _config['max_entries'] = max(0, int(max_entries))
+        if max_memory_bytes is not None:
+            _config['max_memory_bytes'] = max(0, int(max_memory_bytes))
+        _evict_locked()
+
+
+def _evict_locked() -> None:
+    global _cache_bytes
+    while _cache and (len(_cache) > _config['max_entries'] or _cache_bytes > _config['max_memory_bytes']):
+        _, entry = _cache.popitem(last=False)
+        _cache_bytes -= entry.size
+        _stats['evictions'] += 1
+
+
+def load_attachment(path: str) -> Optional[CachedAttachment]:
+    """Geparster Anhang aus dem Cache; None, wenn die Datei fehlt oder kein lesbares PDF ist."""
+    global _cache_bytes
+    if not _PYPDF_AVAILABLE:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cache_key = os.path.realpath(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        entry = _cache.get(cache_key)
+        if entry is not None and entry.signature == signature:
+            _cache.move_to_end(cache_key)
+            _stats['hits'] += 1
+            return entry
+        if entry is not None:
+            _stats['reloads'] += 1
+            del _cache[cache_key]
+            _cache_bytes -= entry.size
+
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        reader = PdfReader(io.BytesIO(data))
+        # Seitenbaum einmal auflösen, damit spätere Angebote nur noch kopieren
+        len(reader.pages)
+    except Exception as e:
+        print(f"WARNUNG: PDF-Anhang '{path}' fehlerhaft: {e}")
+        return None
+    entry = CachedAttachment(cache_key, signature, hashlib.sha1(data).hexdigest(), len(data), reader)
+    with _lock:
+        _stats['misses'] += 1
+        _stats['load_seconds'] += time.perf_counter() - started
+        _cache[cache_key] = entry
+        _cache_bytes += entry.size
+        _evict_locked()
+    return entry
+
+
+def clear_attachment_cache() -> int:
+    global _cache_bytes
+    with _lock:
+        removed = len(_cache)
+        _cache.clear()
+        _cache_bytes = 0
+        return removed
+
+
+def get_attachment_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats['entries'] = len(_cache)
+        stats['memory_bytes'] = _cache_bytes
+        return stats
+
+
+def _reader_for_source(source: PdfSource) -> Tuple[Optional[Any], Optional[str], Optional[threading.Lock]]:
+    """(Reader, Inhalts-Hash, Lock) für Pfad, Bytes oder BytesIO; Pfade kommen aus dem Cache."""
+    if isinstance(source, str):
+        entry = load_attachment(source)
+        if entry is None:
+            return None, None, None
+        return entry.reader, entry.digest, entry.lock
+    if isinstance(source, io.BytesIO):
+        source = source.getvalue()
+    if isinstance(source, (bytes, bytearray)):
+        return PdfReader(io.BytesIO(source)), hashlib.sha1(source).hexdigest(), None
+    return None, None, None
+
+
+def write_merged_pdf(sources: List[PdfSource], output: Union[str, BinaryIO], deduplicate: bool = True) -> int:
+    """
+    Schreibt alle Quellen hintereinander nach output (Dateipfad oder binärer Stream) und gibt
+    die Seitenzahl zurück. Mit deduplicate werden identische Quellen (gleicher Inhalt) nur einmal
+    übernommen; fehlende oder defekte Anhänge werden übersprungen. Ein defektes Hauptdokument
+    (erste Quelle) löst dagegen eine Exception aus.
+    """
+    if not _PYPDF_AVAILABLE:
+        raise RuntimeError("PyPDF ist nicht verfügbar für das Zusammenführen von PDFs")
+    writer = PdfWriter()
+    seen: Set[str] = set()
+    for index, source in enumerate(sources):
+        try:
+            reader, digest, reader_lock = _reader_for_source(source)
+        except Exception as e:
+            if index == 0:
+                raise
+            print(f"WARNUNG: PDF-Anhang fehlerhaft: {e}")
+            continue
+        if reader is None:
+            continue
+        if deduplicate and digest in seen:
+            with _lock:
+                _stats['duplicates_skipped'] += 1
+            continue
+        seen.add(digest)
+        if reader_lock is not None:
+            with reader_lock:
+                for page in reader.pages:
+                    writer.add_page(page)
+        else:
+            for page in reader.pages:
+                writer.add_page(page)
+
+    page_count = len(writer.pages)
+    if isinstance(output, str):
+        tmp_path = f"{output}.tmp"
+        with open(tmp_path, 'wb') as f:
+            writer.write(f)
+        os.replace(tmp_path, output)
+    else:
+        writer.write(output)
+    return page_count
+
+
+def merge_pdf_sources(sources: List[PdfSource], deduplicate: bool = True) -> bytes:
+    """Wie write_merged_pdf, aber mit dem Ergebnis als Bytes."""
+    output = io.BytesIO()
+    write_merged_pdf(sources, output, deduplicate)
+    return output.getvalue()
+
+
+def append_attachments(main_pdf_bytes: bytes, attachment_paths: List[str]) -> bytes:
+    """Hängt Datenblätter/Firmendokumente an das Angebot an; bei Fehlern bleibt das Angebot unverändert."""
+    if not _PYPDF_AVAILABLE or not attachment_paths:
+        return main_pdf_bytes
+    try:
+        return merge_pdf_sources([main_pdf_bytes] + list(attachment_paths))
+    except Exception as e:
+        print(f"Fehler beim Zusammenfügen der PDFs: {e}")
+        return main_pdf_bytes
+
+
+def benchmark_attachment_merge(main_pdf_bytes: bytes, attachment_paths: List[str], runs: int = 5) -> Dict[str, float]:
+    """Vergleicht frisches Parsen je Angebot (bisheriger Weg) mit dem gecachten Anhang-Service."""
+    def _uncached() -> bytes:
+        writer = PdfWriter()
+        for page in PdfReader(io.BytesIO(main_pdf_bytes)).pages:
+            writer.add_page(page)
+        for path in attachment_paths:
+            for page in PdfReader(path).pages:
+                writer.add_page(page)
+        out = io.BytesIO()
+        writer.write(out)
+        return out.getvalue()
+
+    results: Dict[str, float] = {}
+    started = time.perf_counter()
+    for _ in range(runs):
+        uncached_size = len(_uncached())
+    results['uncached_ms'] = (time.perf_counter() - started) / runs * 1000
+    clear_attachment_cache()
+    merge_pdf_sources([main_pdf_bytes] + list(attachment_paths))
+    started = time.perf_counter()
+    for _ in range(runs):
+        cached_size = len(merge_pdf_sources([main_pdf_bytes] + list(attachment_paths)))
+    results['cached_ms'] = (time.perf_counter() - started) / runs * 1000
+    results['uncached_bytes'] = uncached_size
+    results['cached_bytes'] = cached_size
+    return results
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    sample_paths = sorted(
+        os.path.join(base_dir, "pdf_templates_static", name)
+        for name in os.listdir(os.path.join(base_dir, "pdf_templates_static")) if name.endswith(".pdf")
+    )[:6] + [os.path.join(base_dir, "input", "TOM-90.pdf"), os.path.join(base_dir, "input", "aktuellste.pdf")]
+    from reportlab.pdfgen import canvas
+    main_buffer = io.BytesIO()
+    main_canvas = canvas.Canvas(main_buffer)
+    for page_number in range(12):
+        main_canvas.drawString(72, 720, f"Angebot Seite {page_number + 1}")
+        main_canvas.showPage()
+    main_canvas.save()
+    print(benchmark_attachment_merge(main_buffer.getvalue(), sample_paths))
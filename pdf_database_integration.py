@@ -74,6 +74,14 @@ class EnhancedProductDataLoader:
             else:
                 product_data['has_datasheet'] = False
             
+            # Bilder liegen in der Bildablage (product_image_store); products.image_base64 nur noch als Altbestand
+            if not product_data.get('image_base64'):
+                try:
+                    from product_image_store import get_product_image_base64
+                    product_data['image_base64'] = get_product_image_base64(product_id)
+                except ImportError:
+                    pass
+
             # Zusätzliche Bildverarbeitung
             if product_data.get('image_base64'):
                 product_data['has_image'] = True
@@ -132,10 +140,15 @@ class EnhancedProductDataLoader:
             
             cursor.execute(query, params)
             products = []
+            try:
+                from product_image_store import product_ids_with_images
+                image_ids = product_ids_with_images(conn)
+            except (ImportError, sqlite3.Error):
+                image_ids = set()
             
             for row in cursor.fetchall():
                 product = dict(row)
-                product['has_image'] = bool(product.get('image_base64'))
+                product['has_image'] = bool(product.get('image_base64')) or product['id'] in image_ids
                 products.append(product)
             
             return products
@@ -0,0 +1,81 @@
+# pdf_draft_mode.py
+# -*- coding: utf-8 -*-
+"""
+Entwurfsmodus der Angebots-PDF für die Live-Vorschau.
+
+generate_offer_pdf baut mit inclusion_options['draft_mode'] nur einen Entwurf: keine Anhänge,
+Bilder im Profil "draft" (niedrige Auflösung, aus dem Asset-Cache), Platzhalter für Diagramme,
+die noch zum Rastern vorgemerkt sind, Abbruch nach inclusion_options['draft_max_pages']
+Seiten und keine Nachbearbeitung durch pdf_output_optimizer. Der finale Export bleibt davon
+unberührt.
+"""
+
+from typing import Any, Dict, Optional
+
+try:
+    from reportlab.lib import colors
+    from reportlab.platypus import Flowable, SimpleDocTemplate
+    _REPORTLAB_AVAILABLE = True
+except ImportError:
+    Flowable = SimpleDocTemplate = object  # type: ignore
+    _REPORTLAB_AVAILABLE = False
+
+DRAFT_IMAGE_PROFILE = 'draft'
+
+
+def draft_inclusion_options(inclusion_options: Optional[Dict[str, Any]], max_pages: Optional[int] = None) -> Dict[str, Any]:
+    """Kopie der Optionen für einen Vorschau-Entwurf (die Optionen des finalen Exports bleiben unverändert)."""
+    options = dict(inclusion_options or {})
+    options['draft_mode'] = True
+    options['draft_max_pages'] = max_pages
+    options['include_all_documents'] = False
+    return options
+
+
+class PageLimitDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate, das nach max_pages Seiten aufhört; ohne max_pages wie SimpleDocTemplate."""
+
+    def __init__(self, *args, max_pages: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_pages = max_pages
+        self.page_limit_reached = False
+
+    def afterPage(self):
+        if self.max_pages and self.page >= self.max_pages:
+            self.page_limit_reached = True
+
+    def clean_hanging(self):
+        # Nach der letzten gewünschten Seite keine neue (leere) Seite mehr beginnen
+        if not self.page_limit_reached:
+            super().clean_hanging()
+
+    def handle_flowable(self, flowables):
+        if self.page_limit_reached:
+            del flowables[:]
+            return
+        super().handle_flowable(flowables)
+
+
+class ChartPlaceholder(Flowable):
+    """Gestrichelter Platzhalter für ein noch nicht gerastertes Diagramm."""
+
+    def __init__(self, title: str, width: float, height: float):
+        Flowable.__init__(self)
+        self.title = title
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        self.width = min(self.width, availWidth)
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.saveState()
+        self.canv.setStrokeColor(colors.HexColor('#A0A0A0'))
+        self.canv.setFillColor(colors.HexColor('#F4F4F4'))
+        self.canv.setDash(4, 3)
+        self.canv.rect(0, 0, self.width, self.height, stroke=1, fill=1)
+        self.canv.setFillColor(colors.HexColor('#707070'))
+        self.canv.setFont('Helvetica-Oblique', 10)
+        self.canv.drawCentredString(self.width / 2, self.height / 2, f"{self.title} (Diagramm folgt im finalen PDF)")
+        self.canv.restoreState()
@@ -11,7 +11,6 @@ import os
 import io
 import plotly.graph_objects as go
 import pandas as pd
-import base64
 import io
 import math
 import traceback
@@ -22,6 +21,14 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Union, Callable
 from theming.pdf_styles import get_theme
 from theming.pdf_styles import create_modern_table_style
+from chart_cache import render_figure_cached
+from chart_export_queue import pending_chart_keys, rasterize_chart, rasterize_pending_charts
+from vector_charts import build_vector_chart, buildable_vector_chart_keys
+from pdf_asset_cache import CachedImage, get_image_asset
+from pdf_image_optimizer import ImageSavingsReport, image_optimization
+from pdf_attachment_service import append_attachments, merge_pdf_sources
+from pdf_output_optimizer import optimize_pdf_output
+from pdf_draft_mode import DRAFT_IMAGE_PROFILE, ChartPlaceholder, PageLimitDocTemplate
 
 # Optional PDF Templates import
 try:
@@ -429,35 +436,9 @@ class PDFGenerator:
         if not pdf_files:
             return b""
             
-        merger = PdfWriter()
-        
         try:
-            for pdf_file in pdf_files:
-                if isinstance(pdf_file, str):
-                    # Pfad zu PDF-Datei
-                    if os.path.exists(pdf_file):
-                        with open(pdf_file, 'rb') as f:
-                            reader = PdfReader(f)
-                            for page in reader.pages:
-                                merger.add_page(page)
-                elif isinstance(pdf_file, bytes):
-                    # PDF als Bytes
-                    reader = PdfReader(io.BytesIO(pdf_file))
-                    for page in reader.pages:
-                        merger.add_page(page)
-                elif isinstance(pdf_file, io.BytesIO):
-                    # PDF als BytesIO
-                    pdf_file.seek(0)  # Sicherstellung, dass wir am Anfang sind
-                    reader = PdfReader(pdf_file)
-                    for page in reader.pages:
-                        merger.add_page(page)
-                        
-            # Zusammengeführte PDF in BytesIO schreiben
-            output = io.BytesIO()
-            merger.write(output)
-            output.seek(0)
-            return output.getvalue()
-            
+            # Pfade kommen geparst aus dem Anhang-Cache (pdf_attachment_service)
+            return merge_pdf_sources(pdf_files, deduplicate=False)
         except Exception as e:
             # Fallback: Erste PDF zurückgeben wenn verfügbar
             if pdf_files:
@@ -605,12 +586,10 @@ class PDFGenerator:
         # Titel-Bild oder Standard-Titel
         if hasattr(self, 'selected_title_image_b64') and self.selected_title_image_b64:
             try:
-                import base64
-                import io
-                from reportlab.platypus import Image
-                image_data = base64.b64decode(self.selected_title_image_b64)
-                img = Image(io.BytesIO(image_data), width=15*cm, height=10*cm)
-                self.story.append(img)
+                title_asset = get_image_asset(self.selected_title_image_b64, 15*cm, 10*cm)
+                if title_asset is None:
+                    raise ValueError("Titelbild nicht lesbar")
+                self.story.append(CachedImage(title_asset, width=15*cm, height=10*cm))
             except Exception as e:
                 # Fallback zu Text-Titel
                 from reportlab.platypus import Paragraph, Spacer
@@ -850,20 +829,7 @@ class PDFGenerator:
 
     def _append_documents_to_pdf(self, main_pdf_bytes, document_paths_to_append):
         """Hängt externe PDFs an ein PDF in Bytes an."""
-        if not _PYPDF_AVAILABLE or not document_paths_to_append: 
-            return main_pdf_bytes
-        writer = PdfWriter()
-        try:
-            writer.append(io.BytesIO(main_pdf_bytes))
-            for doc_path in document_paths_to_append:
-                if os.path.exists(doc_path):
-                    writer.append(doc_path)
-            output_buffer = io.BytesIO()
-            writer.write(output_buffer)
-            return output_buffer.getvalue()
-        except Exception as e:
-            print(f"Fehler beim Zusammenfügen der PDFs: {e}")
-            return main_pdf_bytes
+        return append_attachments(main_pdf_bytes, document_paths_to_append)
         
     def _add_economics_section(self):
         """Fügt die Wirtschaftlichkeits-Analyse hinzu"""
@@ -1185,8 +1151,10 @@ class PDFGenerator:
     def _add_two_column_layout(self, content_left, content_right):
         if self.selected_title_image_b64:
             try:
-                image_data = base64.b64decode(self.selected_title_image_b64)
-                self.story.append(Image(io.BytesIO(image_data), width=21*cm, height=29.7*cm))
+                title_asset = get_image_asset(self.selected_title_image_b64, 21*cm, 29.7*cm)
+                if title_asset is None:
+                    raise ValueError("Titelbild nicht lesbar")
+                self.story.append(CachedImage(title_asset, width=21*cm, height=29.7*cm))
             except Exception as e:
                 self.story.append(Paragraph(f"[Fehler: Titelbild: {e}]", self.styles['ErrorText']))
         else:
@@ -1614,22 +1582,7 @@ def _draw_page_statics(canvas, doc, theme):
 
     def _append_documents_to_pdf(main_pdf_bytes, document_paths_to_append):
         """Hängt externe PDFs an ein PDF in Bytes an."""
-        if not _PYPDF_AVAILABLE or not document_paths_to_append: return main_pdf_bytes
-        writer = PdfWriter()
-        try:
-            writer.append(io.BytesIO(main_pdf_bytes))
-            for doc_path in document_paths_to_append:
-                if os.path.exists(doc_path):
-                    try:
-                        writer.append(doc_path)
-                    except Exception as e:
-                        print(f"WARNUNG: PDF-Anhang '{doc_path}' fehlerhaft: {e}")
-            output_buffer = io.BytesIO()
-            writer.write(output_buffer)
-            return output_buffer.getvalue()
-        except Exception as e:
-            print(f"Fehler beim Zusammenfügen der PDFs: {e}")
-            return main_pdf_bytes
+        return append_attachments(main_pdf_bytes, document_paths_to_append)
 
         
 class PageNumCanvas(canvas.Canvas):
@@ -1740,23 +1693,12 @@ def _update_styles_with_dynamic_colors(design_settings: Dict[str, str]):
 def _get_image_flowable(image_data_input: Optional[Union[str, bytes]], desired_width: float, texts: Dict[str, str], caption_text_key: Optional[str] = None, max_height: Optional[float] = None, align: str = 'CENTER') -> List[Any]:
     flowables: List[Any] = []
     if not _REPORTLAB_AVAILABLE: return flowables
-    img_data_bytes: Optional[bytes] = None
+    # Dekodierung und ImageReader kommen aus dem prozessweiten Asset-Cache (Schlüssel: Inhalts-Hash)
+    img_asset = get_image_asset(image_data_input, desired_width, max_height)
 
-    if isinstance(image_data_input, str) and image_data_input.strip().lower() not in ["", "none", "null", "nan"]:
+    if img_asset is not None:
         try:
-            if image_data_input.startswith('data:image'): image_data_input = image_data_input.split(',', 1)[1]
-            img_data_bytes = base64.b64decode(image_data_input)
-        except Exception: img_data_bytes = None 
-    elif isinstance(image_data_input, bytes): img_data_bytes = image_data_input
-    
-    if img_data_bytes:
-        try:
-            if not img_data_bytes: raise ValueError("Bilddaten sind leer nach Verarbeitung.")
-            img_file_like = io.BytesIO(img_data_bytes)
-            img_reader = ImageReader(img_file_like)
-            iw, ih = img_reader.getSize()
-            if iw <= 0 or ih <= 0: raise ValueError(f"Ungültige Bilddimensionen: w={iw}, h={ih}")
-            aspect = ih / float(iw) if iw > 0 else 1.0
+            aspect = img_asset.height / float(img_asset.width)
             img_h_calc = desired_width * aspect; img_w_final, img_h_final = desired_width, img_h_calc
             if max_height and img_h_calc > max_height: img_h_final = max_height; img_w_final = img_h_final / aspect if aspect > 0 else desired_width
             
@@ -1764,7 +1706,7 @@ def _get_image_flowable(image_data_input: Optional[Union[str, bytes]], desired_w
             if img_w_final <=0 or img_h_final <=0:
                 raise ValueError(f"Finale Bilddimensionen ungültig: w={img_w_final}, h={img_h_final}")
 
-            img = Image(io.BytesIO(img_data_bytes), width=img_w_final, height=img_h_final)
+            img = CachedImage(img_asset, width=img_w_final, height=img_h_final)
             img.hAlign = align.upper(); flowables.append(img)
             if caption_text_key:
                 caption_text = get_text(texts, caption_text_key, "")
@@ -1812,23 +1754,8 @@ def _draw_custom_content(c: canvas.Canvas, theme: Dict, content: Dict):
     c.showPage()
 
 def _append_documents_to_pdf(main_pdf_bytes, document_paths_to_append):
-    """Hängt externe PDFs an ein PDF in Bytes an."""
-    if not _PYPDF_AVAILABLE or not document_paths_to_append: return main_pdf_bytes
-    writer = PdfWriter()
-    try:
-        writer.append(io.BytesIO(main_pdf_bytes))
-        for doc_path in document_paths_to_append:
-            if os.path.exists(doc_path):
-                try:
-                    writer.append(doc_path)
-                except Exception as e:
-                    print(f"WARNUNG: PDF-Anhang '{doc_path}' fehlerhaft: {e}")
-        output_buffer = io.BytesIO()
-        writer.write(output_buffer)
-        return output_buffer.getvalue()
-    except Exception as e:
-        print(f"Fehler beim Zusammenfügen der PDFs: {e}")
-        return main_pdf_bytes
+    """Hängt externe PDFs an ein PDF in Bytes an (geparste Anhänge aus pdf_attachment_service)."""
+    return append_attachments(main_pdf_bytes, document_paths_to_append)
         # Mapping von Modul-Namen (aus der UI) zu den Zeichenfunktionen
 MODULE_MAP = {
     "deckblatt": _draw_cover_page,
@@ -1926,17 +1853,12 @@ def page_layout_handler(canvas_obj: canvas.Canvas, doc_template: SimpleDocTempla
     if company_logo_base64_ref and include_header_logo_ref:
         try:
             logo_width, logo_height = 3*cm, 2*cm  # Größe für Header-Logo
-            if not company_logo_base64_ref:
+            # Dieselbe Variante wie im Footer -> ein einziges Bild-XObject je Dokument
+            logo_asset = get_image_asset(company_logo_base64_ref, 3*cm, 2*cm)
+            if logo_asset is None:
                 raise ValueError("Kein gültiges Logo bereitgestellt.")
-            logo_bytes_header = base64.b64decode(company_logo_base64_ref.split(',',1)[1]) if ',' in company_logo_base64_ref and len(company_logo_base64_ref.split(',',1)) > 1 else base64.b64decode(company_logo_base64_ref)
-            img_reader_header = ImageReader(io.BytesIO(logo_bytes_header))
-            iw, ih = img_reader_header.getSize()
-            aspect = ih / float(iw) if iw > 0 else 1.0
-            
-            final_w_header, final_h_header = logo_width, logo_width * aspect
-            if final_h_header > logo_height:
-                final_h_header = logo_height
-                final_w_header = final_h_header / aspect if aspect > 0 else logo_width
+            img_reader_header = logo_asset.reader
+            final_w_header, final_h_header = logo_asset.fit_size(logo_width, logo_height)
             
             # Rechts oben positionieren
             logo_x = page_width_ref - margin_right_ref - final_w_header
@@ -1961,15 +1883,11 @@ def page_layout_handler(canvas_obj: canvas.Canvas, doc_template: SimpleDocTempla
             # Logik zum Zeichnen des Logos im Footer (wie zuvor)
             # _get_image_flowable ist für die Story, hier direkter Canvas-Draw:
             logo_width, logo_height = 1.8*cm, 1.0*cm # Zielgröße
-            logo_bytes_for_draw = base64.b64decode(company_logo_base64_ref.split(',',1)[1]) if ',' in company_logo_base64_ref and len(company_logo_base64_ref.split(',',1)) > 1 else base64.b64decode(company_logo_base64_ref)
-            img_reader_logo = ImageReader(io.BytesIO(logo_bytes_for_draw))
-            iw, ih = img_reader_logo.getSize()
-            aspect = ih / float(iw) if iw > 0 else 1.0
-            
-            final_w, final_h = logo_width, logo_width * aspect
-            if final_h > logo_height:
-                final_h = logo_height
-                final_w = final_h / aspect if aspect > 0 else logo_width
+            logo_asset = get_image_asset(company_logo_base64_ref, 3*cm, 2*cm)
+            if logo_asset is None:
+                raise ValueError("Kein gültiges Logo bereitgestellt.")
+            img_reader_logo = logo_asset.reader
+            final_w, final_h = logo_asset.fit_size(logo_width, logo_height)
             
             canvas_obj.drawImage(img_reader_logo, margin_left_ref, margin_bottom_ref * 0.30, 
                                  width=final_w, height=final_h, mask='auto', preserveAspectRatio=True)
@@ -2274,6 +2192,13 @@ def _add_product_details_to_story(
     product_image_flowables_prod: List[Any] = []
     if include_product_images:
         product_image_base64_prod = product_details.get('image_base64')
+        if not product_image_base64_prod and product_details.get('has_image'):
+            # Produktlisten enthalten nur 'has_image'; Original erst hier aus der Bildablage laden
+            try:
+                from product_db import get_product_image_base64 as _get_product_image_base64
+                product_image_base64_prod = _get_product_image_base64(product_details.get('id', product_id))
+            except ImportError:
+                product_image_base64_prod = None
         if product_image_base64_prod:
             img_w_prod = min(available_width * 0.30, 5*cm); img_h_max_prod = 5*cm
             product_image_flowables_prod = _get_image_flowable(product_image_base64_prod, img_w_prod, texts, None, img_h_max_prod, align='CENTER')
@@ -2295,6 +2220,49 @@ def _add_product_details_to_story(
 
 
 def generate_offer_pdf(
+    project_data: Dict, analysis_results: Dict, company_info: Dict,
+    company_logo_base64: Optional[str] = None,
+    selected_title_image_b64: Optional[str] = None,
+    selected_offer_title_text: str = "Ihr Angebot",
+    selected_cover_letter_text: str = "",
+    sections_to_include: Optional[List[str]] = None,
+    inclusion_options: Optional[Dict[str, Any]] = None,
+    load_admin_setting_func: Optional[Callable] = None,
+    save_admin_setting_func: Optional[Callable] = None,
+    list_products_func: Optional[Callable] = None,
+    get_product_by_id_func: Optional[Callable] = None,
+    db_list_company_documents_func: Optional[Callable] = None,
+    active_company_id: Optional[int] = None,
+    texts: Optional[Dict[str, str]] = None,
+    image_report: Optional[ImageSavingsReport] = None,
+    **kwargs
+) -> Optional[bytes]:
+    """
+    Angebots-PDF. Alle Bilder werden auf ihre Platzierungsgröße im Profil
+    inclusion_options['image_profile'] ("screen" ~150 dpi, "print" ~300 dpi) optimiert;
+    die Einsparung landet in image_report (falls übergeben) und im Log. Das fertige PDF wird
+    nach inclusion_options['output_profile'] ("draft", "email", "print") verkleinert.
+    Mit inclusion_options['draft_mode'] entsteht ein schneller Entwurf für die Live-Vorschau:
+    ohne Anhänge, Bilder im Profil "draft", Platzhalter für noch nicht gerasterte Diagramme,
+    Abbruch nach inclusion_options['draft_max_pages'] Seiten, keine neue Angebotsnummer.
+    """
+    draft_mode = bool((inclusion_options or {}).get("draft_mode"))
+    image_profile = DRAFT_IMAGE_PROFILE if draft_mode else (inclusion_options or {}).get("image_profile")
+    with image_optimization(image_profile, image_report) as report:
+        pdf_bytes = _generate_offer_pdf_impl(
+            project_data, analysis_results, company_info, company_logo_base64, selected_title_image_b64,
+            selected_offer_title_text, selected_cover_letter_text, sections_to_include, inclusion_options,
+            load_admin_setting_func, save_admin_setting_func, list_products_func, get_product_by_id_func,
+            db_list_company_documents_func, active_company_id, texts, **kwargs)
+    if report.images:
+        print(f"🖼️ PDF-Bilder optimiert: {report.summary()}")
+    # Entwürfe gehen ohne Nachbearbeitung in die Vorschau
+    if pdf_bytes and not draft_mode:
+        pdf_bytes, output_result = optimize_pdf_output(pdf_bytes, (inclusion_options or {}).get("output_profile"))
+        print(f"📦 PDF-Ausgabe optimiert: {output_result.summary()}")
+    return pdf_bytes
+
+def _generate_offer_pdf_impl(
     project_data: Dict, analysis_results: Dict, company_info: Dict, 
     company_logo_base64: Optional[str] = None,
     selected_title_image_b64: Optional[str] = None,
@@ -2325,6 +2293,19 @@ def generate_offer_pdf(
         inclusion_options = {}
     if not sections_to_include:
         sections_to_include = ["ProjectOverview", "TechnicalComponents", "CostDetails", "Economics", "SimulationDetails", "CO2Savings", "Visualizations", "FutureAspects"]
+
+    draft_mode = bool(inclusion_options.get("draft_mode"))
+    # Im Entwurf werden vorgemerkte Diagramme nicht gerastert, sondern als Platzhalter gezeigt
+    draft_pending_charts = set(pending_chart_keys(analysis_results)) if draft_mode else set()
+    if draft_mode:
+        # Die Vorschau verbraucht keine Angebotsnummer
+        save_admin_setting_func = lambda key, value: True
+
+    # Noch vorgemerkte Diagramme (Aufrufer ohne eigene Export-Stufe) hier nacheinander rastern;
+    # übersprungen werden nur Vektor-Diagramme, deren Drawing aus den Daten auch wirklich entsteht
+    if pending_chart_keys(analysis_results) and not draft_mode:
+        rasterize_pending_charts(analysis_results, max_workers=1,
+                                 skip_keys=buildable_vector_chart_keys(inclusion_options.get("vector_chart_keys"), analysis_results, texts))
         
     if not _REPORTLAB_AVAILABLE:
         if project_data and texts and company_info:
@@ -2464,9 +2445,10 @@ def generate_offer_pdf(
     include_custom_footer_opt = inclusion_options.get("include_custom_footer", True)  
     include_header_logo_opt = inclusion_options.get("include_header_logo", True)
 
-    doc = SimpleDocTemplate(main_offer_buffer, title=get_text(texts, "pdf_offer_title_doc_param", "Angebot: Photovoltaikanlage").format(offer_number=offer_number_final),
+    doc = PageLimitDocTemplate(main_offer_buffer, title=get_text(texts, "pdf_offer_title_doc_param", "Angebot: Photovoltaikanlage").format(offer_number=offer_number_final),
                             author=company_info.get("name", "SolarFirma"), pagesize=pagesizes.A4,
-                            leftMargin=2*cm, rightMargin=2*cm, topMargin=2.5*cm, bottomMargin=2.5*cm)
+                            leftMargin=2*cm, rightMargin=2*cm, topMargin=2.5*cm, bottomMargin=2.5*cm,
+                            max_pages=inclusion_options.get("draft_max_pages") if draft_mode else None)
 
     story: List[Any] = []
     
@@ -2769,7 +2751,19 @@ def generate_offer_pdf(
                     
                     # CO₂-Grafik einfügen, falls verfügbar
                     co2_chart_bytes = current_analysis_results_pdf.get('co2_savings_chart_bytes')
-                    if co2_chart_bytes:
+                    co2_vector_chart = None
+                    if 'co2_savings_chart_bytes' in inclusion_options.get("vector_chart_keys", []):
+                        co2_vector_chart = build_vector_chart('co2_savings_chart_bytes', current_analysis_results_pdf, texts, 16*cm, 10*cm)
+                        if co2_vector_chart is None and not co2_chart_bytes and not draft_mode:
+                            # Vektorgrafik gescheitert: das noch vorgemerkte Bild jetzt rastern
+                            co2_chart_bytes = rasterize_chart(current_analysis_results_pdf, 'co2_savings_chart_bytes')
+                    if co2_vector_chart is not None:
+                        story.append(co2_vector_chart)
+                        story.append(Spacer(1, 0.2 * cm))
+                    elif 'co2_savings_chart_bytes' in draft_pending_charts:
+                        story.append(ChartPlaceholder(get_text(texts, "pdf_chart_label_co2_realistic", "CO₂-Einsparung"), 16*cm, 10*cm))
+                        story.append(Spacer(1, 0.2 * cm))
+                    elif co2_chart_bytes:
                         try:
                             co2_img = ImageReader(io.BytesIO(co2_chart_bytes))
                             co2_image = Image(co2_img, width=16*cm, height=10*cm)
@@ -2817,12 +2811,29 @@ def generate_offer_pdf(
                     }
                     charts_added_count = 0
                     selected_charts_for_pdf_opt = inclusion_options.get("selected_charts_for_pdf", [])
+                    vector_chart_keys_opt = inclusion_options.get("vector_chart_keys", [])
                     
                     for chart_key, config in charts_config_for_pdf_generator.items():
                         if chart_key not in selected_charts_for_pdf_opt:
                             continue # Überspringe dieses Diagramm, wenn nicht vom Nutzer ausgewählt
 
+                        # Vektorgrafik direkt aus den Daten (ohne Kaleido); bei fehlenden Daten weiter mit dem Bild
+                        vector_chart = build_vector_chart(chart_key, current_analysis_results_pdf, texts, available_width_content * 0.9, 10*cm, show_title=False) if chart_key in vector_chart_keys_opt else None
+                        if vector_chart is not None:
+                            story.append(Paragraph(get_text(texts, config["title_key"], config["default_title"]), STYLES.get('ChartTitle')))
+                            story.append(vector_chart); story.append(Spacer(1, 0.7*cm)); charts_added_count += 1
+                            continue
+
+                        if chart_key in draft_pending_charts:
+                            chart_display_title = get_text(texts, config["title_key"], config["default_title"])
+                            story.append(Paragraph(chart_display_title, STYLES.get('ChartTitle')))
+                            story.append(ChartPlaceholder(chart_display_title, available_width_content * 0.9, 10*cm)); story.append(Spacer(1, 0.7*cm)); charts_added_count += 1
+                            continue
+
                         chart_image_bytes = current_analysis_results_pdf.get(chart_key)
+                        if not chart_image_bytes and chart_key in vector_chart_keys_opt and not draft_mode:
+                            # Vektorgrafik gescheitert: das noch vorgemerkte Bild jetzt rastern
+                            chart_image_bytes = rasterize_chart(current_analysis_results_pdf, chart_key)
                         if chart_image_bytes and isinstance(chart_image_bytes, bytes):
                             chart_display_title = get_text(texts, config["title_key"], config["default_title"])
                             story.append(Paragraph(chart_display_title, STYLES.get('ChartTitle')))
@@ -2994,8 +3005,8 @@ def generate_offer_pdf(
     if not main_pdf_bytes: 
         return None
     
-    # PDF-Anhänge nur wenn beide Bedingungen erfüllt sind
-    if not (include_all_documents_opt and _PYPDF_AVAILABLE):
+    # PDF-Anhänge nur wenn beide Bedingungen erfüllt sind (im Entwurf nie)
+    if draft_mode or not (include_all_documents_opt and _PYPDF_AVAILABLE):
         return main_pdf_bytes
 
     paths_to_append: List[str] = []
@@ -3066,33 +3077,8 @@ def generate_offer_pdf(
     if not paths_to_append: 
         return main_pdf_bytes
     
-    pdf_writer = PdfWriter()
-    try:
-        main_offer_reader = PdfReader(io.BytesIO(main_pdf_bytes))
-        for page in main_offer_reader.pages: 
-            pdf_writer.add_page(page)
-    except Exception as e_read_main:
-        return main_pdf_bytes 
-
-    successfully_appended = 0
-    for pdf_path in paths_to_append:
-        try:
-            datasheet_reader = PdfReader(pdf_path)
-            for page in datasheet_reader.pages: 
-                pdf_writer.add_page(page)
-            successfully_appended += 1
-        except Exception as e_append_ds:
-            pass  # Fehler beim Anhängen werden still behandelt
-    
-    final_buffer = io.BytesIO()
-    try:
-        pdf_writer.write(final_buffer)
-        final_pdf_bytes = final_buffer.getvalue()
-        return final_pdf_bytes
-    except Exception as e_write_final:
-        return main_pdf_bytes 
-    finally:
-        final_buffer.close()
+    # Datenblätter werden pro Prozess nur einmal geparst, gleiche Dokumente nur einmal angehängt
+    return append_attachments(main_pdf_bytes, paths_to_append)
 
 def merge_pdfs(pdf_files: List[Union[str, bytes, io.BytesIO]]) -> bytes:
     """
@@ -3110,35 +3096,9 @@ def merge_pdfs(pdf_files: List[Union[str, bytes, io.BytesIO]]) -> bytes:
     if not pdf_files:
         return b""
         
-    merger = PdfWriter()
-    
     try:
-        for pdf_file in pdf_files:
-            if isinstance(pdf_file, str):
-                # Pfad zu PDF-Datei
-                if os.path.exists(pdf_file):
-                    with open(pdf_file, 'rb') as f:
-                        reader = PdfReader(f)
-                        for page in reader.pages:
-                            merger.add_page(page)
-            elif isinstance(pdf_file, bytes):
-                # PDF als Bytes
-                reader = PdfReader(io.BytesIO(pdf_file))
-                for page in reader.pages:
-                    merger.add_page(page)
-            elif isinstance(pdf_file, io.BytesIO):
-                # PDF als BytesIO
-                pdf_file.seek(0)  # Sicherstellung, dass wir am Anfang sind
-                reader = PdfReader(pdf_file)
-                for page in reader.pages:
-                    merger.add_page(page)
-                    
-        # Zusammengeführte PDF in BytesIO schreiben
-        output = io.BytesIO()
-        merger.write(output)
-        output.seek(0)
-        return output.getvalue()
-        
+        # Pfade kommen geparst aus dem Anhang-Cache (pdf_attachment_service)
+        return merge_pdf_sources(pdf_files, deduplicate=False)
     except Exception as e:
         # Fallback: Erste PDF zurückgeben wenn verfügbar
         if pdf_files:
@@ -3312,9 +3272,9 @@ from typing import Dict, Any
 
 # HILFSFUNKTION (falls _export_plotly_fig_to_bytes nicht existiert, bitte diese einfügen)
 def _export_plotly_fig_to_bytes(fig, texts, format='png'):
-    """Exportiert eine Plotly-Figur in Bytes."""
+    """Exportiert eine Plotly-Figur in Bytes (über den Diagramm-Cache)."""
     try:
-        return fig.to_image(format=format)
+        return render_figure_cached(fig, format=format)
     except Exception as e:
         print(f"Fehler beim Exportieren der Plotly-Figur: {e}")
         return None
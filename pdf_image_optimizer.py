@@ -0,0 +1,177 @@
+# pdf_image_optimizer.py
+# -*- coding: utf-8 -*-
+"""
+Bildoptimierung für die PDF-Erzeugung.
+
+Bilder werden auf ihre Platzierungsgröße bei der Ziel-Auflösung des Profils verkleinert
+("screen" ~150 dpi für E-Mail/Bildschirm, "print" ~300 dpi für den Druck) und je nach Inhalt
+neu kodiert: Fotos als JPEG, Bilder mit Transparenz oder wenigen Farben (Logos, Diagramme,
+Screenshots) als optimiertes PNG. Gecacht werden die Ergebnisse in pdf_asset_cache
+(Schlüssel: Inhalts-Hash, Zielgröße, Profil). image_optimization() legt Profil und
+Einsparungsbericht für ein Angebot fest.
+"""
+
+import io
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    from PIL import Image as PILImage
+    _PIL_AVAILABLE = True
+except ImportError:
+    PILImage = None  # type: ignore
+    _PIL_AVAILABLE = False
+
+IMAGE_PROFILES: Dict[str, Dict[str, int]] = {
+    'screen': {'dpi': 150, 'jpeg_quality': 80},
+    'print': {'dpi': 300, 'jpeg_quality': 90},
+    # Entwurf für die Live-Vorschau (pdf_draft_mode), nicht für den Export
+    'draft': {'dpi': 96, 'jpeg_quality': 70},
+}
+DEFAULT_IMAGE_PROFILE = 'print'
+# Erst ab diesem Überschuss gegenüber der Zielauflösung wird verkleinert
+SCALE_THRESHOLD = 1.25
+PALETTE_MAX_COLORS = 256
+# Bis zu so vielen Farben gilt ein Bild als Grafik (Kantenglättung in Diagrammen), darüber als Foto
+GRAPHIC_MAX_COLORS = 4096
+
+
+@dataclass(frozen=True)
+class OptimizedImage:
+    data: bytes
+    format: str
+    width: int
+    height: int
+
+
+class ImageSavingsReport:
+    """
+    Einsparung der Bilder eines Angebots: jedes Quellbild zählt einmal mit seiner Originalgröße,
+    jede eingebettete Variante (Zielgröße/Profil) einmal mit ihrer optimierten Größe.
+    """
+
+    def __init__(self, profile: str = DEFAULT_IMAGE_PROFILE):
+        self.profile = profile
+        self.images: Dict[str, int] = {}
+        self.variants: Dict[str, int] = {}
+
+    def record(self, content_key: str, variant_key: str, original_bytes: int, optimized_bytes: int) -> None:
+        self.images[content_key] = int(original_bytes)
+        self.variants[variant_key] = int(optimized_bytes)
+
+    @property
+    def original_bytes(self) -> int:
+        return sum(self.images.values())
+
+    @property
+    def optimized_bytes(self) -> int:
+        return sum(self.variants.values())
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+
+    def summary(self) -> str:
+        return (f"{len(self.images)} Bild(er), Profil '{self.profile}': {self.original_bytes / 1024:.0f} KB -> "
+                f"{self.optimized_bytes / 1024:.0f} KB ({self.bytes_saved / 1024:.0f} KB gespart)")
+
+
+_active: "ContextVar[Optional[Tuple[str, Optional[ImageSavingsReport]]]]" = ContextVar("pdf_image_optimization", default=None)
+
+
+def resolve_image_profile(profile: Optional[str]) -> str:
+    return profile if profile in IMAGE_PROFILES else DEFAULT_IMAGE_PROFILE
+
+
+@contextmanager
+def image_optimization(profile: Optional[str] = None,
+                       report: Optional[ImageSavingsReport] = None) -> Iterator[ImageSavingsReport]:
+    """Profil und Einsparungsbericht für alle Bilder, die im Block (im selben Thread) platziert werden."""
+    profile = resolve_image_profile(profile)
+    if report is None:
+        report = ImageSavingsReport(profile)
+    report.profile = profile
+    token = _active.set((profile, report))
+    try:
+        yield report
+    finally:
+        _active.reset(token)
+
+
+def active_image_profile() -> str:
+    active = _active.get()
+    return active[0] if active else DEFAULT_IMAGE_PROFILE
+
+
+def record_image(content_key: str, variant_key: str, original_bytes: int, optimized_bytes: int) -> None:
+    active = _active.get()
+    if active and active[1] is not None:
+        active[1].record(content_key, variant_key, original_bytes, optimized_bytes)
+
+
+def target_pixels(width: int, height: int, max_width: Optional[float], max_height: Optional[float],
+                  dpi: int) -> Tuple[int, int]:
+    """Pixelgröße, die die Zielbox (pt) mit mindestens dpi abdeckt, auch bei verzerrtem Zeichnen."""
+    factors = []
+    if max_width:
+        factors.append(max_width / 72.0 * dpi / width)
+    if max_height:
+        factors.append(max_height / 72.0 * dpi / height)
+    factor = max(factors) if factors else 1.0
+    if factor * SCALE_THRESHOLD >= 1.0:
+        return width, height
+    return max(1, round(width * factor)), max(1, round(height * factor))
+
+
+def _has_alpha(image: "PILImage.Image") -> bool:
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        alpha = image.convert("RGBA").getchannel("A")
+        return alpha.getextrema()[0] < 255
+    return False
+
+
+def _encode(image: "PILImage.Image", settings: Dict[str, int]) -> Tuple[bytes, str]:
+    """JPEG für Fotos, PNG (bei wenigen Farben als Palette) für Transparenz und Grafiken."""
+    buffer = io.BytesIO()
+    if _has_alpha(image):
+        image.convert("RGBA").save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "PNG"
+    rgb = image.convert("RGB")
+    colors = rgb.getcolors(GRAPHIC_MAX_COLORS)
+    if colors is not None and len(colors) <= PALETTE_MAX_COLORS:
+        rgb.quantize(colors=len(colors)).save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "PNG"
+    if colors is not None:
+        rgb.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "PNG"
+    rgb.save(buffer, format="JPEG", quality=settings['jpeg_quality'], optimize=True)
+    return buffer.getvalue(), "JPEG"
+
+
+def optimize_image(data: bytes, max_width: Optional[float] = None, max_height: Optional[float] = None,
+                   profile: Optional[str] = None) -> Optional[OptimizedImage]:
+    """
+    Verkleinert und kodiert data für eine Box von max_width x max_height pt neu.
+    None, wenn das Original schon passt: JPEGs in Zielgröße werden nicht verlustbehaftet
+    nachkodiert, und ein unverkleinertes Ergebnis muss kleiner sein als das Original.
+    """
+    if not _PIL_AVAILABLE:
+        return None
+    settings = IMAGE_PROFILES[resolve_image_profile(profile)]
+    image = PILImage.open(io.BytesIO(data))
+    source_format = image.format
+    target = target_pixels(image.width, image.height, max_width, max_height, settings['dpi'])
+    scaled = target != image.size
+    if not scaled and source_format == "JPEG":
+        return None
+    image.load()
+    if scaled:
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+        image = image.resize(target, PILImage.LANCZOS)
+    encoded, encoded_format = _encode(image, settings)
+    if not scaled and len(encoded) >= len(data):
+        return None
+    return OptimizedImage(encoded, encoded_format, image.width, image.height)
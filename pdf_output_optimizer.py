@@ -0,0 +1,131 @@
+# pdf_output_optimizer.py
+# -*- coding: utf-8 -*-
+"""
+Nachbearbeitung fertiger Angebots-PDFs zur Verkleinerung der Ausgabedatei.
+
+Stufe 1 (pypdf, immer verfügbar): identische Objekte zusammenführen (z.B. dieselben
+Schriftdateien in mehreren angehängten Datenblättern), nicht referenzierte Objekte entfernen,
+Seiteninhalte mit Flate komprimieren.
+Stufe 2 (pikepdf, optional): alle übrigen unkomprimierten Streams komprimieren, Objekt- und
+Querverweis-Streams erzeugen, Flate-Streams neu komprimieren und für "Fast Web View" linearisieren.
+Schriften werden nicht nachträglich neu untergliedert: ReportLab bettet bereits Teilmengen
+ein, und bei Schriften fremder Anhänge ist das nicht gefahrlos möglich; doppelte
+Schriftprogramme entfallen aber durch die Objekt-Deduplizierung.
+
+Profile je Ausgabe: "draft" (keine Nachbearbeitung), "email" (maximal klein,
+linearisiert), "print" (klein, nicht linearisiert).
+"""
+
+import io
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    _PYPDF_AVAILABLE = True
+except ImportError:
+    _PYPDF_AVAILABLE = False
+
+try:
+    import pikepdf
+    _PIKEPDF_AVAILABLE = True
+except ImportError:
+    pikepdf = None  # type: ignore
+    _PIKEPDF_AVAILABLE = False
+
+OUTPUT_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Entwurf: schnellstmögliche Ausgabe, keine Nachbearbeitung
+    'draft': {'compress': False, 'deduplicate': False, 'compression_level': 1, 'object_streams': False,
+              'recompress': False, 'linearize': False},
+    'email': {'compress': True, 'deduplicate': True, 'compression_level': 9, 'object_streams': True,
+              'recompress': True, 'linearize': True},
+    'print': {'compress': True, 'deduplicate': True, 'compression_level': 9, 'object_streams': True,
+              'recompress': False, 'linearize': False},
+}
+DEFAULT_OUTPUT_PROFILE = 'print'
+
+
+@dataclass
+class OutputOptimizationResult:
+    profile: str
+    original_bytes: int
+    optimized_bytes: int = 0
+    seconds: float = 0.0
+    steps: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+
+    def summary(self) -> str:
+        text = (f"Profil '{self.profile}': {self.original_bytes / 1024:.0f} KB -> {self.optimized_bytes / 1024:.0f} KB "
+                f"in {self.seconds * 1000:.0f} ms ({', '.join(self.steps) or 'unverändert'})")
+        return f"{text}; Fehler: {self.error}" if self.error else text
+
+
+def resolve_output_profile(profile: Optional[str]) -> str:
+    return profile if profile in OUTPUT_PROFILES else DEFAULT_OUTPUT_PROFILE
+
+
+def _pypdf_stage(pdf_bytes: bytes, settings: Dict[str, Any], steps: List[str]) -> bytes:
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(pdf_bytes)))
+    if settings['deduplicate']:
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+        steps.append("Deduplizierung")
+    for page in writer.pages:
+        page.compress_content_streams(level=settings['compression_level'])
+    steps.append("Seiteninhalte komprimiert")
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _pikepdf_stage(pdf_bytes: bytes, settings: Dict[str, Any], steps: List[str]) -> bytes:
+    out = io.BytesIO()
+    with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        pdf.save(
+            out,
+            compress_streams=True,
+            object_stream_mode=(pikepdf.ObjectStreamMode.generate if settings['object_streams']
+                                else pikepdf.ObjectStreamMode.preserve),
+            recompress_flate=settings['recompress'],
+            linearize=settings['linearize'],
+        )
+    if settings['object_streams']:
+        steps.append("Objekt-Streams")
+    if settings['linearize']:
+        steps.append("linearisiert")
+    return out.getvalue()
+
+
+def optimize_pdf_output(pdf_bytes: bytes, profile: Optional[str] = None) -> Tuple[bytes, OutputOptimizationResult]:
+    """
+    Verkleinert ein fertiges PDF nach dem Ausgabeprofil. Liefert das Original zurück, wenn die
+    Nachbearbeitung fehlschlägt oder nichts bringt (ein linearisiertes Ergebnis wird für "email"
+    auch bei gleicher Größe übernommen).
+    """
+    profile = resolve_output_profile(profile)
+    settings = OUTPUT_PROFILES[profile]
+    result = OutputOptimizationResult(profile, len(pdf_bytes or b""))
+    if not pdf_bytes or not _PYPDF_AVAILABLE or not settings['compress']:
+        result.optimized_bytes = result.original_bytes
+        return pdf_bytes, result
+
+    started = time.perf_counter()
+    optimized = pdf_bytes
+    try:
+        optimized = _pypdf_stage(pdf_bytes, settings, result.steps)
+        if _PIKEPDF_AVAILABLE and (settings['object_streams'] or settings['linearize'] or settings['recompress']):
+            optimized = _pikepdf_stage(optimized, settings, result.steps)
+    except Exception as e:
+        result.error = str(e)
+        optimized = pdf_bytes
+    keep_linearized = settings['linearize'] and _PIKEPDF_AVAILABLE and len(optimized) <= len(pdf_bytes) * 1.02
+    if len(optimized) > len(pdf_bytes) and not keep_linearized:
+        optimized = pdf_bytes
+        result.steps.append("Original behalten")
+    result.optimized_bytes = len(optimized)
+    result.seconds = time.perf_counter() - started
+    return optimized, result
@@ -12,6 +12,9 @@ import io
 from datetime import datetime
 import time
 
+from chart_export_queue import pending_chart_keys
+from pdf_draft_mode import draft_inclusion_options
+
 
 try:
     from pdf_generator import generate_offer_pdf
@@ -59,16 +62,23 @@ class PDFPreviewEngine:
         company_info: Dict[str, Any],
         inclusion_options: Dict[str, Any],
         texts: Dict[str, str],
+        draft: bool = True,
+        max_pages: Optional[int] = None,
         **kwargs
     ) -> Optional[bytes]:
-        """Generiert ein Vorschau-PDF"""
+        """
+        Generiert ein Vorschau-PDF. Standardmäßig als Entwurf (pdf_draft_mode): ohne Anhänge,
+        mit Bildern in Vorschau-Auflösung und Diagramm-Platzhaltern, nur bis max_pages Seiten.
+        draft=False liefert das PDF in voller Qualität wie der finale Export.
+        """
         try:
             from pdf_generator import generate_offer_pdf
             
+            if draft:
+                inclusion_options = draft_inclusion_options(inclusion_options, max_pages)
+            
             # Cache-Key erstellen (vereinfacht, kann erweitert werden)
-            project_data = kwargs.get('project_data', {})
-            inclusion_options = kwargs.get('inclusion_options', {})
-            cache_key = self._create_cache_key(project_data, inclusion_options)
+            cache_key = self._create_cache_key(project_data or {}, inclusion_options or {})
             
             # Aus Cache laden wenn vorhanden
             if cache_key in self.cache:
@@ -84,8 +94,10 @@ class PDFPreviewEngine:
                 **kwargs
             )
             
-            # In Cache speichern
-            if pdf_bytes and len(self.cache) < self.max_cache_size:
+            # In Cache speichern; Entwürfe mit Diagramm-Platzhaltern nicht, sonst bliebe es nach dem
+            # Rastern der Diagramme bei den Platzhaltern
+            has_placeholders = draft and bool(pending_chart_keys(analysis_results))
+            if pdf_bytes and not has_placeholders and len(self.cache) < self.max_cache_size:
                 self.cache[cache_key] = pdf_bytes
             
             return pdf_bytes
@@ -101,7 +113,9 @@ class PDFPreviewEngine:
             project_data.get('customer_data', {}).get('last_name', ''),
             str(project_data.get('project_details', {}).get('module_quantity', 0)),
             str(options.get('include_charts', True)),
-            str(options.get('include_all_documents', True))
+            str(options.get('include_all_documents', True)),
+            str(options.get('draft_mode', False)),
+            str(options.get('draft_max_pages'))
         ]
         return "_".join(key_parts)
     
@@ -193,7 +207,8 @@ def render_pdf_preview_interface(
                 "sections_to_include": st.session_state.get('pdf_selected_main_sections', ["ProjectOverview", "TechnicalComponents", "CostDetails"])
             }
 
-            # PDF über die Engine generieren
+            # PDF über die Engine generieren (Entwurf; in der Schnellansicht nur die gezeigten Seiten)
+            pdf_generation_params["max_pages"] = 3 if preview_mode == "Schnell (erste 3 Seiten)" else None
             pdf_bytes = engine.generate_preview_pdf(**pdf_generation_params)
             
             if pdf_bytes:
@@ -304,7 +319,8 @@ def render_pdf_preview_interface(
                     list_products_func=list_products_func,
                     get_product_by_id_func=get_product_by_id_func,
                     db_list_company_documents_func=db_list_company_documents_func,
-                    active_company_id=active_company_id
+                    active_company_id=active_company_id,
+                    max_pages={"Schnellvorschau": 3, "Seitenweise": 20}.get(preview_mode)
                 )
                 
                 if pdf_bytes:
@@ -1,18 +1,121 @@
-# merger.py  (nur die Pfad-Definition und Schleife ändern)
-from pathlib import Path, PurePosixPath
+# merger.py
+# -*- coding: utf-8 -*-
+"""
+Legt die Overlay-Seiten (dynamische Inhalte) über die statischen Hintergrundseiten aus bg_pdf/.
+
+Die Hintergründe werden pro Prozess nur einmal geparst und als Form-XObject vorbereitet
+(Cache-Schlüssel: Pfad + mtime + Größe). Jede Ausgabeseite zeichnet Hintergrund und Overlay
+per "Do", sodass der Hintergrundinhalt nur einmal im Dokument steht und nicht bei jedem
+Aufruf neu eingelesen und mit der Overlay-Seite verschmolzen werden muss.
+"""
+from pathlib import Path
 import io
-from pypdf import PdfReader, PdfWriter
+import threading
+from typing import Dict, List, Optional, Tuple
 
-BG = Path(__file__).parent / "bg_pdf"      # << NEU
+from pypdf import PdfReader, PdfWriter, PageObject
+from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject,
+                           RectangleObject, StreamObject)
 
-def merge_first_six_pages(overlay_bytes: bytes) -> bytes:
-    writer = PdfWriter()
+BG = Path(__file__).parent / "bg_pdf"
+BG_PATTERN = "nt_*.pdf"
+
+_BG_XOBJECT_NAME = NameObject("/TplBg")
+_OVERLAY_XOBJECT_NAME = NameObject("/TplOv")
+
+_background_cache: Dict[str, Tuple[Tuple[int, int], StreamObject, RectangleObject]] = {}
+_background_cache_lock = threading.Lock()
+
+
+def template_background_paths(bg_dir: Optional[Path] = None) -> List[Path]:
+    """Alle Hintergrundseiten (nt_01.pdf, nt_02.pdf, ...) in Seitenreihenfolge."""
+    return sorted(Path(bg_dir or BG).glob(BG_PATTERN))
+
+
+def _page_as_form_xobject(page: PageObject) -> StreamObject:
+    """Wandelt eine Seite in ein wiederverwendbares Form-XObject (Inhalt + Ressourcen) um."""
+    form = DecodedStreamObject()
+    contents = page.get_contents()
+    form.set_data(contents.get_data() if contents is not None else b"")
+    form.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Form"),
+        NameObject("/BBox"): ArrayObject(page.mediabox),
+        NameObject("/Resources"): page.get("/Resources", DictionaryObject()),
+    })
+    encoded = form.flate_encode()
+    # Ohne eigene Referenz legt clone(writer) die Kopie als neues indirektes Objekt im Writer an
+    encoded.indirect_reference = None
+    return encoded
+
+
+def _clone_form(form: StreamObject, writer: PdfWriter, lock: Optional[threading.Lock] = None) -> IndirectObject:
+    """Kopiert das Form-XObject samt Ressourcen in den Writer und liefert seine Referenz."""
+    if lock is None:
+        return form.clone(writer).indirect_reference
+    with lock:
+        return form.clone(writer).indirect_reference
+
+
+def _load_background(path: Path) -> Tuple[StreamObject, RectangleObject]:
+    """Geparste Hintergrundseite als Form-XObject; neu geladen nur, wenn sich die Datei geändert hat."""
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cache_key = str(path.resolve())
+    with _background_cache_lock:
+        cached = _background_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            return cached[1], cached[2]
+        page = PdfReader(str(path)).pages[0]
+        form = _page_as_form_xobject(page)
+        mediabox = RectangleObject(page.mediabox)
+        _background_cache[cache_key] = (signature, form, mediabox)
+        return form, mediabox
+
+
+def clear_background_cache() -> None:
+    with _background_cache_lock:
+        _background_cache.clear()
+
+
+def merge_template_pages(overlay_bytes: bytes, page_count: Optional[int] = None,
+                         bg_dir: Optional[Path] = None) -> bytes:
+    """
+    Legt jede Overlay-Seite über die gleichnamige Hintergrundseite (Overlay-Seite i -> nt_0i.pdf).
+    page_count begrenzt die Seitenzahl; ohne Angabe werden alle Overlay-Seiten übernommen, für die
+    ein Hintergrund existiert. Fehlt ein Hintergrund, bleibt die Overlay-Seite unverändert.
+    """
     ovl = PdfReader(io.BytesIO(overlay_bytes))
+    backgrounds = template_background_paths(bg_dir)
+    if page_count is None:
+        page_count = len(backgrounds)
+    page_count = min(page_count, len(ovl.pages))
 
-    for i in range(1, 7):
-        base = PdfReader(BG / f"nt_{i:02d}.pdf").pages[0]
-        base.merge_page(ovl.pages[i-1])    # Overlay drüber
-        writer.add_page(base)
+    writer = PdfWriter()
+    for i in range(page_count):
+        overlay_page = ovl.pages[i]
+        if i >= len(backgrounds):
+            writer.add_page(overlay_page)
+            continue
+        bg_form, mediabox = _load_background(backgrounds[i])
+        page = PageObject.create_blank_page(width=mediabox.width, height=mediabox.height)
+        page.mediabox = RectangleObject(mediabox)
+        xobjects = DictionaryObject({
+            # Kopie im Writer; gleiche Objekte des gecachten Readers werden pro Dokument nur einmal übernommen.
+            # Der Hintergrund verweist auf den gecachten, von allen Threads geteilten Reader und wird daher
+            # nur unter dem Cache-Lock kopiert.
+            _BG_XOBJECT_NAME: _clone_form(bg_form, writer, _background_cache_lock),
+            _OVERLAY_XOBJECT_NAME: _clone_form(_page_as_form_xobject(overlay_page), writer),
+        })
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/XObject"): xobjects})
+        content = DecodedStreamObject()
+        content.set_data(b"q /TplBg Do Q q /TplOv Do Q")
+        page.replace_contents(content)
+        writer.add_page(page)
 
     out = io.BytesIO(); writer.write(out)
     return out.getvalue()
+
+
+def merge_first_six_pages(overlay_bytes: bytes) -> bytes:
+    return merge_template_pages(overlay_bytes, page_count=6)
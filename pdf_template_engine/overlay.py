@@ -0,0 +1,75 @@
+# pdf_template_engine/overlay.py
+# -*- coding: utf-8 -*-
+"""
+Overlay-Renderer für die Angebotsvorlage: zeichnet alle Texte aller Seiten in einem Durchgang
+auf einen ReportLab-Canvas im Speicher. Positionen, Schriften und Muster kommen aus der
+kompilierten Platzhalter-Karte (placeholders.compile_placeholder_map); merger.py legt das
+Ergebnis über die textfreien Hintergründe.
+"""
+
+import io
+import string
+from pathlib import Path
+from typing import Dict, Optional
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from .merger import merge_template_pages
+from .placeholders import TemplateSlot, compile_placeholder_map
+
+_formatter = string.Formatter()
+
+
+def _slot_text(slot: TemplateSlot, values: Dict[str, str]) -> str:
+    """Text für den Slot; leer, wenn ein Wert des Musters fehlt (kein halbes 'Verbrauch  Cent')."""
+    if not slot.pattern:
+        return slot.text
+    parts = []
+    for literal, field_name, _, _ in _formatter.parse(slot.pattern):
+        parts.append(literal)
+        if field_name is not None:
+            value = values.get(field_name)
+            if value in (None, ""):
+                return ""
+            parts.append(str(value))
+    return "".join(parts)
+
+
+def _draw_slot(c: "canvas.Canvas", slot: TemplateSlot, text: str) -> None:
+    c.setFont(slot.font, slot.size)
+    if slot.rotation:
+        c.saveState()
+        c.translate(slot.x, slot.y)
+        c.rotate(slot.rotation)
+        c.drawString(0, 0, text)
+        c.restoreState()
+    elif slot.align == "right":
+        c.drawRightString(slot.x, slot.y, text)
+    elif slot.align == "center":
+        c.drawCentredString(slot.x, slot.y, text)
+    else:
+        c.drawString(slot.x, slot.y, text)
+
+
+def generate_overlay(values: Dict[str, str], page_count: Optional[int] = None,
+                     src_dir: Optional[Path] = None) -> bytes:
+    """Overlay-PDF (eine Seite je Vorlagenseite) mit allen statischen und dynamischen Texten."""
+    slot_map = compile_placeholder_map(src_dir)
+    pages = sorted(slot_map)[:page_count] if page_count else sorted(slot_map)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for page in pages:
+        for slot in slot_map[page]:
+            text = _slot_text(slot, values)
+            if text:
+                _draw_slot(c, slot, text)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def render_template_offer(values: Dict[str, str], page_count: Optional[int] = None,
+                          src_dir: Optional[Path] = None, bg_dir: Optional[Path] = None) -> bytes:
+    """Fertiges Angebots-PDF aus der Vorlage: Overlay rendern und über die Hintergründe legen."""
+    return merge_template_pages(generate_overlay(values, page_count, src_dir), page_count, bg_dir)
@@ -0,0 +1,341 @@
+# pdf_template_engine/placeholders.py
+# -*- coding: utf-8 -*-
+"""
+Kompilierte Platzhalter-Karte für die sechsseitige Angebotsvorlage.
+
+Die Original-Vorlagen in pdf_templates_static/ (01.pdf ... 06.pdf) enthalten jeden Text mit
+Position, Schrift und Größe; die Hintergründe in bg_pdf/ sind textfrei. compile_placeholder_map
+liest die Textläufe einmal aus den Vorlagen und erzeugt je Seite eine Liste von Slots
+(Slot-ID -> Seite, Position, Schrift, Größe, Ausrichtung, Drehung, Text). Statische Slots
+behalten den Vorlagentext, dynamische Slots (PLACEHOLDER_MAPPING) bekommen ein Format-Muster
+mit Werten aus build_template_values. Die Karte wird pro Prozess nur einmal kompiliert und
+erst bei geänderten Vorlagen neu erstellt.
+"""
+
+import math
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader
+    _PYPDF_AVAILABLE = True
+except ImportError:
+    _PYPDF_AVAILABLE = False
+
+try:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    _REPORTLAB_AVAILABLE = True
+except ImportError:
+    _REPORTLAB_AVAILABLE = False
+
+TEMPLATE_SRC = Path(__file__).parent.parent / "pdf_templates_static"
+TEMPLATE_PATTERN = "[0-9][0-9].pdf"
+FONT_DIR = Path(__file__).parent / "fonts"
+
+# Vorlagen-Schriften; ohne Roboto-TTF unter fonts/ wird auf die Standardschriften ausgewichen
+FONT_FALLBACKS = {
+    "Roboto-Regular": "Helvetica",
+    "Roboto-Medium": "Helvetica-Bold",
+    "Roboto-Bold": "Helvetica-Bold",
+}
+
+# Dynamische Slots: Slot-ID -> Format-Muster mit Schlüsseln aus build_template_values.
+# Slot-IDs: p<Seite>_<Text-Slug>, bei Wiederholung auf derselben Seite mit _2, _3, ...
+PLACEHOLDER_MAPPING: Dict[str, str] = {
+    # Seite 1: Zusammenfassung
+    "p1_36_958_00_eur": "{savings_with_battery_eur} EUR*",
+    "p1_29_150_00_eur": "{savings_without_battery_eur} EUR*",
+    "p1_30": "{roof_tilt}",
+    "p1_w_rmepumpe": "{heating_type}",
+    "p1_elektrischer_boiler": "{hot_water_type}",
+    "p1_6_000_kwh_jahr": "{annual_consumption_kwh} kWh/Jahr",
+    "p1_8_4_kwp": "{system_kwp} kWp",
+    "p1_6_1_kwh": "{storage_kwh} kWh",
+    "p1_8_251_92_kwh_jahr": "{annual_production_kwh_precise} kWh/Jahr",
+    "p1_qwe_qe": "{customer_name}",
+    "p1_auf_den_w_rden_23": "{customer_street}",
+    "p1_22359_hamburg": "{customer_zip_city}",
+    "p1_0155555555": "{customer_phone}",
+    "p1_oemertimur_gmail_com": "{customer_email}",
+    "p1_tommatech_gmbh": "{company_name}",
+    "p1_zeppelinstra_e_14": "{company_street}",
+    "p1_85748_garching_b_m_nchen": "{company_zip_city}",
+    "p1_49_89_1250_36_860": "{company_phone}",
+    "p1_mail_tommatech_de": "{company_email}",
+    "p1_54": "{autarky_percent}%",
+    "p1_42": "{self_consumption_percent}%",
+    # Seite 2: Eigenverbrauch und Unabhängigkeit
+    "p2_8_251_kwh": "{annual_production_kwh} kWh",
+    "p2_1_562_kwh": "{battery_charge_kwh} kWh",
+    "p2_1_945_kwh": "{direct_consumption_kwh} kWh",
+    "p2_4_745_kwh": "{feed_in_kwh} kWh",
+    "p2_42": "{self_consumption_percent}%",
+    "p2_1_945_kwh_2": "{direct_consumption_kwh} kWh",
+    "p2_1_313_kwh": "{battery_discharge_kwh} kWh",
+    "p2_6_000_kwh": "{annual_consumption_kwh} kWh",
+    "p2_2_742_kwh": "{grid_purchase_kwh} kWh",
+    "p2_54": "{autarky_percent}%",
+    # Seite 3: Wirtschaftlichkeit
+    "p3_36_958": "{savings_with_battery_eur_short}",
+    "p3_29_150": "{savings_without_battery_eur_short}",
+    "p3_12_7": "{irr_without_battery_percent}%",
+    "p3_9_7": "{irr_with_battery_percent}%",
+    "p3_8_9_cent": "{lcoe_without_battery_cent} Cent",
+    "p3_13_5_cent": "{lcoe_with_battery_cent} Cent",
+    "p3_verbrauch_32_cent": "Verbrauch {electricity_price_cent} Cent",
+    "p3_20_jahre": "{simulation_years} Jahre",
+    "p3_5_00_j_hrlich": "{price_increase_percent} % jährlich",
+    # Seite 4: Komponenten
+    "p4_tommatech": "{module_manufacturer}",
+    "p4_tt420_108tnfb10": "{module_model}",
+    "p4_420_wp": "{module_power_wp} Wp",
+    "p4_15_jahre": "{module_warranty_years} Jahre",
+    "p4_30_jahre_87_40": "{module_performance_warranty}",
+    "p4_tommatech_2": "{inverter_manufacturer}",
+    "p4_98": "{inverter_efficiency_percent}%",
+    "p4_10_jahre": "{inverter_warranty_years} Jahre",
+    "p4_tommatech_3": "{storage_manufacturer}",
+    "p4_6_0_kwh_lifepo4_lithium_batterie": "{storage_model}",
+    "p4_6_1_kwh": "{storage_kwh} kWh",
+    "p4_5_1_kw": "{storage_power_kw} kW",
+    "p4_90": "{storage_dod_percent}%",
+    "p4_6000_cycles": "{storage_cycles} cycles",
+    # Seite 5: CO2-Bilanz
+    "p5_15_266_km": "{co2_car_km} km",
+    "p5_fahren_sie_mit_ihrem_auto_15_266_km_um_die_welt": "fahren Sie mit Ihrem Auto {co2_car_km} km um die Welt",
+    "p5_38": "{co2_reduction_percent}%",
+    "p5_fu_abdruck_um_38": "-Fußabdruck um {co2_reduction_percent}%",
+    "p5_244": "{co2_trees}",
+    "p5_wie_244_b_ume_pro_jahr_aufnehmen": ", wie {co2_trees} Bäume pro Jahr aufnehmen",
+    "p5_ersparnis_von_3_053_21_kg": "-Ersparnis von {co2_savings_kg} kg...",
+    # Seite 6: Kontakt
+    "p6_mail_tommatech_de": "{company_email}",
+    "p6_49_89_1250_36_860": "{company_phone}",
+}
+
+# Fußzeile aller Seiten
+for _page in range(1, 7):
+    PLACEHOLDER_MAPPING[f"p{_page}_29_11_2024"] = "{offer_date}"
+
+# Ausrichtung relativ zum Vorlagentext: 'right' hält die rechte Kante, 'center' die Mitte
+SLOT_ALIGNMENT: Dict[str, str] = {
+    "p1_54": "center", "p1_42": "center",
+    "p2_42": "center", "p2_54": "center",
+    "p3_36_958": "center", "p3_29_150": "center",
+    "p3_12_7": "right", "p3_9_7": "right", "p3_8_9_cent": "right", "p3_13_5_cent": "right",
+    "p3_standard_de": "right", "p3_verbrauch_32_cent": "right", "p3_20_jahre": "right", "p3_1": "right",
+    "p3_1_invest_p_a": "right", "p3_1_invest_p_a_2": "right", "p3_5_00_j_hrlich": "right",
+}
+
+
+@dataclass(frozen=True)
+class TemplateSlot:
+    slot_id: str
+    page: int
+    x: float
+    y: float
+    font: str
+    size: float
+    align: str
+    rotation: float
+    text: str
+    pattern: Optional[str] = None
+
+
+_compiled_lock = threading.Lock()
+_compiled: Optional[Tuple[Tuple, Dict[int, List[TemplateSlot]]]] = None
+
+
+def template_source_paths(src_dir: Optional[Path] = None) -> List[Path]:
+    return sorted(Path(src_dir or TEMPLATE_SRC).glob(TEMPLATE_PATTERN))
+
+
+def _slug(text: str) -> str:
+    # wie utils/export_coords.py
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:60]
+
+
+def resolve_font(template_font: str) -> str:
+    """Registriert Roboto aus fonts/ (falls vorhanden) und liefert sonst die Ersatzschrift."""
+    name = template_font.lstrip("/").split("+")[-1]
+    if not _REPORTLAB_AVAILABLE:
+        return FONT_FALLBACKS.get(name, "Helvetica")
+    if name in pdfmetrics.getRegisteredFontNames():
+        return name
+    ttf_path = FONT_DIR / f"{name}.ttf"
+    if ttf_path.exists():
+        try:
+            pdfmetrics.registerFont(TTFont(name, str(ttf_path)))
+            return name
+        except Exception as e:
+            print(f"placeholders: Schrift {ttf_path} konnte nicht geladen werden: {e}")
+    return FONT_FALLBACKS.get(name, "Helvetica")
+
+
+def _extract_page_slots(path: Path, page_number: int) -> List[TemplateSlot]:
+    page = PdfReader(str(path)).pages[0]
+    runs: List[Tuple[str, float, float, str, float, float]] = []
+
+    def _visit(text, cm, tm, font_dict, font_size):
+        text = (text or "").strip()
+        if not text:
+            return
+        # Gesamtmatrix = Tm x CTM
+        a = tm[0] * cm[0] + tm[1] * cm[2]
+        b = tm[0] * cm[1] + tm[1] * cm[3]
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        scale = math.hypot(a, b)
+        font = str(font_dict.get("/BaseFont", "Helvetica")) if font_dict else "Helvetica"
+        runs.append((text, x, y, font, font_size * scale, math.degrees(math.atan2(b, a))))
+
+    page.extract_text(visitor_text=_visit)
+
+    slots: List[TemplateSlot] = []
+    seen: Dict[str, int] = {}
+    for text, x, y, template_font, size, rotation in runs:
+        if size <= 0:
+            continue
+        base_id = f"p{page_number}_{_slug(text) or 'sym'}"
+        seen[base_id] = seen.get(base_id, 0) + 1
+        slot_id = base_id if seen[base_id] == 1 else f"{base_id}_{seen[base_id]}"
+        font = resolve_font(template_font)
+        align = SLOT_ALIGNMENT.get(slot_id, "left")
+        if align != "left" and _REPORTLAB_AVAILABLE:
+            width = pdfmetrics.stringWidth(text, font, size)
+            x += width if align == "right" else width / 2.0
+        slots.append(TemplateSlot(slot_id, page_number, round(x, 2), round(y, 2), font, round(size, 2), align,
+                                  round(rotation, 2), text, PLACEHOLDER_MAPPING.get(slot_id)))
+    return slots
+
+
+def compile_placeholder_map(src_dir: Optional[Path] = None) -> Dict[int, List[TemplateSlot]]:
+    """Seite -> Slots; einmal pro Prozess kompiliert, neu bei geänderten Vorlagen (mtime/Größe)."""
+    global _compiled
+    if not _PYPDF_AVAILABLE:
+        raise ImportError("pypdf wird für die Platzhalter-Karte benötigt.")
+    paths = template_source_paths(src_dir)
+    signature = tuple((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in paths)
+    with _compiled_lock:
+        if _compiled is not None and _compiled[0] == signature:
+            return _compiled[1]
+        compiled = {int(p.stem): _extract_page_slots(p, int(p.stem)) for p in paths}
+        _compiled = (signature, compiled)
+        return compiled
+
+
+def clear_placeholder_cache() -> None:
+    global _compiled
+    with _compiled_lock:
+        _compiled = None
+
+
+def _fmt(value: Any, decimals: int = 0) -> str:
+    """Deutsche Zahlendarstellung (1.234,56); leer für fehlende Werte."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return ""
+    return f"{value:,.{decimals}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _num(source: Dict[str, Any], key: str) -> Optional[float]:
+    value = source.get(key) if isinstance(source, dict) else None
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def build_template_values(project_data: Dict[str, Any], analysis_results: Dict[str, Any],
+                          company_info: Dict[str, Any], offer_date: Optional[str] = None,
+                          get_product_by_id_func=None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Werte für die Format-Muster aus PLACEHOLDER_MAPPING. Nicht berechenbare Werte bleiben leer
+    (z.B. die Vergleichswerte ohne Batteriespeicher); overrides ergänzt oder ersetzt Einträge.
+    """
+    from datetime import datetime
+
+    project_data = project_data or {}
+    results = analysis_results or {}
+    company = company_info or {}
+    customer = project_data.get("customer_data", {}) or {}
+    details = project_data.get("project_details", {}) or {}
+
+    production = _num(results, "annual_pv_production_kwh") or 0.0
+    consumption = _num(results, "total_consumption_kwh_yr") or 0.0
+    autarky = _num(results, "self_supply_rate_percent")
+    direct_pct = _num(results, "direktverbrauch_anteil_pv_produktion_pct") or 0.0
+    storage_pct = _num(results, "speichernutzung_anteil_pv_produktion_pct") or 0.0
+    direct_kwh = production * direct_pct / 100.0
+    battery_charge_kwh = production * storage_pct / 100.0
+    covered_kwh = consumption * (autarky or 0.0) / 100.0
+    cumulative = results.get("cumulative_cash_flows_sim") or []
+    savings = cumulative[-1] if cumulative and isinstance(cumulative[-1], (int, float)) else None
+    lcoe = _num(results, "lcoe_euro_per_kwh")
+    price = _num(results, "aktueller_strompreis_fuer_hochrechnung_euro_kwh")
+    co2_kg = _num(results, "annual_co2_savings_kg")
+    tilt = details.get("tilt_angle")
+
+    values: Dict[str, str] = {
+        "offer_date": offer_date or datetime.now().strftime("%d.%m.%Y"),
+        "customer_name": " ".join(filter(None, [customer.get("first_name"), customer.get("last_name")])),
+        "customer_street": " ".join(filter(None, [customer.get("address"), str(customer.get("house_number") or "")])),
+        "customer_zip_city": " ".join(filter(None, [str(customer.get("zip_code") or ""), customer.get("city")])),
+        "customer_phone": customer.get("phone_mobile") or customer.get("phone_landline") or customer.get("phone") or "",
+        "customer_email": customer.get("email") or "",
+        "company_name": company.get("name") or "",
+        "company_street": company.get("street") or "",
+        "company_zip_city": " ".join(filter(None, [str(company.get("zip_code") or ""), company.get("city")])),
+        "company_phone": company.get("phone") or "",
+        "company_email": company.get("email") or "",
+        "roof_tilt": f"{tilt}°" if tilt not in (None, "") else "",
+        "heating_type": details.get("heating_type") or "",
+        "hot_water_type": details.get("hot_water_type") or "",
+        "system_kwp": _fmt(_num(results, "anlage_kwp"), 1),
+        "storage_kwh": _fmt(_num(details, "selected_storage_storage_power_kw"), 1),
+        "annual_production_kwh": _fmt(production),
+        "annual_production_kwh_precise": _fmt(production, 2),
+        "annual_consumption_kwh": _fmt(consumption),
+        "autarky_percent": _fmt(autarky),
+        "self_consumption_percent": _fmt(direct_pct + storage_pct),
+        "direct_consumption_kwh": _fmt(direct_kwh),
+        "battery_charge_kwh": _fmt(battery_charge_kwh),
+        "battery_discharge_kwh": _fmt(max(0.0, covered_kwh - direct_kwh)),
+        "feed_in_kwh": _fmt(max(0.0, production - direct_kwh - battery_charge_kwh)),
+        "grid_purchase_kwh": _fmt(max(0.0, consumption - covered_kwh)),
+        "savings_with_battery_eur": _fmt(savings, 2),
+        "savings_with_battery_eur_short": _fmt(savings),
+        "savings_without_battery_eur": "",
+        "savings_without_battery_eur_short": "",
+        "irr_with_battery_percent": _fmt(_num(results, "irr_percent"), 1),
+        "irr_without_battery_percent": "",
+        "lcoe_with_battery_cent": _fmt(lcoe * 100.0 if lcoe is not None else None, 1),
+        "lcoe_without_battery_cent": "",
+        "electricity_price_cent": _fmt(price * 100.0 if price is not None else None),
+        "simulation_years": _fmt(_num(results, "simulation_period_years_effective")),
+        "price_increase_percent": _fmt(_num(results, "electricity_price_increase_rate_effective_percent"), 2),
+        "co2_savings_kg": _fmt(co2_kg, 2),
+        "co2_car_km": _fmt(_num(results, "co2_equivalent_car_km_per_year")),
+        "co2_trees": _fmt(_num(results, "co2_equivalent_trees_per_year")),
+        # 7,69 t CO2 pro Kopf und Jahr in Deutschland (Vorlagentext Seite 5)
+        "co2_reduction_percent": _fmt(co2_kg / 7690.0 * 100.0 if co2_kg is not None else None),
+    }
+
+    products: Dict[str, Dict[str, Any]] = {}
+    for prefix in ("module", "inverter", "storage"):
+        product_id = details.get(f"selected_{prefix}_id")
+        product = get_product_by_id_func(product_id) if callable(get_product_by_id_func) and product_id else None
+        products[prefix] = product or {}
+        values[f"{prefix}_manufacturer"] = products[prefix].get("brand") or ""
+        values[f"{prefix}_model"] = products[prefix].get("model_name") or ""
+        values[f"{prefix}_warranty_years"] = _fmt(_num(products[prefix], "warranty_years"))
+    values["module_power_wp"] = _fmt(_num(details, "selected_module_capacity_w"))
+    values["module_performance_warranty"] = ""
+    values["inverter_efficiency_percent"] = _fmt(_num(products["inverter"], "efficiency_percent"))
+    values["storage_power_kw"] = _fmt(_num(products["storage"], "power_kw"), 1)
+    values["storage_dod_percent"] = ""
+    values["storage_cycles"] = _fmt(_num(products["storage"], "max_cycles"))
+
+    if overrides:
+        values.update({k: "" if v is None else str(v) for k, v in overrides.items()})
+    return values
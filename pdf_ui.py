@@ -15,6 +15,9 @@ import json
 import pandas as pd
 from datetime import datetime
 
+from chart_export_queue import is_chart_available, pending_chart_keys, rasterize_pending_charts
+from vector_charts import buildable_vector_chart_keys, supports_vector_chart
+
 
 # --- Fallback-Funktionsreferenzen ---
 def _dummy_load_admin_setting_pdf_ui(key, default=None):
@@ -150,7 +153,24 @@ def _get_all_available_chart_keys(
 ) -> List[str]:
     if not analysis_results or not isinstance(analysis_results, dict):
         return []
-    return [k for k in chart_key_map.keys() if analysis_results.get(k) is not None]
+    return [k for k in chart_key_map.keys() if is_chart_available(analysis_results, k)]
+
+
+def _rasterize_pending_charts_with_progress(analysis_results: Dict[str, Any], skip_keys: Optional[List[str]] = None) -> None:
+    """Rastert die auf der Analyse-Seite vorgemerkten Diagramme vor der PDF-Erstellung (mit Fortschritt).
+    Diagramme in skip_keys werden im PDF als Vektorgrafik gezeichnet und brauchen kein Bild."""
+    total = len(set(pending_chart_keys(analysis_results)) - set(skip_keys or []))
+    if not total:
+        return
+    progress_bar = st.progress(0.0, text=f"Diagramme für das PDF werden erstellt (0/{total})...")
+
+    def _on_progress(done: int, total_charts: int, result_key: str) -> None:
+        progress_bar.progress(done / total_charts, text=f"Diagramme für das PDF werden erstellt ({done}/{total_charts})...")
+
+    export_stats = rasterize_pending_charts(analysis_results, progress_callback=_on_progress, skip_keys=skip_keys)
+    progress_bar.empty()
+    if export_stats["failed"]:
+        st.warning(f"{export_stats['failed']} von {export_stats['total']} Diagrammen konnten nicht exportiert werden (Kaleido?).")
 
 
 def _get_all_available_company_doc_ids(
@@ -530,7 +550,9 @@ def render_pdf_ui(
         # --- Nebeneinanderliegende Simulationen ---
         # (Ihre bestehende `chart_key_to_friendly_name_map` wird hier benötigt)
         all_available_chart_keys = (
-            list(analysis_results.keys()) if analysis_results else []
+            list(analysis_results.keys()) + pending_chart_keys(analysis_results)
+            if analysis_results
+            else []
         )
         chart_key_map = {
             k: k.replace("_chart_bytes", "").replace("_", " ").title()
@@ -589,6 +611,16 @@ def render_pdf_ui(
             )
             st.stop()
 
+        # Vorgemerkte Diagramme jetzt rastern, damit die *_chart_bytes vor generate_offer_pdf vorliegen
+        _rasterize_pending_charts_with_progress(
+            analysis_results,
+            skip_keys=buildable_vector_chart_keys(
+                st.session_state.get("pdf_inclusion_options", {}).get("vector_chart_keys"),
+                analysis_results,
+                texts,
+            ),
+        )
+
         # === BACKUP DER AKTUELLEN DATEN ===
         # Sicherung der Daten für persistente Nutzung
         st.session_state.pdf_generation_analysis_backup = analysis_results.copy()
@@ -705,6 +737,9 @@ def render_pdf_ui(
             "include_all_documents": True,
             "company_document_ids_to_include": [],
             "selected_charts_for_pdf": [],
+            "vector_chart_keys": [],
+            "image_profile": "print",
+            "output_profile": "print",
             "include_optional_component_details": True,
         }
     if "pdf_selected_main_sections" not in st.session_state:
@@ -1356,6 +1391,39 @@ def render_pdf_ui(
                     key="pdf_cb_prod_img_v13_form_main_stable",
                 )
             )
+            image_profile_labels = {
+                "print": "Druck (300 dpi)",
+                "screen": "Bildschirm/E-Mail (150 dpi, kleinere Datei)",
+            }
+            st.session_state.pdf_inclusion_options["image_profile"] = st.selectbox(
+                get_text_pdf_ui(texts, "pdf_image_profile_label", "Bildqualität"),
+                options=list(image_profile_labels),
+                index=list(image_profile_labels).index(
+                    st.session_state.pdf_inclusion_options.get("image_profile", "print")
+                    if st.session_state.pdf_inclusion_options.get("image_profile") in image_profile_labels
+                    else "print"
+                ),
+                format_func=lambda profile: image_profile_labels[profile],
+                help="Bilder werden auf ihre Größe im PDF verkleinert und als JPEG/PNG neu kodiert.",
+                key="pdf_image_profile_form_v1",
+            )
+            output_profile_labels = {
+                "print": "Druck (kompakt)",
+                "email": "E-Mail (maximal kompakt, schnelle Webansicht)",
+                "draft": "Entwurf (ohne Nachbearbeitung, am schnellsten)",
+            }
+            st.session_state.pdf_inclusion_options["output_profile"] = st.selectbox(
+                get_text_pdf_ui(texts, "pdf_output_profile_label", "PDF-Ausgabe"),
+                options=list(output_profile_labels),
+                index=list(output_profile_labels).index(
+                    st.session_state.pdf_inclusion_options.get("output_profile", "print")
+                    if st.session_state.pdf_inclusion_options.get("output_profile") in output_profile_labels
+                    else "print"
+                ),
+                format_func=lambda profile: output_profile_labels[profile],
+                help="Doppelte Objekte zusammenführen und Streams komprimieren; mit pikepdf zusätzlich Objekt-Streams und Linearisierung.",
+                key="pdf_output_profile_form_v1",
+            )
             st.session_state.pdf_inclusion_options[
                 "include_optional_component_details"
             ] = st.checkbox(
@@ -1512,6 +1580,27 @@ def render_pdf_ui(
                 st.session_state.pdf_inclusion_options[
                     "_temp_selected_charts_for_pdf"
                 ] = selected_charts_in_form
+                vector_capable_keys_form = [
+                    k_vec for k_vec in ordered_display_keys_form if supports_vector_chart(k_vec)
+                ]
+                if vector_capable_keys_form:
+                    current_vector_keys_form = st.session_state.pdf_inclusion_options.get(
+                        "vector_chart_keys", []
+                    )
+                    st.session_state.pdf_inclusion_options[
+                        "_temp_vector_chart_keys"
+                    ] = st.multiselect(
+                        "Als Vektorgrafik zeichnen (schärfer, kleinere PDF)",
+                        options=vector_capable_keys_form,
+                        default=[
+                            k_vec
+                            for k_vec in current_vector_keys_form
+                            if k_vec in vector_capable_keys_form
+                        ],
+                        format_func=lambda k_vec: chart_key_to_friendly_name_map.get(k_vec, k_vec),
+                        help="Diese Diagramme werden direkt aus den Berechnungsdaten gezeichnet statt als Bild eingefügt (Standardfarben).",
+                        key="pdf_vector_chart_keys_form_v1",
+                    )
             else:
                 st.caption(
                     get_text_pdf_ui(
@@ -1542,6 +1631,11 @@ def render_pdf_ui(
                     "_temp_selected_charts_for_pdf", []
                 )
             )
+            st.session_state.pdf_inclusion_options["vector_chart_keys"] = (
+                st.session_state.pdf_inclusion_options.pop(
+                    "_temp_vector_chart_keys", []
+                )
+            )
 
     if submitted_generate_pdf and not st.session_state.pdf_generating_lock_v1:
         st.session_state.pdf_generating_lock_v1 = True
@@ -0,0 +1,135 @@
+# price_matrix_service.py
+# -*- coding: utf-8 -*-
+"""
+Geparste, indizierte Preis-Matrix mit Cache.
+
+Die in den Admin-Einstellungen gespeicherte Preis-Matrix (Excel-Bytes oder CSV-Text) wird
+nur einmal pro Inhalts-Hash geparst und als kompakte NumPy-Struktur gehalten:
+sortierte Modulanzahlen, Spaltenname->Index-Map und Float-Matrix. Die Zeilensuche
+("genau oder nächstkleinere Modulanzahl") erfolgt per searchsorted.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_MAX_CACHED_MATRICES = 4
+
+
+class PriceMatrix:
+    """Kompakte, unveränderliche Darstellung einer Preis-Matrix."""
+
+    __slots__ = ('module_counts', 'column_names', 'column_index', 'values', 'source_type')
+
+    def __init__(self, df: pd.DataFrame, source_type: str):
+        order = np.argsort(df.index.to_numpy(dtype=np.int64), kind='stable')
+        self.module_counts: np.ndarray = df.index.to_numpy(dtype=np.int64)[order]
+        self.column_names: List[str] = [str(col) for col in df.columns]
+        # Normalisierte Spaltennamen (strip/lower) -> Spaltenindex; bei Dubletten gewinnt die letzte Spalte
+        self.column_index: Dict[str, int] = {name.strip().lower(): idx for idx, name in enumerate(self.column_names)}
+        self.values: np.ndarray = df.to_numpy(dtype=float, na_value=np.nan)[order]
+        self.source_type = source_type
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    def row_for_module_quantity(self, module_quantity: int) -> Optional[int]:
+        """Index der Zeile mit genau dieser oder der nächstkleineren Modulanzahl (None, falls keine)."""
+        row = int(np.searchsorted(self.module_counts, module_quantity, side='right')) - 1
+        return row if row >= 0 else None
+
+    def lookup(self, module_quantity: int, column_name: str) -> Tuple[Optional[float], Optional[str], Optional[int]]:
+        """
+        Liefert (Preis, originaler Spaltenname, verwendete Modulanzahl der Matrix).
+        Preis ist None, wenn Zeile/Spalte fehlt oder der Wert leer (NaN) ist.
+        """
+        row = self.row_for_module_quantity(module_quantity)
+        if row is None:
+            return None, None, None
+        matrix_count = int(self.module_counts[row])
+        col = self.column_index.get(str(column_name).strip().lower())
+        if col is None:
+            return None, None, matrix_count
+        value = self.values[row, col]
+        if np.isnan(value):
+            return None, None, matrix_count
+        return float(value), self.column_names[col], matrix_count
+
+    def to_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.values, index=pd.Index(self.module_counts, name='Anzahl Module'), columns=self.column_names)
+        return df
+
+
+_cache: "OrderedDict[Tuple[str, str], Tuple[Optional[PriceMatrix], List[str]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _content_key(source_type: str, content: Any) -> Tuple[str, str]:
+    raw = content if isinstance(content, bytes) else str(content).encode('utf-8')
+    return source_type, hashlib.sha1(raw).hexdigest()
+
+
+def _get_or_parse(source_type: str, content: Any, errors_list: List[str]) -> Optional[PriceMatrix]:
+    key = _content_key(source_type, content)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+    if cached is not None:
+        matrix, parse_errors = cached
+        errors_list.extend(parse_errors)
+        return matrix
+
+    # Parser leben in calculations.py; Import hier, um zyklische Importe zu vermeiden
+    from calculations import parse_module_price_matrix_excel, parse_module_price_matrix_csv
+    parse_errors: List[str] = []
+    if source_type == 'Excel':
+        df = parse_module_price_matrix_excel(content, parse_errors)
+    else:
+        df = parse_module_price_matrix_csv(content, parse_errors)
+    matrix = PriceMatrix(df, source_type) if df is not None and not df.empty else None
+    with _cache_lock:
+        _stats['misses'] += 1
+        _cache[key] = (matrix, parse_errors)
+        while len(_cache) > _MAX_CACHED_MATRICES:
+            _cache.popitem(last=False)
+    errors_list.extend(parse_errors)
+    return matrix
+
+
+def get_price_matrix(excel_bytes: Optional[bytes], csv_content: Optional[str], errors_list: List[str]) -> Optional[PriceMatrix]:
+    """
+    Liefert die Preis-Matrix aus den gespeicherten Admin-Daten (Excel hat Vorrang vor CSV).
+    Geparst wird nur, wenn der Inhalt (Hash) noch nicht im Cache liegt.
+    """
+    if excel_bytes and isinstance(excel_bytes, bytes):
+        matrix = _get_or_parse('Excel', excel_bytes, errors_list)
+        if matrix is not None:
+            return matrix
+    if csv_content and isinstance(csv_content, str) and csv_content.strip():
+        return _get_or_parse('CSV', csv_content, errors_list)
+    return None
+
+
+def invalidate_price_matrix_cache() -> None:
+    """Verwirft alle geparsten Matrizen (z.B. nach Upload/Löschen in der Admin-Oberfläche)."""
+    with _cache_lock:
+        _cache.clear()
+        _stats['invalidations'] += 1
+
+
+def get_price_matrix_cache_stats() -> Dict[str, Any]:
+    """Trefferstatistik des Caches (hits, misses, invalidations, entries, hit_rate)."""
+    with _cache_lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats['entries'] = len(_cache)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
@@ -9,6 +9,8 @@ from typing import Dict, List, Optional, Any, Union, Tuple
 import traceback
 import os
 import sys # KORREKTUR: sys-Modul importieren
+import threading
+import time
 
 # Datenbankverbindung und Verfügbarkeitsstatus
 DB_AVAILABLE = False
@@ -17,6 +19,8 @@ get_db_connection_safe_pd = None
 
 # --- (Beginn des unveränderten Codes bis zum if __name__ Block) ---
 try:
+    import db_pool
+    import product_image_store
     from database import get_db_connection, init_db 
     get_db_connection_safe_pd = get_db_connection
     DB_AVAILABLE = True
@@ -130,10 +134,118 @@ def _migrate_product_table_columns(conn: sqlite3.Connection):
             except Exception as e_general_add: print(f"product_db.py: Allgemeiner Fehler beim Hinzufügen der Spalte '{col_name}': {e_general_add}"); traceback.print_exc()
     conn.commit()
 
+# --- Einmaliges Schema-Setup und In-Memory-Produktkatalog ---
+# create_product_table (DDL + Spaltenmigration) läuft pro Datenbankdatei nur einmal je Prozess.
+# Lesezugriffe bedienen sich aus einem Katalog (ID-/Modellname-Maps, Kategorie-Buckets), der bei
+# add/update/delete verworfen und bei Änderungen anderer Prozesse über eine Versionsprüfung erkannt wird.
+# Produktbilder liegen in product_image_store; Katalogeinträge tragen nur das Flag 'has_image'.
+PRODUCT_CATALOG_REVALIDATE_SECONDS = 5.0
+_schema_lock = threading.Lock()
+_schema_ready_for: set = set()
+_catalog_lock = threading.RLock()
+_catalog: Optional[Dict[str, Any]] = None
+_catalog_stats: Dict[str, int] = {'hits': 0, 'loads': 0, 'invalidations': 0}
+_ASCII_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _nocase(value: Any) -> str:
+    # Entspricht SQLite COLLATE NOCASE (nur ASCII-Buchstaben werden gefaltet)
+    return str(value or '').translate(_ASCII_NOCASE)
+
+def _db_identity(conn: sqlite3.Connection) -> Tuple[str, int]:
+    # Datei + Pool-Generation: nach Restore/Reset der Datenbank gelten Schema und Katalog als veraltet
+    pool_path = getattr(conn, 'pool_path', None)
+    if not pool_path:
+        row = conn.execute("PRAGMA database_list").fetchone()
+        pool_path = row[2] if row and row[2] else ':memory:'
+    return pool_path, db_pool.get_generation()
+
+def ensure_product_schema(conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Legt die Produkttabelle an und migriert Spalten – einmal pro Datenbankdatei (Start-Schritt)."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection_safe_pd()
+        if conn is None: return False
+    try:
+        identity = _db_identity(conn)
+        if identity in _schema_ready_for: return True
+        with _schema_lock:
+            if identity not in _schema_ready_for:
+                create_product_table(conn)
+                product_image_store.ensure_image_tables(conn)
+                product_image_store.migrate_inline_images(conn)
+                conn.commit()
+                _schema_ready_for.add(identity)
+        return True
+    except sqlite3.Error as e: print(f"product_db.ensure_product_schema: SQLite Fehler: {e}"); traceback.print_exc(); return False
+    finally:
+        if own_conn: conn.close()
+
+def invalidate_product_catalog() -> None:
+    """Verwirft den Produktkatalog; der nächste Lesezugriff lädt ihn neu."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+        _catalog_stats['invalidations'] += 1
+
+def _read_catalog_version(cursor: sqlite3.Cursor) -> tuple:
+    cursor.execute("SELECT COUNT(*), MAX(id), MAX(updated_at) FROM products")
+    return tuple(cursor.fetchone())
+
+def _get_product_catalog(caller: str) -> Optional[Dict[str, Any]]:
+    global _catalog
+    with _catalog_lock:
+        now = time.monotonic()
+        if (_catalog is not None and _catalog['identity'][1] == db_pool.get_generation()
+                and now - _catalog['checked_at'] < PRODUCT_CATALOG_REVALIDATE_SECONDS):
+            _catalog_stats['hits'] += 1
+            return _catalog
+        conn = get_db_connection_safe_pd()
+        if conn is None: print(f"product_db.{caller}: DB nicht verfügbar."); return None
+        try:
+            ensure_product_schema(conn)
+            identity = _db_identity(conn)
+            cursor = conn.cursor()
+            version = _read_catalog_version(cursor)
+            if _catalog is not None and _catalog['identity'] == identity and _catalog['version'] == version:
+                _catalog['checked_at'] = now
+                _catalog_stats['hits'] += 1
+                return _catalog
+            cursor.execute("SELECT * FROM products ORDER BY id")
+            products = [dict(row) for row in cursor.fetchall()]
+            image_ids = product_image_store.product_ids_with_images(conn)
+            for product in products:
+                inline_image = product.pop('image_base64', None)
+                product['has_image'] = product['id'] in image_ids or bool(inline_image)
+            by_model_name: Dict[str, Dict[str, Any]] = {}
+            by_category: Dict[str, List[Dict[str, Any]]] = {}
+            for product in products:
+                by_model_name.setdefault(_nocase(product.get('model_name')), product)
+                by_category.setdefault(product.get('category'), []).append(product)
+            ordered = sorted(products, key=lambda p: _nocase(p.get('model_name')))
+            for bucket in by_category.values():
+                bucket.sort(key=lambda p: _nocase(p.get('model_name')))
+            _catalog = {
+                'identity': identity, 'version': version, 'checked_at': now,
+                'ordered': ordered, 'by_id': {product['id']: product for product in products},
+                'by_model_name': by_model_name, 'by_category': by_category,
+                'categories': sorted({c for c in by_category if c}, key=_nocase),
+            }
+            _catalog_stats['loads'] += 1
+            return _catalog
+        except sqlite3.Error as e: print(f"product_db.{caller}: SQLite Fehler: {e}"); traceback.print_exc(); return None
+        finally: conn.close()
+
+def get_product_catalog_stats() -> Dict[str, Any]:
+    """Zähler des Produktkatalogs (hits, loads, invalidations, products)."""
+    with _catalog_lock:
+        stats: Dict[str, Any] = dict(_catalog_stats)
+        stats['products'] = len(_catalog['by_id']) if _catalog is not None else 0
+    return stats
+
 def add_product(product_data: Dict[str, Any]) -> Optional[int]:
     conn = get_db_connection_safe_pd()
     if conn is None: print("product_db.add_product: DB nicht verfügbar."); return None
-    create_product_table(conn)
+    ensure_product_schema(conn)
     cursor = conn.cursor()
     now_iso = datetime.now().isoformat()
     all_db_columns = {"id", "category", "model_name", "brand", "price_euro", "capacity_w", "storage_power_kw", "power_kw", "max_cycles", "warranty_years", "length_m", "width_m", "weight_kg", "efficiency_percent", "origin_country", "description", "pros", "cons", "rating", "image_base64", "created_at", "updated_at", "datasheet_link_db_path", "additional_cost_netto"}
@@ -150,10 +262,14 @@ def add_product(product_data: Dict[str, Any]) -> Optional[int]:
             else: insert_data[col_name] = None 
     cursor.execute("SELECT id FROM products WHERE model_name = ?", (insert_data['model_name'],))
     if cursor.fetchone(): print(f"product_db.add_product: Fehler - Produkt mit Modellname '{insert_data['model_name']}' existiert bereits."); conn.close(); return None
+    image_base64 = insert_data.pop('image_base64', None)
     fields = ', '.join(insert_data.keys()); placeholders = ', '.join(['?'] * len(insert_data))
     try:
         cursor.execute(f"INSERT INTO products ({fields}) VALUES ({placeholders})", list(insert_data.values()))
-        conn.commit(); product_id = cursor.lastrowid
+        product_id = cursor.lastrowid
+        if image_base64 and not product_image_store.store_product_image(conn, product_id, image_base64):
+            print(f"product_db.add_product: Bild für '{insert_data['model_name']}' ist kein gültiges Base64 und wurde verworfen.")
+        conn.commit(); invalidate_product_catalog()
         print(f"product_db.add_product: Produkt '{insert_data['model_name']}' erfolgreich mit ID {product_id} hinzugefügt."); return product_id
     except sqlite3.Error as e: print(f"product_db.add_product: SQLite Fehler bei INSERT von '{insert_data.get('model_name', 'N/A')}': {e}"); traceback.print_exc(); conn.rollback(); return None
     finally: conn.close()
@@ -161,7 +277,7 @@ def add_product(product_data: Dict[str, Any]) -> Optional[int]:
 def update_product(product_id: Union[int, float], product_data: Dict[str, Any]) -> bool:
     conn = get_db_connection_safe_pd(); 
     if conn is None: print("product_db.update_product: DB nicht verfügbar."); return False
-    create_product_table(conn); cursor = conn.cursor(); now_iso = datetime.now().isoformat()
+    ensure_product_schema(conn); cursor = conn.cursor(); now_iso = datetime.now().isoformat()
     if 'last_updated' in product_data: product_data['updated_at'] = product_data.pop('last_updated')
     product_data['updated_at'] = now_iso 
     cursor.execute("PRAGMA table_info(products)"); db_columns = [col_info[1] for col_info in cursor.fetchall()]
@@ -170,12 +286,18 @@ def update_product(product_id: Union[int, float], product_data: Dict[str, Any])
     if 'model_name' in product_data:
         cursor.execute("SELECT id FROM products WHERE model_name = ? AND id != ?", (product_data['model_name'], int(product_id)))
         if cursor.fetchone(): print(f"product_db.update_product: Fehler - Modellname '{product_data['model_name']}' existiert bereits für anderes Produkt."); conn.close(); return False
-    update_data = {k: v for k, v in product_data.items() if k in db_columns and k != 'id'}
+    has_image_update = 'image_base64' in product_data
+    update_data = {k: v for k, v in product_data.items() if k in db_columns and k not in ('id', 'image_base64')}
     if not update_data: print(f"product_db.update_product: Keine gültigen Felder zum Aktualisieren für ID {product_id}."); conn.close(); return False 
     fields_to_set = [f"{k}=?" for k in update_data.keys()]; values = list(update_data.values()); values.append(int(product_id))
     try:
-        cursor.execute(f"UPDATE products SET {', '.join(fields_to_set)} WHERE id=?", values); conn.commit()
-        if cursor.rowcount > 0: print(f"product_db.update_product: Produkt ID {product_id} erfolgreich aktualisiert."); return True
+        cursor.execute(f"UPDATE products SET {', '.join(fields_to_set)} WHERE id=?", values); updated_count = cursor.rowcount
+        if updated_count > 0 and has_image_update:
+            if product_image_store.store_product_image(conn, int(product_id), product_data['image_base64']):
+                cursor.execute("UPDATE products SET image_base64 = NULL WHERE id=?", (int(product_id),))
+            else: print(f"product_db.update_product: Bild für ID {product_id} ist kein gültiges Base64, Bild bleibt unverändert.")
+        conn.commit(); invalidate_product_catalog()
+        if updated_count > 0: print(f"product_db.update_product: Produkt ID {product_id} erfolgreich aktualisiert."); return True
         else: print(f"product_db.update_product: Produkt ID {product_id} nicht gefunden."); return False
     except sqlite3.Error as e: print(f"product_db.update_product: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); conn.rollback(); return False
     finally: conn.close()
@@ -183,73 +305,172 @@ def update_product(product_id: Union[int, float], product_data: Dict[str, Any])
 def delete_product(product_id: Union[int, float]) -> bool:
     conn = get_db_connection_safe_pd(); 
     if conn is None: print("product_db.delete_product: DB nicht verfügbar."); return False
-    create_product_table(conn); cursor = conn.cursor()
+    ensure_product_schema(conn); cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM products WHERE id=?", (int(product_id),)); conn.commit(); deleted_count = cursor.rowcount
+        cursor.execute("DELETE FROM products WHERE id=?", (int(product_id),)); deleted_count = cursor.rowcount
+        product_image_store.delete_product_image(conn, int(product_id)); conn.commit(); invalidate_product_catalog()
         if deleted_count > 0: print(f"product_db.delete_product: Produkt ID {product_id} erfolgreich gelöscht.")
         else: print(f"product_db.delete_product: Produkt ID {product_id} nicht gefunden, nichts gelöscht.")
         return deleted_count > 0
     except sqlite3.Error as e: print(f"product_db.delete_product: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); conn.rollback(); return False
     finally: conn.close()
 
-def list_products(category: Optional[str] = None, company_id: Optional[int] = None) -> List[Dict[str, Any]]:
-    conn = get_db_connection_safe_pd(); 
-    if conn is None: print("product_db.list_products: DB nicht verfügbar."); return []
-    create_product_table(conn); cursor = conn.cursor()
-    query = "SELECT * FROM products"; params: List[Any] = [] 
-    conditions = []
-
-    if category:
-        conditions.append("category = ?")
-        params.append(category)
-
+def list_products(category: Optional[str] = None, company_id: Optional[int] = None, include_images: bool = False) -> List[Dict[str, Any]]:
+    # Standardmäßig ohne Bilddaten (nur 'has_image'); include_images lädt die Originale mit einer Abfrage nach
+    catalog = _get_product_catalog('list_products')
+    if catalog is None: return []
+    products = catalog['by_category'].get(category, []) if category else catalog['ordered']
     if company_id is not None:
-        conditions.append("company_id = ?")
-        params.append(company_id)
-
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-
-    query += " ORDER BY model_name COLLATE NOCASE" 
+        products = [p for p in products if p.get('company_id') == company_id]
+    products = [dict(p) for p in products]
+    if include_images:
+        images = product_image_store.get_product_images_base64(p['id'] for p in products if p.get('has_image'))
+        for product in products:
+            product['image_base64'] = images.get(product['id']) or (get_product_image_base64(product['id']) if product.get('has_image') else None)
+    return products
+
+def get_product_by_id(product_id: Union[int, float], include_image: bool = False) -> Optional[Dict[str, Any]]:
+    product_id_int = int(product_id)
+    catalog = _get_product_catalog('get_product_by_id')
+    if catalog is None: return None
+    product = catalog['by_id'].get(product_id_int)
+    if not product: return None
+    product = dict(product)
+    if include_image:
+        product['image_base64'] = get_product_image_base64(product_id_int) if product.get('has_image') else None
+    return product
+
+def get_product_image_base64(product_id: Union[int, float]) -> Optional[str]:
+    """Produktbild in voller Auflösung (Bildablage, Fallback: nicht migrierbarer Wert in products.image_base64)."""
+    image_base64 = product_image_store.get_product_image_base64(int(product_id))
+    if image_base64: return image_base64
+    conn = get_db_connection_safe_pd()
+    if conn is None: return None
     try:
-        cursor.execute(query, params); rows = cursor.fetchall()
-        return [dict(row) for row in rows] if rows else []
-    except sqlite3.Error as e: print(f"product_db.list_products: SQLite Fehler: {e}"); traceback.print_exc(); return []
+        row = conn.execute("SELECT image_base64 FROM products WHERE id = ?", (int(product_id),)).fetchone()
+        return row[0] if row and row[0] else None
+    except sqlite3.Error as e: print(f"product_db.get_product_image_base64: SQLite Fehler: {e}"); return None
     finally: conn.close()
 
-def get_product_by_id(product_id: Union[int, float]) -> Optional[Dict[str, Any]]:
-    conn = get_db_connection_safe_pd(); 
-    if conn is None: print("product_db.get_product_by_id: DB nicht verfügbar."); return None
-    create_product_table(conn); cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT * FROM products WHERE id=?", (int(product_id),)); row = cursor.fetchone()
-        return dict(row) if row else None
-    except sqlite3.Error as e: print(f"product_db.get_product_by_id: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); return None
-    finally: conn.close()
+def get_product_thumbnail(product_id: Union[int, float], size: int = 64) -> Optional[bytes]:
+    """PNG-Vorschaubild (vorberechnet in der Bildablage) für Listenansichten."""
+    return product_image_store.get_product_thumbnail(int(product_id), size)
 
 def get_product_by_model_name(model_name: str) -> Optional[Dict[str, Any]]:
     if not model_name or not model_name.strip(): print("product_db.get_product_by_model_name: Modellname darf nicht leer sein."); return None
-    conn = get_db_connection_safe_pd(); 
-    if conn is None: print("product_db.get_product_by_model_name: DB nicht verfügbar."); return None
-    create_product_table(conn); cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT * FROM products WHERE model_name=? COLLATE NOCASE", (model_name.strip(),)); row = cursor.fetchone()
-        return dict(row) if row else None
-    except sqlite3.Error as e: print(f"product_db.get_product_by_model_name: SQLite Fehler für Modell '{model_name}': {e}"); traceback.print_exc(); return None
-    finally: conn.close()
+    catalog = _get_product_catalog('get_product_by_model_name')
+    if catalog is None: return None
+    product = catalog['by_model_name'].get(_nocase(model_name.strip()))
+    return dict(product) if product else None
 
 def update_product_image(product_id: Union[int, float], image_base64: Optional[str]) -> bool:
     return update_product(int(product_id), {"image_base64": image_base64})
 
 def list_product_categories() -> List[str]:
-    conn = get_db_connection_safe_pd(); 
-    if conn is None: print("product_db.list_product_categories: DB nicht verfügbar."); return []
-    create_product_table(conn); cursor = conn.cursor()
+    catalog = _get_product_catalog('list_product_categories')
+    return list(catalog['categories']) if catalog is not None else []
+
+# --- Massenimport (Excel/CSV) ---
+# Validierung und Typumwandlung laufen spaltenweise über das ganze DataFrame, vorhandene Modellnamen
+# werden mit einer Abfrage aufgelöst und alle Zeilen per executemany-Upsert in einer Transaktion geschrieben.
+BULK_IMPORT_FLOAT_COLUMNS = ['price_euro', 'capacity_w', 'storage_power_kw', 'power_kw', 'length_m', 'width_m', 'weight_kg', 'efficiency_percent', 'additional_cost_netto']
+BULK_IMPORT_INT_COLUMNS = ['warranty_years', 'max_cycles', 'rating']
+BULK_IMPORT_TEXT_COLUMNS = ['category', 'model_name', 'brand', 'origin_country', 'description', 'pros', 'cons', 'datasheet_link_db_path', 'created_at']
+
+def _coerce_numeric_column(series: pd.Series) -> pd.Series:
+    # Wie der frühere Zeilenimport: "1.234,5" -> 1234.5, "12,5" -> 12.5
+    if pd.api.types.is_numeric_dtype(series): return pd.to_numeric(series, errors='coerce')
+    text = series.astype('string').str.strip()
+    german_thousands = text.str.rfind('.') < text.str.rfind(',')
+    text = text.where(~(german_thousands.fillna(False) & text.str.contains('.', regex=False).fillna(False)), text.str.replace('.', '', regex=False))
+    return pd.to_numeric(text.str.replace(',', '.', regex=False), errors='coerce')
+
+def bulk_import_products(df: pd.DataFrame, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Importiert/aktualisiert Produkte aus einem DataFrame (Spaltennamen wie in der products-Tabelle).
+    Gibt einen Bericht zurück: inserted, updated, skipped, errors (pro Zeile, 'row' = Excel-Zeilennummer),
+    dry_run. Im Probelauf wird alles geprüft und geschrieben, die Transaktion aber zurückgerollt.
+    """
+    report: Dict[str, Any] = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': [], 'dry_run': dry_run}
+    df = df.rename(columns={'last_updated': 'updated_at'})
+    missing_required = [col for col in ('model_name', 'category') if col not in df.columns]
+    if missing_required:
+        report['errors'].append({'row': None, 'reason': f"Fehlende Pflichtspalten: {', '.join(missing_required)}"})
+        return report
+    known_columns = BULK_IMPORT_FLOAT_COLUMNS + BULK_IMPORT_INT_COLUMNS + BULK_IMPORT_TEXT_COLUMNS
+    data = pd.DataFrame(index=df.index)
+    for col in BULK_IMPORT_TEXT_COLUMNS:
+        if col in df.columns:
+            data[col] = df[col].astype('string').str.strip().astype(object).where(df[col].notna(), None)
+    row_numbers = pd.Series(df.index, index=df.index) + 2
+    model_names = data['model_name'].fillna('')
+
+    for col in BULK_IMPORT_FLOAT_COLUMNS + BULK_IMPORT_INT_COLUMNS:
+        if col not in df.columns: continue
+        numeric = _coerce_numeric_column(df[col])
+        failed = df[col].notna() & numeric.isna()
+        for idx in failed[failed].index:
+            report['errors'].append({'row': int(row_numbers[idx]), 'model': model_names[idx], 'column': col, 'value': str(df.at[idx, col]), 'reason': 'Zahlenkonvertierung fehlgeschlagen'})
+        if col in BULK_IMPORT_INT_COLUMNS: numeric = numeric.apply(lambda v: int(v) if pd.notna(v) else None)
+        data[col] = numeric.astype(object).where(numeric.notna(), None)
+
+    invalid = (model_names == '') | (data['category'].fillna('') == '')
+    duplicate = model_names.map(_nocase).duplicated(keep='last') & ~invalid
+    for idx in invalid[invalid].index:
+        report['errors'].append({'row': int(row_numbers[idx]), 'model': model_names[idx] or None, 'reason': 'Modellname oder Kategorie fehlt in Zeile.'})
+    for idx in duplicate[duplicate].index:
+        report['errors'].append({'row': int(row_numbers[idx]), 'model': model_names[idx], 'reason': 'Modellname mehrfach in der Datei, spätere Zeile wird verwendet.'})
+    keep = ~(invalid | duplicate)
+    report['skipped'] = int((~keep).sum())
+    data = data[keep]
+    images = df.loc[keep, 'image_base64'] if 'image_base64' in df.columns else None
+    report['errors'].sort(key=lambda err: err['row'] or 0)
+    if data.empty: return report
+
+    file_columns = [col for col in known_columns if col in data.columns and col != 'created_at']
+    now_iso = datetime.now().isoformat()
+    insert_columns = [col for col in known_columns if col != 'created_at'] + ['created_at', 'updated_at']
+    for col in BULK_IMPORT_FLOAT_COLUMNS:
+        if col not in data.columns: data[col] = 0.0
+    for col in BULK_IMPORT_INT_COLUMNS:
+        if col not in data.columns: data[col] = 0
+    for col in BULK_IMPORT_TEXT_COLUMNS:
+        if col not in data.columns: data[col] = None
+    data['created_at'] = data['created_at'].where(data['created_at'].notna(), now_iso)
+    data['updated_at'] = now_iso
+    update_columns = [col for col in file_columns if col != 'model_name'] + ['updated_at']
+    upsert_sql = (f"INSERT INTO products ({', '.join(insert_columns)}) VALUES ({', '.join(['?'] * len(insert_columns))}) "
+                  f"ON CONFLICT(model_name) DO UPDATE SET {', '.join(f'{col}=excluded.{col}' for col in update_columns)}")
+
+    conn = get_db_connection_safe_pd()
+    if conn is None:
+        report['errors'].append({'row': None, 'reason': 'Datenbank nicht verfügbar.'})
+        return report
     try:
-        cursor.execute("SELECT DISTINCT category FROM products WHERE category IS NOT NULL AND category != '' ORDER BY category COLLATE NOCASE"); rows = cursor.fetchall()
-        return [row['category'] for row in rows] 
-    except sqlite3.Error as e: print(f"product_db.list_product_categories: SQLite Fehler: {e}"); traceback.print_exc(); return []
+        ensure_product_schema(conn)
+        cursor = conn.cursor()
+        # Modellnamen ohne Groß-/Kleinschreibung zuordnen (wie get_product_by_model_name) und unter der
+        # gespeicherten Schreibweise schreiben, damit ON CONFLICT(model_name) die vorhandene Zeile trifft
+        stored_names = {_nocase(row[0]): row[0] for row in cursor.execute("SELECT model_name FROM products")}
+        matched = data['model_name'].map(lambda name: stored_names.get(_nocase(name)))
+        data['model_name'] = matched.where(matched.notna(), data['model_name'])
+        report['updated'] = int(matched.notna().sum())
+        report['inserted'] = len(data) - report['updated']
+        cursor.executemany(upsert_sql, data[insert_columns].itertuples(index=False, name=None))
+        if images is not None and images.notna().any():
+            ids = dict(cursor.execute("SELECT model_name, id FROM products").fetchall())
+            for idx, image_base64 in images[images.notna()].items():
+                if not product_image_store.store_product_image(conn, ids[data.at[idx, 'model_name']], str(image_base64)):
+                    report['errors'].append({'row': int(row_numbers[idx]), 'model': data.at[idx, 'model_name'], 'column': 'image_base64', 'reason': 'Bild ist kein gültiges Base64'})
+        if dry_run: conn.rollback()
+        else: conn.commit(); invalidate_product_catalog()
+        print(f"product_db.bulk_import_products: {report['inserted']} neu, {report['updated']} aktualisiert, {report['skipped']} übersprungen{' (Probelauf)' if dry_run else ''}.")
+    except sqlite3.Error as e:
+        conn.rollback(); traceback.print_exc()
+        report['inserted'] = report['updated'] = 0
+        report['errors'].append({'row': None, 'reason': f"Datenbankfehler, Import zurückgerollt: {e}"})
     finally: conn.close()
+    return report
 # --- (Ende des unveränderten Codes) ---
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+# product_image_store.py
+# -*- coding: utf-8 -*-
+"""
+Ablage für Produktbilder außerhalb der products-Tabelle.
+
+Originalbilder liegen als BLOB in product_images (inkl. Inhalts-Hash, damit unveränderte
+Bilder beim Speichern nicht neu geschrieben werden), vorberechnete PNG-Vorschaubilder in
+mehreren Größen in product_image_thumbnails. Produktlisten bleiben dadurch schlank; das
+Original wird nur bei Bedarf (PDF-Erstellung, Bearbeiten) geladen.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import sqlite3
+import traceback
+from typing import Dict, Iterable, Optional, Set
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None  # type: ignore
+    PIL_AVAILABLE = False
+
+try:
+    from database import get_db_connection
+except ImportError:
+    def get_db_connection():  # type: ignore
+        print("product_image_store.py: database.py nicht verfügbar.")
+        return None
+
+THUMBNAIL_SIZES = (64, 160, 320)
+
+
+def ensure_image_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS product_images (
+            product_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            mime_type TEXT,
+            width INTEGER,
+            height INTEGER,
+            size_bytes INTEGER,
+            data BLOB NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS product_image_thumbnails (
+            product_id INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (product_id, size)
+        )
+    """)
+
+
+def _decode_base64(image_base64: str) -> Optional[bytes]:
+    try:
+        return base64.b64decode(image_base64, validate=False)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def _make_thumbnails(image_bytes: bytes) -> Dict[str, object]:
+    """Liefert MIME-Typ, Abmessungen und PNG-Vorschaubilder (leer, wenn Pillow fehlt oder das Bild defekt ist)."""
+    info: Dict[str, object] = {'mime_type': None, 'width': None, 'height': None, 'thumbnails': {}}
+    if not PIL_AVAILABLE:
+        return info
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            info['mime_type'] = Image.MIME.get(img.format or '', None)
+            info['width'], info['height'] = img.size
+            source = img.convert('RGBA') if img.mode not in ('RGB', 'RGBA') else img.copy()
+        for size in THUMBNAIL_SIZES:
+            thumb = source.copy()
+            thumb.thumbnail((size, size))
+            buffer = io.BytesIO()
+            thumb.save(buffer, format='PNG', optimize=True)
+            info['thumbnails'][size] = buffer.getvalue()
+    except Exception as e:
+        print(f"product_image_store: Vorschaubilder konnten nicht erzeugt werden: {e}")
+    return info
+
+
+def store_product_image(conn: sqlite3.Connection, product_id: int, image_base64: Optional[str]) -> bool:
+    """
+    Speichert (oder löscht bei leerem Wert) das Bild eines Produkts innerhalb der Transaktion des Aufrufers.
+    Gibt False zurück, wenn der Wert kein gültiges Base64 ist.
+    """
+    if not image_base64:
+        delete_product_image(conn, product_id)
+        return True
+    image_bytes = _decode_base64(image_base64)
+    if not image_bytes:
+        return False
+    content_hash = hashlib.sha1(image_bytes).hexdigest()
+    row = conn.execute("SELECT content_hash FROM product_images WHERE product_id = ?", (product_id,)).fetchone()
+    if row is not None and row[0] == content_hash:
+        return True  # unverändert, Vorschaubilder sind aktuell
+    info = _make_thumbnails(image_bytes)
+    conn.execute(
+        "INSERT OR REPLACE INTO product_images (product_id, content_hash, mime_type, width, height, size_bytes, data, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+        (product_id, content_hash, info['mime_type'], info['width'], info['height'], len(image_bytes), sqlite3.Binary(image_bytes))
+    )
+    conn.execute("DELETE FROM product_image_thumbnails WHERE product_id = ?", (product_id,))
+    conn.executemany(
+        "INSERT INTO product_image_thumbnails (product_id, size, data) VALUES (?, ?, ?)",
+        [(product_id, size, sqlite3.Binary(data)) for size, data in info['thumbnails'].items()]
+    )
+    return True
+
+
+def delete_product_image(conn: sqlite3.Connection, product_id: int) -> None:
+    conn.execute("DELETE FROM product_images WHERE product_id = ?", (product_id,))
+    conn.execute("DELETE FROM product_image_thumbnails WHERE product_id = ?", (product_id,))
+
+
+def product_ids_with_images(conn: sqlite3.Connection) -> Set[int]:
+    return {row[0] for row in conn.execute("SELECT product_id FROM product_images")}
+
+
+def migrate_inline_images(conn: sqlite3.Connection) -> int:
+    """Verschiebt vorhandene image_base64-Werte aus products in die Bildablage (einmaliger Start-Schritt)."""
+    moved = 0
+    rows = conn.execute("SELECT id, image_base64 FROM products WHERE image_base64 IS NOT NULL AND image_base64 != ''").fetchall()
+    for product_id, image_base64 in rows:
+        if store_product_image(conn, product_id, image_base64):
+            conn.execute("UPDATE products SET image_base64 = NULL WHERE id = ?", (product_id,))
+            moved += 1
+        else:
+            print(f"product_image_store: Bild von Produkt {product_id} ist kein gültiges Base64 und bleibt in products.")
+    if moved:
+        print(f"product_image_store: {moved} Produktbilder aus der products-Tabelle verschoben.")
+    return moved
+
+
+def _fetch_one(query: str, params: tuple) -> Optional[bytes]:
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(query, params).fetchone()
+        return bytes(row[0]) if row and row[0] is not None else None
+    except sqlite3.Error as e:
+        print(f"product_image_store: SQLite Fehler: {e}"); traceback.print_exc()
+        return None
+    finally:
+        conn.close()
+
+
+def get_product_image_bytes(product_id: int) -> Optional[bytes]:
+    """Originalbild in voller Auflösung (None, wenn kein Bild gespeichert ist)."""
+    return _fetch_one("SELECT data FROM product_images WHERE product_id = ?", (int(product_id),))
+
+
+def get_product_image_base64(product_id: int) -> Optional[str]:
+    image_bytes = get_product_image_bytes(product_id)
+    return base64.b64encode(image_bytes).decode('utf-8') if image_bytes else None
+
+
+def get_product_thumbnail(product_id: int, size: int = THUMBNAIL_SIZES[0]) -> Optional[bytes]:
+    """PNG-Vorschaubild der nächstgrößeren vorberechneten Größe (Fallback: Original)."""
+    size = next((s for s in THUMBNAIL_SIZES if s >= size), THUMBNAIL_SIZES[-1])
+    thumbnail = _fetch_one("SELECT data FROM product_image_thumbnails WHERE product_id = ? AND size = ?", (int(product_id), size))
+    return thumbnail if thumbnail is not None else get_product_image_bytes(product_id)
+
+
+def get_product_images_base64(product_ids: Iterable[int]) -> Dict[int, str]:
+    """Originalbilder mehrerer Produkte mit einer Abfrage (für Exporte/Vergleiche)."""
+    ids = [int(pid) for pid in product_ids]
+    if not ids:
+        return {}
+    conn = get_db_connection()
+    if conn is None:
+        return {}
+    try:
+        placeholders = ', '.join('?' * len(ids))
+        rows = conn.execute(f"SELECT product_id, data FROM product_images WHERE product_id IN ({placeholders})", ids).fetchall()
+        return {row[0]: base64.b64encode(bytes(row[1])).decode('utf-8') for row in rows}
+    except sqlite3.Error as e:
+        print(f"product_image_store: SQLite Fehler: {e}"); traceback.print_exc()
+        return {}
+    finally:
+        conn.close()
@@ -11,6 +11,8 @@ import pandas as pd
 import plotly.graph_objects as go
 from typing import Dict, Any, Optional
 import math # <--- KORREKTUR: Fehlender Import hinzugefügt
+from chart_cache import render_figure_cached
+from chart_export_queue import register_chart_export
 
 # Hilfsfunktion für Texte innerhalb dieses Moduls
 def get_text_pv_viz(texts: Dict[str, str], key: str, fallback_text: Optional[str] = None) -> str:
@@ -46,7 +48,8 @@ def _export_plotly_fig_to_bytes_pv_viz(fig: Optional[go.Figure], texts: Dict[str
         return None
     try:
         # Erhöhe die Skalierung und definiere eine Standardgröße für bessere Qualität im PDF
-        img_bytes = fig.to_image(format="png", scale=2, width=900, height=550)
+        # (gecacht: identische Figuren werden nicht erneut gerastert)
+        img_bytes = render_figure_cached(fig, format="png", scale=2, width=900, height=550)
         return img_bytes
     except Exception as e:
         # Fehlerbehandlung wurde aus der Originaldatei übernommen
@@ -59,6 +62,13 @@ def _export_plotly_fig_to_bytes_pv_viz(fig: Optional[go.Figure], texts: Dict[str
         # Der Nutzer wird den Fehler durch ein fehlendes Bild im PDF bemerken.
         return None
 
+def _defer_chart_export_pv_viz(analysis_results: Dict[str, Any], result_key: str, fig: Optional[go.Figure]) -> None:
+    """
+    Merkt eine Plotly-Figur für den PDF-Export vor, statt sie bei jedem Rerun zu rastern.
+    Die Bild-Bytes werden erst bei der PDF-Erstellung (chart_export_queue.rasterize_pending_charts) eingetragen.
+    """
+    register_chart_export(analysis_results, result_key, fig, format="png", scale=2, width=900, height=550)
+
 def render_yearly_production_pv_data(analysis_results: Dict[str, Any], texts: Dict[str, str]):
     """
     Rendert ein 3D-Balkendiagramm der monatlichen PV-Produktion für das erste Jahr.
@@ -85,7 +95,7 @@ def render_yearly_production_pv_data(analysis_results: Dict[str, Any], texts: Di
         fig_fallback_yearly = go.Figure()
         fig_fallback_yearly.update_layout(title=get_text_pv_viz(texts, "viz_data_unavailable_title", "Daten nicht verfügbar"))
         st.plotly_chart(fig_fallback_yearly, use_container_width=True, key="pv_visuals_yearly_prod_fallback")
-        analysis_results['yearly_production_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_fallback_yearly, texts)
+        _defer_chart_export_pv_viz(analysis_results, 'yearly_production_chart_bytes', fig_fallback_yearly)
         return
 
     fig_yearly_prod = go.Figure()
@@ -114,7 +124,7 @@ def render_yearly_production_pv_data(analysis_results: Dict[str, Any], texts: Di
         margin=dict(l=10, r=10, t=50, b=10), showlegend=True
     )
     st.plotly_chart(fig_yearly_prod, use_container_width=True, key="pv_visuals_yearly_prod")
-    analysis_results['yearly_production_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_yearly_prod, texts)
+    _defer_chart_export_pv_viz(analysis_results, 'yearly_production_chart_bytes', fig_yearly_prod)
 
 
 def render_break_even_pv_data(analysis_results: Dict[str, Any], texts: Dict[str, str]):
@@ -140,7 +150,7 @@ def render_break_even_pv_data(analysis_results: Dict[str, Any], texts: Dict[str,
         fig_fallback_break_even = go.Figure()
         fig_fallback_break_even.update_layout(title=get_text_pv_viz(texts, "viz_data_unavailable_title", "Daten nicht verfügbar"))
         st.plotly_chart(fig_fallback_break_even, use_container_width=True, key="pv_visuals_break_even_fallback")
-        analysis_results['break_even_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_fallback_break_even, texts)
+        _defer_chart_export_pv_viz(analysis_results, 'break_even_chart_bytes', fig_fallback_break_even)
         return
 
     cashflow_data = [float(cf) if isinstance(cf, (int,float)) and not (math.isnan(cf) or math.isinf(cf)) else 0.0 for cf in cashflow_data_raw]
@@ -166,7 +176,7 @@ def render_break_even_pv_data(analysis_results: Dict[str, Any], texts: Dict[str,
         margin=dict(l=0, r=0, b=0, t=50)
     )
     st.plotly_chart(fig_break_even, use_container_width=True, key="pv_visuals_break_even")
-    analysis_results['break_even_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_break_even, texts)
+    _defer_chart_export_pv_viz(analysis_results, 'break_even_chart_bytes', fig_break_even)
 
 def render_amortisation_pv_data(analysis_results: Dict[str, Any], texts: Dict[str, str]):
     """
@@ -196,7 +206,7 @@ def render_amortisation_pv_data(analysis_results: Dict[str, Any], texts: Dict[st
         fig_fallback_amort = go.Figure()
         fig_fallback_amort.update_layout(title=get_text_pv_viz(texts, "viz_data_unavailable_title", "Daten nicht verfügbar"))
         st.plotly_chart(fig_fallback_amort, use_container_width=True, key="pv_visuals_amortisation_fallback")
-        analysis_results['amortisation_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_fallback_amort, texts)
+        _defer_chart_export_pv_viz(analysis_results, 'amortisation_chart_bytes', fig_fallback_amort)
         return
 
     annual_benefits = [float(b) if isinstance(b, (int, float)) and not (math.isnan(b) or math.isinf(b)) else 0.0 for b in annual_benefits_raw]
@@ -230,7 +240,7 @@ def render_amortisation_pv_data(analysis_results: Dict[str, Any], texts: Dict[st
         margin=dict(l=0, r=0, b=0, t=50)
     )
     st.plotly_chart(fig_amort, use_container_width=True, key="pv_visuals_amortisation")
-    analysis_results['amortisation_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_amort, texts)
+    _defer_chart_export_pv_viz(analysis_results, 'amortisation_chart_bytes', fig_amort)
 
 def render_co2_savings_visualization(analysis_results: Dict[str, Any], texts: Dict[str, str]) -> None:
     """
@@ -381,7 +391,7 @@ def render_co2_savings_visualization(analysis_results: Dict[str, Any], texts: Di
     st.plotly_chart(fig_co2, use_container_width=True, key="co2_savings_3d_viz")
     
     # Export für PDF
-    analysis_results['co2_savings_chart_bytes'] = _export_plotly_fig_to_bytes_pv_viz(fig_co2, texts)
+    _defer_chart_export_pv_viz(analysis_results, 'co2_savings_chart_bytes', fig_co2)
     
     # Zusätzliche Info-Boxen
     col1, col2, col3 = st.columns(3)
@@ -0,0 +1,162 @@
+# pvgis_cache.py
+# -*- coding: utf-8 -*-
+"""
+Persistenter Cache für PVGIS-Antworten (SQLite unter data/pvgis_cache.db).
+
+Einträge werden über gerundete Koordinaten, Neigung, Azimut, Systemverlust und
+Modultechnologie adressiert und normiert auf 1 kWp gespeichert, sodass jede
+Anlagengröße denselben Eintrag wiederverwendet. Einträge verfallen nach einer TTL,
+die Gesamtzahl ist begrenzt (älteste Zugriffe werden zuerst verworfen).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import db_pool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PVGIS_CACHE_DB_PATH = os.path.join(BASE_DIR, 'data', 'pvgis_cache.db')
+
+COORDINATE_DECIMALS = 2  # ~1 km Raster, PVGIS-Ergebnisse ändern sich darunter praktisch nicht
+DEFAULT_TTL_DAYS = 180
+DEFAULT_MAX_ENTRIES = 5000
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0}
+
+
+def make_cache_key(
+    latitude: float, longitude: float, tilt: float, azimuth: float,
+    system_loss_percent: float, pv_tech: str = "crystSi", mounting_place: str = "building"
+) -> str:
+    """Normierter Cache-Schlüssel für eine PVGIS-Anfrage (unabhängig von der Anlagenleistung)."""
+    return "|".join([
+        f"{round(float(latitude), COORDINATE_DECIMALS):.{COORDINATE_DECIMALS}f}",
+        f"{round(float(longitude), COORDINATE_DECIMALS):.{COORDINATE_DECIMALS}f}",
+        str(int(round(float(tilt)))), str(int(round(float(azimuth)))),
+        f"{round(float(system_loss_percent), 1):.1f}", str(pv_tech), str(mounting_place),
+    ])
+
+
+def _connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    conn = db_pool.get_connection(db_path or PVGIS_CACHE_DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pvgis_cache (
+            cache_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    return conn
+
+
+def get_cached_pvgis_per_kwp(cache_key: str, ttl_days: Optional[float] = DEFAULT_TTL_DAYS, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Liefert die auf 1 kWp normierten Daten oder None (nicht vorhanden/abgelaufen)."""
+    try:
+        conn = _connect(db_path)
+        try:
+            row = conn.execute("SELECT payload, created_at FROM pvgis_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                with _stats_lock: _stats['misses'] += 1
+                return None
+            now = time.time()
+            if ttl_days is not None and ttl_days > 0 and now - row[1] > ttl_days * 86400:
+                conn.execute("DELETE FROM pvgis_cache WHERE cache_key = ?", (cache_key,))
+                conn.commit()
+                with _stats_lock:
+                    _stats['expired'] += 1
+                    _stats['misses'] += 1
+                return None
+            conn.execute("UPDATE pvgis_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+            conn.commit()
+            with _stats_lock: _stats['hits'] += 1
+            return json.loads(row[0])
+        finally:
+            conn.close()
+    except (sqlite3.Error, json.JSONDecodeError, OSError) as e:
+        print(f"pvgis_cache: Fehler beim Lesen ({cache_key}): {e}")
+        return None
+
+
+def store_pvgis_per_kwp(cache_key: str, data_per_kwp: Dict[str, Any], max_entries: int = DEFAULT_MAX_ENTRIES, db_path: Optional[str] = None) -> bool:
+    """Speichert normierte Daten und begrenzt den Cache auf max_entries (LRU nach letztem Zugriff)."""
+    try:
+        conn = _connect(db_path)
+        try:
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO pvgis_cache (cache_key, payload, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (cache_key, json.dumps(data_per_kwp), now, now)
+            )
+            if max_entries and max_entries > 0:
+                conn.execute("""
+                    DELETE FROM pvgis_cache WHERE cache_key IN (
+                        SELECT cache_key FROM pvgis_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                """, (int(max_entries),))
+            conn.commit()
+            with _stats_lock: _stats['stores'] += 1
+            return True
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError, TypeError) as e:
+        print(f"pvgis_cache: Fehler beim Speichern ({cache_key}): {e}")
+        return False
+
+
+def normalize_pvgis_result(result: Dict[str, Any], peak_power_kwp: float) -> Dict[str, Any]:
+    """Rechnet ein get_pvgis_data-Ergebnis auf 1 kWp herunter."""
+    factor = 1.0 / peak_power_kwp if peak_power_kwp > 0 else 0.0
+    return {
+        "monthly_production_kwh": [float(m) * factor for m in result.get("monthly_production_kwh", [])],
+        "annual_production_kwh": float(result.get("annual_production_kwh", 0.0) or 0.0) * factor,
+        "specific_yield_kwh_kwp_pa": float(result.get("specific_yield_kwh_kwp_pa", 0.0) or 0.0),
+        "pvgis_source": result.get("pvgis_source", "PVGIS"),
+    }
+
+
+def scale_pvgis_result(data_per_kwp: Dict[str, Any], peak_power_kwp: float) -> Dict[str, Any]:
+    """Skaliert normierte Cache-Daten auf die konkrete Anlagenleistung."""
+    return {
+        "monthly_production_kwh": [float(m) * peak_power_kwp for m in data_per_kwp.get("monthly_production_kwh", [])],
+        "annual_production_kwh": float(data_per_kwp.get("annual_production_kwh", 0.0) or 0.0) * peak_power_kwp,
+        "specific_yield_kwh_kwp_pa": data_per_kwp.get("specific_yield_kwh_kwp_pa", 0.0),
+        "pvgis_source": data_per_kwp.get("pvgis_source", "PVGIS"),
+    }
+
+
+def clear_pvgis_cache(db_path: Optional[str] = None) -> int:
+    """Löscht alle Einträge, gibt die Anzahl gelöschter Zeilen zurück."""
+    try:
+        conn = _connect(db_path)
+        try:
+            deleted = conn.execute("DELETE FROM pvgis_cache").rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"pvgis_cache: Fehler beim Leeren: {e}")
+        return 0
+
+
+def get_pvgis_cache_stats(db_path: Optional[str] = None) -> Dict[str, Any]:
+    """Trefferstatistik (seit Prozessstart) und Anzahl gespeicherter Einträge."""
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    try:
+        conn = _connect(db_path)
+        try:
+            stats['entries'] = conn.execute("SELECT COUNT(*) FROM pvgis_cache").fetchone()[0]
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        stats['entries'] = None
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,366 @@
+# solar_model.py
+# -*- coding: utf-8 -*-
+"""
+Lokales Einstrahlungs- und Ertragsmodell als Offline-Ersatz für PVGIS.
+
+Für ein typisches Jahr (8760 Stunden) werden vektorisiert berechnet:
+Sonnenstand, Aufteilung in Direkt-/Diffusstrahlung (Erbs), Transposition auf die
+geneigte Modulebene (Hay-Davies inkl. Bodenreflexion), Zelltemperatur (Faiman) und
+temperaturkorrigierte Modulleistung. Klimadaten stammen entweder aus den mitgelieferten
+Monatstabellen deutscher Referenzstandorte (daraus wird ein stündliches Typjahr
+synthetisiert) oder aus einer importierten Typjahr-Datei (z.B. PVGIS-TMY-CSV).
+
+Das Ergebnis hat dasselbe Format wie get_pvgis_data (monthly_production_kwh,
+annual_production_kwh, specific_yield_kwh_kwp_pa, pvgis_source) und enthält zusätzlich
+die stündliche Produktion (hourly_production_kwh).
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+SOLAR_CONSTANT_W_M2 = 1367.0
+
+DEFAULT_ALBEDO = 0.2
+DEFAULT_TEMP_COEFFICIENT_PER_K = -0.004  # Leistungstemperaturkoeffizient kristallines Silizium
+FAIMAN_U0 = 25.0  # W/(m²K)
+FAIMAN_U1 = 6.84  # W/(m³sK)
+DEFAULT_WIND_SPEED_M_S = 1.0
+DIURNAL_TEMP_AMPLITUDE_K = 4.0
+
+_MONTH_INDEX_OF_HOUR = np.repeat(np.arange(12), np.array(DAYS_PER_MONTH) * 24)
+_DAY_OF_YEAR_OF_HOUR = np.repeat(np.arange(1, 366), 24)
+_HOUR_OF_DAY = np.tile(np.arange(24), 365)
+
+# Monatssummen der Globalstrahlung (kWh/m²) und Monatsmitteltemperaturen (°C),
+# gerundete langjährige Mittel für Referenzstandorte in Deutschland
+CLIMATE_TABLES: Dict[str, Dict[str, Any]] = {
+    'Hamburg': {
+        'latitude': 53.55, 'longitude': 9.99,
+        'ghi_kwh_m2': [17, 33, 67, 116, 154, 159, 156, 129, 85, 47, 21, 13],
+        'temp_c': [1.5, 2.0, 4.8, 8.9, 13.2, 16.1, 18.3, 18.0, 14.6, 10.3, 5.7, 2.6],
+    },
+    'Berlin': {
+        'latitude': 52.52, 'longitude': 13.40,
+        'ghi_kwh_m2': [20, 37, 75, 124, 162, 165, 165, 140, 93, 53, 23, 15],
+        'temp_c': [0.6, 1.8, 5.2, 10.1, 14.8, 17.8, 20.0, 19.6, 15.2, 10.2, 5.1, 1.7],
+    },
+    'Köln': {
+        'latitude': 50.94, 'longitude': 6.96,
+        'ghi_kwh_m2': [22, 39, 77, 121, 155, 160, 162, 138, 95, 57, 26, 17],
+        'temp_c': [2.8, 3.4, 6.7, 10.3, 14.4, 17.3, 19.3, 18.9, 15.4, 11.2, 6.6, 3.6],
+    },
+    'Leipzig': {
+        'latitude': 51.34, 'longitude': 12.37,
+        'ghi_kwh_m2': [21, 39, 78, 126, 162, 166, 167, 142, 96, 56, 24, 16],
+        'temp_c': [0.5, 1.6, 5.2, 9.9, 14.6, 17.6, 19.8, 19.4, 15.1, 10.2, 5.0, 1.6],
+    },
+    'Frankfurt': {
+        'latitude': 50.11, 'longitude': 8.68,
+        'ghi_kwh_m2': [23, 42, 82, 128, 162, 168, 170, 146, 100, 58, 26, 17],
+        'temp_c': [1.6, 2.8, 6.5, 10.7, 15.0, 18.2, 20.3, 19.9, 15.6, 10.7, 5.8, 2.5],
+    },
+    'Stuttgart': {
+        'latitude': 48.78, 'longitude': 9.18,
+        'ghi_kwh_m2': [27, 47, 87, 130, 160, 168, 172, 148, 104, 63, 30, 21],
+        'temp_c': [1.0, 2.3, 6.1, 10.0, 14.4, 17.6, 19.7, 19.3, 15.1, 10.4, 5.2, 1.9],
+    },
+    'München': {
+        'latitude': 48.14, 'longitude': 11.58,
+        'ghi_kwh_m2': [30, 50, 90, 130, 160, 168, 172, 150, 105, 66, 32, 23],
+        'temp_c': [-0.5, 1.0, 4.8, 9.1, 13.6, 16.8, 18.8, 18.4, 14.3, 9.6, 4.3, 0.7],
+    },
+    'Freiburg': {
+        'latitude': 47.99, 'longitude': 7.85,
+        'ghi_kwh_m2': [31, 52, 93, 133, 162, 172, 177, 153, 109, 67, 33, 24],
+        'temp_c': [2.4, 3.8, 7.6, 11.3, 15.5, 18.8, 20.9, 20.5, 16.4, 11.6, 6.4, 3.2],
+    },
+}
+
+# Feste Folge von Tages-Klarheitsabweichungen (Mittelwert 0), damit klare und trübe Tage
+# abwechseln und die Diffusaufteilung realistisch wird; deterministisch für reproduzierbare Angebote
+_DAILY_CLEARNESS_PATTERN = np.random.default_rng(20240601).uniform(-1.0, 1.0, 365)
+_DAILY_CLEARNESS_PATTERN -= _DAILY_CLEARNESS_PATTERN.mean()
+
+
+class TypicalYear:
+    """Stündliche Klimadaten eines typischen Jahres (je 8760 Werte)."""
+
+    __slots__ = ('ghi', 'dhi', 'dni', 'temp_air', 'wind_speed', 'utc_offset_hours', 'source')
+
+    def __init__(self, ghi: np.ndarray, temp_air: np.ndarray, source: str,
+                 dhi: Optional[np.ndarray] = None, dni: Optional[np.ndarray] = None,
+                 wind_speed: Optional[np.ndarray] = None, utc_offset_hours: Optional[float] = None):
+        self.ghi = np.asarray(ghi, dtype=float)
+        self.temp_air = np.asarray(temp_air, dtype=float)
+        self.dhi = None if dhi is None else np.asarray(dhi, dtype=float)
+        self.dni = None if dni is None else np.asarray(dni, dtype=float)
+        self.wind_speed = None if wind_speed is None else np.asarray(wind_speed, dtype=float)
+        # None = Zeitstempel in lokaler Standardzeit des Standorts, sonst Versatz der Zeitstempel zu UTC
+        self.utc_offset_hours = utc_offset_hours
+        self.source = source
+
+
+def _standard_utc_offset(longitude: float) -> float:
+    return float(round(longitude / 15.0))
+
+
+def solar_position(latitude: float, longitude: float, utc_offset_hours: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Sonnenstand für die Stundenmitten eines Jahres (Spencer-Näherung).
+
+    Returns:
+        Dict mit cos_zenith, zenith_rad, azimuth_rad (Süd = 0, West positiv),
+        extraterrestrial_w_m2 (Normalstrahlung am Atmosphärenrand).
+    """
+    lat_rad = np.radians(latitude)
+    tz = _standard_utc_offset(longitude) if utc_offset_hours is None else float(utc_offset_hours)
+    b = 2.0 * np.pi * (_DAY_OF_YEAR_OF_HOUR - 1) / 365.0
+    declination = (0.006918 - 0.399912 * np.cos(b) + 0.070257 * np.sin(b)
+                   - 0.006758 * np.cos(2 * b) + 0.000907 * np.sin(2 * b)
+                   - 0.002697 * np.cos(3 * b) + 0.00148 * np.sin(3 * b))
+    equation_of_time_min = 229.18 * (0.000075 + 0.001868 * np.cos(b) - 0.032077 * np.sin(b)
+                                     - 0.014615 * np.cos(2 * b) - 0.040849 * np.sin(2 * b))
+    solar_time_h = _HOUR_OF_DAY + 0.5 + (4.0 * (longitude - 15.0 * tz) + equation_of_time_min) / 60.0
+    hour_angle = np.radians(15.0 * (solar_time_h - 12.0))
+
+    cos_zenith = (np.sin(lat_rad) * np.sin(declination)
+                  + np.cos(lat_rad) * np.cos(declination) * np.cos(hour_angle))
+    cos_zenith = np.clip(cos_zenith, -1.0, 1.0)
+    zenith = np.arccos(cos_zenith)
+    sin_zenith = np.maximum(np.sin(zenith), 1e-6)
+    cos_azimuth = (cos_zenith * np.sin(lat_rad) - np.sin(declination)) / (sin_zenith * max(np.cos(lat_rad), 1e-6))
+    azimuth = np.sign(hour_angle) * np.arccos(np.clip(cos_azimuth, -1.0, 1.0))
+    extraterrestrial = SOLAR_CONSTANT_W_M2 * (1.0 + 0.033 * np.cos(2.0 * np.pi * _DAY_OF_YEAR_OF_HOUR / 365.0))
+    return {'cos_zenith': cos_zenith, 'zenith_rad': zenith, 'azimuth_rad': azimuth,
+            'extraterrestrial_w_m2': extraterrestrial}
+
+
+def erbs_diffuse_fraction(clearness_index: np.ndarray) -> np.ndarray:
+    """Diffusanteil der Globalstrahlung nach Erbs et al. (1982)."""
+    kt = np.clip(clearness_index, 0.0, 1.0)
+    return np.where(
+        kt <= 0.22, 1.0 - 0.09 * kt,
+        np.where(kt <= 0.80,
+                 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4,
+                 0.165)
+    )
+
+
+def synthesize_typical_year(
+    monthly_ghi_kwh_m2: Sequence[float], monthly_temp_c: Sequence[float],
+    latitude: float, longitude: float, source: str = "Klimatabelle"
+) -> TypicalYear:
+    """
+    Erzeugt aus Monatssummen der Globalstrahlung und Monatsmitteltemperaturen ein stündliches Typjahr.
+    Die Monatssummen der Globalstrahlung werden exakt reproduziert.
+    """
+    sun = solar_position(latitude, longitude)
+    horizontal_extra = sun['extraterrestrial_w_m2'] * np.clip(sun['cos_zenith'], 0.0, None)
+    monthly_extra_kwh = np.bincount(_MONTH_INDEX_OF_HOUR, weights=horizontal_extra, minlength=12) / 1000.0
+    monthly_ghi = np.asarray(monthly_ghi_kwh_m2, dtype=float)
+    monthly_kt = np.clip(np.divide(monthly_ghi, monthly_extra_kwh, out=np.zeros(12), where=monthly_extra_kwh > 0), 0.0, 0.8)
+
+    # Tageweise variierende Klarheit um den Monatsmittelwert
+    daily_kt = monthly_kt[_MONTH_INDEX_OF_HOUR[::24]] * (1.0 + 0.45 * _DAILY_CLEARNESS_PATTERN)
+    ghi = horizontal_extra * np.clip(daily_kt, 0.02, 0.85)[_DAY_OF_YEAR_OF_HOUR - 1]
+    ghi_sums_kwh = np.bincount(_MONTH_INDEX_OF_HOUR, weights=ghi, minlength=12) / 1000.0
+    scale = np.divide(monthly_ghi, ghi_sums_kwh, out=np.zeros(12), where=ghi_sums_kwh > 0)
+    ghi = ghi * scale[_MONTH_INDEX_OF_HOUR]
+
+    # Tagesgang der Temperatur: Minimum bei Sonnenaufgang (~5 Uhr), Maximum ~15 Uhr
+    temp_air = (np.asarray(monthly_temp_c, dtype=float)[_MONTH_INDEX_OF_HOUR]
+                + DIURNAL_TEMP_AMPLITUDE_K * np.sin(2.0 * np.pi * (_HOUR_OF_DAY - 9.0) / 24.0))
+    return TypicalYear(ghi, temp_air, source)
+
+
+def nearest_climate_table(latitude: float, longitude: float) -> Tuple[str, Dict[str, Any]]:
+    """Nächstgelegener Referenzstandort aus CLIMATE_TABLES (Großkreisabstand)."""
+    lat_rad, lon_rad = np.radians(latitude), np.radians(longitude)
+    best_name, best_dist = None, None
+    for name, table in CLIMATE_TABLES.items():
+        t_lat, t_lon = np.radians(table['latitude']), np.radians(table['longitude'])
+        cos_angle = (np.sin(lat_rad) * np.sin(t_lat)
+                     + np.cos(lat_rad) * np.cos(t_lat) * np.cos(lon_rad - t_lon))
+        dist = float(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+        if best_dist is None or dist < best_dist:
+            best_name, best_dist = name, dist
+    return best_name, CLIMATE_TABLES[best_name]
+
+
+_typical_year_cache: "OrderedDict[str, TypicalYear]" = OrderedDict()
+_typical_year_cache_lock = threading.Lock()
+_MAX_CACHED_TYPICAL_YEARS = 16
+
+
+def get_typical_year(latitude: float, longitude: float) -> TypicalYear:
+    """Typjahr aus der nächstgelegenen Klimatabelle (gecacht pro Standort, auf 0,1° gerundet)."""
+    key = f"{round(latitude, 1)}|{round(longitude, 1)}"
+    with _typical_year_cache_lock:
+        cached = _typical_year_cache.get(key)
+        if cached is not None:
+            _typical_year_cache.move_to_end(key)
+            return cached
+    name, table = nearest_climate_table(latitude, longitude)
+    year = synthesize_typical_year(table['ghi_kwh_m2'], table['temp_c'], latitude, longitude,
+                                   source=f"Klimatabelle {name}")
+    with _typical_year_cache_lock:
+        _typical_year_cache[key] = year
+        while len(_typical_year_cache) > _MAX_CACHED_TYPICAL_YEARS:
+            _typical_year_cache.popitem(last=False)
+    return year
+
+
+_COLUMN_ALIASES = {
+    'ghi': ('g(h)', 'ghi', 'globalstrahlung'),
+    'dni': ('gb(n)', 'dni'),
+    'dhi': ('gd(h)', 'dhi', 'diffusstrahlung'),
+    'temp_air': ('t2m', 'temp_air', 'temperatur', 'temperature'),
+    'wind_speed': ('ws10m', 'wind_speed', 'wind'),
+}
+
+_imported_year_cache: "OrderedDict[str, Tuple[Optional[TypicalYear], List[str]]]" = OrderedDict()
+
+
+def load_typical_year_csv(content: Any, errors_list: Optional[List[str]] = None) -> Optional[TypicalYear]:
+    """
+    Liest ein Typjahr aus CSV-Text/-Bytes (PVGIS-TMY-Export oder Spalten ghi/dhi/dni/temp_air/wind_speed).
+    PVGIS-Zeitstempel (time(UTC)) werden als UTC interpretiert. Ergebnisse werden pro Inhalts-Hash gecacht.
+    """
+    errors = errors_list if errors_list is not None else []
+    raw = content if isinstance(content, bytes) else str(content or "").encode('utf-8')
+    key = hashlib.sha1(raw).hexdigest()
+    with _typical_year_cache_lock:
+        cached = _imported_year_cache.get(key)
+    if cached is not None:
+        errors.extend(cached[1])
+        return cached[0]
+
+    parse_errors: List[str] = []
+    year = None
+    try:
+        import pandas as pd
+        lines = raw.decode('utf-8', errors='replace').splitlines()
+        header_idx = next((i for i, line in enumerate(lines)
+                           if any(alias in line.lower() for alias in _COLUMN_ALIASES['ghi'])), None)
+        if header_idx is None:
+            parse_errors.append("Typjahr-Datei: Keine Spalte für Globalstrahlung (G(h)/ghi) gefunden.")
+        else:
+            sep = ';' if lines[header_idx].count(';') > lines[header_idx].count(',') else ','
+            df = pd.read_csv(io.StringIO("\n".join(lines[header_idx:])), sep=sep)
+            columns = {str(col).strip().lower(): col for col in df.columns}
+            found = {}
+            for target, aliases in _COLUMN_ALIASES.items():
+                col = next((columns[a] for a in aliases if a in columns), None)
+                if col is not None:
+                    found[target] = pd.to_numeric(df[col], errors='coerce')
+            if 'ghi' not in found or 'temp_air' not in found:
+                parse_errors.append("Typjahr-Datei: Spalten für Globalstrahlung und Temperatur erforderlich.")
+            else:
+                valid = found['ghi'].notna() & found['temp_air'].notna()
+                if int(valid.sum()) < HOURS_PER_YEAR:
+                    parse_errors.append(f"Typjahr-Datei: {int(valid.sum())} gültige Stundenwerte, {HOURS_PER_YEAR} erforderlich.")
+                else:
+                    series = {k: v[valid].to_numpy(dtype=float)[:HOURS_PER_YEAR] for k, v in found.items()}
+                    has_utc = any('utc' in str(col).lower() for col in df.columns)
+                    year = TypicalYear(
+                        series['ghi'], series['temp_air'], "Importiertes Typjahr",
+                        dhi=series.get('dhi'), dni=series.get('dni'), wind_speed=series.get('wind_speed'),
+                        utc_offset_hours=0.0 if has_utc else None
+                    )
+    except Exception as e:
+        parse_errors.append(f"Typjahr-Datei konnte nicht gelesen werden: {e}")
+
+    with _typical_year_cache_lock:
+        _imported_year_cache[key] = (year, parse_errors)
+        while len(_imported_year_cache) > _MAX_CACHED_TYPICAL_YEARS:
+            _imported_year_cache.popitem(last=False)
+    errors.extend(parse_errors)
+    return year
+
+
+def plane_of_array_irradiance(
+    year: TypicalYear, latitude: float, longitude: float, tilt: float, azimuth: float,
+    albedo: float = DEFAULT_ALBEDO
+) -> np.ndarray:
+    """
+    Einstrahlung auf die Modulebene (W/m²) nach Hay-Davies.
+    azimuth in PVGIS-Konvention: 0 = Süd, -90 = Ost, 90 = West.
+    """
+    sun = solar_position(latitude, longitude, year.utc_offset_hours)
+    cos_zenith = sun['cos_zenith']
+    daylight = cos_zenith > 0.01
+    extra = sun['extraterrestrial_w_m2']
+    ghi = np.where(daylight, np.clip(year.ghi, 0.0, None), 0.0)
+
+    if year.dhi is not None:
+        dhi = np.clip(np.minimum(year.dhi, ghi), 0.0, None)
+    else:
+        kt = np.divide(ghi, extra * cos_zenith, out=np.zeros_like(ghi), where=daylight)
+        dhi = ghi * erbs_diffuse_fraction(kt)
+    if year.dni is not None:
+        dni = np.where(daylight, np.clip(year.dni, 0.0, None), 0.0)
+    else:
+        dni = np.divide(ghi - dhi, cos_zenith, out=np.zeros_like(ghi), where=cos_zenith > 0.087)
+    dni = np.minimum(dni, extra)
+
+    tilt_rad, surface_az_rad = np.radians(tilt), np.radians(azimuth)
+    cos_incidence = (cos_zenith * np.cos(tilt_rad)
+                     + np.sin(sun['zenith_rad']) * np.sin(tilt_rad) * np.cos(sun['azimuth_rad'] - surface_az_rad))
+    cos_incidence = np.clip(cos_incidence, 0.0, None)
+    anisotropy = dni / extra
+    rb = cos_incidence / np.maximum(cos_zenith, 0.087)
+    poa_beam = dni * cos_incidence
+    poa_sky = dhi * ((1.0 - anisotropy) * (1.0 + np.cos(tilt_rad)) / 2.0 + anisotropy * rb)
+    poa_ground = ghi * albedo * (1.0 - np.cos(tilt_rad)) / 2.0
+    return np.where(daylight, poa_beam + poa_sky + poa_ground, 0.0)
+
+
+def calculate_hourly_production(
+    year: TypicalYear, latitude: float, longitude: float, peak_power_kwp: float,
+    tilt: float, azimuth: float, system_loss_percent: float = 14.0,
+    temp_coefficient_per_k: float = DEFAULT_TEMP_COEFFICIENT_PER_K, albedo: float = DEFAULT_ALBEDO
+) -> np.ndarray:
+    """Stündliche AC-Produktion in kWh (Länge 8760) inkl. Zelltemperatur- und Systemverlusten."""
+    poa = plane_of_array_irradiance(year, latitude, longitude, tilt, azimuth, albedo)
+    wind = year.wind_speed if year.wind_speed is not None else DEFAULT_WIND_SPEED_M_S
+    cell_temp = year.temp_air + poa / (FAIMAN_U0 + FAIMAN_U1 * np.clip(wind, 0.0, None))
+    dc_kw = peak_power_kwp * poa / 1000.0 * (1.0 + temp_coefficient_per_k * (cell_temp - 25.0))
+    return np.clip(dc_kw, 0.0, None) * (1.0 - system_loss_percent / 100.0)
+
+
+def get_local_yield_data(
+    latitude: float, longitude: float, peak_power_kwp: float, tilt: float, azimuth: float,
+    system_loss_percent: float = 14.0, typical_year: Optional[TypicalYear] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Ertragsdaten im Format von get_pvgis_data, berechnet mit dem lokalen Modell.
+
+    Args:
+        typical_year: Importiertes Typjahr; ohne Angabe wird die nächstgelegene Klimatabelle genutzt.
+
+    Returns:
+        Dict mit monthly_production_kwh, annual_production_kwh, specific_yield_kwh_kwp_pa,
+        pvgis_source, hourly_production_kwh (np.ndarray) und local_solar_model=True;
+        None bei ungültigen Eingaben.
+    """
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or peak_power_kwp <= 0:
+        return None
+    year = typical_year if typical_year is not None else get_typical_year(latitude, longitude)
+    hourly = calculate_hourly_production(year, latitude, longitude, peak_power_kwp, tilt, azimuth, system_loss_percent)
+    monthly = np.bincount(_MONTH_INDEX_OF_HOUR, weights=hourly, minlength=12)
+    annual = float(monthly.sum())
+    return {
+        "monthly_production_kwh": [float(m) for m in monthly],
+        "annual_production_kwh": annual,
+        "specific_yield_kwh_kwp_pa": annual / peak_power_kwp,
+        "pvgis_source": f"Lokales Solarmodell ({year.source})",
+        "hourly_production_kwh": hourly,
+        "local_solar_model": True,
+    }
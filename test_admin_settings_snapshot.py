@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Tests für den Snapshot-Cache der Admin-Einstellungen (database.load_admin_setting)"""
+
+import sqlite3
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def temp_db(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+    database.init_db()
+    yield str(tmp_path / "app_data.db")
+    database.invalidate_admin_settings_cache()
+
+
+def test_loads_all_settings_once_and_refreshes_on_save(temp_db):
+    """Mehrere Lesezugriffe teilen sich einen Snapshot, save_admin_setting aktualisiert ihn"""
+    before = database.get_admin_settings_cache_stats()
+    constants = database.load_admin_setting('global_constants')
+    tariffs = database.load_admin_setting('feed_in_tariffs')
+    assert isinstance(constants, dict) and isinstance(tariffs, dict)
+    assert database.load_admin_setting('does_not_exist', 'fallback') == 'fallback'
+    assert database.get_admin_settings_cache_stats()['reloads'] == before['reloads'] + 1
+
+    constants['vat_rate_percent'] = 19.0  # Änderung am Rückgabewert darf den Cache nicht verändern
+    assert database.load_admin_setting('global_constants')['vat_rate_percent'] == 0.0
+
+    assert database.save_admin_setting('global_constants', constants)
+    assert database.load_admin_setting('global_constants')['vat_rate_percent'] == 19.0
+    assert database.save_admin_setting('price_matrix_csv_data', "Anzahl Module;Ohne Speicher")
+    assert database.load_admin_setting('price_matrix_csv_data') == "Anzahl Module;Ohne Speicher"
+
+
+def test_external_writes_are_detected_after_revalidation(temp_db, monkeypatch):
+    """Direkte DB-Änderungen (andere Prozesse/Skripte) werden über die Versionsprüfung erkannt"""
+    assert database.load_admin_setting('active_company_id') is None
+    conn = sqlite3.connect(temp_db)
+    conn.execute("INSERT INTO admin_settings (key, value, last_modified) VALUES ('external_key', 'x', '2999-01-01 00:00:00')")
+    conn.commit()
+    conn.close()
+    assert database.load_admin_setting('external_key') is None  # innerhalb des Prüfintervalls
+    monkeypatch.setattr(database, "ADMIN_SETTINGS_REVALIDATE_SECONDS", 0.0)
+    assert database.load_admin_setting('external_key') == 'x'
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Tests für perform_calculations_batch (viele Varianten in einem Aufruf)"""
+
+import math
+
+import calculations
+
+PRODUCTS = {
+    1: {'id': 1, 'model_name': 'Modul 420', 'capacity_w': 420, 'additional_cost_netto': 10.0},
+    2: {'id': 2, 'model_name': 'Speicher 10', 'power_kw': 5.0, 'additional_cost_netto': 500.0},
+}
+
+BASE_PROJECT = {
+    'customer_data': {'type': 'Privat'},
+    'project_details': {
+        'annual_consumption_kwh_yr': 4500, 'electricity_price_kwh': 0.35,
+        'module_quantity': 20, 'selected_module_id': 1,
+        'include_storage': True, 'selected_storage_id': 2, 'selected_storage_storage_power_kw': 10.0,
+        'roof_orientation': 'Süd', 'roof_inclination_deg': 30,
+    },
+    'economic_data': {'simulation_period_years': 20},
+}
+
+
+def _values_equal(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        return (math.isnan(a) and math.isnan(b)) or a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_values_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def test_batch_matches_single_calls(monkeypatch):
+    """Jede Batch-Variante liefert dasselbe Ergebnis wie ein Einzelaufruf"""
+    load_calls = []
+    def fake_load(key, default=None):
+        load_calls.append(key)
+        return default
+    monkeypatch.setattr(calculations, 'real_load_admin_setting', fake_load)
+    monkeypatch.setattr(calculations, 'real_get_product_by_id', PRODUCTS.get)
+
+    variants = [
+        {'project_details': {'module_quantity': 16}},
+        {'project_details': {'include_storage': False}},
+        {'project_details': {'feed_in_type': 'Volleinspeisung'}, 'economic_data': {'simulation_period_years': 30}},
+    ]
+    batch_results = calculations.perform_calculations_batch(BASE_PROJECT, variants)
+    # Einstellungen werden für den gesamten Batch nur einmal geladen
+    assert load_calls.count('global_constants') == 1
+    assert len(batch_results) == len(variants)
+
+    for variant, batch_result in zip(variants, batch_results):
+        single = calculations.perform_calculations(
+            calculations._merge_project_variant(BASE_PROJECT, variant), {}, []
+        )
+        for key, value in single.items():
+            if key == 'maintenance_schedule':  # enthält das aktuelle Datum
+                continue
+            assert _values_equal(value, batch_result[key]), key
+
+    assert len(batch_results[2]['annual_cash_flows_sim']) == 30
+    assert len(batch_results[0]['cumulative_cash_flows_sim']) == 21
+
+
+def test_price_scaled_runs_energy_stage_once(monkeypatch):
+    """Preisfaktoren skalieren nur die Wirtschaftlichkeit; Faktor 1.0 entspricht perform_calculations"""
+    monkeypatch.setattr(calculations, 'real_load_admin_setting', lambda key, default=None: default)
+    monkeypatch.setattr(calculations, 'real_get_product_by_id', PRODUCTS.get)
+    base_calls = []
+    original_base = calculations._calculate_project_base
+    monkeypatch.setattr(calculations, '_calculate_project_base', lambda *a, **kw: base_calls.append(1) or original_base(*a, **kw))
+
+    scaled = calculations.perform_calculations_price_scaled(BASE_PROJECT, [1.0, 1.2])
+    assert len(base_calls) == 1
+
+    single = calculations.perform_calculations(BASE_PROJECT, {}, [])
+    for key, value in single.items():
+        if key != 'maintenance_schedule':
+            assert _values_equal(value, scaled[0][key]), key
+
+    plain, expensive = scaled
+    assert expensive['price_factor'] == 1.2
+    assert math.isclose(expensive['subtotal_netto'], plain['subtotal_netto'] * 1.2)
+    assert math.isclose(expensive['total_investment_netto'], expensive['subtotal_netto'])
+    assert expensive['annual_pv_production_kwh'] == plain['annual_pv_production_kwh']
+    assert expensive['eigenverbrauch_pro_jahr_kwh'] == plain['eigenverbrauch_pro_jahr_kwh']
+    assert expensive['amortization_time_years'] > plain['amortization_time_years']
+    investment_delta = expensive['total_investment_netto'] - plain['total_investment_netto']
+    assert math.isclose(plain['cumulative_cash_flows_sim'][-1] - expensive['cumulative_cash_flows_sim'][-1],
+                        investment_delta + sum(expensive['annual_maintenance_costs_sim']) - sum(plain['annual_maintenance_costs_sim']))
+    assert math.isclose(expensive['cumulative_cash_flows_sim'][0], -expensive['total_investment_netto'])
@@ -0,0 +1,91 @@
+"""Tests für den inhaltsadressierten Diagramm-Cache (Plotly → PNG)."""
+
+import json
+
+import pytest
+
+import chart_cache
+
+
+class _FakeFigure:
+    """Figur mit Plotly-Schnittstelle (to_json/to_image), die Renderaufrufe zählt."""
+
+    def __init__(self, values, payload_size=100):
+        self.values = values
+        self.payload_size = payload_size
+        self.renders = 0
+
+    def to_json(self):
+        return json.dumps({"data": [{"y": self.values}]})
+
+    def to_image(self, format="png", width=None, height=None, scale=None):
+        self.renders += 1
+        return f"{format}:{width}x{height}@{scale}:{self.values}".encode().ljust(self.payload_size, b"\0")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(tmp_path):
+    chart_cache.configure_chart_cache(max_memory_bytes=10_000, disk_enabled=False, disk_dir=str(tmp_path / "charts"))
+    chart_cache.clear_chart_cache()
+    for key in chart_cache._stats:
+        chart_cache._stats[key] = 0
+    yield
+    chart_cache.configure_chart_cache(max_memory_bytes=chart_cache.DEFAULT_MAX_MEMORY_MB * 1024 * 1024,
+                                      disk_enabled=False, disk_dir=chart_cache.CHART_CACHE_DIR)
+    chart_cache.clear_chart_cache(include_disk=False)
+
+
+def test_identical_figures_render_once_and_size_is_part_of_key():
+    first = _FakeFigure([1, 2, 3])
+    same_numbers = _FakeFigure([1, 2, 3])
+    png = chart_cache.render_figure_cached(first, format="png", width=900, height=550, scale=2)
+    assert chart_cache.render_figure_cached(same_numbers, format="png", width=900, height=550, scale=2) == png
+    assert first.renders + same_numbers.renders == 1
+
+    chart_cache.render_figure_cached(same_numbers, format="png", width=600, height=400, scale=2)
+    chart_cache.render_figure_cached(_FakeFigure([1, 2, 4]), format="png", width=900, height=550, scale=2)
+    stats = chart_cache.get_chart_cache_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["hit_rate"] == pytest.approx(0.25)
+
+
+def test_memory_budget_evicts_least_recently_used():
+    chart_cache.configure_chart_cache(max_memory_bytes=250)
+    figures = [_FakeFigure([i]) for i in range(3)]
+    chart_cache.render_figure_cached(figures[0])
+    chart_cache.render_figure_cached(figures[1])
+    chart_cache.render_figure_cached(figures[0])  # 0 zuletzt benutzt
+    chart_cache.render_figure_cached(figures[2])  # verdrängt 1
+
+    stats = chart_cache.get_chart_cache_stats()
+    assert stats["entries"] == 2 and stats["memory_bytes"] <= 250
+    assert stats["evictions"] == 1
+    chart_cache.render_figure_cached(figures[0])
+    chart_cache.render_figure_cached(figures[1])
+    assert [f.renders for f in figures] == [1, 2, 1]
+
+
+def test_disk_tier_survives_memory_clear(tmp_path):
+    chart_cache.configure_chart_cache(disk_enabled=True)
+    figure = _FakeFigure([5, 6])
+    png = chart_cache.render_figure_cached(figure, width=900, height=550, scale=2)
+    chart_cache.clear_chart_cache(include_disk=False)
+
+    assert chart_cache.render_figure_cached(_FakeFigure([5, 6]), width=900, height=550, scale=2) == png
+    assert figure.renders == 1
+    assert chart_cache.get_chart_cache_stats()["disk_hits"] == 1
+    assert len(list((tmp_path / "charts").iterdir())) == 1
+
+
+def test_export_errors_are_not_cached():
+    class _BrokenFigure(_FakeFigure):
+        def to_image(self, **kwargs):
+            self.renders += 1
+            raise ValueError("Kaleido fehlt")
+
+    figure = _BrokenFigure([1])
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            chart_cache.render_figure_cached(figure)
+    assert figure.renders == 2
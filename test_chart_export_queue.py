@@ -0,0 +1,79 @@
+"""Tests für den verzögerten Diagramm-Export (Vormerken auf der Analyse-Seite, Rastern bei PDF-Anforderung)."""
+
+import json
+import os
+
+import pytest
+
+import chart_cache
+import chart_export_queue
+
+
+class _FakeFigure:
+    def __init__(self, values):
+        self.values = values
+
+    def to_json(self):
+        return json.dumps({"data": [{"y": self.values}]})
+
+
+def _fake_rasterize(spec):
+    # Modulebene, damit der Auftrag in Worker-Prozessen ausgeführt werden kann
+    values = json.loads(spec["figure_json"])["data"][0]["y"]
+    if values == ["kaputt"]:
+        raise RuntimeError("Kaleido abgestürzt")
+    return f"PNG {values} {spec['width']}x{spec['height']} {os.getpid()}".encode()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    chart_cache.configure_chart_cache(disk_enabled=False)
+    chart_cache.clear_chart_cache(include_disk=False)
+    yield
+    chart_cache.clear_chart_cache(include_disk=False)
+
+
+def test_registered_charts_are_rasterized_on_demand_with_progress():
+    results = {"daily_production_switcher_chart_bytes": b"altes Diagramm"}
+    chart_export_queue.register_chart_export(results, "daily_production_switcher_chart_bytes", _FakeFigure([1, 2]), width=900, height=550)
+    chart_export_queue.register_chart_export(results, "cost_projection_chart_bytes", _FakeFigure([3]), width=900, height=550)
+    chart_export_queue.register_chart_export(results, "ignored_chart_bytes", None)
+
+    assert "daily_production_switcher_chart_bytes" not in results  # veraltetes Bild entfernt
+    assert chart_export_queue.is_chart_available(results, "cost_projection_chart_bytes")
+    assert not chart_export_queue.is_chart_available(results, "ignored_chart_bytes")
+
+    progress = []
+    stats = chart_export_queue.rasterize_pending_charts(results, max_workers=1, rasterize=_fake_rasterize,
+                                                        progress_callback=lambda done, total, key: progress.append((done, total)))
+
+    assert stats["total"] == 2 and stats["rendered"] == 2 and stats["failed"] == 0
+    assert progress == [(1, 2), (2, 2)]
+    assert results["daily_production_switcher_chart_bytes"].startswith(b"PNG [1, 2] 900x550")
+    assert chart_export_queue.PENDING_CHART_EXPORTS_KEY not in results
+
+
+def test_known_figures_are_filled_immediately_from_cache():
+    first = {}
+    chart_export_queue.register_chart_export(first, "roi_chart_bytes", _FakeFigure([7]))
+    chart_export_queue.rasterize_pending_charts(first, max_workers=1, rasterize=_fake_rasterize)
+
+    rerun = {}
+    chart_export_queue.register_chart_export(rerun, "roi_chart_bytes", _FakeFigure([7]))
+    assert rerun["roi_chart_bytes"] == first["roi_chart_bytes"]
+    assert chart_export_queue.pending_chart_keys(rerun) == []
+
+
+def test_worker_pool_isolates_failures():
+    results = {}
+    for i, values in enumerate([[1], ["kaputt"], [3], [4]]):
+        chart_export_queue.register_chart_export(results, f"chart_{i}_chart_bytes", _FakeFigure(values))
+    try:
+        stats = chart_export_queue.rasterize_pending_charts(results, max_workers=2, rasterize=_fake_rasterize)
+    finally:
+        chart_export_queue.shutdown_chart_export_pool()
+
+    assert stats["rendered"] == 3 and stats["failed"] == 1
+    assert results["chart_1_chart_bytes"] is None
+    worker_pids = {int(results[f"chart_{i}_chart_bytes"].split()[-1]) for i in (0, 2, 3)}
+    assert os.getpid() not in worker_pids
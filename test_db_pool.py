@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Tests für die gepoolten SQLite-Verbindungen (db_pool.py)"""
+
+import sqlite3
+import threading
+
+import db_pool
+
+
+def test_connections_are_reused_and_configured(tmp_path):
+    """close() gibt die Verbindung zurück, der nächste Aufruf erhält dieselbe (WAL, Row-Factory)"""
+    path = str(tmp_path / "pool.db")
+    before = db_pool.get_pool_stats()
+    conn = db_pool.get_connection(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db_pool.BUSY_TIMEOUT_MS
+    conn.row_factory = None
+    conn.close()
+    again = db_pool.get_connection(path)
+    assert again is conn and again.row_factory is sqlite3.Row
+    nested = db_pool.get_connection(path)  # verschachtelte Nutzung -> eigene Verbindung
+    assert nested is not again
+    nested.close()
+    again.close()
+    stats = db_pool.get_pool_stats()
+    assert stats['reused'] >= before['reused'] + 1
+    assert stats['opened'] >= before['opened'] + 2
+
+
+def test_close_discards_uncommitted_changes(tmp_path):
+    """Wie beim echten Schließen: nicht committete Änderungen werden verworfen"""
+    path = str(tmp_path / "pool.db")
+    conn = db_pool.get_connection(path)
+    conn.execute("CREATE TABLE t (v INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    conn = db_pool.get_connection(path)
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.execute("INSERT INTO t VALUES (2)")
+    conn.commit()
+    conn.close()
+
+    seen = []
+    def reader():
+        c = db_pool.get_connection(path)
+        seen.append((id(c), c.execute("SELECT COUNT(*) FROM t").fetchone()[0]))
+        c.close()
+    worker = threading.Thread(target=reader)
+    worker.start()
+    worker.join()
+    assert seen[0][1] == 1 and seen[0][0] != id(db_pool.get_connection(path))
+
+
+def test_close_all_connections_forces_reopen(tmp_path):
+    """Nach close_all_connections (Restore/Reset) werden neue Verbindungen geöffnet"""
+    path = str(tmp_path / "pool.db")
+    conn = db_pool.get_connection(path)
+    conn.close()
+    assert db_pool.close_all_connections() >= 1
+    fresh = db_pool.get_connection(path)
+    assert fresh is not conn
+    assert fresh.execute("SELECT 1").fetchone()[0] == 1
+    fresh.close()
+
+
+def test_connection_execute_counts_lock_timeouts(tmp_path):
+    """Auch conn.execute/executemany (nicht nur Cursor-Anweisungen) fließen in die Sperr-Zähler ein"""
+    path = str(tmp_path / "pool.db")
+    writer = db_pool.get_connection(path)
+    writer.execute("CREATE TABLE t (v INTEGER)")
+    writer.commit()
+    writer.execute("BEGIN IMMEDIATE")
+    other = sqlite3.connect(path, timeout=0, factory=db_pool.PooledConnection)
+    before = db_pool.get_pool_stats()
+    for statement in (lambda: other.execute("INSERT INTO t VALUES (1)"),
+                      lambda: other.executemany("INSERT INTO t VALUES (?)", [(2,), (3,)])):
+        try:
+            statement()
+        except sqlite3.OperationalError:
+            pass
+    stats = db_pool.get_pool_stats()
+    assert stats['lock_timeouts'] == before['lock_timeouts'] + 2
+    other.close_for_real()
+    writer.rollback()
+    writer.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Tests für die stündliche Energiebilanz (calculations_hourly.py)"""
+
+import time
+
+import numpy as np
+
+from calculations_hourly import (
+    HOURS_PER_YEAR, build_hourly_pv_profile, build_hourly_load_profile,
+    simulate_hourly_energy_balance, run_hourly_energy_balance
+)
+
+MONTHLY_PROD = [300, 450, 750, 1000, 1150, 1200, 1180, 1050, 800, 550, 320, 250]
+MONTHLY_CONS = [450] * 12
+
+
+def test_profiles_keep_monthly_totals():
+    """Stundenprofile müssen die Monatssummen exakt reproduzieren"""
+    pv = build_hourly_pv_profile(MONTHLY_PROD, 48.1)
+    load = build_hourly_load_profile(MONTHLY_CONS)
+    assert pv.shape == (HOURS_PER_YEAR,) and load.shape == (HOURS_PER_YEAR,)
+    assert abs(pv.sum() - sum(MONTHLY_PROD)) < 1e-6
+    assert abs(load.sum() - sum(MONTHLY_CONS)) < 1e-6
+    # Nachts keine PV-Produktion
+    assert pv[0] == 0.0 and pv[23] == 0.0
+
+
+def test_energy_conservation_with_storage():
+    """PV = Direktverbrauch + Ladung + Einspeisung, Last = Direktverbrauch + Entladung + Netzbezug"""
+    pv = build_hourly_pv_profile(MONTHLY_PROD)
+    load = build_hourly_load_profile(MONTHLY_CONS)
+    sim = simulate_hourly_energy_balance(pv, load, storage_capacity_kwh=8.0, max_charge_kw=4.0,
+                                         max_discharge_kw=4.0, round_trip_efficiency=0.9)
+    eta = 0.9 ** 0.5
+    assert np.allclose(sim['direct_self_consumption'] + sim['storage_charge'] / eta + sim['feed_in'], pv)
+    assert np.allclose(sim['direct_self_consumption'] + sim['storage_discharge'] + sim['grid_import'], load)
+    assert sim['soc'].max() <= 8.0 + 1e-9
+    assert sim['storage_charge'].max() <= 4.0 * eta + 1e-9
+    assert sim['storage_discharge'].max() <= 4.0 + 1e-9
+
+
+def test_storage_raises_self_consumption_and_is_fast():
+    """Speicher erhöht den Eigenverbrauch, ein Jahr dauert deutlich unter 50 ms"""
+    without = run_hourly_energy_balance(MONTHLY_PROD, MONTHLY_CONS)
+    start = time.perf_counter()
+    with_storage = run_hourly_energy_balance(MONTHLY_PROD, MONTHLY_CONS, storage_capacity_kwh=10.0,
+                                             max_charge_kw=5.0, max_discharge_kw=5.0)
+    duration_ms = (time.perf_counter() - start) * 1000
+    assert sum(with_storage['monthly_storage_discharge_for_sc_kwh']) > 0
+    assert sum(with_storage['monthly_grid_bezug_kwh']) < sum(without['monthly_grid_bezug_kwh'])
+    assert sum(with_storage['monthly_feed_in_kwh']) < sum(without['monthly_feed_in_kwh'])
+    assert len(with_storage['monthly_feed_in_kwh']) == 12
+    # Vollzyklen sind physikalisch begrenzt (max. 1 pro Tag)
+    assert with_storage['storage_full_cycles_per_year_sim'] <= 365
+    assert duration_ms < 50, f"Simulation zu langsam: {duration_ms:.1f} ms"
+
+
+if __name__ == "__main__":
+    test_profiles_keep_monthly_totals()
+    test_energy_conservation_with_storage()
+    test_storage_raises_self_consumption_and_is_fast()
+    print("✅ Alle Tests der stündlichen Energiebilanz erfolgreich")
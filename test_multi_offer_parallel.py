@@ -0,0 +1,60 @@
+"""Tests für die parallele PDF-Erstellung im Multi-Firmen-Angebotsgenerator."""
+
+import os
+import pickle
+
+import pytest
+
+import database
+from multi_offer_generator import MultiCompanyOfferGenerator
+
+
+@pytest.fixture(autouse=True)
+def temp_db(monkeypatch, tmp_path):
+    # Admin-Einstellungen beim Job-Aufbau nicht aus/in die echte data/app_data.db lesen
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+    yield str(tmp_path / "app_data.db")
+    database.invalidate_admin_settings_cache()
+
+
+def _fake_render_job(job):
+    # Modulebene, damit der Auftrag in Worker-Prozessen ausgeführt werden kann
+    if job["company_name"] == "Kaputt GmbH":
+        raise RuntimeError("Rendering fehlgeschlagen")
+    return {"company_index": job["company_index"], "company_name": job["company_name"],
+            "pdf_content": f"%PDF {job['company_name']} {os.getpid()}".encode(), "error": None}
+
+
+def _jobs(names):
+    return [{"company_index": i, "company_name": name, "generate_kwargs": {}} for i, name in enumerate(names)]
+
+
+def test_build_pdf_job_is_picklable():
+    generator = MultiCompanyOfferGenerator.__new__(MultiCompanyOfferGenerator)
+    offer_data = {"customer_data": {"last_name": "Muster"}, "project_details": {"selected_module_id": 3}, "module_quantity": 20}
+    job = generator._build_pdf_job(offer_data, {"id": 7, "name": "Solar A"}, 0)
+    restored = pickle.loads(pickle.dumps(job))
+    assert restored["company_name"] == "Solar A"
+    assert restored["generate_kwargs"]["project_data"]["project_details"]["selected_module_id"] == 3
+    assert restored["generate_kwargs"]["active_company_id"] == 7
+
+
+def test_parallel_results_stream_and_failures_are_isolated():
+    generator = MultiCompanyOfferGenerator.__new__(MultiCompanyOfferGenerator)
+    names = ["Solar A", "Kaputt GmbH", "Solar C", "Solar D"]
+    results = list(generator._iter_pdf_results(_jobs(names), max_workers=2, render_job=_fake_render_job))
+
+    by_name = {r["company_name"]: r for r in results}
+    assert sorted(by_name) == sorted(names)
+    assert by_name["Kaputt GmbH"]["pdf_content"] is None
+    assert "Rendering fehlgeschlagen" in by_name["Kaputt GmbH"]["error"]
+    assert all(by_name[n]["pdf_content"].startswith(b"%PDF") for n in names if n != "Kaputt GmbH")
+    worker_pids = {int(by_name[n]["pdf_content"].split()[-1]) for n in names if n != "Kaputt GmbH"}
+    assert os.getpid() not in worker_pids
+
+
+def test_single_worker_runs_in_process():
+    generator = MultiCompanyOfferGenerator.__new__(MultiCompanyOfferGenerator)
+    results = list(generator._iter_pdf_results(_jobs(["Solar A", "Solar B"]), max_workers=1, render_job=_fake_render_job))
+    assert [r["company_name"] for r in results] == ["Solar A", "Solar B"]
+    assert all(r["pdf_content"].endswith(str(os.getpid()).encode()) for r in results)
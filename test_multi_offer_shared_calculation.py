@@ -0,0 +1,52 @@
+"""Tests für die gemeinsame Berechnung im Multi-Firmen-Angebot (einmal rechnen, je Firma nur Preisstufe)."""
+
+import math
+
+import calculations
+from multi_offer_generator import MultiCompanyOfferGenerator
+
+PRODUCTS = {
+    1: {'id': 1, 'model_name': 'Modul 420', 'capacity_w': 420, 'additional_cost_netto': 10.0},
+    2: {'id': 2, 'model_name': 'Modul 450', 'capacity_w': 450, 'additional_cost_netto': 12.0},
+}
+
+PROJECT = {
+    'customer_data': {'type': 'Privat'},
+    'project_details': {'annual_consumption_kwh_yr': 4500, 'electricity_price_kwh': 0.35,
+                        'roof_orientation': 'Süd', 'roof_inclination_deg': 30},
+    'economic_data': {'simulation_period_years': 20},
+}
+
+
+def _prepared(index, module_id):
+    details = {'module_quantity': 20, 'include_storage': False, 'selected_module_id': module_id}
+    return {'company_index': index, 'company': {'id': index + 1}, 'company_name': f'Firma {index + 1}',
+            'offer_data': {'project_details': details}}
+
+
+def test_energy_stage_once_per_product_set(monkeypatch):
+    monkeypatch.setattr(calculations, 'real_load_admin_setting', lambda key, default=None: default)
+    monkeypatch.setattr(calculations, 'real_get_product_by_id', PRODUCTS.get)
+    base_calls = []
+    original_base = calculations._calculate_project_base
+    monkeypatch.setattr(calculations, '_calculate_project_base', lambda *a, **kw: base_calls.append(1) or original_base(*a, **kw))
+
+    generator = MultiCompanyOfferGenerator.__new__(MultiCompanyOfferGenerator)
+    settings = {'price_increment_percent': 10, 'price_calculation_mode': 'linear'}
+    prepared = [_prepared(0, 1), _prepared(1, 2), _prepared(2, 1)]
+    results = generator._calculate_company_results(prepared, PROJECT, settings)
+
+    assert len(base_calls) == 2  # zwei Produktkombinationen
+    assert sorted(results) == [0, 1, 2]
+    assert results[0]['price_factor'] == 1.0
+    assert math.isclose(results[2]['price_factor'], 1.2)
+    assert results[2]['annual_pv_production_kwh'] == results[0]['annual_pv_production_kwh']
+    assert math.isclose(results[2]['subtotal_netto'], results[0]['subtotal_netto'] * 1.2)
+    assert results[1]['anlage_kwp'] == 9.0
+
+
+def test_without_project_details_falls_back_to_price_scaling():
+    generator = MultiCompanyOfferGenerator.__new__(MultiCompanyOfferGenerator)
+    assert generator._calculate_company_results([_prepared(0, 1)], {}, {}) == {}
+    assert generator.get_price_factor(3, {'price_increment_percent': 5, 'price_calculation_mode': 'custom',
+                                          'custom_price_factors': '[1.0, 1.1]'}) == 1.1
@@ -0,0 +1,62 @@
+"""Tests für die Auslagerung von Multi-Angebots-PDFs und das blockweise erzeugte ZIP."""
+
+import os
+import time
+import zipfile
+
+import offer_spool
+from multi_offer_generator import MultiCompanyOfferGenerator
+
+
+def test_zip_is_stored_sorted_and_built_from_disk(tmp_path):
+    spool = offer_spool.OfferSpool(root=str(tmp_path))
+    generator = MultiCompanyOfferGenerator.__new__(MultiCompanyOfferGenerator)
+
+    # Firma 1 schreibt wie ein Worker direkt in die Datei, Firma 0 liefert Bytes
+    worker_path = spool.path_for(1, "Angebot_B/C GmbH_Muster.pdf")
+    with open(worker_path, "wb") as fh:
+        fh.write(b"%PDF-1.4 B" * 1000)
+    generator._spool_pdf_result(spool, {"company_index": 1, "company_name": "B/C GmbH", "pdf_path": worker_path},
+                                "Angebot_B_C_Muster.pdf")
+    generator._spool_pdf_result(spool, {"company_index": 0, "company_name": "A", "pdf_content": b"%PDF-1.4 A",
+                                        "peak_rss_mb": 180.0},
+                                "Angebot_A_Muster.pdf")
+
+    zip_path = spool.build_zip("Multi_Angebote_Muster.zip")
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = zf.infolist()
+        assert [i.filename for i in infos] == ["Angebot_A_Muster.pdf", "Angebot_B_C_Muster.pdf"]
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in infos)
+        assert zf.read("Angebot_B_C_Muster.pdf") == b"%PDF-1.4 B" * 1000
+
+    stats = spool.stats()
+    assert stats["files"] == 2
+    assert stats["total_bytes"] == 10 + 10000
+    assert stats["largest_buffered_bytes"] == 10  # das Worker-PDF lief nicht durch den Speicher
+    assert stats["worker_peak_rss_mb"] == 180.0
+    assert os.path.dirname(worker_path) == spool.directory
+
+    spool.cleanup()
+    assert not os.path.exists(spool.directory)
+
+
+def test_expired_spools_are_removed_on_new_run(tmp_path):
+    old_spool = offer_spool.OfferSpool(root=str(tmp_path))
+    recent_spool = offer_spool.OfferSpool(root=str(tmp_path))
+    expired = time.time() - offer_spool.SPOOL_MAX_AGE_SECONDS - 60
+    os.utime(old_spool.directory, (expired, expired))
+    unrelated = tmp_path / "fremd"
+    unrelated.mkdir()
+    os.utime(unrelated, (expired, expired))
+
+    new_spool = offer_spool.OfferSpool(root=str(tmp_path))
+
+    assert new_spool.expired_removed == 1
+    assert not os.path.exists(old_spool.directory)
+    assert os.path.exists(recent_spool.directory)
+    assert unrelated.exists()
+
+
+def test_safe_filename_strips_path_separators():
+    assert offer_spool.safe_filename("../Solar & Co/GmbH.pdf") == "Solar_Co_GmbH.pdf"
+    assert offer_spool.safe_filename("///") == "datei"
@@ -0,0 +1,157 @@
+"""Tests für den prozessweiten Bild-Asset-Cache der PDF-Erzeugung."""
+
+import base64
+import io
+
+import pytest
+
+pytest.importorskip("reportlab")
+PILImage = pytest.importorskip("PIL.Image")
+from pypdf import PdfReader
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate
+
+import pdf_asset_cache
+import pdf_image_optimizer
+
+
+def _image_b64(size=(400, 200), fmt="PNG", color=(13, 55, 128)):
+    buffer = io.BytesIO()
+    PILImage.new("RGB", size, color).save(buffer, format=fmt)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _photo_bytes(size=(3000, 2000), fmt="JPEG"):
+    """Foto-ähnliches Bild (Verlauf + Rauschen, deutlich mehr als 256 Farben)."""
+    gradient = PILImage.linear_gradient("L").resize(size)
+    noise = PILImage.effect_noise(size, 40)
+    image = PILImage.merge("RGB", (gradient, noise, gradient.transpose(PILImage.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=95) if fmt == "JPEG" else image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    pdf_asset_cache.clear_asset_cache()
+    yield
+    pdf_asset_cache.clear_asset_cache()
+
+
+def test_payload_is_decoded_once_and_shared_across_representations():
+    logo = _image_b64()
+    first = pdf_asset_cache.get_image_asset(logo)
+    again = pdf_asset_cache.get_image_asset(logo)
+    as_uri = pdf_asset_cache.get_image_asset("data:image/png;base64," + logo)
+    as_bytes = pdf_asset_cache.get_image_asset(base64.b64decode(logo))
+
+    assert first is again is as_uri is as_bytes
+    assert (first.width, first.height) == (400, 200)
+    stats = pdf_asset_cache.get_asset_cache_stats()
+    assert stats['misses'] == 1 and stats['hits'] == 3 and stats['entries'] == 1
+
+
+def test_invalid_payloads_return_none():
+    assert pdf_asset_cache.get_image_asset(None) is None
+    assert pdf_asset_cache.get_image_asset("none") is None
+    assert pdf_asset_cache.get_image_asset(base64.b64encode(b"kein bild").decode()) is None
+
+
+def test_large_images_get_a_cached_prescaled_variant():
+    photo = _photo_bytes()
+    original = pdf_asset_cache.get_image_asset(photo)
+    variant = pdf_asset_cache.get_image_asset(photo, 3 * cm, 2 * cm)
+
+    assert variant is not original and variant.key == original.key
+    assert variant.width < 400 and abs(variant.width / variant.height - 1.5) < 0.01
+    assert variant.reader.jpeg_fh() is not None
+    assert pdf_asset_cache.get_image_asset(photo, 3 * cm, 2 * cm) is variant
+    assert pdf_asset_cache.get_optimized_image_bytes(photo, 3 * cm, 2 * cm) == variant.data
+    # Kleine Bilder werden nicht verkleinert, ein passendes JPEG auch nicht nachkodiert
+    small = _photo_bytes(size=(120, 80))
+    assert pdf_asset_cache.get_image_asset(small, 3 * cm, 2 * cm) is pdf_asset_cache.get_image_asset(small)
+
+
+def test_logo_on_every_page_is_embedded_once():
+    logo = _image_b64()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for _ in range(5):
+        for box in ((3 * cm, 2 * cm), (1.8 * cm, 1 * cm)):
+            asset = pdf_asset_cache.get_image_asset(logo, 3 * cm, 2 * cm)
+            c.drawImage(asset.reader, 50, 50, *asset.fit_size(*box), mask='auto')
+        c.showPage()
+    c.save()
+
+    reader = PdfReader(io.BytesIO(buffer.getvalue()))
+    xobject_ids = set()
+    for page in reader.pages:
+        for ref in page["/Resources"]["/XObject"].values():
+            xobject_ids.add(ref.idnum)
+    assert len(xobject_ids) == 1
+
+
+def test_cached_image_flowable_builds():
+    asset = pdf_asset_cache.get_image_asset(_image_b64())
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer).build([pdf_asset_cache.CachedImage(asset, width=6 * cm, height=3 * cm),
+                                     pdf_asset_cache.CachedImage(asset, width=4 * cm, height=2 * cm)])
+    assert buffer.getvalue().startswith(b"%PDF")
+
+
+def test_profiles_choose_resolution_and_encoding_by_content():
+    photo_png = _photo_bytes(size=(2400, 1600), fmt="PNG")
+    screen = pdf_asset_cache.get_image_asset(photo_png, 10 * cm, profile='screen')
+    printed = pdf_asset_cache.get_image_asset(photo_png, 10 * cm, profile='print')
+    assert screen.width == round(10 / 2.54 * 150) and printed.width == round(10 / 2.54 * 300)
+    assert screen.data[:2] == b"\xff\xd8" and len(screen.data) < len(printed.data) < len(photo_png)
+
+    # Logo mit Transparenz bleibt PNG, die Grafik mit wenigen Farben wird Paletten-PNG
+    logo = io.BytesIO()
+    PILImage.new("RGBA", (2000, 1000), (0, 0, 0, 0)).save(logo, format="PNG")
+    logo_variant = pdf_asset_cache.get_image_asset(logo.getvalue(), 3 * cm, 2 * cm)
+    assert logo_variant.data.startswith(b"\x89PNG") and logo_variant.reader._dataA is not None
+    flat = pdf_asset_cache.get_image_asset(_image_b64(size=(3000, 1500)), 3 * cm, 2 * cm)
+    assert PILImage.open(io.BytesIO(flat.data)).mode == "P"
+
+
+def test_report_counts_bytes_saved_per_offer():
+    photo = _photo_bytes()
+    small_jpeg = _photo_bytes(size=(200, 100))
+    with pdf_image_optimizer.image_optimization('screen') as report:
+        for _ in range(3):
+            pdf_asset_cache.get_image_asset(photo, 8 * cm, 6 * cm)
+        pdf_asset_cache.get_image_asset(small_jpeg, 8 * cm, 6 * cm)
+        assert pdf_image_optimizer.active_image_profile() == 'screen'
+    assert pdf_image_optimizer.active_image_profile() == pdf_image_optimizer.DEFAULT_IMAGE_PROFILE
+
+    assert len(report.images) == 2
+    assert report.original_bytes == len(photo) + len(small_jpeg)
+    assert report.bytes_saved > len(photo) // 2
+    assert "gespart" in report.summary()
+
+
+def test_concurrent_requests_optimize_once_outside_the_lock(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    photo = _photo_bytes(size=(1600, 1200))
+    calls = []
+    original_optimize = pdf_asset_cache.optimize_image
+
+    def _counting_optimize(*args, **kwargs):
+        # Die teure Arbeit darf andere Bilder nicht über den globalen Lock blockieren
+        acquired = pdf_asset_cache._lock.acquire(timeout=2)
+        if acquired:
+            pdf_asset_cache._lock.release()
+        calls.append(acquired)
+        return original_optimize(*args, **kwargs)
+
+    monkeypatch.setattr(pdf_asset_cache, "optimize_image", _counting_optimize)
+    optimized_before = pdf_asset_cache.get_asset_cache_stats()['optimized']
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        variants = list(pool.map(lambda _: pdf_asset_cache.get_image_asset(photo, 4 * cm, 3 * cm), range(16)))
+
+    assert calls == [True]
+    assert all(variant is variants[0] for variant in variants)
+    assert pdf_asset_cache.get_asset_cache_stats()['optimized'] == optimized_before + 1
@@ -0,0 +1,102 @@
+"""Tests für den Anhang-Service (gecachte Datenblätter, Deduplizierung, Schreiben in Streams/Dateien)."""
+
+import io
+import os
+import shutil
+import threading
+
+import pytest
+
+pytest.importorskip("reportlab")
+pypdf = pytest.importorskip("pypdf")
+from reportlab.pdfgen import canvas
+
+import pdf_attachment_service
+
+
+def _pdf_bytes(label, pages=1):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for page in range(pages):
+        c.drawString(72, 720, f"{label} {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def _texts(pdf_bytes):
+    return [page.extract_text().strip() for page in pypdf.PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    pdf_attachment_service.clear_attachment_cache()
+    yield
+    pdf_attachment_service.clear_attachment_cache()
+
+
+def test_attachments_are_parsed_once_and_reloaded_after_change(tmp_path):
+    path = _write(tmp_path / "modul.pdf", _pdf_bytes("Modul", 2))
+    first = pdf_attachment_service.load_attachment(path)
+    assert pdf_attachment_service.load_attachment(path) is first
+
+    _write(path, _pdf_bytes("Modul neu", 3))
+    os.utime(path, ns=(first.signature[0] + 10**9, first.signature[0] + 10**9))
+    reloaded = pdf_attachment_service.load_attachment(path)
+    assert reloaded is not first and len(reloaded.reader.pages) == 3
+
+    stats = pdf_attachment_service.get_attachment_cache_stats()
+    assert stats['misses'] == 2 and stats['hits'] == 1 and stats['reloads'] == 1
+
+
+def test_offer_keeps_order_and_skips_duplicate_missing_and_broken_attachments(tmp_path):
+    modul = _write(tmp_path / "modul.pdf", _pdf_bytes("Modul"))
+    kopie = str(tmp_path / "modul_kopie.pdf")
+    shutil.copy(modul, kopie)
+    wr = _write(tmp_path / "wechselrichter.pdf", _pdf_bytes("WR", 2))
+    kaputt = _write(tmp_path / "kaputt.pdf", b"%PDF-1.4 kein pdf")
+
+    merged = pdf_attachment_service.append_attachments(
+        _pdf_bytes("Angebot", 2), [modul, wr, kopie, str(tmp_path / "fehlt.pdf"), kaputt, modul])
+
+    assert _texts(merged) == ["Angebot 1", "Angebot 2", "Modul 1", "WR 1", "WR 2"]
+    assert pdf_attachment_service.get_attachment_cache_stats()['duplicates_skipped'] == 2
+
+
+def test_broken_main_document_keeps_offer_unchanged(tmp_path):
+    modul = _write(tmp_path / "modul.pdf", _pdf_bytes("Modul"))
+    assert pdf_attachment_service.append_attachments(b"kaputt", [modul]) == b"kaputt"
+
+
+def test_merge_streams_into_file_and_can_keep_duplicates(tmp_path):
+    modul = _write(tmp_path / "modul.pdf", _pdf_bytes("Modul"))
+    target = str(tmp_path / "angebot.pdf")
+    pages = pdf_attachment_service.write_merged_pdf([_pdf_bytes("Angebot"), modul, modul], target, deduplicate=False)
+    assert pages == 3 and not os.path.exists(target + ".tmp")
+    with open(target, 'rb') as f:
+        assert _texts(f.read()) == ["Angebot 1", "Modul 1", "Modul 1"]
+
+
+def test_shared_readers_are_safe_across_threads(tmp_path):
+    paths = [_write(tmp_path / f"blatt_{i}.pdf", _pdf_bytes(f"Blatt{i}", 3)) for i in range(4)]
+    results, errors = [], []
+
+    def _offer(index):
+        try:
+            results.append(len(_texts(pdf_attachment_service.append_attachments(_pdf_bytes(f"Angebot{index}"), paths))))
+        except Exception as e:  # pragma: no cover - nur bei Fehlern
+            errors.append(e)
+
+    threads = [threading.Thread(target=_offer, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and results == [13] * 6
+    assert pdf_attachment_service.get_attachment_cache_stats()['entries'] == 4
@@ -0,0 +1,57 @@
+"""Tests für den Entwurfsmodus der PDF-Vorschau."""
+
+import io
+
+import pytest
+
+pytest.importorskip("reportlab")
+from pypdf import PdfReader
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import PageBreak, Paragraph
+
+import pdf_draft_mode
+import pdf_image_optimizer
+
+
+def _story(pages):
+    style = getSampleStyleSheet()["Normal"]
+    story = []
+    for number in range(pages):
+        story.append(Paragraph(f"Seite {number + 1}", style))
+        story.append(PageBreak())
+    return story
+
+
+def _build(story, max_pages=None):
+    buffer = io.BytesIO()
+    doc = pdf_draft_mode.PageLimitDocTemplate(buffer, max_pages=max_pages)
+    doc.build(story)
+    return PdfReader(io.BytesIO(buffer.getvalue())), doc
+
+
+def test_build_stops_after_requested_pages():
+    reader, doc = _build(_story(12), max_pages=3)
+    assert len(reader.pages) == 3 and doc.page_limit_reached
+    assert "Seite 3" in reader.pages[2].extract_text()
+
+
+def test_without_limit_the_document_is_complete():
+    reader, doc = _build(_story(5))
+    assert len(reader.pages) == 5 and not doc.page_limit_reached
+    reader, _ = _build(_story(2), max_pages=10)
+    assert len(reader.pages) == 2
+
+
+def test_chart_placeholder_is_drawn_with_title():
+    reader, _ = _build([pdf_draft_mode.ChartPlaceholder("Kumulierter Cashflow", 16 * cm, 10 * cm)])
+    assert "Kumulierter Cashflow" in reader.pages[0].extract_text()
+
+
+def test_draft_options_leave_export_options_untouched():
+    export_options = {"include_all_documents": True, "image_profile": "print"}
+    draft = pdf_draft_mode.draft_inclusion_options(export_options, max_pages=3)
+    assert draft["draft_mode"] and draft["draft_max_pages"] == 3 and not draft["include_all_documents"]
+    assert export_options == {"include_all_documents": True, "image_profile": "print"}
+    profiles = pdf_image_optimizer.IMAGE_PROFILES
+    assert profiles[pdf_draft_mode.DRAFT_IMAGE_PROFILE]["dpi"] < profiles["screen"]["dpi"]
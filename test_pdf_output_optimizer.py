@@ -0,0 +1,64 @@
+"""Tests für die Größenoptimierung fertiger Angebots-PDFs."""
+
+import io
+
+import pytest
+
+pytest.importorskip("reportlab")
+pypdf = pytest.importorskip("pypdf")
+from reportlab.pdfgen import canvas
+
+import pdf_attachment_service
+import pdf_output_optimizer
+
+
+def _pdf_bytes(pages=3, text="Angebot", page_compression=0):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pageCompression=page_compression)
+    for number in range(pages):
+        for line in range(40):
+            c.drawString(72, 760 - line * 16, f"{text} Seite {number + 1} Zeile {line + 1} " * 3)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _page_texts(pdf_bytes):
+    return [page.extract_text() for page in pypdf.PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+
+def test_print_profile_compresses_and_keeps_content():
+    original = _pdf_bytes()
+    optimized, result = pdf_output_optimizer.optimize_pdf_output(original, 'print')
+
+    assert len(optimized) < len(original) // 2
+    assert _page_texts(optimized) == _page_texts(original)
+    assert result.original_bytes == len(original) and result.optimized_bytes == len(optimized)
+    assert result.bytes_saved > 0 and result.seconds > 0
+    assert "Deduplizierung" in result.steps and "KB" in result.summary()
+
+
+def test_identical_attachments_are_stored_once():
+    datasheet = _pdf_bytes(pages=2, text="Datenblatt", page_compression=1)
+    merged = pdf_attachment_service.merge_pdf_sources([_pdf_bytes(page_compression=1), datasheet, datasheet],
+                                                      deduplicate=False)
+    optimized, result = pdf_output_optimizer.optimize_pdf_output(merged, 'print')
+
+    assert len(pypdf.PdfReader(io.BytesIO(optimized)).pages) == 7
+    assert result.bytes_saved > len(datasheet) // 2
+
+
+def test_draft_and_broken_input_return_original():
+    original = _pdf_bytes()
+    draft, result = pdf_output_optimizer.optimize_pdf_output(original, 'draft')
+    assert draft is original and result.bytes_saved == 0
+
+    broken, result = pdf_output_optimizer.optimize_pdf_output(b"%PDF-1.4 kaputt", 'email')
+    assert broken == b"%PDF-1.4 kaputt" and result.error
+    assert pdf_output_optimizer.resolve_output_profile("unbekannt") == pdf_output_optimizer.DEFAULT_OUTPUT_PROFILE
+
+
+def test_output_is_never_larger_than_input():
+    original = _pdf_bytes(pages=1, page_compression=1)
+    optimized, _ = pdf_output_optimizer.optimize_pdf_output(original, 'print')
+    assert len(optimized) <= len(original)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Tests für den Preis-Matrix-Cache (price_matrix_service.py)"""
+
+import price_matrix_service as pms
+
+CSV_MATRIX = """Anzahl Module;Ohne Speicher;Speicher A
+10;9.000,00;14.000,00
+20;12.500,00;
+15;10.800,00;15.900,00
+"""
+
+
+def test_parse_once_per_content_hash():
+    """Gleicher Inhalt wird nur einmal geparst, neuer Inhalt erzeugt einen neuen Eintrag"""
+    pms.invalidate_price_matrix_cache()
+    before = pms.get_price_matrix_cache_stats()
+    errors = []
+    first = pms.get_price_matrix(None, CSV_MATRIX, errors)
+    second = pms.get_price_matrix(None, CSV_MATRIX, errors)
+    assert first is second and not errors
+    stats = pms.get_price_matrix_cache_stats()
+    assert stats['misses'] == before['misses'] + 1
+    assert stats['hits'] == before['hits'] + 1
+
+    changed = pms.get_price_matrix(None, CSV_MATRIX.replace("9.000,00", "9.100,00"), errors)
+    assert changed is not first
+    assert pms.get_price_matrix_cache_stats()['misses'] == before['misses'] + 2
+
+
+def test_lookup_uses_next_lower_module_count():
+    """searchsorted-Lookup: genau oder nächstkleinere Modulanzahl, Spaltennamen normalisiert"""
+    matrix = pms.get_price_matrix(None, CSV_MATRIX, [])
+    assert list(matrix.module_counts) == [10, 15, 20]
+    assert matrix.lookup(17, "speicher a ") == (15900.0, "Speicher A", 15)
+    assert matrix.lookup(20, "Ohne Speicher") == (12500.0, "Ohne Speicher", 20)
+    # Leere Zelle -> kein Preis, aber Modulstufe bekannt
+    assert matrix.lookup(25, "Speicher A") == (None, None, 20)
+    assert matrix.row_for_module_quantity(9) is None
+
+
+def test_invalidation_clears_cache():
+    """Nach einem Upload verwirft invalidate_price_matrix_cache alle Einträge"""
+    pms.get_price_matrix(None, CSV_MATRIX, [])
+    pms.invalidate_price_matrix_cache()
+    stats = pms.get_price_matrix_cache_stats()
+    assert stats['entries'] == 0 and stats['invalidations'] >= 1
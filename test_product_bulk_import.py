@@ -0,0 +1,78 @@
+"""Tests für den transaktionalen Massenimport (product_db.bulk_import_products)."""
+
+import pandas as pd
+import pytest
+
+import database
+import product_db
+
+
+@pytest.fixture
+def product_db_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+    database.init_db()
+    product_db.invalidate_product_catalog()
+    yield product_db
+    product_db.invalidate_product_catalog()
+
+
+def _import_frame():
+    return pd.DataFrame({
+        "model_name": ["Alpha 450W", "Beta 400W", "", "Gamma 5K", "Beta 400W"],
+        "category": ["Modul", "Modul", "Modul", "Wechselrichter", "Modul"],
+        "price_euro": ["1.234,50", "160", "10", "abc", "165,5"],
+        "warranty_years": [25, 12, None, 10, 15],
+    })
+
+
+def test_bulk_import_upserts_in_one_transaction_with_row_report(product_db_tmp):
+    existing_id = product_db_tmp.add_product({"category": "Modul", "model_name": "Beta 400W", "brand": "BetaSun", "price_euro": 150.0})
+
+    report = product_db_tmp.bulk_import_products(_import_frame())
+
+    assert (report["inserted"], report["updated"], report["skipped"]) == (2, 1, 2)
+    reasons = {(err["row"], err.get("column")) for err in report["errors"]}
+    assert reasons == {(3, None), (4, None), (5, "price_euro")}
+
+    alpha = product_db_tmp.get_product_by_model_name("Alpha 450W")
+    assert alpha["price_euro"] == pytest.approx(1234.5)
+    assert alpha["warranty_years"] == 25
+    assert alpha["capacity_w"] == 0.0
+    beta = product_db_tmp.get_product_by_model_name("Beta 400W")
+    assert beta["id"] == existing_id
+    assert beta["price_euro"] == pytest.approx(165.5)
+    assert beta["warranty_years"] == 15
+    assert beta["brand"] == "BetaSun"  # nicht in der Datei -> unverändert
+    assert product_db_tmp.get_product_by_model_name("Gamma 5K")["price_euro"] is None
+
+
+def test_bulk_import_dry_run_writes_nothing(product_db_tmp):
+    report = product_db_tmp.bulk_import_products(_import_frame(), dry_run=True)
+    assert report["dry_run"] is True
+    assert (report["inserted"], report["updated"]) == (3, 0)
+    assert product_db_tmp.list_products() == []
+
+
+def test_bulk_import_requires_model_name_and_category(product_db_tmp):
+    report = product_db_tmp.bulk_import_products(pd.DataFrame({"model_name": ["X"]}))
+    assert report["inserted"] == 0
+    assert "category" in report["errors"][0]["reason"]
+
+
+def test_bulk_import_matches_model_names_case_insensitively(product_db_tmp):
+    existing_id = product_db_tmp.add_product({"category": "Modul", "model_name": "abc-400", "price_euro": 100.0})
+    frame = pd.DataFrame({
+        "model_name": ["ABC-400", "Neu 1", "NEU 1"],
+        "category": ["Modul", "Modul", "Modul"],
+        "price_euro": [120, 10, 11],
+        "image_base64": ["kein base64", None, None],
+    })
+
+    report = product_db_tmp.bulk_import_products(frame)
+
+    assert (report["inserted"], report["updated"], report["skipped"]) == (1, 1, 1)
+    assert {err["row"] for err in report["errors"]} == {2, 3}
+    products = product_db_tmp.list_products()
+    assert sorted(p["model_name"] for p in products) == ["NEU 1", "abc-400"]
+    abc = product_db_tmp.get_product_by_model_name("ABC-400")
+    assert abc["id"] == existing_id and abc["price_euro"] == pytest.approx(120.0)
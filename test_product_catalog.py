@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests für den In-Memory-Produktkatalog und das einmalige Schema-Setup (product_db.py)"""
+
+import pytest
+
+import database
+import product_db
+
+
+@pytest.fixture
+def temp_products(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+    product_db.invalidate_product_catalog()
+    product_db.add_product({"category": "Modul", "model_name": "beta 400W", "capacity_w": 400})
+    product_db.add_product({"category": "Modul", "model_name": "Alpha 450W", "capacity_w": 450})
+    product_db.add_product({"category": "Batteriespeicher", "model_name": "Cell 10", "storage_power_kw": 10.0})
+    yield
+    product_db.invalidate_product_catalog()
+
+
+def test_lookups_are_served_from_catalog(temp_products, monkeypatch):
+    """Nach dem ersten Laden greifen Lookups nicht mehr auf die DB zu"""
+    assert [p['model_name'] for p in product_db.list_products()] == ["Alpha 450W", "beta 400W", "Cell 10"]
+    calls = []
+    original = product_db.get_db_connection_safe_pd
+    monkeypatch.setattr(product_db, "get_db_connection_safe_pd", lambda: calls.append(1) or original())
+
+    module = product_db.get_product_by_model_name(" alpha 450w ")
+    assert module['capacity_w'] == 450
+    assert product_db.get_product_by_id(module['id'])['model_name'] == "Alpha 450W"
+    assert product_db.get_product_by_id(9999) is None
+    assert [p['model_name'] for p in product_db.list_products("Modul")] == ["Alpha 450W", "beta 400W"]
+    assert product_db.list_product_categories() == ["Batteriespeicher", "Modul"]
+    assert calls == []
+
+    # Rückgabewerte sind Kopien
+    module['capacity_w'] = 1
+    assert product_db.get_product_by_id(module['id'])['capacity_w'] == 450
+
+
+def test_writes_invalidate_catalog(temp_products):
+    """add/update/delete sind sofort in den Lookups sichtbar"""
+    storage = product_db.get_product_by_model_name("Cell 10")
+    assert product_db.update_product(storage['id'], {"storage_power_kw": 12.5})
+    assert product_db.get_product_by_id(storage['id'])['storage_power_kw'] == 12.5
+    new_id = product_db.add_product({"category": "Wechselrichter", "model_name": "Inverter 5K", "power_kw": 5.0})
+    assert product_db.get_product_by_id(new_id)['power_kw'] == 5.0
+    assert "Wechselrichter" in product_db.list_product_categories()
+    assert product_db.delete_product(new_id)
+    assert product_db.get_product_by_id(new_id) is None
+    assert product_db.get_product_catalog_stats()['invalidations'] >= 3
+
+
+def test_schema_setup_runs_once_per_database(temp_products, monkeypatch):
+    """create_product_table wird nach dem ersten Aufruf nicht erneut ausgeführt"""
+    ddl_calls = []
+    monkeypatch.setattr(product_db, "create_product_table", lambda conn: ddl_calls.append(conn))
+    product_db.invalidate_product_catalog()
+    product_db.list_products()
+    product_db.add_product({"category": "Modul", "model_name": "Gamma 500W"})
+    assert ddl_calls == []
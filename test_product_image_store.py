@@ -0,0 +1,76 @@
+"""Tests für die ausgelagerte Produktbild-Ablage (product_image_store) und deren Einbindung in product_db."""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+import database
+import product_db
+import product_image_store
+
+
+@pytest.fixture
+def product_db_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+    database.init_db()
+    product_db.invalidate_product_catalog()
+    yield product_db
+    product_db.invalidate_product_catalog()
+
+
+def _png_base64(color, size=(400, 300)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def test_image_stored_outside_products_row_with_thumbnails(product_db_tmp):
+    image_b64 = _png_base64("red")
+    product_id = product_db_tmp.add_product({"category": "Modul", "model_name": "Bild A", "image_base64": image_b64})
+
+    listed = product_db_tmp.list_products()[0]
+    assert listed["has_image"] is True
+    assert "image_base64" not in listed
+
+    conn = database.get_db_connection()
+    try:
+        assert conn.execute("SELECT image_base64 FROM products WHERE id = ?", (product_id,)).fetchone()[0] is None
+    finally:
+        conn.close()
+
+    assert product_db_tmp.get_product_by_id(product_id, include_image=True)["image_base64"] == image_b64
+    assert product_db_tmp.list_products(include_images=True)[0]["image_base64"] == image_b64
+    with Image.open(io.BytesIO(product_db_tmp.get_product_thumbnail(product_id, 64))) as thumb:
+        assert max(thumb.size) == 64
+
+
+def test_update_without_image_keeps_it_and_delete_removes_it(product_db_tmp):
+    product_id = product_db_tmp.add_product({"category": "Modul", "model_name": "Bild B", "image_base64": _png_base64("blue")})
+    assert product_db_tmp.update_product(product_id, {"price_euro": 99.0})
+    assert product_db_tmp.get_product_image_base64(product_id) is not None
+
+    new_image = _png_base64("green", (50, 50))
+    assert product_db_tmp.update_product_image(product_id, new_image)
+    assert product_db_tmp.get_product_image_base64(product_id) == new_image
+
+    assert product_db_tmp.delete_product(product_id)
+    assert product_image_store.get_product_image_bytes(product_id) is None
+    assert product_image_store.get_product_thumbnail(product_id) is None
+
+
+def test_inline_images_are_migrated_on_schema_setup(product_db_tmp, monkeypatch):
+    product_id = product_db_tmp.add_product({"category": "Modul", "model_name": "Altbestand"})
+    image_b64 = _png_base64("yellow")
+    conn = database.get_db_connection()
+    try:
+        conn.execute("UPDATE products SET image_base64 = ? WHERE id = ?", (image_b64, product_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+    monkeypatch.setattr(product_db, "_schema_ready_for", set())
+    product_db_tmp.invalidate_product_catalog()
+    assert product_db_tmp.get_product_by_id(product_id)["has_image"] is True
+    assert product_image_store.get_product_image_base64(product_id) == image_b64
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests für den persistenten PVGIS-Cache (pvgis_cache.py + get_pvgis_data)"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import calculations
+import pvgis_cache
+
+MONTHLY_PER_KWP = [30, 45, 75, 100, 115, 120, 118, 105, 80, 55, 32, 25]
+
+
+class _PvgisStubHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        _PvgisStubHandler.requests_seen.append(self.path)
+        peak = float(self.path.split("peakpower=")[1].split("&")[0])
+        payload = {
+            "outputs": {
+                "monthly": [{"month": i + 1, "E_m": e * peak} for i, e in enumerate(MONTHLY_PER_KWP)],
+                "totals": {"fixed": {"E_y": sum(MONTHLY_PER_KWP) * peak, "Yield_y": float(sum(MONTHLY_PER_KWP))}},
+            },
+            "meta": {"source": "PVGIS-Stub"},
+        }
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pvgis_stub(monkeypatch, tmp_path):
+    server = HTTPServer(("127.0.0.1", 0), _PvgisStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _PvgisStubHandler.requests_seen = []
+    monkeypatch.setattr(calculations, "PVGIS_API_URL", f"http://127.0.0.1:{server.server_port}/api/seriescalc")
+    monkeypatch.setattr(pvgis_cache, "PVGIS_CACHE_DB_PATH", str(tmp_path / "pvgis_cache.db"))
+    yield _PvgisStubHandler.requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_second_call_is_served_from_cache(pvgis_stub):
+    """Erster Aufruf geht ans Netz, der zweite (gleiche Lage) kommt aus dem Cache"""
+    errors = []
+    first = calculations.get_pvgis_data(48.137, 11.575, 8.0, 30, 0, errors_list=errors)
+    second = calculations.get_pvgis_data(48.137, 11.575, 8.0, 30, 0, errors_list=errors)
+    assert not errors
+    assert len(pvgis_stub) == 1
+    assert first["pvgis_cache_hit"] is False and second["pvgis_cache_hit"] is True
+    assert second["monthly_production_kwh"] == pytest.approx(first["monthly_production_kwh"])
+    assert second["annual_production_kwh"] == pytest.approx(first["annual_production_kwh"])
+
+
+def test_cache_entry_is_scaled_to_system_size(pvgis_stub):
+    """Normierte Einträge werden für andere Anlagengrößen wiederverwendet"""
+    calculations.get_pvgis_data(52.52, 13.405, 10.0, 35, 0)
+    scaled = calculations.get_pvgis_data(52.521, 13.404, 4.0, 35, 0)  # gleiche Rasterzelle
+    assert len(pvgis_stub) == 1
+    assert scaled["pvgis_cache_hit"] is True
+    assert scaled["annual_production_kwh"] == pytest.approx(sum(MONTHLY_PER_KWP) * 4.0)
+    assert scaled["specific_yield_kwh_kwp_pa"] == pytest.approx(sum(MONTHLY_PER_KWP))
+
+
+def test_offline_mode_miss_returns_none(pvgis_stub):
+    """Offline-Modus ohne Cache-Eintrag: kein Netzwerkzugriff, None plus Fehlermeldung"""
+    errors = []
+    result = calculations.get_pvgis_data(50.0, 8.0, 5.0, 30, 0, errors_list=errors, offline_mode=True)
+    assert result is None and errors
+    assert pvgis_stub == []
+
+
+def test_ttl_expiry_and_max_entries(pvgis_stub):
+    """Abgelaufene Einträge werden verworfen, der Cache bleibt auf max_entries begrenzt"""
+    key = pvgis_cache.make_cache_key(50.0, 8.0, 30, 0, 14.0)
+    pvgis_cache.store_pvgis_per_kwp(key, {"monthly_production_kwh": [1.0] * 12, "annual_production_kwh": 12.0})
+    assert pvgis_cache.get_cached_pvgis_per_kwp(key, ttl_days=1) is not None
+    assert pvgis_cache.get_cached_pvgis_per_kwp(key, ttl_days=1e-9) is None
+    assert pvgis_cache.get_cached_pvgis_per_kwp(key, ttl_days=None) is None  # bereits gelöscht
+
+    for i in range(5):
+        pvgis_cache.store_pvgis_per_kwp(f"key-{i}", {"annual_production_kwh": float(i)}, max_entries=3)
+        time.sleep(0.002)
+    assert pvgis_cache.get_pvgis_cache_stats()["entries"] == 3
+    assert pvgis_cache.get_cached_pvgis_per_kwp("key-0", ttl_days=None) is None
+    assert pvgis_cache.get_cached_pvgis_per_kwp("key-4", ttl_days=None) is not None
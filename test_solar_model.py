@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests für das lokale Einstrahlungs- und Ertragsmodell (solar_model.py)"""
+
+import time
+
+import numpy as np
+
+import calculations
+import solar_model
+
+
+def test_output_matches_pvgis_format_and_is_fast():
+    """Gleiches Format wie get_pvgis_data plus Stundenreihe, ein Jahr in wenigen Millisekunden"""
+    solar_model.get_local_yield_data(48.14, 11.58, 8.0, 30, 0)  # Typjahr anlegen (Cache)
+    start = time.perf_counter()
+    result = solar_model.get_local_yield_data(48.14, 11.58, 8.0, 30, 0)
+    duration_ms = (time.perf_counter() - start) * 1000
+    assert len(result["monthly_production_kwh"]) == 12
+    assert result["hourly_production_kwh"].shape == (solar_model.HOURS_PER_YEAR,)
+    assert abs(sum(result["monthly_production_kwh"]) - result["annual_production_kwh"]) < 1e-6
+    # Plausibler spezifischer Ertrag für Süddeutschland
+    assert 950 < result["specific_yield_kwh_kwp_pa"] < 1200
+    assert result["hourly_production_kwh"][:5].sum() == 0.0  # Nachts keine Produktion
+    assert duration_ms < 50, f"Modell zu langsam: {duration_ms:.1f} ms"
+
+
+def test_orientation_and_location_effects():
+    """Süd schlägt Ost/West, Freiburg schlägt Hamburg"""
+    south = solar_model.get_local_yield_data(50.11, 8.68, 1.0, 35, 0)["annual_production_kwh"]
+    east = solar_model.get_local_yield_data(50.11, 8.68, 1.0, 35, -90)["annual_production_kwh"]
+    west = solar_model.get_local_yield_data(50.11, 8.68, 1.0, 35, 90)["annual_production_kwh"]
+    assert south > east and south > west
+    assert abs(east - west) / south < 0.05
+    freiburg = solar_model.get_local_yield_data(47.99, 7.85, 1.0, 35, 0)["annual_production_kwh"]
+    hamburg = solar_model.get_local_yield_data(53.55, 9.99, 1.0, 35, 0)["annual_production_kwh"]
+    assert freiburg > hamburg
+
+
+def test_imported_typical_year_csv():
+    """PVGIS-TMY-Format wird eingelesen und als UTC interpretiert"""
+    year = solar_model.get_typical_year(52.52, 13.40)
+    rows = [f"2010{h:04d}:{h % 24:02d}10,{t:.2f},80,{g:.1f},0,0,300,2.0,180,101000"
+            for h, (g, t) in enumerate(zip(year.ghi, year.temp_air))]
+    csv_text = "Latitude (decimal degrees):\t52.52\n\ntime(UTC),T2m,RH,G(h),Gb(n),Gd(h),IR(h),WS10m,WD10m,SP\n" + "\n".join(rows)
+    errors = []
+    imported = solar_model.load_typical_year_csv(csv_text, errors)
+    assert imported is not None and not errors
+    assert imported.utc_offset_hours == 0.0
+    assert np.allclose(imported.ghi, np.round(year.ghi, 1))
+    # Gb(n)/Gd(h) sind 0 -> gesamte Strahlung diffus, Ertrag muss trotzdem positiv sein
+    result = solar_model.get_local_yield_data(52.52, 13.40, 5.0, 30, 0, typical_year=imported)
+    assert result["annual_production_kwh"] > 0
+
+    errors = []
+    assert solar_model.load_typical_year_csv("a,b\n1,2\n", errors) is None and errors
+
+
+def test_perform_calculations_uses_local_model_without_pvgis(monkeypatch):
+    """Bei deaktiviertem PVGIS liefert das lokale Modell den Ertrag statt der Pauschalwerte"""
+    constants = calculations.Dummy_load_admin_setting_calc('global_constants')
+    constants['pvgis_enabled'] = False
+    def fake_load(key, default=None):
+        return constants if key == 'global_constants' else default
+    monkeypatch.setattr(calculations, 'real_load_admin_setting', fake_load)
+    monkeypatch.setattr(calculations, 'real_get_product_by_id', {
+        1: {'id': 1, 'model_name': 'Modul 420', 'capacity_w': 420},
+    }.get)
+    project = {
+        'customer_data': {'type': 'Privat'},
+        'project_details': {
+            'annual_consumption_kwh_yr': 4500, 'electricity_price_kwh': 0.35,
+            'module_quantity': 20, 'selected_module_id': 1,
+            'roof_orientation': 'Süd', 'roof_inclination_deg': 30,
+            'latitude': 48.14, 'longitude': 11.58, 'energy_balance_mode': 'hourly',
+        },
+        'economic_data': {'simulation_period_years': 20},
+    }
+    results = calculations.perform_calculations(project, {}, [])
+    expected = solar_model.get_local_yield_data(48.14, 11.58, 8.4, 30, 0)
+    assert results['local_solar_model_used'] is True and results['pvgis_data_used'] is False
+    assert results['pvgis_source'].startswith("Lokales Solarmodell")
+    assert abs(results['annual_pv_production_kwh'] - expected['annual_production_kwh']) < 1e-6
+    assert results['energy_balance_mode'] == 'hourly'
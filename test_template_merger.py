@@ -0,0 +1,85 @@
+"""Tests für das Zusammenführen von Overlay und gecachten Hintergrundseiten (pdf_template_engine.merger)."""
+
+import io
+import os
+
+import pytest
+
+pytest.importorskip("pypdf")
+pytest.importorskip("reportlab")
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from pdf_template_engine import merger
+
+
+def _pdf(texts):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for text in texts:
+        c.drawString(100, 700, text)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def bg_dir(tmp_path):
+    for i in range(1, 4):
+        (tmp_path / f"nt_{i:02d}.pdf").write_bytes(_pdf([f"Hintergrund {i}"]))
+    merger.clear_background_cache()
+    yield tmp_path
+    merger.clear_background_cache()
+
+
+def test_overlay_is_drawn_over_shared_background_form(bg_dir):
+    merged = merger.merge_template_pages(_pdf(["Overlay 1", "Overlay 2", "Overlay 3"]), bg_dir=bg_dir)
+
+    reader = PdfReader(io.BytesIO(merged))
+    assert len(reader.pages) == 3
+    for i, page in enumerate(reader.pages, start=1):
+        xobjects = page["/Resources"]["/XObject"]
+        assert xobjects["/TplBg"].get_object()["/Subtype"] == "/Form"
+        text = page.extract_text()
+        assert f"Hintergrund {i}" in text and f"Overlay {i}" in text
+
+
+def test_backgrounds_are_parsed_once_and_reloaded_on_change(bg_dir, monkeypatch):
+    overlay = _pdf(["Overlay 1", "Overlay 2"])
+    merger.merge_template_pages(overlay, bg_dir=bg_dir)
+
+    parsed = []
+    original_reader = merger.PdfReader
+    monkeypatch.setattr(merger, "PdfReader", lambda src, *a, **kw: parsed.append(src) or original_reader(src, *a, **kw))
+    merger.merge_template_pages(overlay, bg_dir=bg_dir)
+    assert len(parsed) == 1  # nur das Overlay
+
+    changed = bg_dir / "nt_02.pdf"
+    changed.write_bytes(_pdf(["Neuer Hintergrund"]))
+    os.utime(changed, ns=(changed.stat().st_atime_ns, changed.stat().st_mtime_ns + 1_000_000_000))
+    merged = merger.merge_template_pages(overlay, bg_dir=bg_dir)
+    assert len(parsed) == 3
+    assert "Neuer Hintergrund" in PdfReader(io.BytesIO(merged)).pages[1].extract_text()
+
+
+def test_page_count_follows_templates_and_overlay(bg_dir):
+    four_pages = _pdf([f"Overlay {i}" for i in range(1, 5)])
+    assert len(PdfReader(io.BytesIO(merger.merge_template_pages(four_pages, bg_dir=bg_dir))).pages) == 3
+    assert len(PdfReader(io.BytesIO(merger.merge_template_pages(four_pages, page_count=4, bg_dir=bg_dir))).pages) == 4
+    assert len(PdfReader(io.BytesIO(merger.merge_template_pages(four_pages, page_count=2, bg_dir=bg_dir))).pages) == 2
+
+
+def test_concurrent_merges_share_the_cached_backgrounds(bg_dir):
+    from concurrent.futures import ThreadPoolExecutor
+
+    overlays = [_pdf([f"Angebot {n} Seite {i}" for i in range(1, 4)]) for n in range(8)]
+    merger.merge_template_pages(overlays[0], bg_dir=bg_dir)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        merged = list(pool.map(lambda overlay: merger.merge_template_pages(overlay, bg_dir=bg_dir), overlays * 3))
+
+    for n, pdf_bytes in enumerate(merged):
+        pages = PdfReader(io.BytesIO(pdf_bytes)).pages
+        for i, page in enumerate(pages, start=1):
+            text = page.extract_text()
+            assert f"Hintergrund {i}" in text and f"Angebot {n % 8} Seite {i}" in text
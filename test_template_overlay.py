@@ -0,0 +1,59 @@
+"""Tests für die Platzhalter-Karte und den Overlay-Renderer der Angebotsvorlage (pdf_template_engine)."""
+
+import io
+
+import pytest
+
+pytest.importorskip("pypdf")
+pytest.importorskip("reportlab")
+from pypdf import PdfReader
+
+from pdf_template_engine import overlay, placeholders
+
+PROJECT_DATA = {
+    "customer_data": {"first_name": "Erika", "last_name": "Muster", "address": "Hauptstr.", "house_number": "5",
+                      "zip_code": "80331", "city": "München", "email": "erika@example.de"},
+    "project_details": {"tilt_angle": 35, "selected_storage_storage_power_kw": 7.5},
+}
+ANALYSIS_RESULTS = {
+    "annual_pv_production_kwh": 9100.0, "total_consumption_kwh_yr": 5200.0, "self_supply_rate_percent": 61.0,
+    "direktverbrauch_anteil_pv_produktion_pct": 22.0, "speichernutzung_anteil_pv_produktion_pct": 15.0,
+    "anlage_kwp": 9.6, "cumulative_cash_flows_sim": [-18000.0, 30500.5], "irr_percent": 8.3,
+}
+
+
+def test_compiled_map_covers_all_placeholders_and_is_cached():
+    slot_map = placeholders.compile_placeholder_map()
+    slot_ids = {slot.slot_id for slots in slot_map.values() for slot in slots}
+
+    assert sorted(slot_map) == [1, 2, 3, 4, 5, 6]
+    assert set(placeholders.PLACEHOLDER_MAPPING) <= slot_ids
+    assert placeholders.compile_placeholder_map() is slot_map
+
+
+def test_values_are_derived_from_project_and_analysis():
+    values = placeholders.build_template_values(PROJECT_DATA, ANALYSIS_RESULTS, {"name": "Solar GmbH"},
+                                                offer_date="16.10.2026", overrides={"heating_type": "Wärmepumpe"})
+
+    assert values["customer_name"] == "Erika Muster"
+    assert values["customer_street"] == "Hauptstr. 5"
+    assert values["savings_with_battery_eur"] == "30.500,50"
+    assert values["self_consumption_percent"] == "37"
+    assert values["grid_purchase_kwh"] == "2.028"
+    assert values["storage_kwh"] == "7,5"
+    assert values["heating_type"] == "Wärmepumpe"
+    assert values["irr_without_battery_percent"] == ""
+
+
+def test_rendered_offer_contains_values_but_no_template_samples():
+    values = placeholders.build_template_values(PROJECT_DATA, ANALYSIS_RESULTS, {"name": "Solar GmbH"}, offer_date="16.10.2026")
+
+    reader = PdfReader(io.BytesIO(overlay.render_template_offer(values)))
+
+    assert len(reader.pages) == 6
+    first_page = reader.pages[0].extract_text()
+    assert "Erika Muster" in first_page and "30.500,50 EUR*" in first_page and "16.10.2026" in first_page
+    assert "PERSÖNLICHE ZUSAMMENFASSUNG" in first_page  # statischer Vorlagentext
+    assert "qwe qe" not in first_page and "29.150,00" not in first_page  # Beispielwerte der Vorlage
+    # Muster mit fehlendem Wert werden ganz weggelassen
+    assert "Verbrauch  Cent" not in reader.pages[2].extract_text()
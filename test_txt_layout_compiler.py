@@ -0,0 +1,138 @@
+"""Tests für den Layout-Compiler der TXT-Seitenbeschreibungen (txt_layout_compiler.py)."""
+
+import io
+import os
+
+import pytest
+
+import txt_layout_compiler
+
+SEP = "-" * 40
+
+
+def _write_page(input_dir, number, text="Angebot für {customer_name}"):
+    (input_dir / f"seite_{number}_details.txt").write_text(
+        f"Seitengröße: Rect(0.0, 0.0, 595.0, 842.0)\nRotation: 0\nNummer: {number}\n{SEP}\n", encoding="utf-8")
+    (input_dir / f"seite_{number}_texte.txt").write_text(
+        f"Text: {text}\nPosition: (74.5, 195.0, 520.0, 228.0)\nSchriftart: Helvetica-Bold\n"
+        f"Schriftgröße: 24.0\nFarbe: 5210557\n{SEP}\nText: Nur Position\n{SEP}\n", encoding="utf-8")
+    (input_dir / f"seite_{number}_formen.txt").write_text(
+        "Zeichnung 1\nRechteck: (Rect(10.0, 20.0, 30.0, 40.0), -1)\n"
+        "Bezier-Kurve: (Point(1.0, 2.0), Point(3.0, 4.0), Point(5.0, 6.0), Point(7.0, 8.0))\n"
+        "Linie von (1.0, 2.0) nach (3.0, 4.0)\n", encoding="utf-8")
+    (input_dir / f"seite_{number}_bilder_positionen.txt").write_text(
+        "Bild 1: Rect(212.5, 76.8, 382.6, 140.0)\nBild 2: Rect(1.0, 1.0, 2.0, 2.0)\n", encoding="utf-8")
+    (input_dir / f"seite_{number}_bild_1.png").write_bytes(b"kein echtes Bild")
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    directory = tmp_path / "input"
+    directory.mkdir()
+    for number in (1, 2):
+        _write_page(directory, number)
+    txt_layout_compiler.clear_layout_cache()
+    yield directory
+    txt_layout_compiler.clear_layout_cache()
+
+
+def test_compiled_page_holds_columns(input_dir):
+    layout = txt_layout_compiler.compile_layout(str(input_dir))
+    page = layout["pages"][0]
+
+    assert [p["number"] for p in layout["pages"]] == [1, 2]
+    assert page["size"] == (0.0, 0.0, 595.0, 842.0)
+    assert page["texts"]["text"] == ["Angebot für {customer_name}"]  # Block ohne Position entfällt
+    assert list(page["texts"]["bbox"]) == [74.5, 195.0, 520.0, 228.0]
+    assert list(page["texts"]["color"]) == [5210557]
+    assert list(page["rects"]) == [10.0, 20.0, 30.0, 40.0]
+    assert list(page["lines"]) == [1.0, 2.0, 3.0, 4.0]
+    assert list(page["beziers"]) == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]
+    assert page["image_files"] == ["seite_1_bild_1.png"]  # Bild 2 ohne Datei entfällt
+
+
+def test_artifact_is_reused_until_a_source_changes(input_dir, tmp_path, monkeypatch):
+    artifact = str(tmp_path / "layout.bin")
+    first = txt_layout_compiler.load_layout(str(input_dir), artifact)
+    assert os.path.exists(artifact)
+
+    compiled = []
+    original = txt_layout_compiler.compile_layout
+    monkeypatch.setattr(txt_layout_compiler, "compile_layout", lambda d=None: compiled.append(d) or original(d))
+
+    # neuer Prozess: Artefakt statt Parsen
+    txt_layout_compiler.clear_layout_cache()
+    assert txt_layout_compiler.load_layout(str(input_dir), artifact)["pages"][0]["texts"]["text"] == first["pages"][0]["texts"]["text"]
+    # nur mtime geändert, Inhalt gleich
+    texts_file = input_dir / "seite_1_texte.txt"
+    os.utime(texts_file, ns=(texts_file.stat().st_atime_ns, texts_file.stat().st_mtime_ns + 10**9))
+    txt_layout_compiler.load_layout(str(input_dir), artifact)
+    assert compiled == []
+
+    _write_page(input_dir, 1, text="Geändert")
+    os.utime(texts_file, ns=(texts_file.stat().st_atime_ns, texts_file.stat().st_mtime_ns + 2 * 10**9))
+    assert txt_layout_compiler.load_layout(str(input_dir), artifact)["pages"][0]["texts"]["text"] == ["Geändert"]
+    assert len(compiled) == 1
+
+
+def test_artifact_with_other_format_version_is_rebuilt(input_dir, tmp_path, monkeypatch):
+    artifact = str(tmp_path / "layout.bin")
+    txt_layout_compiler.load_layout(str(input_dir), artifact)
+    monkeypatch.setattr(txt_layout_compiler, "LAYOUT_FORMAT_VERSION", txt_layout_compiler.LAYOUT_FORMAT_VERSION + 1)
+    assert txt_layout_compiler.read_layout_artifact(artifact) is None
+
+    txt_layout_compiler.clear_layout_cache()
+    txt_layout_compiler.load_layout(str(input_dir), artifact)
+    assert txt_layout_compiler.read_layout_artifact(artifact) is not None
+
+
+def test_layout_renders_with_reportlab(input_dir):
+    pytest.importorskip("reportlab")
+    pypdf = pytest.importorskip("pypdf")
+    os.remove(input_dir / "seite_1_bild_1.png")
+    os.remove(input_dir / "seite_2_bild_1.png")
+    from dynamic_pdf_creator import DynamicPDFCreator
+
+    layout = txt_layout_compiler.compile_layout(str(input_dir))
+    reader = pypdf.PdfReader(io.BytesIO(DynamicPDFCreator().create_pdf_from_layout(layout)))
+
+    assert len(reader.pages) == 2
+    assert "Angebot für {customer_name}" in reader.pages[0].extract_text()
+
+
+def test_placeholders_are_filled_in_a_copy(input_dir):
+    layout = txt_layout_compiler.load_layout(str(input_dir), str(input_dir.parent / "layout.bin"))
+
+    filled = txt_layout_compiler.fill_layout_placeholders(layout, {"customer_name": "Erika Muster", "other": None})
+
+    assert filled["pages"][0]["texts"]["text"] == ["Angebot für Erika Muster"]
+    assert layout["pages"][0]["texts"]["text"] == ["Angebot für {customer_name}"]
+    assert filled["pages"][0]["beziers"] is layout["pages"][0]["beziers"]
+    unknown = txt_layout_compiler.fill_layout_placeholders(layout, {})
+    assert unknown["pages"][0]["texts"]["text"] == ["Angebot für {customer_name}"]
+
+
+def test_parallel_in_memory_rendering_leaves_input_untouched(input_dir, tmp_path, monkeypatch):
+    pypdf = pytest.importorskip("pypdf")
+    from concurrent.futures import ThreadPoolExecutor
+
+    import dynamic_pdf_creator
+    import txt_pdf_manager
+
+    for number in (1, 2):
+        os.remove(input_dir / f"seite_{number}_bild_1.png")
+    monkeypatch.setattr(txt_layout_compiler, "LAYOUT_ARTIFACT_PATH", str(tmp_path / "layout.bin"))
+    monkeypatch.chdir(tmp_path)
+    before = {path.name: path.read_bytes() for path in input_dir.iterdir()}
+
+    names = [f"Kunde {i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pdfs = list(pool.map(lambda name: dynamic_pdf_creator.render_txt_pdf({"customer_name": name}, str(input_dir)), names))
+    for name, pdf_bytes in zip(names, pdfs):
+        assert f"Angebot für {name}" in pypdf.PdfReader(io.BytesIO(pdf_bytes)).pages[0].extract_text()
+
+    pdf_bytes = txt_pdf_manager.generate_pdf_from_txt_files(
+        project_data={"customer_data": {"first_name": "Erika", "last_name": "Muster"}}, analysis_results={})
+    assert pdf_bytes.startswith(b"%PDF")
+    assert {path.name: path.read_bytes() for path in input_dir.iterdir()} == before
+    assert not (tmp_path / "recreated_full.pdf").exists()
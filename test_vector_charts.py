@@ -0,0 +1,110 @@
+"""Tests für die Vektor-Diagramme im PDF (ReportLab-Graphics statt Kaleido-PNG)."""
+
+import io
+import json
+
+import pytest
+
+reportlab = pytest.importorskip("reportlab")
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.platypus import SimpleDocTemplate
+
+import chart_cache
+import chart_export_queue
+import vector_charts
+
+SAMPLE_RESULTS = {
+    'monthly_productions_sim': [300, 420, 700, 900, 1050, 1100, 1120, 980, 760, 520, 310, 240],
+    'monthly_consumption_sim': [450] * 12,
+    'annual_costs_hochrechnung_values': [1200 * 1.03 ** i for i in range(20)],
+    'cumulative_cash_flows_sim': [-15000 + 1300 * i for i in range(21)],
+    'total_consumption_kwh_yr': 5400,
+    'self_supply_rate_percent': 62.5,
+    'direktverbrauch_anteil_pv_produktion_pct': 35.0,
+    'speichernutzung_anteil_pv_produktion_pct': 20.0,
+    'annual_pv_production_kwh': 8400,
+    'annual_co2_savings_kg': 3900,
+    'simulation_period_years_effective': 20,
+}
+
+
+def _strings(drawing):
+    found = []
+
+    def _walk(node):
+        if isinstance(node, String):
+            found.append(node.text)
+        for child in getattr(node, 'contents', []) or []:
+            _walk(child)
+    _walk(drawing)
+    return found
+
+
+@pytest.mark.parametrize("chart_key", sorted(vector_charts.VECTOR_CHART_BUILDERS))
+def test_builders_draw_from_results_and_skip_missing_data(chart_key):
+    drawing = vector_charts.build_vector_chart(chart_key, SAMPLE_RESULTS, {}, 450, 280)
+    assert isinstance(drawing, Drawing)
+    assert vector_charts.build_vector_chart(chart_key, {}, {}, 450, 280) is None
+
+
+def test_unknown_key_and_optional_title():
+    assert not vector_charts.supports_vector_chart('daily_production_switcher_chart_bytes')
+    assert vector_charts.build_vector_chart('daily_production_switcher_chart_bytes', SAMPLE_RESULTS, {}, 450, 280) is None
+
+    with_title = vector_charts.build_vector_chart('cost_projection_chart_bytes', SAMPLE_RESULTS, {}, 450, 280)
+    without_title = vector_charts.build_vector_chart('cost_projection_chart_bytes', SAMPLE_RESULTS, {}, 450, 280, show_title=False)
+    assert "Stromkosten-Hochrechnung (€/Jahr)" in _strings(with_title)
+    assert "Stromkosten-Hochrechnung (€/Jahr)" not in _strings(without_title)
+
+
+def test_drawings_build_into_small_pdf():
+    buffer = io.BytesIO()
+    story = [vector_charts.build_vector_chart(key, SAMPLE_RESULTS, {}, 450, 280) for key in vector_charts.VECTOR_CHART_BUILDERS]
+    SimpleDocTemplate(buffer).build(story)
+    pdf_bytes = buffer.getvalue()
+    assert pdf_bytes.startswith(b"%PDF")
+    assert len(pdf_bytes) < 60 * 1024
+
+
+class _FakeFigure:
+    def to_json(self):
+        return json.dumps({"data": [{"y": [1]}]})
+
+
+def test_vector_keys_are_not_rasterized():
+    chart_cache.configure_chart_cache(disk_enabled=False)
+    chart_cache.clear_chart_cache(include_disk=False)
+    results = {}
+    chart_export_queue.register_chart_export(results, 'cost_projection_chart_bytes', _FakeFigure(), width=901)
+    chart_export_queue.register_chart_export(results, 'roi_chart_bytes', _FakeFigure(), width=902)
+
+    stats = chart_export_queue.rasterize_pending_charts(results, max_workers=1, rasterize=lambda spec: b"PNG",
+                                                        skip_keys=['cost_projection_chart_bytes'])
+
+    assert stats['total'] == 1 and results['roi_chart_bytes'] == b"PNG"
+    assert chart_export_queue.pending_chart_keys(results) == ['cost_projection_chart_bytes']
+    assert chart_export_queue.is_chart_available(results, 'cost_projection_chart_bytes')
+    chart_cache.clear_chart_cache(include_disk=False)
+
+
+def test_failed_vector_build_keeps_the_chart_image():
+    chart_cache.configure_chart_cache(disk_enabled=False)
+    chart_cache.clear_chart_cache(include_disk=False)
+    results = {'cost_projection_chart_bytes': b"ALT"}
+    chart_export_queue.register_chart_export(results, 'cost_projection_chart_bytes', _FakeFigure(), width=903)
+    chart_export_queue.register_chart_export(results, 'cumulative_cashflow_chart_bytes', _FakeFigure(), width=904)
+    results['cumulative_cash_flows_sim'] = SAMPLE_RESULTS['cumulative_cash_flows_sim']
+    vector_keys = ['cost_projection_chart_bytes', 'cumulative_cashflow_chart_bytes']
+
+    # Für die Kostenprojektion fehlen die Daten: sie darf nicht übersprungen werden und bekommt ihr Bild
+    skip_keys = vector_charts.buildable_vector_chart_keys(vector_keys, results)
+    assert skip_keys == ['cumulative_cashflow_chart_bytes']
+    chart_export_queue.rasterize_pending_charts(results, max_workers=1, rasterize=lambda spec: b"PNG", skip_keys=skip_keys)
+    assert results['cost_projection_chart_bytes'] == b"PNG"
+
+    # Scheitert die Vektorgrafik erst beim Zeichnen, wird das vorgemerkte Bild sofort nachgerastert
+    results.pop('cumulative_cash_flows_sim')
+    assert vector_charts.build_vector_chart('cumulative_cashflow_chart_bytes', results, {}, 450, 280) is None
+    assert chart_export_queue.rasterize_chart(results, 'cumulative_cashflow_chart_bytes', rasterize=lambda spec: b"PNG2") == b"PNG2"
+    assert chart_export_queue.pending_chart_keys(results) == []
+    chart_cache.clear_chart_cache(include_disk=False)
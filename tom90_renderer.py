@@ -35,7 +35,6 @@ Datum: 2025‑07‑25
 from __future__ import annotations
 
 import io
-import base64
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Callable
 
@@ -50,8 +49,9 @@ try:
     from reportlab.lib import colors
     from reportlab.lib.styles import ParagraphStyle
     from reportlab.pdfgen import canvas as _rl_canvas
-    from reportlab.lib.utils import ImageReader
     _REPORTLAB_AVAILABLE = True
+    from pdf_asset_cache import CachedImage, get_image_asset
+    from pdf_image_optimizer import image_optimization
 except ImportError:
     _REPORTLAB_AVAILABLE = False
     class BaseDocTemplate:      # pragma: no cover
@@ -151,13 +151,11 @@ def _b64_to_image_flowable(b64_str: str, max_width: float, max_height: float) ->
     if not _REPORTLAB_AVAILABLE or not b64_str:
         return None
     try:
-        img_data = base64.b64decode(b64_str)
-        image = Image(io.BytesIO(img_data))
-        w, h = image.drawWidth, image.drawHeight
-        scale = min(max_width / w, max_height / h)
-        image.drawWidth = w * scale
-        image.drawHeight = h * scale
-        return image
+        asset = get_image_asset(b64_str, max_width, max_height)
+        if asset is None:
+            return None
+        scale = min(max_width / asset.width, max_height / asset.height)
+        return CachedImage(asset, width=asset.width * scale, height=asset.height * scale)
     except Exception:
         return None
 
@@ -1926,13 +1924,10 @@ if _REPORTLAB_AVAILABLE:
                 self.drawCentredString(page_width / 2, 0.15 * cm, text)
             if self.include_logo and self.company_logo_b64:
                 try:
-                    img_data = base64.b64decode(self.company_logo_b64)
-                    logo = ImageReader(io.BytesIO(img_data))
                     logo_w = 1.5 * cm
-                    iw, ih = logo.getSize()
-                    scale = logo_w / iw
-                    logo_h = ih * scale
-                    self.drawImage(logo, 0.5 * cm, 0.1 * cm, width=logo_w, height=logo_h, mask='auto')
+                    logo_asset = get_image_asset(self.company_logo_b64, max_width=logo_w)
+                    logo_h = logo_asset.height * logo_w / logo_asset.width
+                    self.drawImage(logo_asset.reader, 0.5 * cm, 0.1 * cm, width=logo_w, height=logo_h, mask='auto')
                 except Exception:
                     pass
 
@@ -1963,6 +1958,7 @@ class Tom90Renderer:
         self.company_logo_base64 = company_logo_base64
         self.title_image_b64 = title_image_b64
         self.offer_title_text = offer_title_text
+        self.image_report = None
         
         # TOM-90 Enhanced Theme als Standard verwenden
         if theme_name == "TOM-90" or theme_name == "Blau Elegant":
@@ -2034,6 +2030,17 @@ class Tom90Renderer:
         canvas_obj.restoreState()
 
     def build_pdf(self) -> Optional[bytes]:
+        """Rendert das PDF; Bilder werden im Profil inclusion_options['image_profile'] optimiert eingebettet."""
+        if not _REPORTLAB_AVAILABLE:
+            return self._build_pdf()
+        with image_optimization(self.inclusion_options.get('image_profile')) as report:
+            pdf_bytes = self._build_pdf()
+        self.image_report = report
+        if report.images:
+            print(f"🖼️ TOM-90 PDF-Bilder optimiert: {report.summary()}")
+        return pdf_bytes
+
+    def _build_pdf(self) -> Optional[bytes]:
         if not _REPORTLAB_AVAILABLE:
             dummy_pdf = (b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\n"
                          b"endobj\n2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n3 0 obj\n"
@@ -0,0 +1,349 @@
+# txt_layout_compiler.py
+# -*- coding: utf-8 -*-
+"""
+Layout-Compiler für die TXT-Seitenbeschreibungen in input/.
+
+pdf_erstellen_komplett.py und DynamicPDFCreator haben bei jedem PDF alle
+seite_N_{texte,formen,bilder_positionen,annotationen,details}.txt neu eingelesen, an den
+Trennlinien zerlegt und die Koordinaten Zeile für Zeile per ast/regex geparst.
+compile_layout macht daraus einmal eine kompakte Struktur (Textläufe, Formen und
+Bildplatzierungen als array-Spalten), load_layout speichert sie versioniert als Binärdatei
+(data/txt_layout.bin) und baut sie nur neu, wenn sich eine Quelldatei geändert hat
+(mtime/Größe, bei abweichender mtime zusätzlich SHA-1 des Inhalts).
+"""
+
+import ast
+import glob
+import hashlib
+import os
+import pickle
+import re
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LAYOUT_ARTIFACT_PATH = os.path.join(BASE_DIR, 'data', 'txt_layout.bin')
+LAYOUT_MAGIC = b'TXTLAYOUT'
+LAYOUT_FORMAT_VERSION = 1
+BLOCK_SEPARATOR = '-' * 40
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'tif', 'tiff')
+
+_HEADER = struct.Struct('<9sH')
+_PAGE_FILE_RE = re.compile(r'seite_(\d+)_')
+_RECT_RE = re.compile(r'Rect\(([^)]+)\)')
+_PAGE_SIZE_RE = re.compile(r'Rect\(([^,]+), ([^,]+), ([^,]+), ([^)]+)\)')
+_LINE_POINTS_RE = re.compile(r'\(([^,]+), ([^)]+)\)')
+_BEZIER_POINTS_RE = re.compile(r'Point\(([^)]+)\)')
+_IMAGE_RE = re.compile(r'Bild (\d+): Rect\(([^)]+)\)')
+_PLACEHOLDER_RE = re.compile(r'\{([A-Za-z0-9_]+)\}')
+
+_memory_lock = threading.Lock()
+_memory: Dict[str, Tuple[Dict[str, Tuple[int, int, str]], Dict[str, Any]]] = {}
+
+
+def default_input_dir() -> str:
+    # wie bisher relativ zum Arbeitsverzeichnis
+    return os.path.join(os.getcwd(), 'input')
+
+
+# --- Parser (einzige Stelle, an der das TXT-Format gelesen wird) ---
+
+def parse_text_runs(content: str) -> List[Dict[str, Any]]:
+    """Textblöcke aus seite_N_texte.txt: text, bbox (x0, y0, x1, y1 von oben), font, size, color."""
+    runs = []
+    for block in content.split(BLOCK_SEPARATOR):
+        run: Dict[str, Any] = {}
+        for line in block.splitlines():
+            line = line.strip()
+            if line.startswith('Text:'):
+                run['text'] = line.split('Text:', 1)[1].strip()
+            elif line.startswith('Position:'):
+                try:
+                    run['bbox'] = tuple(float(v) for v in ast.literal_eval(line.split('Position:', 1)[1].strip()))
+                except (ValueError, SyntaxError, TypeError):
+                    pass
+            elif line.startswith('Schriftart:'):
+                run['font'] = line.split('Schriftart:', 1)[1].strip()
+            elif line.startswith('Schriftgröße:'):
+                try:
+                    run['size'] = float(line.split('Schriftgröße:', 1)[1].strip())
+                except ValueError:
+                    pass
+            elif line.startswith('Farbe:'):
+                try:
+                    run['color'] = int(line.split('Farbe:', 1)[1].strip())
+                except ValueError:
+                    pass
+        if 'text' in run and len(run.get('bbox', ())) == 4:
+            runs.append(run)
+    return runs
+
+
+def parse_page_size(content: str) -> Optional[Tuple[float, float, float, float]]:
+    for line in content.splitlines():
+        if line.startswith('Seitengröße:'):
+            match = _PAGE_SIZE_RE.search(line)
+            if match:
+                return tuple(float(v) for v in match.groups())
+    return None
+
+
+def parse_shapes(content: str) -> Tuple[List[Tuple[float, ...]], List[Tuple[float, ...]], List[Tuple[float, ...]]]:
+    """Linien (x0, y0, x1, y1), Rechtecke (x0, y0, x1, y1) und Bezier-Kurven (4 Punkte) aus seite_N_formen.txt."""
+    lines, rects, beziers = [], [], []
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('Linie von'):
+            points = _LINE_POINTS_RE.findall(line)
+            if len(points) >= 2:
+                lines.append(tuple(float(v) for point in points[:2] for v in point))
+        elif line.startswith('Rechteck:'):
+            match = _RECT_RE.search(line)
+            if match:
+                values = [float(v) for v in match.group(1).split(',')]
+                if len(values) == 4:
+                    rects.append(tuple(values))
+        elif line.startswith('Bezier-Kurve:'):
+            points = [tuple(float(v) for v in point.split(', ')) for point in _BEZIER_POINTS_RE.findall(line)]
+            if len(points) == 4:
+                beziers.append(tuple(v for point in points for v in point))
+    return lines, rects, beziers
+
+
+def parse_image_positions(content: str) -> List[Tuple[int, Tuple[float, float, float, float]]]:
+    placements = []
+    for line in content.splitlines():
+        match = _IMAGE_RE.match(line)
+        if match:
+            bbox = tuple(float(v) for v in ast.literal_eval(f"({match.group(2)})"))
+            placements.append((int(match.group(1)), bbox))
+    return placements
+
+
+def parse_annotations(content: str) -> List[Tuple[str, Tuple[float, ...]]]:
+    annotations = []
+    for block in content.split(BLOCK_SEPARATOR):
+        text, rect = None, None
+        for line in block.splitlines():
+            if line.startswith('Inhalt:'):
+                text = line.split('Inhalt:', 1)[1].strip()
+            elif line.startswith('Position:'):
+                try:
+                    rect = tuple(float(v) for v in ast.literal_eval(line.split('Position:', 1)[1].strip()))
+                except (ValueError, SyntaxError, TypeError):
+                    rect = None
+        if text and rect:
+            annotations.append((text, rect))
+    return annotations
+
+
+# --- Compiler ---
+
+def _read(path: str) -> str:
+    if not os.path.exists(path):
+        return ''
+    with open(path, encoding='utf-8') as fh:
+        return fh.read()
+
+
+def _flat(rows: List[Tuple[float, ...]]) -> array:
+    return array('d', (v for row in rows for v in row))
+
+
+def page_numbers(input_dir: str) -> List[int]:
+    names = (os.path.basename(f) for f in glob.glob(os.path.join(input_dir, 'seite_*_*.*')))
+    return sorted({int(m.group(1)) for m in map(_PAGE_FILE_RE.match, names) if m})
+
+
+def compile_page(input_dir: str, number: int) -> Dict[str, Any]:
+    """Eine Seite als Spalten: texts (Listen + arrays), Formen und Bilder (flache float-arrays)."""
+    prefix = os.path.join(input_dir, f"seite_{number}_")
+    runs = parse_text_runs(_read(prefix + 'texte.txt'))
+    lines, rects, beziers = parse_shapes(_read(prefix + 'formen.txt'))
+    images = []
+    for index, bbox in parse_image_positions(_read(prefix + 'bilder_positionen.txt')):
+        filename = next((f"seite_{number}_bild_{index}.{ext}" for ext in IMAGE_EXTENSIONS
+                         if os.path.exists(f"{prefix}bild_{index}.{ext}")), None)
+        if filename:
+            images.append((filename, bbox))
+    return {
+        'number': number,
+        'size': parse_page_size(_read(prefix + 'details.txt')),
+        'texts': {
+            'text': [run['text'] for run in runs],
+            'font': [run.get('font', '') for run in runs],
+            'bbox': _flat([run['bbox'] for run in runs]),
+            'size': array('d', (run.get('size', 12.0) for run in runs)),
+            'color': array('q', (run.get('color', 0) for run in runs)),
+        },
+        'lines': _flat(lines),
+        'rects': _flat(rects),
+        'beziers': _flat(beziers),
+        'image_files': [filename for filename, _ in images],
+        'image_bboxes': _flat([bbox for _, bbox in images]),
+        'annotations': parse_annotations(_read(prefix + 'annotationen.txt')),
+    }
+
+
+def compile_layout(input_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Parst den kompletten input/-Satz (ohne Cache)."""
+    input_dir = input_dir or default_input_dir()
+    return {
+        'version': LAYOUT_FORMAT_VERSION,
+        'input_dir': os.path.abspath(input_dir),
+        'pages': [compile_page(input_dir, number) for number in page_numbers(input_dir)],
+    }
+
+
+# --- Versioniertes Binär-Artefakt ---
+
+def _source_files(input_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(input_dir, 'seite_*_*.*')))
+
+
+def _file_sha1(path: str) -> str:
+    with open(path, 'rb') as fh:
+        return hashlib.sha1(fh.read()).hexdigest()
+
+
+def _source_signature(input_dir: str, previous: Optional[Dict[str, Tuple[int, int, str]]] = None) -> Dict[str, Tuple[int, int, str]]:
+    """Name -> (mtime_ns, Größe, SHA-1); der Hash wird nur bei geänderter mtime/Größe neu berechnet."""
+    signature = {}
+    for path in _source_files(input_dir):
+        stat = os.stat(path)
+        name = os.path.basename(path)
+        old = (previous or {}).get(name)
+        if old and old[0] == stat.st_mtime_ns and old[1] == stat.st_size:
+            signature[name] = old
+        else:
+            signature[name] = (stat.st_mtime_ns, stat.st_size, _file_sha1(path))
+    return signature
+
+
+def _same_content(a: Dict[str, Tuple[int, int, str]], b: Dict[str, Tuple[int, int, str]]) -> bool:
+    return a.keys() == b.keys() and all(a[name][1:] == b[name][1:] for name in a)
+
+
+def write_layout_artifact(layout: Dict[str, Any], sources: Dict[str, Tuple[int, int, str]], artifact_path: str) -> None:
+    os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+    payload = pickle.dumps({'sources': sources, 'layout': layout}, protocol=pickle.HIGHEST_PROTOCOL)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(artifact_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(_HEADER.pack(LAYOUT_MAGIC, LAYOUT_FORMAT_VERSION))
+            fh.write(payload)
+        os.replace(tmp_path, artifact_path)  # atomar, parallele Leser sehen nie eine halbe Datei
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_layout_artifact(artifact_path: str) -> Optional[Dict[str, Any]]:
+    """Inhalt des Artefakts oder None bei fehlender, fremder oder veralteter Formatversion."""
+    try:
+        with open(artifact_path, 'rb') as fh:
+            magic, version = _HEADER.unpack(fh.read(_HEADER.size))
+            if magic != LAYOUT_MAGIC or version != LAYOUT_FORMAT_VERSION:
+                return None
+            return pickle.loads(fh.read())
+    except (OSError, struct.error, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        if os.path.exists(artifact_path):
+            print(f"txt_layout_compiler: Artefakt {artifact_path} nicht lesbar, wird neu erstellt: {e}")
+        return None
+
+
+def load_layout(input_dir: Optional[str] = None, artifact_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Kompiliertes Layout für input_dir. Reihenfolge: Prozess-Speicher, Binär-Artefakt, Neukompilierung.
+    Bei jedem Aufruf werden nur die Quelldateien per stat geprüft.
+    """
+    input_dir = os.path.abspath(input_dir or default_input_dir())
+    artifact_path = artifact_path or LAYOUT_ARTIFACT_PATH
+    cache_key = f"{input_dir}|{artifact_path}"
+    with _memory_lock:
+        cached = _memory.get(cache_key)
+        current = _source_signature(input_dir, cached[0] if cached else None)
+        if cached and _same_content(cached[0], current):
+            return cached[1]
+
+        stored = read_layout_artifact(artifact_path)
+        if stored and stored['layout'].get('input_dir') == input_dir and _same_content(stored['sources'], current):
+            layout = stored['layout']
+            if stored['sources'] != current:  # nur mtimes verschoben (z.B. git checkout)
+                write_layout_artifact(layout, current, artifact_path)
+        else:
+            layout = compile_layout(input_dir)
+            try:
+                write_layout_artifact(layout, current, artifact_path)
+            except OSError as e:
+                print(f"txt_layout_compiler: Artefakt konnte nicht geschrieben werden: {e}")
+        _memory[cache_key] = (current, layout)
+        return layout
+
+
+def fill_layout_placeholders(layout: Dict[str, Any], values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Kopie des Layouts, in deren Textläufen {platzhalter} durch values ersetzt sind (None -> '').
+    Unbekannte Platzhalter bleiben stehen. Nur die Textlisten werden kopiert, Geometrie-Arrays
+    geteilt; das geladene Layout selbst wird nie verändert, parallele Aufrufe stören sich nicht.
+    """
+    def _replace(match: 're.Match') -> str:
+        key = match.group(1)
+        if key not in values:
+            return match.group(0)
+        return '' if values[key] is None else str(values[key])
+
+    pages = []
+    for page in layout['pages']:
+        texts = page['texts']
+        filled = [_PLACEHOLDER_RE.sub(_replace, text) if '{' in text else text for text in texts['text']]
+        pages.append(dict(page, texts=dict(texts, text=filled)))
+    return dict(layout, pages=pages)
+
+
+def clear_layout_cache() -> None:
+    with _memory_lock:
+        _memory.clear()
+
+
+def benchmark_layout_loading(input_dir: Optional[str] = None, artifact_path: Optional[str] = None, runs: int = 10) -> Dict[str, float]:
+    """Vergleicht TXT-Parsen mit dem Laden des Artefakts (Sekunden pro Durchlauf)."""
+    input_dir = input_dir or default_input_dir()
+    artifact_path = artifact_path or LAYOUT_ARTIFACT_PATH
+    load_layout(input_dir, artifact_path)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        compile_layout(input_dir)
+    parse_seconds = (time.perf_counter() - start) / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        read_layout_artifact(artifact_path)
+    artifact_seconds = (time.perf_counter() - start) / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        load_layout(input_dir, artifact_path)
+    warm_seconds = (time.perf_counter() - start) / runs
+
+    return {
+        'parse_seconds': parse_seconds,
+        'artifact_load_seconds': artifact_seconds,
+        'warm_load_seconds': warm_seconds,
+        'speedup_artifact': parse_seconds / artifact_seconds if artifact_seconds else 0.0,
+        'artifact_bytes': float(os.path.getsize(artifact_path)) if os.path.exists(artifact_path) else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    stats = benchmark_layout_loading()
+    print(f"TXT parsen:         {stats['parse_seconds'] * 1000:8.1f} ms")
+    print(f"Artefakt laden:     {stats['artifact_load_seconds'] * 1000:8.1f} ms ({stats['speedup_artifact']:.0f}x schneller)")
+    print(f"Warm (nur stat):    {stats['warm_load_seconds'] * 1000:8.1f} ms")
+    print(f"Artefakt-Größe:     {stats['artifact_bytes'] / 1024:8.1f} KB")
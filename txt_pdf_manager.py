@@ -7,134 +7,74 @@ Datum: 28.07.2025
 """
 
 import os
-import subprocess
 import re
-import sys
 from typing import Dict, Any, Optional
 import traceback
 
 
 def generate_pdf_from_txt_files(project_data=True, analysis_results=True, **kwargs):
-    try:
-        # Vor jeder PDF-Erzeugung: Platzhalter in den TXT-Dateien ersetzen
-        try:
-            update_txt_files_from_project_data(
-                project_data or {}, analysis_results or {}
-            )
-        except Exception as update_err:
-            print(f"⚠️ TXT-Update vor PDF-Erstellung fehlgeschlagen: {update_err}")
-
-   
-        # Pfade definierent
-        base_dir = os.getcwd()
-        pdf_script = os.path.join(base_dir, "pdf_erstellen_komplett.py")
-        output_pdf = os.path.join(base_dir, "recreated_full.pdf")
-
-        # Prüfen ob das Script existiert
-        if not os.path.exists(pdf_script):
-            print(f" PDF-Script nicht gefunden: {pdf_script}")
-            return None
+    """
+    Erstellt das PDF aus den TXT-Seitenbeschreibungen in input/ komplett im Speicher.
 
-        # Prüfen ob input-Ordner existiert
-        input_dir = os.path.join(base_dir, "input")
+    Die Platzhalter werden im geladenen Layout ersetzt (txt_layout_compiler), nicht in den
+    TXT-Dateien; es gibt keinen Subprozess und keine gemeinsame recreated_full.pdf mehr.
+    Dadurch können mehrere Nutzer gleichzeitig (Threads oder Prozesse) PDFs erzeugen.
+    """
+    try:
+        input_dir = os.path.join(os.getcwd(), "input")
         if not os.path.exists(input_dir):
             print(f" Input-Ordner nicht gefunden: {input_dir}")
             return None
 
-        # 🔥 NEUE DYNAMISCHE DATENINTEGRATION
-        print("🔄 Integriere dynamische Kundendaten zur Laufzeit...")
-        dynamic_texts = None
-        
-        try:
-            from runtime_dynamic_replacer import RuntimeDynamicReplacer
-            from dynamic_data_integrator import DynamicDataIntegrator
-            
-            # Dynamische Daten vorbereiten
-            integrator = DynamicDataIntegrator()
-            dynamic_data = integrator.prepare_dynamic_data(
-                project_data=project_data or {},
-                analysis_results=analysis_results or {},
-                company_info=kwargs.get('company_info', {}),
-                customer_data=kwargs.get('customer_data', project_data or {})
-            )
-            
-            # TXT-Dateien zur Laufzeit verarbeiten
-            replacer = RuntimeDynamicReplacer()
-            dynamic_texts = replacer.load_and_process_txt_files(dynamic_data)
-            
-            print(f"✅ {len(dynamic_data)} dynamische Werte integriert")
-            print(f"✅ {len(dynamic_texts)} TXT-Dateien mit echten Kundendaten verarbeitet")
-            
-        except Exception as dynamic_error:
-            print(f"⚠️ Dynamische Datenintegration fehlgeschlagen: {dynamic_error}")
-            print("📄 Verwende Original-TXT-Dateien")
-            dynamic_texts = None
-
-        # Dynamische Platzhalter in den TXT-Dateien ersetzen (LEGACY - nicht mehr verwendet)
-        update_txt_files_from_project_data(project_data or {}, analysis_results or {})
-
-        print("📄 Starte dynamische PDF-Generierung...")
-
-        # Verwende dynamische Texte falls verfügbar
-        if dynamic_texts:
-            print("✅ Verwende verarbeitete dynamische Texte für PDF-Erstellung")
-            try:
-                from dynamic_pdf_creator import create_dynamic_pdf
-                
-                pdf_bytes = create_dynamic_pdf(dynamic_texts)
-                
-                if pdf_bytes:
-                    print(f"✅ Dynamische PDF erfolgreich erstellt ({len(pdf_bytes)} bytes)")
-                    
-                    # Optional: PDF auch als Datei speichern
-                    with open(output_pdf, 'wb') as f:
-                        f.write(pdf_bytes)
-                    
-                    return pdf_bytes
-                else:
-                    print("❌ Dynamische PDF-Erstellung fehlgeschlagen")
-                    
-            except Exception as dynamic_pdf_error:
-                print(f"⚠️ Dynamische PDF-Erstellung fehlgeschlagen: {dynamic_pdf_error}")
-                print("📄 Fallback zu Original-System...")
-        
-        # Fallback: Original-System verwenden
-        print("📄 Verwende Original TXT-zu-PDF System...")
-
-        # PDF-Script ausführen
-        result = subprocess.run(
-            [sys.executable, pdf_script],
-            cwd=base_dir,
-            capture_output=True,
-            text=True,
-            timeout=30,
+        dynamic_data = _prepare_dynamic_data(
+            project_data if isinstance(project_data, dict) else {},
+            analysis_results if isinstance(analysis_results, dict) else {},
+            company_info=kwargs.get("company_info"),
+            customer_data=kwargs.get("customer_data"),
         )
 
-        if result.returncode != 0:
-            print(f" PDF-Script Fehler: {result.stderr}")
-            return None
+        from dynamic_pdf_creator import render_txt_pdf
 
-        # Prüfen ob PDF erstellt wurde
-        if not os.path.exists(output_pdf):
-            print(f" PDF-Datei nicht erstellt: {output_pdf}")
+        pdf_bytes = render_txt_pdf(dynamic_data, input_dir)
+        if not pdf_bytes:
+            print("❌ PDF-Erstellung aus dem TXT-Layout fehlgeschlagen")
             return None
-
-        # PDF-Bytes lesen
-        with open(output_pdf, "rb") as f:
-            pdf_bytes = f.read()
-
-        print(" PDF erfolgreich aus TXT-Dateien erstellt!")
+        print(f"✅ PDF aus TXT-Layout erstellt ({len(pdf_bytes)} bytes)")
         return pdf_bytes
 
-    except subprocess.TimeoutExpired:
-        print(" PDF-Generierung Timeout nach 30 Sekunden")
-        return None
     except Exception as e:
         print(f" Fehler bei TXT-zu-PDF Generierung: {e}")
         print(traceback.format_exc())
         return None
 
 
+def _prepare_dynamic_data(
+    project_data: Dict[str, Any],
+    analysis_results: Dict[str, Any],
+    company_info: Optional[Dict[str, Any]] = None,
+    customer_data: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Platzhalterwerte über den DynamicDataIntegrator (Firmen-/Kundendaten auch aus project_data)."""
+    from dynamic_data_integrator import DynamicDataIntegrator
+
+    if not company_info:
+        company_info = (
+            project_data.get('company_information', {})
+            or project_data.get('company_data', {})
+            or project_data.get('company_info', {})
+            or {}
+        )
+    if customer_data is None:
+        customer_data = project_data.get('customer_data')
+
+    return DynamicDataIntegrator().prepare_dynamic_data(
+        project_data=project_data,
+        analysis_results=analysis_results,
+        company_info=company_info or {},
+        customer_data=customer_data or None
+    )
+
+
 def update_txt_files_from_project_data(
     project_data: Dict[str, Any],
     analysis_results: Dict[str, Any]
@@ -150,38 +90,12 @@ def update_txt_files_from_project_data(
             print(f"❌ Input-Ordner nicht gefunden: {input_dir}")
             return False
 
-        # DynamicDataIntegrator importieren
         try:
-            from dynamic_data_integrator import DynamicDataIntegrator
+            dynamic_data = _prepare_dynamic_data(project_data or {}, analysis_results or {})
         except Exception as import_err:
-            print(f"❌ Konnte dynamic_data_integrator nicht importieren: {import_err}")
+            print(f"❌ Konnte dynamic_data_integrator nicht verwenden: {import_err}")
             return False
 
-        integrator = DynamicDataIntegrator()
-
-        # Firmeninformationen aus project_data extrahieren (verschiedene Schlüssel unterstützen)
-        company_info: Dict[str, Any] = {}
-        if isinstance(project_data, dict):
-            company_info = (
-                project_data.get('company_information', {})
-                or project_data.get('company_data', {})
-                or project_data.get('company_info', {})
-                or {}
-            )
-
-        # Optionales customer_data extrahieren
-        customer_data: Optional[Dict[str, Any]] = None
-        if isinstance(project_data, dict):
-            customer_data = project_data.get('customer_data')
-
-        # Dynamische Daten vorbereiten (enthält alle benötigten Schlüssel/Werte)
-        dynamic_data = integrator.prepare_dynamic_data(
-            project_data=project_data or {},
-            analysis_results=analysis_results or {},
-            company_info=company_info or {},
-            customer_data=customer_data or None
-        )
-
         # Alle TXT-Dateien mit _texte.txt durchgehen und Platzhalter ersetzen
         txt_files = [f for f in os.listdir(input_dir) if f.endswith('_texte.txt')]
         if not txt_files:
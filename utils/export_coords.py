@@ -10,7 +10,7 @@ OUT = Path("coords_raw.yaml")
 
 all_pages = collections.OrderedDict()
 
-for pdf_file in sorted(SRC.glob("[01][02][03][04][05][06].pdf")):
+for pdf_file in sorted(SRC.glob("[0-9][0-9].pdf")):
     doc = pdfplumber.open(pdf_file)
     page = doc.pages[0]                   # jede deiner Vorlagen hat 1 Seite
     h = page.height
@@ -0,0 +1,286 @@
+# vector_charts.py
+# -*- coding: utf-8 -*-
+"""
+Vektor-Diagramme für das PDF direkt aus den Analyseergebnissen (ReportLab-Graphics).
+
+Für die Standarddiagramme (Monatsvergleich Produktion/Verbrauch, Stromkosten-Hochrechnung,
+kumulierter Cashflow, Verbrauchsdeckung, PV-Nutzung, CO₂-Einsparung) wird statt des
+gerasterten Plotly-PNGs eine Drawing erzeugt: kein Kaleido/Chromium, kleine PDFs und scharfer
+Druck. Welche Diagramme als Vektor gezeichnet werden, wählt der Aufrufer je Diagramm-Schlüssel
+(inclusion_options['vector_chart_keys']); alle anderen bleiben Bilder.
+"""
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.charts.legends import Legend
+    from reportlab.graphics.charts.linecharts import HorizontalLineChart
+    from reportlab.graphics.charts.piecharts import Pie
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.lib import colors
+    _REPORTLAB_GRAPHICS_AVAILABLE = True
+except ImportError:
+    _REPORTLAB_GRAPHICS_AVAILABLE = False
+
+DEFAULT_PALETTE = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+MONTH_LABELS_DEFAULT = "Jan,Feb,Mrz,Apr,Mai,Jun,Jul,Aug,Sep,Okt,Nov,Dez"
+FONT_NAME = 'Helvetica'
+FONT_NAME_BOLD = 'Helvetica-Bold'
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+def _series(values: Any) -> List[float]:
+    if not isinstance(values, (list, tuple)):
+        return []
+    return [_number(v) or 0.0 for v in values]
+
+
+def _format_de(value: float, decimals: int = 0) -> str:
+    return f"{value:,.{decimals}f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def _text(texts: Optional[Dict[str, str]], key: str, fallback: str) -> str:
+    return (texts or {}).get(key, fallback)
+
+
+def _palette(palette: Optional[Sequence[str]]) -> List[Any]:
+    return [colors.HexColor(c) if isinstance(c, str) and c.startswith('#') else colors.grey for c in (palette or DEFAULT_PALETTE)] + \
+        [colors.HexColor(c) for c in DEFAULT_PALETTE]
+
+
+def _value_axis_step(max_abs: float) -> float:
+    """Rundes Teilungsintervall für etwa fünf Achsenabschnitte."""
+    if max_abs <= 0:
+        return 1.0
+    raw = max_abs / 5.0
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for step in (1, 2, 2.5, 5, 10):
+        if raw <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+def _base_drawing(width: float, height: float, title: Optional[str]) -> "Drawing":
+    drawing = Drawing(width, height)
+    if title:
+        drawing.add(String(width / 2.0, height - 14, title, fontName=FONT_NAME_BOLD, fontSize=11, textAnchor='middle'))
+    return drawing
+
+
+def _add_legend(drawing: "Drawing", entries: List[tuple], x: float, y: float) -> None:
+    legend = Legend()
+    legend.x, legend.y = x, y
+    legend.alignment = 'right'
+    legend.fontName, legend.fontSize = FONT_NAME, 8
+    legend.columnMaximum = 1
+    legend.deltax = 90
+    legend.dx = legend.dy = 8
+    legend.colorNamePairs = entries
+    drawing.add(legend)
+
+
+def _configure_value_axis(axis: Any, values: Sequence[float], decimals: int = 0) -> None:
+    low = min(0.0, min(values)) if values else 0.0
+    high = max(0.0, max(values)) if values else 1.0
+    step = _value_axis_step(max(abs(low), abs(high)))
+    axis.valueMin = math.floor(low / step) * step
+    axis.valueMax = math.ceil(high / step) * step if high > 0 else step
+    axis.valueStep = step
+    axis.labels.fontName, axis.labels.fontSize = FONT_NAME, 7
+    axis.labelTextFormat = lambda v: _format_de(v, decimals)
+    axis.visibleGrid = True
+    axis.gridStrokeColor = colors.HexColor('#dddddd')
+    axis.gridStrokeWidth = 0.4
+
+
+def _bar_chart(width: float, height: float, title: Optional[str], categories: List[str], series: List[List[float]],
+               series_names: List[str], palette: Optional[Sequence[str]], decimals: int = 0) -> "Drawing":
+    drawing = _base_drawing(width, height, title)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 45, 45
+    chart.width, chart.height = width - 60, height - 80
+    chart.data = [tuple(s) for s in series]
+    chart.categoryAxis.categoryNames = categories
+    chart.categoryAxis.labels.fontName, chart.categoryAxis.labels.fontSize = FONT_NAME, 7
+    chart.categoryAxis.labels.boxAnchor = 'n'
+    _configure_value_axis(chart.valueAxis, [v for s in series for v in s], decimals)
+    chart.barSpacing = 1
+    chart.groupSpacing = 6
+    fills = _palette(palette)
+    for i in range(len(series)):
+        chart.bars[i].fillColor = fills[i]
+        chart.bars[i].strokeColor = None
+    drawing.add(chart)
+    if len(series) > 1:
+        _add_legend(drawing, [(fills[i], name) for i, name in enumerate(series_names)], 45, 14)
+    return drawing
+
+
+def _line_chart(width: float, height: float, title: Optional[str], categories: List[str], series: List[List[float]],
+                series_names: List[str], palette: Optional[Sequence[str]], decimals: int = 0) -> "Drawing":
+    drawing = _base_drawing(width, height, title)
+    chart = HorizontalLineChart()
+    chart.x, chart.y = 55, 45
+    chart.width, chart.height = width - 70, height - 80
+    chart.data = [tuple(s) for s in series]
+    chart.categoryAxis.labels.fontName, chart.categoryAxis.labels.fontSize = FONT_NAME, 7
+    chart.categoryAxis.labels.boxAnchor = 'n'
+    # Bei vielen Jahren nur jede n-te Beschriftung
+    label_every = max(1, len(categories) // 12)
+    chart.categoryAxis.categoryNames = [c if i % label_every == 0 else '' for i, c in enumerate(categories)]
+    _configure_value_axis(chart.valueAxis, [v for s in series for v in s], decimals)
+    strokes = _palette(palette)
+    for i in range(len(series)):
+        chart.lines[i].strokeColor = strokes[i]
+        chart.lines[i].strokeWidth = 1.6
+    drawing.add(chart)
+    if len(series) > 1:
+        _add_legend(drawing, [(strokes[i], name) for i, name in enumerate(series_names)], 55, 14)
+    return drawing
+
+
+def _pie_chart(width: float, height: float, title: Optional[str], labels: List[str], values: List[float],
+               palette: Optional[Sequence[str]]) -> Optional["Drawing"]:
+    pairs = [(label, value) for label, value in zip(labels, values) if value >= 0.01]
+    if not pairs:
+        return None
+    drawing = _base_drawing(width, height, title)
+    pie = Pie()
+    size = min(width * 0.5, height - 60)
+    pie.x, pie.y = 30, (height - 24 - size) / 2.0
+    pie.width = pie.height = size
+    pie.data = [value for _, value in pairs]
+    pie.labels = [f"{_format_de(value, 1)} %" for _, value in pairs]
+    pie.simpleLabels = True
+    pie.slices.fontName, pie.slices.fontSize = FONT_NAME, 8
+    pie.slices.strokeColor = colors.white
+    pie.slices.strokeWidth = 1
+    fills = _palette(palette)
+    for i in range(len(pairs)):
+        pie.slices[i].fillColor = fills[i]
+    drawing.add(pie)
+    legend = Legend()
+    legend.x, legend.y = pie.x + size + 40, pie.y + size * 0.75
+    legend.alignment = 'right'
+    legend.fontName, legend.fontSize = FONT_NAME, 9
+    legend.colorNamePairs = [(fills[i], label) for i, (label, _) in enumerate(pairs)]
+    drawing.add(legend)
+    return drawing
+
+
+def build_monthly_prod_cons(results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float, height: float,
+                            palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    production = _series(results.get('monthly_productions_sim'))
+    consumption = _series(results.get('monthly_consumption_sim'))
+    if len(production) != 12 or len(consumption) != 12:
+        return None
+    months = _text(texts, "month_names_short_list", MONTH_LABELS_DEFAULT).split(',')
+    return _bar_chart(width, height, _text(texts, "pdf_chart_title_monthly_comp_pdf", "Monatl. Produktion/Verbrauch") if show_title else None,
+                      months[:12], [production, consumption],
+                      [_text(texts, 'pv_production_chart_label', "PV Produktion"), _text(texts, 'consumption_chart_label', "Verbrauch")],
+                      palette)
+
+
+def build_cost_projection(results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float, height: float,
+                          palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    costs = _series(results.get('annual_costs_hochrechnung_values'))
+    if not costs:
+        return None
+    years = [str(i) for i in range(1, len(costs) + 1)]
+    return _line_chart(width, height, _text(texts, "pdf_chart_label_cost_projection", "Stromkosten-Hochrechnung (€/Jahr)") if show_title else None,
+                       years, [costs], [_text(texts, "annual_costs_label", "Stromkosten")], palette)
+
+
+def build_cumulative_cashflow(results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float, height: float,
+                              palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    cumulative = _series(results.get('cumulative_cash_flows_sim'))
+    if not cumulative:
+        return None
+    years = [str(i) for i in range(len(cumulative))]
+    return _line_chart(width, height, _text(texts, "pdf_chart_label_cum_cashflow", "Kumulierter Cashflow (€)") if show_title else None,
+                       years, [cumulative], [_text(texts, "cumulative_cashflow_label", "Kumulierter Cashflow")], palette)
+
+
+def build_consumption_coverage_pie(results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float, height: float,
+                                   palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    total_consumption = _number(results.get('total_consumption_kwh_yr'))
+    self_supply = _number(results.get('self_supply_rate_percent'))
+    if not total_consumption or total_consumption <= 0 or self_supply is None:
+        return None
+    return _pie_chart(width, height, _text(texts, "pdf_chart_title_consumption_coverage_pdf", "Deckung Gesamtverbrauch (Jahr 1)") if show_title else None,
+                      [_text(texts, 'self_supply_rate_pie_label', "Eigenversorgung"), _text(texts, 'grid_consumption_rate_pie_label', "Netzbezug")],
+                      [self_supply, max(0.0, 100.0 - self_supply)], palette or ['#2ca02c', '#d62728'])
+
+
+def build_pv_usage_pie(results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float, height: float,
+                       palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    direct = _number(results.get('direktverbrauch_anteil_pv_produktion_pct'))
+    storage = _number(results.get('speichernutzung_anteil_pv_produktion_pct'))
+    production = _number(results.get('annual_pv_production_kwh'))
+    if direct is None or storage is None or not production or production <= 0:
+        return None
+    return _pie_chart(width, height, _text(texts, "pdf_chart_title_pv_usage_pdf", "Nutzung PV-Strom (Jahr 1)") if show_title else None,
+                      [_text(texts, 'direct_consumption_pie_label', "Direktverbrauch"), _text(texts, 'storage_usage_pie_label', "Speichernutzung"),
+                       _text(texts, 'feed_in_pie_label', "Einspeisung")],
+                      [direct, storage, max(0.0, 100.0 - direct - storage)], palette or ['#1f77b4', '#ff7f0e', '#dddddd'])
+
+
+def build_co2_savings(results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float, height: float,
+                      palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    annual_kg = _number(results.get('annual_co2_savings_kg'))
+    if not annual_kg or annual_kg <= 0:
+        return None
+    period = int(_number(results.get('simulation_period_years_effective')) or 20)
+    milestones = sorted({1, 5, 10, 15, 20, 25, period} & set(range(1, period + 1)))
+    return _bar_chart(width, height, _text(texts, "pdf_chart_label_co2_realistic", "Kumulierte CO₂-Einsparung (t)") if show_title else None,
+                      [f"{_text(texts, 'year_short_label', 'Jahr')} {year}" for year in milestones],
+                      [[annual_kg * year / 1000.0 for year in milestones]],
+                      [_text(texts, 'co2_savings_label', "CO₂-Einsparung")], palette or ['#2ca02c'], decimals=1)
+
+
+VECTOR_CHART_BUILDERS: Dict[str, Callable[..., Optional["Drawing"]]] = {
+    'monthly_prod_cons_chart_bytes': build_monthly_prod_cons,
+    'cost_projection_chart_bytes': build_cost_projection,
+    'cumulative_cashflow_chart_bytes': build_cumulative_cashflow,
+    'consumption_coverage_pie_chart_bytes': build_consumption_coverage_pie,
+    'pv_usage_pie_chart_bytes': build_pv_usage_pie,
+    'co2_savings_chart_bytes': build_co2_savings,
+}
+
+
+def supports_vector_chart(chart_key: str) -> bool:
+    return _REPORTLAB_GRAPHICS_AVAILABLE and chart_key in VECTOR_CHART_BUILDERS
+
+
+def build_vector_chart(chart_key: str, results: Dict[str, Any], texts: Optional[Dict[str, str]], width: float,
+                       height: float, palette: Optional[Sequence[str]] = None, show_title: bool = True) -> Optional["Drawing"]:
+    """
+    Drawing für chart_key (Schlüssel wie in analysis_results, z.B. 'cost_projection_chart_bytes').
+    None, wenn kein Vektor-Builder existiert oder die Daten fehlen – der Aufrufer nutzt dann das Bild.
+    """
+    if not supports_vector_chart(chart_key) or not isinstance(results, dict):
+        return None
+    try:
+        drawing = VECTOR_CHART_BUILDERS[chart_key](results, texts, width, height, palette, show_title)
+    except Exception as e:
+        print(f"vector_charts: {chart_key} konnte nicht gezeichnet werden: {e}")
+        return None
+    if drawing is not None:
+        drawing.hAlign = 'CENTER'
+    return drawing
+
+
+def buildable_vector_chart_keys(chart_keys: Optional[Sequence[str]], results: Dict[str, Any],
+                                texts: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Die Schlüssel aus chart_keys, für die aus results wirklich eine Drawing entsteht. Nur diese
+    dürfen beim Rastern übersprungen werden; alle anderen brauchen weiterhin ihr Bild.
+    """
+    return [key for key in (chart_keys or []) if build_vector_chart(key, results, texts, 450, 280) is not None]